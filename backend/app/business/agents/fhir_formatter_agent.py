@@ -1,9 +1,11 @@
+import json
 from typing import Any
 
 from langgraph.prebuilt import create_react_agent
 from loguru import logger
 
 from business.clients.llm_client import LLMClient
+from business.mappers.fhir_summary_mapper import as_fhir_resources, summarize_fhir_resources
 from business.schemas.fhir_translator_agent import FHIRTranslatorAgentOutput
 from config.settings import get_settings
 
@@ -24,6 +26,24 @@ class FHIRFormatterAgent:
         """
         self.agent_name = "FHIRFormatterAgent"
         self.llm = llm_client.get_llm()
+        self.system_message = (
+            "You are a medical assistant specializing in summarizing patient data retrieved from FHIR servers. "
+            "Your task is to convert raw FHIR data into a concise, human-readable format, preserving key details."
+        )
+        self.agent = None
+
+    def get_agent(self):
+        """
+        Return the compiled agent graph, building it once on first use.
+        """
+        if self.agent is None:
+            self.agent = create_react_agent(
+                name=self.agent_name,
+                model=self.llm,
+                prompt=self.system_message,
+                tools=[],
+            )
+        return self.agent
 
     async def format(self, fhir_translator_agent_output: FHIRTranslatorAgentOutput,
                      fhir_retriever_agent_output: Any):
@@ -31,17 +51,30 @@ class FHIRFormatterAgent:
         Format
         \nInput: Retrieved raw FHIR data and the doctor’s original natural-language query.
         \nOutput: Natural language summary of the FHIR data suitable for LLM consumption.
+
+        FHIR resources are summarized by deterministic per-resource-type rules; the LLM ReAct agent is only used
+        when the formatter mode is `llm` or the retrieved data is not FHIR JSON.
         """
+        if settings.FHIR_FORMATTER_MODE == "rules":
+            fhir_resources = as_fhir_resources(fhir_retriever_agent_output)
+            if fhir_resources is not None:
+                return summarize_fhir_resources(fhir_resources)
+            logger.warning(f"{self.agent_name} could not read retrieved data as FHIR resources, falling back to the agent")
+
+        return await self._format_with_agent(fhir_translator_agent_output, fhir_retriever_agent_output)
+
+    async def _format_with_agent(self, fhir_translator_agent_output: FHIRTranslatorAgentOutput,
+                                 fhir_retriever_agent_output: Any):
+        """
+        Summarize the retrieved FHIR data with the LLM ReAct agent.
+        """
+        if not isinstance(fhir_retriever_agent_output, str):
+            fhir_retriever_agent_output = json.dumps(fhir_retriever_agent_output, separators=(",", ":"))
+
         logger.info(
             f"{self.agent_name} is converting raw FHIR data into an LLM-friendly format by extracting key details and presenting them concisely."
         )
 
-        # Define the system message tailored for FHIR data formatting
-        system_message = (
-            "You are a medical assistant specializing in summarizing patient data retrieved from FHIR servers. "
-            "Your task is to convert raw FHIR data into a concise, human-readable format, preserving key details."
-        )
-
         # Construct the agent prompt
         query_prompt = f"""
         # Input
@@ -64,12 +97,5 @@ class FHIRFormatterAgent:
         - A natural-language summary of the FHIR data in paragraph or bullet-point form.
         """
 
-        # Create the agent with the updated context and retrieval tool
-        agent = create_react_agent(
-            name=self.agent_name,
-            model=self.llm,
-            prompt=system_message,
-            tools=[],
-        )
-        response = await agent.ainvoke({"messages": query_prompt})
+        response = await self.get_agent().ainvoke({"messages": query_prompt})
         return response["messages"][-1].content
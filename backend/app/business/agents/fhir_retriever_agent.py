@@ -1,9 +1,12 @@
+from fhirpy.base.exceptions import OperationOutcome
 from langgraph.prebuilt import create_react_agent
 from loguru import logger
 
 from business.clients.llm_client import LLMClient
 from business.schemas.fhir_translator_agent import FHIRTranslatorAgentOutput
+from business.tools.fhir_query_parser import FHIRQueryParseError, parse_fhir_queries, patient_scope
 from business.tools.fhir_tools import FHIRTools
+from config.logger import payload
 from config.settings import get_settings
 
 settings = get_settings()
@@ -25,22 +28,59 @@ class FHIRRetrieverAgent:
         self.agent_name = "FHIRRetrieverAgent"
         self.llm = llm_client.get_llm()
         self.fhir_tools = fhir_tools
+        self.system_message = (
+            "You are a medical assistant specializing in retrieving data from FHIR servers. "
+            "Your task is to fetch the required resources based on the provided FHIR query parameters."
+        )
+        self.agent = None
+
+    def get_agent(self):
+        """
+        Return the compiled agent graph, building it once on first use.
+        """
+        if self.agent is None:
+            self.agent = create_react_agent(
+                name=self.agent_name,
+                model=self.llm,
+                prompt=self.system_message,
+                tools=[self.fhir_tools.get_fhir_resources_tool],
+            )
+        return self.agent
 
-    async def retrieve(self, fhir_translator_agent_output: FHIRTranslatorAgentOutput):
+    async def retrieve(self, patient_id: str, fhir_translator_agent_output: FHIRTranslatorAgentOutput):
         """
         Retrieve FHIR resources based on the translated query from the translator agent.
-        Input: FHIRTranslatorAgentOutput containing the FHIR query and related metadata.
-        Output: FHIR resource data retrieved from the FHIR server.
+        Input: The session's patient ID, and FHIRTranslatorAgentOutput containing the FHIR query and related metadata.
+        Output: FHIR resource data retrieved from the FHIR server, as a list of resource dicts when the query is
+        executed directly or as the agent's JSON text otherwise.
+
+        The query is parsed and executed directly against the FHIR server, with one search per line sent as a single
+        FHIR batch; the LLM ReAct agent is only used when the query cannot be parsed or the server rejects it. Every
+        search, the agent's included, is scoped to `patient_id`; one that could read another patient's resources
+        raises `FHIRQueryScopeError` instead of falling back to the agent.
         """
-        logger.info(
-            f"{self.agent_name} attempting to retrieve resources using query '{fhir_translator_agent_output.fhir_query}'."
-        )
+        patient_scope.set(patient_id)
+        if settings.FHIR_RETRIEVER_MODE == "deterministic":
+            try:
+                search_queries = parse_fhir_queries(fhir_translator_agent_output.fhir_query, patient_id,
+                                                    fhir_translator_agent_output.entities)
+                if len(search_queries) == 1:
+                    return await self.fhir_tools.execute_search(search_queries[0])
+                results = await self.fhir_tools.execute_batch(search_queries)
+                return [resource for resources in results for resource in resources]
+            except FHIRQueryParseError as e:
+                logger.warning(f"{self.agent_name} could not parse FHIR query, falling back to the agent: {e}")
+            except OperationOutcome as e:
+                logger.warning(f"{self.agent_name} FHIR server rejected the query, falling back to the agent: {e}")
 
-        # Define the system message tailored for FHIR data retrieval
-        system_message = (
-            "You are a medical assistant specializing in retrieving data from FHIR servers. "
-            "Your task is to fetch the required resources based on the provided FHIR query parameters."
-        )
+        return await self._retrieve_with_agent(fhir_translator_agent_output)
+
+    async def _retrieve_with_agent(self, fhir_translator_agent_output: FHIRTranslatorAgentOutput):
+        """
+        Retrieve FHIR resources by letting the LLM ReAct agent call the `get_fhir_resources` tool.
+        """
+        logger.info("{} attempting to retrieve resources using query {}.", self.agent_name,
+                    payload(fhir_translator_agent_output.fhir_query))
 
         # Construct the agent prompt
         query_prompt = f"""
@@ -103,13 +143,5 @@ class FHIRRetrieverAgent:
             - Your output should be JSON response representing the FHIR resources.
         """
 
-        # Create the agent with the updated context and retrieval tool
-        agent = create_react_agent(
-            name=self.agent_name,
-            model=self.llm,
-            prompt=system_message,
-            tools=[self.fhir_tools.get_fhir_resources_tool],
-        )
-
-        response = await agent.ainvoke({"messages": query_prompt})
+        response = await self.get_agent().ainvoke({"messages": query_prompt})
         return response["messages"][-1].content
@@ -3,6 +3,7 @@ from loguru import logger
 
 from business.clients.llm_client import LLMClient
 from business.schemas.fhir_translator_agent import FHIRTranslatorAgentOutput
+from config.logger import payload
 from config.settings import get_settings
 from presentation.schemas.medical_qa_assistant import DoctorQuery
 
@@ -24,6 +25,20 @@ class FHIRTranslatorAgent:
 
         self.agent_name = "FHIRTranslatorAgent"
         self.llm = llm_client.get_llm()
+        self.system_message = (
+            "You are a precise and efficient assistant that translates natural-language medical queries into FHIR-compliant API queries. "
+            "Your output should be concise and structured as a valid FHIR RESTful query URL with parameters."
+        )
+        self.agent = None
+
+    def get_agent(self):
+        """
+        Return the compiled agent graph, building it once on first use.
+        """
+        if self.agent is None:
+            self.agent = create_react_agent(name=self.agent_name, model=self.llm, prompt=self.system_message,
+                                            tools=[], response_format=FHIRTranslatorAgentOutput)
+        return self.agent
 
     async def translate(self, patient_id: str, doctor_query: DoctorQuery) -> FHIRTranslatorAgentOutput:
         """
@@ -31,13 +46,8 @@ class FHIRTranslatorAgent:
         \nInput: Doctor’s natural-language query
         \nOutput: FHIR-compliant API query (e.g., RESTful URL + params)
         """
-        logger.info(f"{self.agent_name} attempting to translate '{doctor_query}' to FHIR-compliant API query.")
-
-        # Define the system message tailored for FHIR query translation
-        system_message = (
-            "You are a precise and efficient assistant that translates natural-language medical queries into FHIR-compliant API queries. "
-            "Your output should be concise and structured as a valid FHIR RESTful query URL with parameters."
-        )
+        logger.info("{} attempting to translate {} to FHIR-compliant API query.", self.agent_name,
+                    payload(doctor_query.content))
 
         # Example prompt for the agent
         query = f"""
@@ -57,6 +67,10 @@ class FHIRTranslatorAgent:
             - Use the intent, entities, ambiguities, and clarifications to translate the query into a FHIR API query parameters format, such as:
                 ?patient=564b051c-6fcf-4123-909e-5ee74d5f6a9a&authoredon=ge2025-02-07&status=active,completed
 
+            - If the query needs several resource types, output one query per line, each starting with its resource type, such as:
+                Condition?patient=564b051c-6fcf-4123-909e-5ee74d5f6a9a&clinical-status=active
+                MedicationRequest?patient=564b051c-6fcf-4123-909e-5ee74d5f6a9a&status=active
+
             - If ambiguities exist, determine which tools are needed to clarify them:
                 **Ambiguities**:
                 - Missing patient name.
@@ -69,10 +83,6 @@ class FHIRTranslatorAgent:
             - Your output should only be the valid FHIR query parameters without any server URL or additional text.
         """
 
-        # Create the agent with the updated context
-        agent = create_react_agent(name=self.agent_name, model=self.llm, prompt=system_message, tools=[],
-                                   response_format=FHIRTranslatorAgentOutput)
-
-        response = await agent.ainvoke({"messages": query})
-        logger.info(f"Structured Response: {response["structured_response"]}")
+        response = await self.get_agent().ainvoke({"messages": query})
+        logger.info("Structured Response: {}", payload(response["structured_response"]))
         return response["structured_response"]
@@ -0,0 +1,79 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from business.cache.sqlite_cache import SQLiteCache
+from business.clients.redis_client import RedisClient
+
+
+class CacheBackend(ABC):
+    """
+    Shared tier of the cache: a byte store with per-entry expiry that every gunicorn worker (and, for Redis, every
+    node) reads and writes. Values are serialized by the cache namespaces; backends only move bytes.
+    """
+
+    name: str
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return the stored value, or None when missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        """Store a value for `ttl_seconds`, replacing any previous entry for the key."""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Remove the entry for the key, if any."""
+
+    @abstractmethod
+    async def close(self):
+        """Release the backend's connections."""
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache file on the local disk, shared by the workers on the host and kept across restarts."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        """Open the SQLite cache file, creating it when missing."""
+        # Every entry is stored with the TTL of its namespace, so the file has no default TTL of its own.
+        self.cache = SQLiteCache(path, ttl_seconds=0.0)
+
+    def purge_expired(self) -> int:
+        return self.cache.purge_expired()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self.cache.get, key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        await asyncio.to_thread(self.cache.set, key, value, ttl_seconds)
+
+    async def delete(self, key: str):
+        await asyncio.to_thread(self.cache.delete, key)
+
+    async def close(self):
+        self.cache.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis (or a protocol-compatible server) shared by every worker on every node; entries expire server-side."""
+
+    name = "redis"
+
+    def __init__(self, url: str, max_connections: int, timeout: float):
+        """Initialize RedisCacheBackend configuration; connections are opened on first use."""
+        self.client = RedisClient(url, max_connections, timeout)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        await self.client.set(key, value, ttl_seconds)
+
+    async def delete(self, key: str):
+        await self.client.delete(key)
+
+    async def close(self):
+        await self.client.close()
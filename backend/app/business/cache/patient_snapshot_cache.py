@@ -0,0 +1,200 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Sequence
+
+from loguru import logger
+
+from business.cache.ttl_lru_cache import TTLLRUCache
+from business.clients.fhir_client import fhir_client
+from business.schemas.fhir_search_query import FHIRSearchQuery
+from business.tools.fhir_local_search import query_patient_id, search_resources
+from business.tools.fhir_search_iterator import FHIRSearchIterator
+from config.settings import get_settings
+
+settings = get_settings()
+
+SNAPSHOT_PAGE_SIZE = 500
+
+
+class PatientSnapshotTooLarge(Exception):
+    """Raised when a patient's resources exceed `PATIENT_SNAPSHOT_MAX_RESOURCES` or the FHIR search byte limit."""
+
+
+class PatientSnapshot:
+    """
+    A patient's FHIR resources held in memory, indexed by resource type and ID.
+    """
+
+    def __init__(self, patient_id: str, resource_types: Optional[Sequence[str]], resources: List[dict]):
+        """
+        Initialize PatientSnapshot configuration.
+        `resource_types` lists the types that were fetched, or None for everything in the patient compartment.
+        """
+        self.patient_id = patient_id
+        self.resource_types = set(resource_types) if resource_types else None
+        self.resources: Dict[str, Dict[str, dict]] = {}
+        self.last_updated: Optional[str] = None
+        self.validated_at = time.monotonic()
+        self.merge(resources)
+
+    def __len__(self) -> int:
+        return sum(len(resources) for resources in self.resources.values())
+
+    def covers(self, resource_type: str) -> bool:
+        """Return whether every resource of `resource_type` for the patient is in the snapshot."""
+        return self.resource_types is None or resource_type in self.resource_types
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.validated_at >= settings.PATIENT_SNAPSHOT_REVALIDATE_SECONDS
+
+    def merge(self, resources: List[dict]) -> int:
+        """
+        Add new resources and replace changed ones. Returns the number of resources added or updated.
+        """
+        changed = 0
+        for resource in resources:
+            resources_of_type = self.resources.setdefault(resource["resourceType"], {})
+            current = resources_of_type.get(resource.get("id"))
+            meta = resource.get("meta") or {}
+            if current is None or (current.get("meta") or {}).get("versionId") != meta.get("versionId"):
+                resources_of_type[resource.get("id")] = resource
+                changed += 1
+            if meta.get("lastUpdated") and (self.last_updated is None or meta["lastUpdated"] > self.last_updated):
+                self.last_updated = meta["lastUpdated"]
+        self.validated_at = time.monotonic()
+        return changed
+
+    def search(self, search_query: FHIRSearchQuery) -> Optional[List[dict]]:
+        """Answer the search from the snapshot, or return None when it cannot be answered locally."""
+        if not self.covers(search_query.resource_type):
+            return None
+        return search_resources(list(self.resources.get(search_query.resource_type, {}).values()), search_query)
+
+
+class PatientSnapshotCache:
+    """
+    Bounded in-memory cache of patient snapshots.
+
+    The patient WebSocket prefetches a snapshot when a doctor connects, either with `Patient/$everything` or with one
+    concurrent search per type in `PATIENT_SNAPSHOT_RESOURCE_TYPES`. Searches scoped to a cached patient are answered
+    from memory. Snapshots older than `PATIENT_SNAPSHOT_REVALIDATE_SECONDS` are revalidated before use by fetching only
+    the resources updated since the newest `meta.lastUpdated` in the snapshot (`_since` / `_lastUpdated`) and merging
+    them by `meta.versionId`. Deletions are not detected by revalidation, so `PATIENT_SNAPSHOT_TTL_SECONDS` bounds how
+    long a deleted resource can be served.
+    """
+
+    def __init__(self):
+        """Initialize PatientSnapshotCache configuration."""
+        self.cache = TTLLRUCache(settings.PATIENT_SNAPSHOT_MAX_PATIENTS, settings.PATIENT_SNAPSHOT_TTL_SECONDS)
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def initialize(self):
+        logger.info("Patient Snapshot Cache Initialized")
+
+    async def close(self):
+        """Cancel in-flight prefetches and drop every snapshot."""
+        tasks = list(self.inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.inflight.clear()
+        self.cache.clear()
+
+    def prefetch(self, patient_id: str):
+        """Start loading the patient's snapshot in the background unless it is cached or already loading."""
+        if not settings.PATIENT_SNAPSHOT_ENABLED or patient_id in self.inflight:
+            return
+        if self.cache.get(patient_id) is not None:
+            return
+        self.inflight[patient_id] = asyncio.create_task(self._load(patient_id, None))
+
+    async def get(self, patient_id: str) -> Optional[PatientSnapshot]:
+        """
+        Return the patient's snapshot, waiting for an in-flight prefetch and revalidating a stale snapshot.
+        Returns None for patients that were never prefetched or whose snapshot could not be loaded.
+        """
+        task = self.inflight.get(patient_id)
+        if task is None:
+            snapshot = self.cache.get(patient_id)
+            if snapshot is None or not snapshot.is_stale():
+                return snapshot
+            task = self.inflight[patient_id] = asyncio.create_task(self._load(patient_id, snapshot))
+        # Shielded so that a cancelled query does not cancel a load other queries are waiting on.
+        return await asyncio.shield(task)
+
+    async def search(self, search_query: FHIRSearchQuery) -> Optional[List[dict]]:
+        """Answer a patient-scoped search from the patient's snapshot, or return None to query the server."""
+        patient_id = query_patient_id(search_query)
+        snapshot = await self.get(patient_id) if patient_id else None
+        resources = snapshot.search(search_query) if snapshot is not None else None
+        if resources is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return resources
+
+    async def _load(self, patient_id: str, snapshot: Optional[PatientSnapshot]) -> Optional[PatientSnapshot]:
+        """Fetch a new snapshot, or the changes since `snapshot`, and store the result."""
+        start = time.perf_counter()
+        try:
+            since = snapshot.last_updated if snapshot is not None else None
+            resources = await self._fetch_resources(patient_id, since)
+            if snapshot is None or since is None:
+                snapshot = PatientSnapshot(patient_id, settings.PATIENT_SNAPSHOT_RESOURCE_TYPES, resources)
+                changed = len(snapshot)
+            else:
+                changed = snapshot.merge(resources)
+            if len(snapshot) > settings.PATIENT_SNAPSHOT_MAX_RESOURCES:
+                raise PatientSnapshotTooLarge()
+            self.cache.set(patient_id, snapshot)
+            logger.info(f"Patient {patient_id} snapshot {'revalidated' if since else 'loaded'}: "
+                        f"{changed} resources changed, {len(snapshot)} total "
+                        f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+            return snapshot
+        except PatientSnapshotTooLarge:
+            logger.warning(f"Patient {patient_id} exceeds the snapshot size limits, not caching a snapshot")
+        except Exception as e:
+            logger.warning(f"Patient {patient_id} snapshot could not be loaded, querying the server instead: {e!r}")
+        finally:
+            self.inflight.pop(patient_id, None)
+        self.cache.delete(patient_id)
+        return None
+
+    async def _fetch_resources(self, patient_id: str, since: Optional[str]) -> List[dict]:
+        if not settings.PATIENT_SNAPSHOT_RESOURCE_TYPES:
+            params = {}
+            if since:
+                params["_since"] = since
+            return await self._fetch_pages(f"Patient/{patient_id}/$everything", params)
+
+        searches = []
+        for resource_type in settings.PATIENT_SNAPSHOT_RESOURCE_TYPES:
+            params = {"_id" if resource_type == "Patient" else "patient": patient_id}
+            if since:
+                params["_lastUpdated"] = f"gt{since}"
+            searches.append(self._fetch_pages(resource_type, params))
+        return [resource for resources in await asyncio.gather(*searches) for resource in resources]
+
+    @staticmethod
+    async def _fetch_pages(path: str, params: dict) -> List[dict]:
+        """Fetch every page of a searchset Bundle, refusing patients over the snapshot size limits."""
+        search = FHIRSearchIterator(fhir_client.get_fhir_server(), path, params, page_size=SNAPSHOT_PAGE_SIZE,
+                                    max_resources=settings.PATIENT_SNAPSHOT_MAX_RESOURCES)
+        resources = await search.collect()
+        if search.truncated:
+            raise PatientSnapshotTooLarge()
+        return resources
+
+    def stats(self) -> Dict[str, int]:
+        """Return local hit/miss counters and the number of cached patients."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.cache.evictions,
+            "size": len(self.cache),
+        }
+
+
+patient_snapshot_cache = PatientSnapshotCache()
@@ -0,0 +1,72 @@
+import re
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from business.cache.shared_cache import DocumentsCodec, shared_cache
+from config.settings import get_settings
+
+settings = get_settings()
+
+QUOTED_PHRASE_PATTERN = re.compile(r'"[^"]*"')
+WORD_PATTERN = re.compile(r"\w+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# PubMed only reads these as operators in capitals; in lower case they are search terms.
+BOOLEAN_OPERATORS = {"AND", "OR", "NOT"}
+
+
+def _normalize_terms(text: str) -> str:
+    text = WORD_PATTERN.sub(lambda word: word[0] if word[0] in BOOLEAN_OPERATORS else word[0].casefold(), text)
+    return WHITESPACE_PATTERN.sub(" ", text)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so that phrasings PubMed searches identically share a cache entry.
+
+    Outside quoted phrases, whitespace is collapsed and terms are case folded. Quoted phrases, the boolean operators
+    `AND`, `OR` and `NOT`, and punctuation (parentheses, field tags, truncation) are kept as they are, since they
+    change the search.
+    """
+    parts = []
+    position = 0
+    for phrase in QUOTED_PHRASE_PATTERN.finditer(query):
+        parts += [_normalize_terms(query[position:phrase.start()]), phrase[0]]
+        position = phrase.end()
+    parts.append(_normalize_terms(query[position:]))
+    return "".join(parts).strip()
+
+
+class RetrievalCache:
+    """
+    Cache of retrieval results, in the `retrieval` namespace of the shared cache.
+
+    Results are held in a bounded in-process TTL/LRU tier and, with `CACHE_BACKEND` set to `sqlite` or `redis`, in the
+    shared tier seen by every worker. Keys combine the retriever backend, the normalized query, the number of results
+    and, for reranked results, the number of candidates they were chosen from.
+    """
+
+    def __init__(self):
+        """Initialize RetrievalCache configuration."""
+        self.cache = shared_cache.namespace("retrieval", DocumentsCodec(), settings.RETRIEVER_CACHE_TTL_SECONDS,
+                                            settings.RETRIEVER_CACHE_MAX_ENTRIES)
+
+    @staticmethod
+    def build_key(query: str, top_k_results: int, candidates: Optional[int] = None) -> str:
+        count = f"{top_k_results}/{candidates}" if candidates else f"{top_k_results}"
+        return f"{settings.RETRIEVER_BACKEND}/{count}:{normalize_query(query)}"
+
+    async def get(self, query: str, top_k_results: int, candidates: Optional[int] = None) -> Optional[List[Document]]:
+        """Return the cached documents for the query, or None on a miss."""
+        return await self.cache.get(self.build_key(query, top_k_results, candidates))
+
+    async def set(self, query: str, top_k_results: int, documents: List[Document], candidates: Optional[int] = None):
+        """Store the documents retrieved for the query in every tier."""
+        await self.cache.set(self.build_key(query, top_k_results, candidates), documents)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the size of the in-process tier."""
+        return self.cache.stats()
+
+
+retrieval_cache = RetrievalCache()
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import sqlite3
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from business.cache.cache_backends import CacheBackend, RedisCacheBackend, SQLiteCacheBackend
+from business.cache.ttl_lru_cache import TTLLRUCache
+from business.clients.redis_client import RedisError
+from config.settings import get_settings
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+# Serialized values at least this large are stored zlib-compressed; FHIR JSON shrinks several times.
+COMPRESSION_THRESHOLD = 1024
+RAW_MARKER = b"j"
+COMPRESSED_MARKER = b"z"
+
+# Failures of the shared tier that degrade a lookup to a miss instead of failing the request. Decoding a corrupt or
+# truncated entry fails with zlib.error, or with ValueError (JSON and UTF-8 errors) or TypeError from the codec.
+BACKEND_ERRORS = (OSError, TimeoutError, EOFError, asyncio.LimitOverrunError, sqlite3.Error, RedisError, zlib.error,
+                  ValueError, TypeError)
+
+
+class JSONCodec:
+    """
+    Serializes JSON values compactly, compressing large ones. fhirpy resources and references are dicts, so they are
+    encoded as they are, several times faster than through their `serialize()`, and read back as plain resource
+    dicts, which is what the FHIR layer works with.
+    """
+
+    def to_json(self, value: Any) -> Any:
+        return value
+
+    def from_json(self, value: Any) -> Any:
+        return value
+
+    def encode(self, value: Any) -> bytes:
+        data = json.dumps(self.to_json(value), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        if len(data) >= COMPRESSION_THRESHOLD:
+            return COMPRESSED_MARKER + zlib.compress(data, 1)
+        return RAW_MARKER + data
+
+    def decode(self, value: bytes) -> Any:
+        data = zlib.decompress(value[1:]) if value[:1] == COMPRESSED_MARKER else value[1:]
+        return self.from_json(json.loads(data))
+
+
+class DocumentsCodec(JSONCodec):
+    """Serializes lists of LangChain `Document`s as `[page_content, metadata]` pairs."""
+
+    def to_json(self, value: List[Document]) -> Any:
+        return [[document.page_content, document.metadata] for document in value]
+
+    def from_json(self, value: Any) -> List[Document]:
+        return [Document(page_content=page_content, metadata=metadata) for page_content, metadata in value]
+
+
+class CacheNamespace:
+    """
+    One namespace of the shared cache, with its own codec, TTL and in-process tier.
+
+    Lookups go to a bounded in-process TTL/LRU tier of decoded values first, then to the shared backend when one is
+    configured. A `ttl_seconds` of zero disables the namespace. Errors of the shared tier are logged and treated as
+    misses, so an unreachable cache only costs the work it would have saved.
+    """
+
+    def __init__(self, cache: "SharedCache", name: str, codec: JSONCodec, ttl_seconds: float, max_entries: int):
+        """Initialize CacheNamespace configuration."""
+        self.cache = cache
+        self.name = name
+        self.codec = codec
+        self.ttl_seconds = ttl_seconds
+        self.memory_cache = TTLLRUCache(max_entries, ttl_seconds)
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _backend_key(self, key: str) -> str:
+        return f"{settings.CACHE_KEY_PREFIX}:{self.name}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for the key, or None on a miss."""
+        if not self.enabled:
+            return None
+        value = self.memory_cache.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        backend = self.cache.backend
+        if backend is not None:
+            try:
+                data = await backend.get(self._backend_key(key))
+                value = None if data is None else self.codec.decode(data)
+            except BACKEND_ERRORS as e:
+                self.errors += 1
+                logger.warning(f"Cache {self.name} lookup failed on {backend.name}: {e!r}")
+                value = None
+            if value is not None:
+                self.memory_cache.set(key, value)
+                self.hits += 1
+                self.shared_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        """Store the value in every tier."""
+        if not self.enabled:
+            return
+        self.memory_cache.set(key, value)
+        backend = self.cache.backend
+        if backend is not None:
+            try:
+                await backend.set(self._backend_key(key), self.codec.encode(value), self.ttl_seconds)
+            except BACKEND_ERRORS as e:
+                self.errors += 1
+                logger.warning(f"Cache {self.name} store failed on {backend.name}: {e!r}")
+
+    async def delete(self, key: str):
+        self.memory_cache.delete(key)
+        backend = self.cache.backend
+        if backend is not None:
+            try:
+                await backend.delete(self._backend_key(key))
+            except BACKEND_ERRORS as e:
+                self.errors += 1
+                logger.warning(f"Cache {self.name} delete failed on {backend.name}: {e!r}")
+
+    async def get_or_call(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Return the cached value for the key, or the result of `call()`, which is then cached."""
+        if not self.enabled:
+            return await call()
+        value = await self.get(key)
+        if value is None:
+            value = await call()
+            await self.set(key, value)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters, shared tier errors and the size of the in-process tier."""
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "evictions": self.memory_cache.evictions,
+            "size": len(self.memory_cache),
+        }
+
+
+class SharedCache:
+    """
+    Process-wide cache shared by the PubMed, FHIR and LLM layers, one namespace each.
+
+    `CACHE_BACKEND` selects the tier behind the namespaces' in-process tiers: `memory` keeps nothing else (each
+    gunicorn worker caches on its own), `sqlite` adds a file on the local disk shared by the workers on the host and
+    `redis` a Redis-protocol server shared across nodes.
+    """
+
+    def __init__(self):
+        """Initialize SharedCache configuration."""
+        self.backend: Optional[CacheBackend] = None
+        self.namespaces: Dict[str, CacheNamespace] = {}
+
+    def namespace(self, name: str, codec: JSONCodec, ttl_seconds: float, max_entries: int) -> CacheNamespace:
+        """Register and return the namespace `name`."""
+        namespace = CacheNamespace(self, name, codec, ttl_seconds, max_entries)
+        self.namespaces[name] = namespace
+        return namespace
+
+    def initialize(self):
+        """Open the configured shared backend."""
+        if settings.CACHE_BACKEND == "sqlite":
+            backend = SQLiteCacheBackend(settings.CACHE_SQLITE_PATH)
+            purged = backend.purge_expired()
+            logger.info(f"Shared Cache opened at {settings.CACHE_SQLITE_PATH} ({purged} expired entries purged)")
+            self.backend = backend
+        elif settings.CACHE_BACKEND == "redis":
+            self.backend = RedisCacheBackend(settings.CACHE_REDIS_URL, settings.CACHE_REDIS_MAX_CONNECTIONS,
+                                             settings.CACHE_REDIS_TIMEOUT)
+        enabled = [name for name, namespace in self.namespaces.items() if namespace.enabled]
+        logger.info(f"Shared Cache Initialized ({settings.CACHE_BACKEND} backend, namespaces: {enabled})")
+
+    async def close(self):
+        """Close the shared backend."""
+        logger.info(f"Shared Cache stats: {self.stats()}")
+        if self.backend is not None:
+            await self.backend.close()
+            self.backend = None
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Counters of every namespace, by name."""
+        return {name: namespace.stats() for name, namespace in self.namespaces.items()}
+
+
+shared_cache = SharedCache()
+fhir_cache = shared_cache.namespace("fhir", JSONCodec(), settings.FHIR_CACHE_TTL_SECONDS,
+                                    settings.FHIR_CACHE_MAX_ENTRIES)
+llm_cache = shared_cache.namespace("llm", JSONCodec(), settings.LLM_CACHE_TTL_SECONDS, settings.LLM_CACHE_MAX_ENTRIES)
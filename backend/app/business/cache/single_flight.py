@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from loguru import logger
+
+from config.settings import get_settings
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+def hash_key(*parts: Any) -> str:
+    """Stable digest of JSON-serializable key parts, so that large prompts do not become dictionary keys."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is in flight, later callers with the same key await
+    its result (or exception) instead of starting their own. Nothing is kept once the call completes, so this only
+    merges overlapping work; caching completed results is left to the caches.
+
+    The shared call runs as its own task, so a caller that is cancelled (e.g. its WebSocket closed) does not cancel it
+    for the others; it is cancelled only when every caller waiting on it has been. Callers receive the same result
+    object and must not mutate it.
+    """
+
+    def __init__(self, name: str):
+        """Initialize SingleFlight configuration."""
+        self.name = name
+        self.in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.waiters: Dict[Hashable, int] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of `call()`, sharing an identical in-flight call if there is one."""
+        self.calls += 1
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            self.executions += 1
+            return await call()
+
+        task = self.in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(call())
+            self.in_flight[key] = task
+            self.waiters[key] = 0
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+            logger.opt(lazy=True).debug("Single-flight {} call coalesced: {}", lambda: self.name, self.stats)
+
+        self.waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and self.in_flight.get(key) is task:
+                self.waiters[key] -= 1
+                if self.waiters[key] == 0:
+                    # Later callers must start afresh rather than join the cancelled call.
+                    del self.in_flight[key]
+                    del self.waiters[key]
+                    task.cancel()
+            raise
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+            del self.waiters[key]
+        # Retrieve the exception so asyncio does not log it as never retrieved when every waiter was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Return call counters: calls made, calls executed, calls that joined an in-flight call and calls in flight."""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.in_flight),
+        }
+
+
+llm_single_flight = SingleFlight("llm")
+retrieval_single_flight = SingleFlight("retrieval")
+fhir_single_flight = SingleFlight("fhir")
+
+
+def single_flight_stats() -> Dict[str, Dict[str, int]]:
+    """Counters of every single-flight group, by name."""
+    return {group.name: group.stats() for group in (llm_single_flight, retrieval_single_flight, fhir_single_flight)}
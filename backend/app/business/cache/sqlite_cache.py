@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+class SQLiteCache:
+    """
+    On-disk key/value cache with per-entry expiry, backed by SQLite.
+
+    The database runs in WAL mode so several gunicorn workers on the same host can share it and entries survive
+    worker restarts. Calls are blocking and meant to be run in a worker thread.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float):
+        """
+        Initialize SQLiteCache configuration and create the cache table when missing.
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Return the stored value, or None when missing or expired.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None):
+        """
+        Store a value, replacing any previous entry for the key.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl)
+            )
+
+    def delete(self, key: str):
+        with self.lock:
+            self.connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        """
+        Delete expired entries and return how many were removed.
+        """
+        with self.lock:
+            return self.connection.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,54 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class TTLLRUCache:
+    """
+    In-process cache bounded by entry count, evicting the least recently used entry and expiring entries after a TTL.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """
+        Initialize TTLLRUCache configuration.
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries must be greater than zero.")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the cached value, or None when missing or expired.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """
+        Store a value, evicting the least recently used entries beyond `max_entries`.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from loguru import logger
+
+from business.index.fhir_analytics_store import AnalyticsStore
+from business.schemas.fhir_analytics import CodeSummary, CohortQuery, CohortResult
+from config.settings import get_settings
+
+settings = get_settings()
+
+
+class FHIRAnalyticsClient:
+    """
+    Population-level queries over the local FHIR analytics store built with `business.index.fhir_analytics_ingest`.
+
+    Answers cohort questions ("patients with HbA1c above 7 since 2018") from memory-mapped columns instead of one
+    FHIR search per patient. Queries run in a worker thread; the store is re-opened when an ingest in another process
+    replaces its snapshot.
+    """
+
+    def __init__(self):
+        """Initialize FHIRAnalyticsClient configuration."""
+        self.store: Optional[AnalyticsStore] = None
+        self.refreshed_at = 0.0
+
+    def initialize(self):
+        """Memory-map the current snapshot of the store."""
+        self.store = AnalyticsStore(settings.FHIR_ANALYTICS_STORE_PATH)
+        self.store.open()
+        self.refreshed_at = time.monotonic()
+        logger.info(f"FHIR Analytics Client Initialized ({self.store.patient_count} patients, "
+                    f"{self.store.fact_count} facts)")
+
+    async def close(self):
+        """Unmap the store."""
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        logger.info("FHIR Analytics Client Closed")
+
+    def _refresh(self):
+        """
+        Swap in a freshly opened store when the manifest changed. The previous store is left to the garbage
+        collector rather than closed, since queries in other threads may still be reading it.
+        """
+        self.refreshed_at = time.monotonic()
+        if self.store.is_stale():
+            store = AnalyticsStore(settings.FHIR_ANALYTICS_STORE_PATH)
+            store.open()
+            self.store = store
+            logger.info(f"FHIR analytics store reloaded ({store.patient_count} patients, {store.fact_count} facts)")
+
+    def _get_store(self) -> AnalyticsStore:
+        if self.store is None:
+            raise RuntimeError("FHIR Analytics Client is not initialized.")
+        if time.monotonic() - self.refreshed_at >= settings.FHIR_ANALYTICS_REFRESH_SECONDS:
+            self._refresh()
+        return self.store
+
+    async def query(self, cohort_query: CohortQuery) -> CohortResult:
+        """Return the patients matching `cohort_query`, with per-patient aggregates of their matching facts."""
+        store = self._get_store()
+        return await asyncio.to_thread(store.query, cohort_query)
+
+    async def find_codes(self, text: str, limit: int = 20) -> List[CodeSummary]:
+        """Return the codes whose display or code contains `text`, to turn a clinical term into query codes."""
+        store = self._get_store()
+        return await asyncio.to_thread(store.find_codes, text, limit)
+
+
+fhir_analytics_client = FHIRAnalyticsClient()
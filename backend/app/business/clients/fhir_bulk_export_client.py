@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+from typing import List, Optional, Sequence
+
+import aiohttp
+from fhirpy import AsyncFHIRClient
+from loguru import logger
+
+from config.settings import get_settings
+
+settings = get_settings()
+
+NDJSON_CONTENT_TYPE = "application/fhir+ndjson"
+
+
+class FHIRBulkExportClient:
+    """
+    Client for the FHIR Bulk Data `$export` operation (https://hl7.org/fhir/uv/bulkdata/export.html).
+
+    Kicks off a system, patient or group level export, polls its status URL until the server has written the NDJSON
+    files and downloads them. Downloads are streamed to disk, so only the read timeout of `FHIR_CLIENT_TIMEOUT`
+    applies rather than a total one.
+    """
+
+    def __init__(self, fhir_server: AsyncFHIRClient):
+        """Initialize FHIRBulkExportClient with the FHIR server to export from."""
+        self.fhir_server = fhir_server
+
+    def _headers(self, **headers: str) -> dict:
+        return {**self.fhir_server._build_request_headers(), **headers}
+
+    async def export(self,
+                     output_dir: str,
+                     resource_types: Optional[Sequence[str]] = None,
+                     since: Optional[str] = None,
+                     group_id: Optional[str] = None,
+                     patient_level: bool = False,
+                     poll_seconds: float = 5.0,
+                     timeout_seconds: float = 3600.0) -> List[str]:
+        """
+        Run an export and download its output files into `output_dir`, returning their paths.
+        Exports every resource on the server unless `group_id` (a Group's members) or `patient_level` (every
+        patient compartment) is given. Raises `RuntimeError` if the server rejects or fails the export.
+        """
+        path = f"Group/{group_id}/$export" if group_id else "Patient/$export" if patient_level else "$export"
+        params = {"_outputFormat": NDJSON_CONTENT_TYPE}
+        if resource_types:
+            params["_type"] = ",".join(resource_types)
+        if since:
+            params["_since"] = since
+
+        os.makedirs(output_dir, exist_ok=True)
+        async with aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=None, sock_read=settings.FHIR_CLIENT_TIMEOUT)) as session:
+            status_url = await self._kick_off(session, self.fhir_server._build_request_url(path, params))
+            try:
+                manifest = await self._wait(session, status_url, poll_seconds, timeout_seconds)
+                headers = self._headers() if manifest.get("requiresAccessToken") else {}
+                paths = []
+                for index, output in enumerate(manifest.get("output", [])):
+                    file_path = os.path.join(output_dir, f"{index:04d}_{output['type']}.ndjson")
+                    await self._download(session, output["url"], file_path, headers)
+                    paths.append(file_path)
+                for error in manifest.get("error", []):
+                    logger.warning(f"FHIR bulk export reported an error file: {error.get('url')}")
+                return paths
+            finally:
+                # Tells the server the client is done with the export files (or abandons the export).
+                try:
+                    async with session.delete(status_url, headers=self._headers()) as response:
+                        logger.debug(f"FHIR bulk export cleanup returned {response.status}")
+                except aiohttp.ClientError as e:
+                    logger.warning(f"FHIR bulk export cleanup failed: {str(e)}")
+
+    async def _kick_off(self, session: aiohttp.ClientSession, url: str) -> str:
+        headers = self._headers(Accept="application/fhir+json", Prefer="respond-async")
+        async with session.get(url, headers=headers) as response:
+            if response.status != 202 or "Content-Location" not in response.headers:
+                raise RuntimeError(f"FHIR bulk export kick-off failed with {response.status}: {await response.text()}")
+            logger.info(f"FHIR bulk export started: {response.headers['Content-Location']}")
+            return response.headers["Content-Location"]
+
+    async def _wait(self, session: aiohttp.ClientSession, status_url: str, poll_seconds: float,
+                    timeout_seconds: float) -> dict:
+        """Poll the status URL until the export completes, honouring `Retry-After`, and return its manifest."""
+        deadline = time.monotonic() + timeout_seconds
+        while True:
+            async with session.get(status_url, headers=self._headers(Accept="application/json")) as response:
+                if response.status == 200:
+                    return await response.json(content_type=None)
+                if response.status != 202:
+                    raise RuntimeError(f"FHIR bulk export failed with {response.status}: {await response.text()}")
+                retry_after = response.headers.get("Retry-After", "")
+                logger.info(f"FHIR bulk export in progress: {response.headers.get('X-Progress', 'no progress')}")
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"FHIR bulk export did not complete within {timeout_seconds}s")
+            await asyncio.sleep(float(retry_after) if retry_after.isdigit() else poll_seconds)
+
+    @staticmethod
+    async def _download(session: aiohttp.ClientSession, url: str, file_path: str, headers: dict):
+        start = time.perf_counter()
+        async with session.get(url, headers={**headers, "Accept": NDJSON_CONTENT_TYPE}) as response:
+            response.raise_for_status()
+            with open(file_path, "wb") as output_file:
+                async for chunk in response.content.iter_chunked(1 << 16):
+                    output_file.write(chunk)
+        logger.info(f"Downloaded {url} to {file_path} ({os.path.getsize(file_path)} bytes) "
+                    f"in {time.perf_counter() - start:.1f}s")
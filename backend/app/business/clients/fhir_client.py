@@ -1,7 +1,14 @@
+import json
+from typing import Any, Optional, Tuple
+
+import aiohttp
 from fhirpy import AsyncFHIRClient
-from fhirpy.base.exceptions import AuthorizationError, BaseFHIRError
+from fhirpy.base.exceptions import AuthorizationError, BaseFHIRError, ForbiddenError, MultipleResourcesFound, \
+    OperationOutcome, ResourceNotFound
 from loguru import logger
 
+from business.telemetry.metrics import fhir_request_duration
+from business.telemetry.tracing import span
 from config.settings import get_settings
 
 settings = get_settings()
@@ -13,6 +20,7 @@ class FHIRClient:
     def __init__(self):
         """Initialize FHIR Client configuration."""
         self.fhir_client = None
+        self.session: Optional[aiohttp.ClientSession] = None
 
     def initialize(self):
         """Return the configured FHIR server instance."""
@@ -34,5 +42,61 @@ class FHIRClient:
         """Return the configured FHIR server instance."""
         return self.fhir_client
 
+    def get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the pooled HTTP session used for paged and batched searches, creating it on first use.
+        fhirpy opens a new session per request, so paging through it would reconnect for every page.
+        """
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=settings.FHIR_CLIENT_MAX_CONNECTIONS),
+                timeout=aiohttp.ClientTimeout(total=settings.FHIR_CLIENT_TIMEOUT)
+            )
+        return self.session
+
+    async def request(self, method: str, path: str, params: Optional[dict] = None, data: Optional[dict] = None,
+                      fhir_server: Optional[AsyncFHIRClient] = None) -> Tuple[Any, int]:
+        """
+        Send a request over the pooled session, with the URL building, headers and error mapping of `fhir_server`
+        (the configured server by default). Returns the parsed JSON body and its size in bytes.
+        """
+        fhir_server = fhir_server or self.fhir_client
+        # `Patient/123/$everything` is timed as `Patient`; an empty path is a batch posted to the base URL.
+        labels = {"method": method.upper(), "resource_type": path.split("/", 1)[0] or "batch"}
+        with span("fhir.request", fhir_request_duration, labels, {"fhir.path": path}):
+            return await self._request(fhir_server, method, path, params, data)
+
+    async def _request(self, fhir_server: AsyncFHIRClient, method: str, path: str, params: Optional[dict],
+                       data: Optional[dict]) -> Tuple[Any, int]:
+        async with self.get_session().request(method, fhir_server._build_request_url(path, params), json=data,
+                                              headers=fhir_server._build_request_headers()) as response:
+            body = await response.read()
+            if 200 <= response.status < 300:
+                return (json.loads(body) if body else None), len(body)
+
+            text = body.decode("utf-8", errors="replace")
+            if response.status == 401:
+                raise AuthorizationError(text)
+            if response.status == 403:
+                raise ForbiddenError(text)
+            if response.status in (404, 410):
+                raise ResourceNotFound(text)
+            if response.status == 412:
+                raise MultipleResourcesFound(text)
+            try:
+                outcome = json.loads(text)
+            except ValueError:
+                raise OperationOutcome(reason=text)
+            if isinstance(outcome, dict) and outcome.get("resourceType") == "OperationOutcome":
+                raise OperationOutcome(resource=outcome)
+            raise OperationOutcome(reason=text)
+
+    async def close(self):
+        """Close the pooled HTTP session."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        logger.info("FHIR Client Closed")
+
 
 fhir_client = FHIRClient()
@@ -0,0 +1,228 @@
+import asyncio
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional
+
+from botocore.exceptions import ClientError
+from loguru import logger
+
+from business.clients.rate_limiter import TokenBucketRateLimiter
+from config.settings import get_settings
+
+settings = get_settings()
+
+# Bedrock error codes worth retrying after a backoff. Errors inside a ConverseStream event stream use camel case.
+THROTTLING_ERROR_CODES = {"throttlingexception", "toomanyrequestsexception", "serviceunavailableexception",
+                          "modelnotreadyexception"}
+
+AdmissionListener = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Set by the WebSocket handlers for the duration of a query, so that a call that has to wait can tell the client.
+admission_listener: ContextVar[Optional[AdmissionListener]] = ContextVar("admission_listener", default=None)
+
+
+class AdmissionBroadcast:
+    """
+    Admission listener of a call shared by several callers through a `SingleFlight`. The shared call runs in the
+    context of the caller that started it, so its notifications are fanned out to the listener of every caller
+    waiting on it.
+    """
+
+    def __init__(self):
+        """Initialize AdmissionBroadcast configuration."""
+        self.listeners: List[AdmissionListener] = []
+        self.callers = 0
+
+    async def __call__(self, details: Dict[str, Any]):
+        for listener in list(self.listeners):
+            try:
+                await listener(details)
+            except Exception as e:
+                # A client that went away must not keep the others from being told.
+                logger.debug(f"LLM admission notification failed: {e!r}")
+
+
+class AdmissionBroadcasts:
+    """The `AdmissionBroadcast` of every shared call in flight, by single-flight key."""
+
+    def __init__(self):
+        """Initialize AdmissionBroadcasts configuration."""
+        self.broadcasts: Dict[Hashable, AdmissionBroadcast] = {}
+
+    @contextmanager
+    def join(self, key: Hashable) -> Iterator[AdmissionBroadcast]:
+        """Add the caller's `admission_listener` to the broadcast of `key` while it waits on the shared call."""
+        broadcast = self.broadcasts.setdefault(key, AdmissionBroadcast())
+        listener = admission_listener.get()
+        broadcast.callers += 1
+        if listener is not None:
+            broadcast.listeners.append(listener)
+        try:
+            yield broadcast
+        finally:
+            broadcast.callers -= 1
+            if listener is not None:
+                broadcast.listeners.remove(listener)
+            if not broadcast.callers and self.broadcasts.get(key) is broadcast:
+                del self.broadcasts[key]
+
+
+class LLMOverloadedError(RuntimeError):
+    """Raised when an LLM call cannot be admitted: the queue is full or the call waited too long."""
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    return isinstance(error, ClientError) and \
+        error.response.get("Error", {}).get("Code", "").lower() in THROTTLING_ERROR_CODES
+
+
+class LLMAdmissionController:
+    """
+    Process-wide admission control in front of every Bedrock call (the orchestrator and the FHIR agents).
+
+    Calls are admitted against a requests-per-minute and a tokens-per-minute token bucket, reserving the estimated
+    input tokens plus `max_tokens` as Bedrock quotas do and releasing what the response did not use. Calls that
+    cannot be admitted at once wait in FIFO order, at most `LLM_ADMISSION_MAX_QUEUE` of them for at most
+    `LLM_ADMISSION_QUEUE_TIMEOUT` seconds. Throttling errors that outlast botocore's own retries are retried with
+    full-jitter exponential backoff. Whenever a call has to wait, the `admission_listener` of its context is told.
+    """
+
+    def __init__(self):
+        """Initialize LLMAdmissionController configuration."""
+        self.request_limiter: Optional[TokenBucketRateLimiter] = None
+        self.token_limiter: Optional[TokenBucketRateLimiter] = None
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.throttled = 0
+
+    def initialize(self):
+        """Create the request and token budgets from the settings; an unset budget is not enforced."""
+        if settings.LLM_REQUESTS_PER_MINUTE:
+            self.request_limiter = TokenBucketRateLimiter(settings.LLM_REQUESTS_PER_MINUTE / 60,
+                                                          settings.LLM_REQUESTS_PER_MINUTE)
+        if settings.LLM_TOKENS_PER_MINUTE:
+            self.token_limiter = TokenBucketRateLimiter(settings.LLM_TOKENS_PER_MINUTE / 60,
+                                                        settings.LLM_TOKENS_PER_MINUTE)
+        logger.info(f"LLM Admission Controller Initialized ({settings.LLM_REQUESTS_PER_MINUTE or 'unlimited'} "
+                    f"requests/min, {settings.LLM_TOKENS_PER_MINUTE or 'unlimited'} tokens/min)")
+
+    def close(self):
+        self.request_limiter = None
+        self.token_limiter = None
+        logger.info(f"LLM Admission Controller Closed: {self.stats()}")
+
+    def _reservation(self, tokens: int) -> float:
+        return min(tokens, self.token_limiter.capacity) if self.token_limiter is not None else 0.0
+
+    @staticmethod
+    async def _notify(details: Dict[str, Any]):
+        listener = admission_listener.get()
+        if listener is None:
+            return
+        try:
+            await listener(details)
+        except Exception as e:
+            # A client that went away must not fail the call of the others sharing it.
+            logger.debug(f"LLM admission notification failed: {e!r}")
+
+    async def _acquire(self, reservation: float):
+        if self.request_limiter is not None:
+            await self.request_limiter.acquire()
+        if reservation:
+            await self.token_limiter.acquire(reservation)
+
+    async def admit(self, tokens: int) -> float:
+        """Wait until a call estimated at `tokens` tokens fits the budgets, returning the tokens reserved."""
+        reservation = self._reservation(tokens)
+        # Waiters ahead each take at least one request of the budget.
+        wait_time = max(self.request_limiter.wait_time() + self.waiting / self.request_limiter.rate
+                        if self.request_limiter is not None else 0.0,
+                        self.token_limiter.wait_time(reservation) if reservation else 0.0)
+        if wait_time > 0 or self.waiting:
+            if self.waiting >= settings.LLM_ADMISSION_MAX_QUEUE:
+                self.rejected += 1
+                raise LLMOverloadedError("The LLM request queue is full.")
+            self.queued += 1
+            logger.info(f"LLM call queued behind {self.waiting} others for ~{wait_time:.1f}s")
+            await self._notify({"status": "queued", "reason": "rate_limit", "position": self.waiting + 1,
+                                "wait_ms": round(wait_time * 1000)})
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._acquire(reservation), settings.LLM_ADMISSION_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError as e:
+            self.rejected += 1
+            raise LLMOverloadedError(f"LLM call not admitted within {settings.LLM_ADMISSION_QUEUE_TIMEOUT}s.") from e
+        finally:
+            self.waiting -= 1
+        self.admitted += 1
+        return reservation
+
+    def settle(self, reservation: float, used_tokens: Optional[int]):
+        """Release the part of a reservation the call did not use, when the response reported its usage."""
+        if reservation and used_tokens is not None and used_tokens < reservation:
+            self.token_limiter.release(reservation - used_tokens)
+
+    async def _backoff(self, attempt: int, error: BaseException):
+        self.throttled += 1
+        delay = random.uniform(0, min(settings.LLM_THROTTLE_MAX_BACKOFF, settings.LLM_THROTTLE_BACKOFF * 2 ** attempt))
+        logger.warning(f"LLM call throttled ({error!r}), retry {attempt + 1}/{settings.LLM_THROTTLE_MAX_RETRIES} "
+                       f"in {delay:.2f}s")
+        await self._notify({"status": "queued", "reason": "throttled", "retry": attempt + 1,
+                            "wait_ms": round(delay * 1000)})
+        await asyncio.sleep(delay)
+
+    async def call(self, tokens: int, call: Callable[[], Awaitable[Any]],
+                   used_tokens: Callable[[Any], Optional[int]]) -> Any:
+        """Run `call()` once admitted, retrying throttling errors; `used_tokens` reads the usage of its result."""
+        for attempt in range(settings.LLM_THROTTLE_MAX_RETRIES + 1):
+            reservation = await self.admit(tokens)
+            try:
+                result = await call()
+            except Exception as e:
+                if not is_throttling_error(e) or attempt >= settings.LLM_THROTTLE_MAX_RETRIES:
+                    raise
+                await self._backoff(attempt, e)
+                continue
+            self.settle(reservation, used_tokens(result))
+            return result
+
+    async def stream(self, tokens: int, stream: Callable[[], AsyncIterator[Any]],
+                     used_tokens: Callable[[Any], Optional[int]]) -> AsyncIterator[Any]:
+        """
+        Yield the chunks of `stream()` once admitted. Throttling errors are retried only until the first chunk, since
+        the chunks already yielded cannot be taken back.
+        """
+        for attempt in range(settings.LLM_THROTTLE_MAX_RETRIES + 1):
+            reservation = await self.admit(tokens)
+            used = None
+            started = False
+            try:
+                async for chunk in stream():
+                    started = True
+                    used = used_tokens(chunk) or used
+                    yield chunk
+            except Exception as e:
+                if started or not is_throttling_error(e) or attempt >= settings.LLM_THROTTLE_MAX_RETRIES:
+                    raise
+                await self._backoff(attempt, e)
+                continue
+            self.settle(reservation, used)
+            return
+
+    def stats(self) -> Dict[str, int]:
+        """Return admission counters and the number of calls currently waiting."""
+        return {
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "waiting": self.waiting,
+        }
+
+
+llm_admission_controller = LLMAdmissionController()
+llm_admission_broadcasts = AdmissionBroadcasts()
@@ -1,27 +1,112 @@
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import boto3
+from botocore.config import Config
 from langchain_aws import ChatBedrockConverse
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
 from langchain_core.exceptions import LangChainException
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from loguru import logger
 
+from business.cache.shared_cache import llm_cache
+from business.cache.single_flight import hash_key, llm_single_flight
+from business.clients.llm_admission_controller import (AdmissionBroadcast, admission_listener,
+                                                        llm_admission_broadcasts, llm_admission_controller)
+from business.telemetry.metrics import llm_call_duration, llm_time_to_first_token, llm_tokens
+from business.telemetry.tracing import Span, span
 from config.settings import get_settings
 
 settings = get_settings()
 
+CHARS_PER_TOKEN = 4
+
+
+def _usage_tokens(message: Any) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+def _record_usage(llm_span: Span, model_id: str, usage: Optional[dict]):
+    """Count the input and output tokens Bedrock reported for a call and add them to its span."""
+    if not usage:
+        return
+    llm_tokens.inc(usage.get("input_tokens", 0), model=model_id, direction="input")
+    llm_tokens.inc(usage.get("output_tokens", 0), model=model_id, direction="output")
+    llm_span.set_attributes(**{"gen_ai.usage.input_tokens": usage.get("input_tokens", 0),
+                               "gen_ai.usage.output_tokens": usage.get("output_tokens", 0)})
+
+
+class AdmissionControlledChatBedrockConverse(ChatBedrockConverse):
+    """
+    `ChatBedrockConverse` whose calls, including those the FHIR agents' LangGraph graphs make, go through the shared
+    `LLMAdmissionController`: rate limited on requests and tokens per minute and retried when Bedrock throttles.
+    Every call is timed, admission wait included, and its token usage counted.
+    """
+
+    def _estimate_tokens(self, messages: List[BaseMessage], **kwargs: Any) -> int:
+        """Estimated input tokens (~4 characters per token, bound tools included) plus the output budget."""
+        characters = sum(len(str(message.content)) for message in messages) + len(json.dumps(kwargs, default=str))
+        return characters // CHARS_PER_TOKEN + (self.max_tokens or settings.MODEL_MAX_TOKENS)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        generate = super()._agenerate
+        with span("llm.generate", llm_call_duration, {"model": self.model_id, "mode": "generate"}) as llm_span:
+            result = await llm_admission_controller.call(
+                self._estimate_tokens(messages, **kwargs),
+                lambda: generate(messages, stop=stop, run_manager=run_manager, **kwargs),
+                lambda result: _usage_tokens(result.generations[0].message) if result.generations else None)
+            if result.generations:
+                _record_usage(llm_span, self.model_id, getattr(result.generations[0].message, "usage_metadata", None))
+            return result
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        stream = super()._astream
+        started_at = time.perf_counter()
+        first_token = True
+        usage = None
+        with span("llm.stream", llm_call_duration, {"model": self.model_id, "mode": "stream"},
+                  current=False) as llm_span:
+            async for chunk in llm_admission_controller.stream(
+                    self._estimate_tokens(messages, **kwargs),
+                    lambda: stream(messages, stop=stop, run_manager=run_manager, **kwargs),
+                    lambda generation_chunk: _usage_tokens(generation_chunk.message)):
+                if first_token and chunk.text:
+                    first_token = False
+                    llm_time_to_first_token.observe(time.perf_counter() - started_at, model=self.model_id)
+                usage = getattr(chunk.message, "usage_metadata", None) or usage
+                yield chunk
+            _record_usage(llm_span, self.model_id, usage)
+
 
 class LLMClient:
     """LLM Client"""
 
-    def __init__(self):
-        """Initialize LLM configuration."""
+    def __init__(self, model_id: Optional[str] = None, bedrock_runtime: Any = None, bedrock: Any = None):
+        """
+        Initialize LLM configuration.
+
+        When `bedrock_runtime`/`bedrock` boto3 clients are given they are reused instead of creating new ones,
+        so that several model instances share a single HTTP connection pool.
+        """
+        self.model_id = model_id or settings.MODEL_ID
         try:
-            self.llm = ChatBedrockConverse(
-                model_id=settings.MODEL_ID,
+            self.llm = AdmissionControlledChatBedrockConverse(
+                model_id=self.model_id,
                 temperature=settings.MODEL_TEMPERATURE,
                 max_tokens=settings.MODEL_MAX_TOKENS,
                 aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
                 aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_REGION
+                region_name=settings.AWS_REGION,
+                client=bedrock_runtime,
+                bedrock_client=bedrock
             )
         except Exception as e:
             logger.error(f"LLM failed to instantiate: {str(e)}")
@@ -32,9 +117,23 @@ class LLMClient:
         return self.llm
 
     def bind_tools_to_llm(self, tools):
-        self.llm.bind_tools(tools)
+        """Return a runnable of the LLM bound to the given tools, leaving the shared LLM untouched."""
+        return self.llm.bind_tools(tools)
 
     async def generate_response(self, prompt_template: PromptTemplate, template_vars: dict) -> str:
+        """
+        Generate a response; concurrent calls with the same model, prompt and variables share one generation, and with
+        `LLM_CACHE_TTL_SECONDS` set the response is cached. Every caller sharing a generation is told when it is
+        queued by admission control.
+        """
+        key = hash_key(self.model_id, repr(prompt_template), template_vars)
+        with llm_admission_broadcasts.join(key) as broadcast:
+            return await llm_single_flight.run(key, lambda: llm_cache.get_or_call(
+                key, lambda: self._generate_response(prompt_template, template_vars, broadcast)))
+
+    async def _generate_response(self, prompt_template: PromptTemplate, template_vars: dict,
+                                 broadcast: AdmissionBroadcast) -> str:
+        listener_token = admission_listener.set(broadcast)
         # Generate output using LLM
         try:
             chain = prompt_template | self.llm | StrOutputParser()
@@ -46,3 +145,70 @@ class LLMClient:
         except Exception as e:
             logger.error(f"Unexpected error occurred during generation: {e}")
             raise
+        finally:
+            admission_listener.reset(listener_token)
+
+
+class LLMClientRegistry:
+    """
+    Process-wide registry of LLM clients.
+
+    A single boto3 session and pair of Bedrock clients (runtime and control plane) is created at startup with a
+    tunable connection pool and TCP keep-alive; every `LLMClient` handed out shares them, one instance per model ID.
+    """
+
+    def __init__(self):
+        """Initialize LLM Client Registry configuration."""
+        self.bedrock_runtime = None
+        self.bedrock = None
+        self.llm_clients: Dict[str, LLMClient] = {}
+
+    def initialize(self):
+        """Create the shared Bedrock clients and the default model's LLM client."""
+        try:
+            session = boto3.session.Session(
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                region_name=settings.AWS_REGION
+            )
+            config = Config(
+                max_pool_connections=settings.LLM_MAX_POOL_CONNECTIONS,
+                connect_timeout=settings.LLM_CONNECT_TIMEOUT,
+                read_timeout=settings.LLM_READ_TIMEOUT,
+                tcp_keepalive=settings.LLM_TCP_KEEPALIVE,
+                retries={"max_attempts": settings.LLM_MAX_RETRY_ATTEMPTS, "mode": "adaptive"}
+            )
+            self.bedrock_runtime = session.client("bedrock-runtime", config=config)
+            self.bedrock = session.client("bedrock", config=config)
+        except Exception as e:
+            logger.error(f"Bedrock clients failed to instantiate: {str(e)}")
+            raise RuntimeError("Bedrock clients failed to instantiate.") from e
+
+        self.get_llm_client()
+        logger.info("LLM Client Registry Initialized")
+
+    def get_llm_client(self, model_id: Optional[str] = None) -> LLMClient:
+        """Return the shared LLM client for `model_id`, creating it on first use."""
+        if self.bedrock_runtime is None:
+            raise RuntimeError("LLM Client Registry is not initialized.")
+
+        model_id = model_id or settings.MODEL_ID
+        llm_client = self.llm_clients.get(model_id)
+        if llm_client is None:
+            llm_client = LLMClient(model_id, self.bedrock_runtime, self.bedrock)
+            self.llm_clients[model_id] = llm_client
+            logger.info(f"LLM Client created for model '{model_id}'")
+        return llm_client
+
+    def close(self):
+        """Close the shared Bedrock clients and drop every cached LLM client."""
+        for client in (self.bedrock_runtime, self.bedrock):
+            if client is not None:
+                client.close()
+        self.bedrock_runtime = None
+        self.bedrock = None
+        self.llm_clients.clear()
+        logger.info("LLM Client Registry Closed")
+
+
+llm_client_registry = LLMClientRegistry()
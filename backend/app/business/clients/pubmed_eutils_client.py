@@ -0,0 +1,206 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+import xmltodict
+from langchain_core.documents import Document
+from loguru import logger
+
+from business.clients.rate_limiter import TokenBucketRateLimiter
+from business.telemetry.metrics import pubmed_request_duration
+from business.telemetry.tracing import span
+from config.settings import get_settings
+
+settings = get_settings()
+
+# NCBI allows 3 requests per second without an API key and 10 with one.
+NCBI_REQUESTS_PER_SECOND = 3
+NCBI_REQUESTS_PER_SECOND_WITH_API_KEY = 10
+
+MAX_QUERY_LENGTH = 300
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class PubmedEUtilsError(Exception):
+    """Raised when the PubMed E-utilities API returns an unusable response."""
+
+
+class PubmedEUtilsClient:
+    """
+    Asyncio PubMed E-utilities client.
+
+    Uses a single pooled HTTP session and a process-wide token-bucket limiter. A search is one `esearch` call
+    followed by one batched `efetch` of every returned UID, and yields `Document`s with the same metadata as
+    LangChain's `PubMedRetriever` (`uid`, `Title`, `Published`, `Copyright Information`).
+    """
+
+    def __init__(self):
+        """Initialize PubmedEUtilsClient configuration."""
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.rate_limiter: Optional[TokenBucketRateLimiter] = None
+        self.base_url = settings.RETRIEVER_BASE_URL.rstrip("/")
+
+    def initialize(self):
+        """Create the pooled HTTP session and the shared rate limiter. Must be called inside the event loop."""
+        requests_per_second = settings.RETRIEVER_REQUESTS_PER_SECOND or (
+            NCBI_REQUESTS_PER_SECOND_WITH_API_KEY if settings.RETRIEVER_API_KEY else NCBI_REQUESTS_PER_SECOND
+        )
+        self.rate_limiter = TokenBucketRateLimiter(requests_per_second)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=settings.RETRIEVER_MAX_CONNECTIONS,
+                keepalive_timeout=settings.RETRIEVER_KEEPALIVE_TIMEOUT
+            ),
+            timeout=aiohttp.ClientTimeout(total=settings.RETRIEVER_TIMEOUT)
+        )
+        logger.info(f"PubMed E-utilities Client Initialized ({requests_per_second} requests/s)")
+
+    async def close(self):
+        """Close the pooled HTTP session."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        logger.info("PubMed E-utilities Client Closed")
+
+    async def _request(self, endpoint: str, params: Dict[str, Any]) -> str:
+        """Send a rate-limited request, retrying throttled and transient failures with exponential backoff."""
+        if self.session is None:
+            raise RuntimeError("PubMed E-utilities Client is not initialized.")
+
+        if settings.RETRIEVER_API_KEY:
+            params = {**params, "api_key": settings.RETRIEVER_API_KEY}
+
+        with span("pubmed.request", pubmed_request_duration, {"endpoint": endpoint.removesuffix(".fcgi")}):
+            return await self._request_with_retries(endpoint, params)
+
+    async def _request_with_retries(self, endpoint: str, params: Dict[str, Any]) -> str:
+        url = f"{self.base_url}/{endpoint}"
+        delay = settings.RETRIEVER_RETRY_BACKOFF
+        for attempt in range(settings.RETRIEVER_MAX_RETRY + 1):
+            await self.rate_limiter.acquire()
+            try:
+                # POST keeps long UID lists out of the URL; E-utilities accepts both verbs.
+                async with self.session.post(url, data=params) as response:
+                    if response.status in RETRYABLE_STATUSES and attempt < settings.RETRIEVER_MAX_RETRY:
+                        logger.warning(f"PubMed {endpoint} returned {response.status}, retrying in {delay:.2f}s")
+                    else:
+                        response.raise_for_status()
+                        return await response.text()
+            except aiohttp.ClientResponseError as e:
+                raise PubmedEUtilsError(f"PubMed {endpoint} failed with status {e.status}") from e
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= settings.RETRIEVER_MAX_RETRY:
+                    raise PubmedEUtilsError(f"PubMed {endpoint} request failed: {str(e)}") from e
+                logger.warning(f"PubMed {endpoint} request failed ({e!r}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            delay *= 2
+        raise PubmedEUtilsError(f"PubMed {endpoint} retries exhausted")
+
+    async def esearch(self, query: str, top_k_results: int) -> List[str]:
+        """Return the PMIDs of the `top_k_results` best matches for `query`."""
+        text = await self._request("esearch.fcgi", {
+            "db": "pubmed",
+            "term": query[:MAX_QUERY_LENGTH],
+            "retmode": "json",
+            "retmax": top_k_results,
+        })
+        try:
+            return list(json.loads(text)["esearchresult"]["idlist"])
+        except (KeyError, ValueError) as e:
+            raise PubmedEUtilsError("Unexpected esearch response") from e
+
+    async def efetch(self, uids: List[str]) -> List[Document]:
+        """Fetch and parse every article in `uids` with a single request, preserving the order of `uids`."""
+        if not uids:
+            return []
+
+        text = await self._request("efetch.fcgi", {
+            "db": "pubmed",
+            "retmode": "xml",
+            "id": ",".join(uids),
+        })
+        articles = parse_pubmed_articles(text)
+        return [articles[uid] for uid in uids if uid in articles]
+
+    async def search(self, query: str, top_k_results: int) -> List[Document]:
+        """Search PubMed and return the top `top_k_results` articles as `Document`s."""
+        uids = await self.esearch(query, top_k_results)
+        logger.debug(f"PubMed esearch returned {len(uids)} UIDs")
+        return await self.efetch(uids)
+
+
+def _text(value: Any) -> str:
+    """Flatten an xmltodict node (which may carry attributes or inline markup) to plain text."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return value.get("#text", "")
+    if isinstance(value, list):
+        return " ".join(_text(item) for item in value)
+    return str(value)
+
+
+def _parse_summary(abstract: dict) -> str:
+    abstract_text = abstract.get("AbstractText") or []
+    if not isinstance(abstract_text, list):
+        abstract_text = [abstract_text]
+
+    summaries = [
+        f"{txt['@Label']}: {txt['#text']}" if isinstance(txt, dict) and "@Label" in txt and "#text" in txt
+        else _text(txt)
+        for txt in abstract_text
+    ]
+    summaries = [summary for summary in summaries if summary]
+    return "\n".join(summaries) if summaries else "No abstract available"
+
+
+def parse_pubmed_article(uid: str, article: dict) -> Document:
+    """Convert a parsed `Article` or `BookDocument` element into a `Document`."""
+    abstract = article.get("Abstract") or {}
+    article_date = article.get("ArticleDate") or {}
+    if isinstance(article_date, list):
+        article_date = article_date[0]
+    published = "-".join([
+        article_date.get("Year", ""),
+        article_date.get("Month", ""),
+        article_date.get("Day", ""),
+    ])
+
+    return Document(
+        page_content=_parse_summary(abstract),
+        metadata={
+            "uid": uid,
+            "Title": _text(article.get("ArticleTitle") or article.get("BookTitle")),
+            "Published": published,
+            "Copyright Information": _text(abstract.get("CopyrightInformation")),
+        }
+    )
+
+
+def parse_pubmed_articles(xml_text: str) -> Dict[str, Document]:
+    """Parse an efetch `PubmedArticleSet` into `Document`s keyed by PMID."""
+    try:
+        article_set = xmltodict.parse(
+            xml_text,
+            force_list=("PubmedArticle", "PubmedBookArticle")
+        ).get("PubmedArticleSet") or {}
+    except Exception as e:
+        raise PubmedEUtilsError("Unexpected efetch response") from e
+
+    documents: Dict[str, Document] = {}
+    for pubmed_article in article_set.get("PubmedArticle", []):
+        citation = pubmed_article.get("MedlineCitation", {})
+        uid = _text(citation.get("PMID"))
+        documents[uid] = parse_pubmed_article(uid, citation.get("Article", {}))
+    for book_article in article_set.get("PubmedBookArticle", []):
+        book_document = book_article.get("BookDocument", {})
+        uid = _text(book_document.get("PMID"))
+        documents[uid] = parse_pubmed_article(uid, book_document)
+    return documents
+
+
+pubmed_eutils_client = PubmedEUtilsClient()
@@ -0,0 +1,68 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from business.index.bm25_index import BM25Index
+from business.index.pubmed_index import to_document
+from config.settings import get_settings
+
+settings = get_settings()
+
+
+class PubmedLocalIndexClient:
+    """
+    PubMed retriever backed by the local BM25 abstract index built with `business.index.pubmed_index`.
+
+    Exposes the same `search` interface as `PubmedEUtilsClient` and returns `Document`s shaped like
+    `PubMedRetriever` output. Searches run in a worker thread; the index is re-opened when an ingest in another
+    process updates its manifest.
+    """
+
+    def __init__(self):
+        """Initialize PubmedLocalIndexClient configuration."""
+        self.index: Optional[BM25Index] = None
+        self.refreshed_at = 0.0
+
+    def initialize(self):
+        """Memory-map the local index."""
+        self.index = BM25Index(settings.RETRIEVER_LOCAL_INDEX_PATH)
+        self.index.open()
+        self.refreshed_at = time.monotonic()
+        logger.info(f"PubMed Local Index Client Initialized ({self.index.document_count} documents, "
+                    f"{len(self.index.segments)} segments)")
+
+    async def close(self):
+        """Unmap the local index."""
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+        logger.info("PubMed Local Index Client Closed")
+
+    def _refresh(self):
+        """
+        Swap in a freshly opened index when the manifest changed. The previous index is left to the garbage
+        collector rather than closed, since searches in other threads may still be reading it.
+        """
+        self.refreshed_at = time.monotonic()
+        if self.index.is_stale():
+            index = BM25Index(settings.RETRIEVER_LOCAL_INDEX_PATH)
+            index.open()
+            self.index = index
+            logger.info(f"PubMed local index reloaded ({index.document_count} documents)")
+
+    def _search(self, query: str, top_k_results: int) -> List[Document]:
+        if time.monotonic() - self.refreshed_at >= settings.RETRIEVER_LOCAL_INDEX_REFRESH_SECONDS:
+            self._refresh()
+        return [to_document(stored) for _, stored in self.index.search(query, top_k_results)]
+
+    async def search(self, query: str, top_k_results: int) -> List[Document]:
+        """Return the `top_k_results` best BM25 matches for `query`."""
+        if self.index is None:
+            raise RuntimeError("PubMed Local Index Client is not initialized.")
+        return await asyncio.to_thread(self._search, query, top_k_results)
+
+
+pubmed_local_index_client = PubmedLocalIndexClient()
@@ -1,29 +1,76 @@
-from langchain_community.retrievers import PubMedRetriever
+import time
+from typing import List, Optional, Union
+
+from langchain_core.documents import Document
 from loguru import logger
 
+from business.cache.retrieval_cache import RetrievalCache, retrieval_cache
+from business.cache.single_flight import retrieval_single_flight
+from business.clients.pubmed_eutils_client import PubmedEUtilsClient, PubmedEUtilsError, pubmed_eutils_client
+from business.clients.pubmed_local_index_client import PubmedLocalIndexClient, pubmed_local_index_client
+from business.index.bm25_reranker import rerank
 from config.settings import get_settings
 
 settings = get_settings()
 
+PubmedBackend = Union[PubmedEUtilsClient, PubmedLocalIndexClient]
+
+
+def get_retriever_backend() -> PubmedBackend:
+    """Return the PubMed backend selected by `RETRIEVER_BACKEND`."""
+    if settings.RETRIEVER_BACKEND == "local_index":
+        return pubmed_local_index_client
+    return pubmed_eutils_client
+
 
 class PubmedRetrieverClient:
     """PubmedRetrieverClient"""
 
-    def __init__(self):
+    def __init__(self,
+                 backend: Optional[PubmedBackend] = None,
+                 cache: Optional[RetrievalCache] = retrieval_cache if settings.RETRIEVER_CACHE_ENABLED else None):
         """Initialize PubmedRetrieverClient configuration."""
-        try:
-            self.retriever = PubMedRetriever(
-                api_key=settings.RETRIEVER_API_KEY,
-                top_k_results=settings.RETRIEVER_TOP_K_RESULTS,
-            )
-        except Exception as e:
-            logger.error(f"LLM failed to instantiate: {str(e)}")
-            raise RuntimeError("LLM failed to instantiate.") from e
-
-    def get_retriever(self):
-        """Return the configured LLM instance."""
+        self.retriever = backend or get_retriever_backend()
+        self.cache = cache
+        self.top_k_results = settings.RETRIEVER_TOP_K_RESULTS
+        # Over-fetch this many candidates and rerank them locally, or None to keep the backend's ordering.
+        self.rerank_candidates = max(settings.RETRIEVER_RERANK_CANDIDATES, self.top_k_results) \
+            if settings.RETRIEVER_RERANK_ENABLED else None
+
+    def get_retriever(self) -> PubmedBackend:
+        """Return the configured PubMed backend."""
         return self.retriever
 
-    async def get_relevant_documents(self, query: str):
-        """Return the configured LLM instance."""
-        return await self.retriever.ainvoke(query)
+    async def get_relevant_documents(self, query: str) -> List[Document]:
+        """
+        Return the top PubMed articles for the query, served from the retrieval cache when possible.
+        With reranking enabled, `RETRIEVER_RERANK_CANDIDATES` articles are fetched and the `RETRIEVER_TOP_K_RESULTS`
+        best by local BM25 over the candidates are returned.
+        """
+        if self.cache is not None:
+            documents = await self.cache.get(query, self.top_k_results, self.rerank_candidates)
+            if documents is not None:
+                logger.opt(lazy=True).debug("Retrieval cache hit: {}", self.cache.stats)
+                return documents
+
+        # Identical queries in flight at the same time (e.g. from several terminals) share one retrieval.
+        key = (type(self.retriever).__name__,
+               RetrievalCache.build_key(query, self.top_k_results, self.rerank_candidates))
+        return await retrieval_single_flight.run(key, lambda: self._retrieve(query))
+
+    async def _retrieve(self, query: str) -> List[Document]:
+        try:
+            documents = await self.retriever.search(query, self.rerank_candidates or self.top_k_results)
+        except PubmedEUtilsError as e:
+            logger.error(f"PubMed retrieval failed: {str(e)}")
+            raise RuntimeError("PubMed retrieval failed.") from e
+
+        if self.rerank_candidates:
+            start = time.perf_counter()
+            documents = rerank(query, documents, self.top_k_results)
+            logger.debug(f"Reranked {self.rerank_candidates} PubMed candidates in "
+                         f"{(time.perf_counter() - start) * 1000:.1f}ms")
+
+        if self.cache is not None:
+            await self.cache.set(query, self.top_k_results, documents, self.rerank_candidates)
+        return documents
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucketRateLimiter:
+    """
+    Asyncio token-bucket rate limiter.
+
+    Tokens are refilled continuously at `rate` per second up to `capacity`; `acquire` waits until enough tokens
+    are available. A single instance is meant to be shared by every caller of the rate-limited API in the process.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialize TokenBucketRateLimiter configuration.
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be greater than zero.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """
+        Wait until `tokens` are available and consume them.
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}.")
+
+        # The lock keeps waiters in FIFO order, so a large request is not starved by smaller ones.
+        async with self.lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """
+        Seconds until `tokens` would be available, ignoring callers already waiting.
+        """
+        self._refill()
+        return max(0.0, (min(tokens, self.capacity) - self.tokens) / self.rate)
+
+    def release(self, tokens: float):
+        """
+        Return unused tokens to the bucket, e.g. when a request consumed less than it reserved.
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + tokens)
@@ -0,0 +1,138 @@
+import asyncio
+import ssl
+from typing import Any, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from loguru import logger
+
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class RedisError(Exception):
+    """Raised for an error reply of the server or a malformed reply."""
+
+
+class RedisProtocolError(RedisError):
+    """Raised for a malformed reply, after which the connection is out of sync with its commands."""
+
+
+class RedisClient:
+    """
+    Minimal asyncio client of the Redis protocol (RESP2), enough for a shared cache: `GET`, `SET` with an expiry,
+    `DEL` and `PING`. It works with Redis and protocol-compatible servers (Valkey, KeyDB, Dragonfly) without an extra
+    dependency.
+
+    Connections are opened on demand from a `redis://` or `rediss://` URL (`redis://:password@host:6379/0`), at most
+    `max_connections` of them, and reused. A connection that failed to open, returned a malformed reply, or whose
+    command failed or was cancelled is closed rather than reused, since its replies can no longer be matched to
+    commands; only error replies, which are read in full, leave it in the pool.
+    """
+
+    def __init__(self, url: str, max_connections: int = 10, timeout: float = 1.0):
+        """Initialize RedisClient configuration."""
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", "rediss"):
+            raise ValueError(f"Unsupported Redis URL scheme: {parsed.scheme}")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.database = int(parsed.path.lstrip("/") or 0)
+        self.ssl = ssl.create_default_context() if parsed.scheme == "rediss" else None
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_connections)
+        self.idle: List[Connection] = []
+
+    async def _connect(self) -> Connection:
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        connection = (reader, writer)
+        try:
+            if self.password is not None:
+                self._check(await self._call(connection, ("AUTH", self.username, self.password) if self.username
+                                             else ("AUTH", self.password)))
+            if self.database:
+                self._check(await self._call(connection, ("SELECT", self.database)))
+        except BaseException:
+            writer.close()
+            raise
+        return connection
+
+    @staticmethod
+    def _encode(args: Tuple[Any, ...]) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            value = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(value), value))
+        return b"".join(parts)
+
+    @staticmethod
+    def _check(reply: Any) -> Any:
+        if isinstance(reply, RedisError):
+            raise reply
+        return reply
+
+    async def _read_reply(self, reader: asyncio.StreamReader) -> Any:
+        """
+        Read one reply in full. Error replies are returned as `RedisError` instances rather than raised, so that an
+        error inside an array does not leave the rest of the array unread.
+        """
+        line = await reader.readuntil(b"\r\n")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload.decode("utf-8")
+        if prefix == b"-":
+            return RedisError(payload.decode("utf-8", "replace"))
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            return None if length < 0 else (await reader.readexactly(length + 2))[:-2]
+        if prefix == b"*":
+            length = int(payload)
+            return None if length < 0 else [await self._read_reply(reader) for _ in range(length)]
+        raise RedisProtocolError(f"Malformed reply: {line[:64]!r}")
+
+    async def _call(self, connection: Connection, args: Tuple[Any, ...]) -> Any:
+        reader, writer = connection
+        writer.write(self._encode(args))
+        await writer.drain()
+        return await self._read_reply(reader)
+
+    async def execute(self, *args: Any) -> Any:
+        """Send one command and return its reply, raising `RedisError` for an error reply."""
+        async with self.semaphore:
+            connection = self.idle.pop() if self.idle else None
+            try:
+                async with asyncio.timeout(self.timeout):
+                    if connection is None:
+                        connection = await self._connect()
+                    reply = await self._call(connection, args)
+            except BaseException:
+                if connection is not None:
+                    connection[1].close()
+                raise
+            # The reply, an error reply included, was read in full, so the connection is still in sync.
+            self.idle.append(connection)
+            return self._check(reply)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        await self.execute("SET", key, value, "PX", max(1, int(ttl_seconds * 1000)))
+
+    async def delete(self, key: str):
+        await self.execute("DEL", key)
+
+    async def ping(self) -> bool:
+        return await self.execute("PING") == "PONG"
+
+    async def close(self):
+        """Close every idle connection."""
+        while self.idle:
+            _, writer = self.idle.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError as e:
+                logger.debug(f"Redis connection closed with an error: {e!r}")
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Annotated
 
 from fastapi import Depends
@@ -6,19 +7,31 @@ from fhirpy import AsyncFHIRClient
 from business.agents.fhir_formatter_agent import FHIRFormatterAgent
 from business.agents.fhir_retriever_agent import FHIRRetrieverAgent
 from business.agents.fhir_translator_agent import FHIRTranslatorAgent
+from business.cache.patient_snapshot_cache import PatientSnapshotCache, patient_snapshot_cache
+from business.clients.fhir_analytics_client import FHIRAnalyticsClient, fhir_analytics_client
 from business.clients.fhir_client import fhir_client
-from business.clients.llm_client import LLMClient
+from business.clients.llm_client import LLMClient, llm_client_registry
 from business.clients.pubmed_retriever_client import PubmedRetrieverClient
 from business.tools.fhir_tools import FHIRTools
+from config.settings import get_settings
+
+settings = get_settings()
 
 
 def get_llm_client() -> LLMClient:
-    return LLMClient()
+    return llm_client_registry.get_llm_client()
 
 
 LLMClientDependency = Annotated[LLMClient, Depends(get_llm_client)]
 
 
+def get_fhir_agent_llm_client() -> LLMClient:
+    return llm_client_registry.get_llm_client(settings.FHIR_AGENT_MODEL_ID)
+
+
+FHIRAgentLLMClientDependency = Annotated[LLMClient, Depends(get_fhir_agent_llm_client)]
+
+
 def get_retriever_client() -> PubmedRetrieverClient:
     return PubmedRetrieverClient()
 
@@ -33,6 +46,20 @@ def get_fhir_server() -> AsyncFHIRClient:
 FHIRServerDependency = Annotated[AsyncFHIRClient, Depends(get_fhir_server)]
 
 
+def get_patient_snapshot_cache() -> PatientSnapshotCache:
+    return patient_snapshot_cache
+
+
+PatientSnapshotCacheDependency = Annotated[PatientSnapshotCache, Depends(get_patient_snapshot_cache)]
+
+
+def get_fhir_analytics_client() -> FHIRAnalyticsClient:
+    return fhir_analytics_client
+
+
+FHIRAnalyticsClientDependency = Annotated[FHIRAnalyticsClient, Depends(get_fhir_analytics_client)]
+
+
 def get_fhir_tools(fhir_server: FHIRServerDependency) -> FHIRTools:
     return FHIRTools(fhir_server)
 
@@ -40,13 +67,15 @@ def get_fhir_tools(fhir_server: FHIRServerDependency) -> FHIRTools:
 FHIRToolsDependency = Annotated[FHIRTools, Depends(get_fhir_tools)]
 
 
+@lru_cache
 def get_fhir_translator_agent(
-        llm_client: LLMClientDependency) -> FHIRTranslatorAgent:
+        llm_client: FHIRAgentLLMClientDependency) -> FHIRTranslatorAgent:
     """
     Creates and returns an instance of the TranslatorAgent.
 
     The TranslatorAgent is responsible for converting natural-language queries
     into FHIR-compliant API queries using the provided LLM and LangSmith clients.
+    The instance is cached per LLM client so its compiled graph is reused across requests.
     """
     return FHIRTranslatorAgent(llm_client)
 
@@ -54,15 +83,17 @@ def get_fhir_translator_agent(
 TranslatorAgentDependency = Annotated[FHIRTranslatorAgent, Depends(get_fhir_translator_agent)]
 
 
+@lru_cache
 def get_fhir_retriever_agent(
-        llm_client: LLMClientDependency,
+        llm_client: FHIRAgentLLMClientDependency,
         fhir_server: FHIRServerDependency
 ) -> FHIRRetrieverAgent:
     """
-    Creates and returns an instance of the TranslatorAgent.
+    Creates and returns an instance of the FHIRRetrieverAgent.
 
-    The TranslatorAgent is responsible for converting natural-language queries
-    into FHIR-compliant API queries using the provided LLM and LangSmith clients.
+    The FHIRRetrieverAgent is responsible for fetching the patient's FHIR resources for the
+    queries produced by the TranslatorAgent, falling back to an LLM agent with the FHIR tools.
+    The instance is cached per LLM client and FHIR server so its compiled graph is reused across requests.
     """
     fhir_tools = get_fhir_tools(fhir_server)
     return FHIRRetrieverAgent(llm_client, fhir_tools)
@@ -71,15 +102,26 @@ def get_fhir_retriever_agent(
 FHIRRetrieverAgentDependency = Annotated[FHIRRetrieverAgent, Depends(get_fhir_retriever_agent)]
 
 
+@lru_cache
 def get_fhir_formatter_agent(
-        llm_client: LLMClientDependency) -> FHIRFormatterAgent:
+        llm_client: FHIRAgentLLMClientDependency) -> FHIRFormatterAgent:
     """
     Creates and returns an instance of the FHIRFormatterAgent.
 
     The FHIRFormatterAgent is responsible for converting raw FHIR data into an
     LLM-friendly format by extracting key details and structuring them concisely.
+    The instance is cached per LLM client so its compiled graph is reused across requests.
     """
     return FHIRFormatterAgent(llm_client)
 
 
 FHIRFormatterAgentDependency = Annotated[FHIRFormatterAgent, Depends(get_fhir_formatter_agent)]
+
+
+def clear_agent_caches():
+    """
+    Drop the cached agents, which hold the LLM client and FHIR server they were created with; called when those
+    are closed so that the next application start does not reuse agents bound to closed clients.
+    """
+    for get_agent in (get_fhir_translator_agent, get_fhir_retriever_agent, get_fhir_formatter_agent):
+        get_agent.cache_clear()
@@ -0,0 +1,300 @@
+import json
+import math
+import mmap
+import os
+import re
+import shutil
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+MAX_TERM_BYTES = 32
+TERM_DTYPE = f"S{MAX_TERM_BYTES}"
+MAX_TERM_FREQUENCY = np.iinfo(np.uint16).max
+
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or that the their there these this "
+    "those to was were which with what when where who whom why how do does did can could should would may might "
+    "not no than then also".split()
+)
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case alphanumeric tokens without stop words, truncated to the on-disk term width."""
+    return [
+        token[:MAX_TERM_BYTES]
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+class SegmentWriter:
+    """
+    Builds one immutable index segment in memory and writes it to disk.
+
+    A segment directory holds numpy arrays (sorted terms, posting offsets, posting doc IDs and term frequencies,
+    document lengths and PMIDs) plus the stored documents as JSON lines with their byte offsets. Every file is
+    opened memory-mapped by `Segment`, so workers on the same host share the pages through the OS page cache.
+    """
+
+    def __init__(self):
+        """Initialize SegmentWriter configuration."""
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+        self.doc_pmids: List[int] = []
+        self.docs: List[bytes] = []
+        self.deletions: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, pmid: int, text: str, stored: dict):
+        """Index `text` for the document `pmid` and store `stored` to be returned by searches."""
+        doc_id = len(self.docs)
+        tokens = tokenize(text)
+        for term, frequency in Counter(tokens).items():
+            self.postings[term].append((doc_id, min(frequency, MAX_TERM_FREQUENCY)))
+        self.doc_lengths.append(len(tokens))
+        self.doc_pmids.append(pmid)
+        self.docs.append(json.dumps(stored, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def delete(self, pmid: int):
+        """Record that `pmid` is deleted from every older segment."""
+        self.deletions.append(pmid)
+
+    def write(self, path: str):
+        """Write the segment atomically to `path`."""
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        terms = sorted(self.postings)
+        term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        postings_count = sum(len(self.postings[term]) for term in terms)
+        postings_doc = np.empty(postings_count, dtype=np.uint32)
+        postings_tf = np.empty(postings_count, dtype=np.uint16)
+        position = 0
+        for index, term in enumerate(terms):
+            term_postings = self.postings[term]
+            postings_doc[position:position + len(term_postings)] = [doc_id for doc_id, _ in term_postings]
+            postings_tf[position:position + len(term_postings)] = [frequency for _, frequency in term_postings]
+            position += len(term_postings)
+            term_offsets[index + 1] = position
+
+        doc_offsets = np.zeros(len(self.docs) + 1, dtype=np.int64)
+        with open(os.path.join(tmp_path, "docs.jsonl"), "wb") as docs_file:
+            for index, doc in enumerate(self.docs):
+                docs_file.write(doc)
+                doc_offsets[index + 1] = doc_offsets[index] + len(doc)
+
+        arrays = {
+            "terms": np.array([term.encode("utf-8")[:MAX_TERM_BYTES] for term in terms], dtype=TERM_DTYPE),
+            "term_offsets": term_offsets,
+            "postings_doc": postings_doc,
+            "postings_tf": postings_tf,
+            "doc_lengths": np.array(self.doc_lengths, dtype=np.uint32),
+            "doc_pmids": np.array(self.doc_pmids, dtype=np.int64),
+            "doc_offsets": doc_offsets,
+            "deletions": np.array(self.deletions, dtype=np.int64),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+
+class Segment:
+    """Read-only, memory-mapped view of a segment written by `SegmentWriter`."""
+
+    def __init__(self, path: str):
+        """Memory-map the segment at `path`."""
+        self.path = path
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.terms = load("terms")
+        self.term_offsets = load("term_offsets")
+        self.postings_doc = load("postings_doc")
+        self.postings_tf = load("postings_tf")
+        self.doc_lengths = load("doc_lengths")
+        self.doc_pmids = load("doc_pmids")
+        self.doc_offsets = load("doc_offsets")
+        self.deletions = load("deletions")
+        self.live = np.ones(len(self.doc_pmids), dtype=bool)
+
+        self.docs_file = open(os.path.join(path, "docs.jsonl"), "rb")
+        size = os.fstat(self.docs_file.fileno()).st_size
+        self.docs = mmap.mmap(self.docs_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self.doc_pmids)
+
+    def postings(self, term: bytes) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the (doc IDs, term frequencies) postings of `term`, empty when the term is unknown."""
+        index = int(np.searchsorted(self.terms, term))
+        if index >= len(self.terms) or self.terms[index] != term:
+            return self.postings_doc[0:0], self.postings_tf[0:0]
+        start, end = int(self.term_offsets[index]), int(self.term_offsets[index + 1])
+        return self.postings_doc[start:end], self.postings_tf[start:end]
+
+    def document(self, doc_id: int) -> dict:
+        start, end = int(self.doc_offsets[doc_id]), int(self.doc_offsets[doc_id + 1])
+        return json.loads(self.docs[start:end])
+
+    def iter_live_documents(self) -> Iterable[Tuple[int, dict]]:
+        for doc_id in np.flatnonzero(self.live):
+            yield int(self.doc_pmids[doc_id]), self.document(int(doc_id))
+
+    def close(self):
+        if isinstance(self.docs, mmap.mmap):
+            self.docs.close()
+        self.docs_file.close()
+
+
+class BM25Index:
+    """
+    Okapi BM25 index made of append-only segments listed in a manifest.
+
+    Each ingest adds a segment; a document in a newer segment supersedes the same PMID in older ones, and a
+    segment's deletions hide PMIDs from older ones. Collection statistics use live documents, while document
+    frequencies are summed over segments, which slightly overcounts superseded documents until `compact`.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        """Initialize BM25Index configuration."""
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.segments: List[Segment] = []
+        self.manifest: dict = {"segments": [], "ingested_files": []}
+        self.manifest_mtime: Optional[float] = None
+        self.document_count = 0
+        self.average_document_length = 0.0
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST_FILENAME)
+
+    def open(self):
+        """Memory-map every segment in the manifest and compute which documents are live."""
+        self.close()
+        if os.path.exists(self.manifest_path):
+            self.manifest_mtime = os.path.getmtime(self.manifest_path)
+            with open(self.manifest_path, encoding="utf-8") as manifest_file:
+                self.manifest = json.load(manifest_file)
+        self.segments = [Segment(os.path.join(self.path, name)) for name in self.manifest["segments"]]
+
+        # Walk from newest to oldest: a PMID seen (or deleted) in a newer segment hides it in older ones.
+        newer_pmids = np.empty(0, dtype=np.int64)
+        total_length = 0
+        for segment in reversed(self.segments):
+            # Within a segment the last occurrence of a PMID wins.
+            _, last_reversed = np.unique(segment.doc_pmids[::-1], return_index=True)
+            latest = np.zeros(len(segment), dtype=bool)
+            latest[len(segment) - 1 - last_reversed] = True
+            segment.live = latest & ~np.isin(segment.doc_pmids, newer_pmids)
+            total_length += int(segment.doc_lengths[segment.live].sum())
+            newer_pmids = np.concatenate([newer_pmids, segment.doc_pmids, segment.deletions])
+        self.document_count = int(sum(segment.live.sum() for segment in self.segments))
+        self.average_document_length = total_length / self.document_count if self.document_count else 0.0
+
+    def is_stale(self) -> bool:
+        """Return True when another process has changed the manifest since the index was opened."""
+        mtime = os.path.getmtime(self.manifest_path) if os.path.exists(self.manifest_path) else None
+        return mtime != self.manifest_mtime
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+    def search(self, query: str, top_k: int) -> List[Tuple[float, dict]]:
+        """Return up to `top_k` (score, stored document) pairs, best first."""
+        terms = [term.encode("utf-8") for term in dict.fromkeys(tokenize(query))]
+        if not terms or not self.document_count:
+            return []
+
+        per_segment = [[segment.postings(term) for term in terms] for segment in self.segments]
+        document_frequencies = [
+            sum(len(postings[index][0]) for postings in per_segment) for index in range(len(terms))
+        ]
+
+        candidates: List[Tuple[float, int, int]] = []
+        for segment_index, (segment, postings) in enumerate(zip(self.segments, per_segment)):
+            doc_ids, contributions = [], []
+            for (term_docs, term_tfs), document_frequency in zip(postings, document_frequencies):
+                if not len(term_docs):
+                    continue
+                idf = math.log(1 + (self.document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+                tfs = term_tfs.astype(np.float32)
+                lengths = segment.doc_lengths[term_docs].astype(np.float32)
+                norm = self.k1 * (1 - self.b + self.b * lengths / self.average_document_length)
+                doc_ids.append(term_docs)
+                contributions.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+            if not doc_ids:
+                continue
+
+            doc_ids = np.concatenate(doc_ids)
+            unique_docs, inverse = np.unique(doc_ids, return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(contributions))
+            live = segment.live[unique_docs]
+            unique_docs, scores = unique_docs[live], scores[live]
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k - 1)[:top_k]
+                unique_docs, scores = unique_docs[best], scores[best]
+            candidates.extend(
+                (float(score), segment_index, int(doc_id)) for score, doc_id in zip(scores, unique_docs)
+            )
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return [
+            (score, self.segments[segment_index].document(doc_id))
+            for score, segment_index, doc_id in candidates[:top_k]
+        ]
+
+    def _write_manifest(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _next_segment_name(self) -> str:
+        return f"segment-{time.strftime('%Y%m%d%H%M%S')}-{len(self.manifest['segments']):06d}"
+
+    def add_segment(self, writer: SegmentWriter, source: Optional[str] = None):
+        """Write `writer` as the newest segment and record `source` as ingested."""
+        os.makedirs(self.path, exist_ok=True)
+        name = self._next_segment_name()
+        writer.write(os.path.join(self.path, name))
+        self.manifest["segments"].append(name)
+        if source:
+            self.manifest["ingested_files"].append(source)
+        self._write_manifest()
+        self.open()
+
+    def compact(self, text_of: Callable[[dict], str]):
+        """
+        Rewrite every live document into a single segment and drop the old segments.
+        `text_of` rebuilds the indexed text from a stored document.
+        """
+        self.open()
+        writer = SegmentWriter()
+        for segment in self.segments:
+            for pmid, stored in segment.iter_live_documents():
+                writer.add(pmid, text_of(stored), stored)
+
+        old_segments = list(self.manifest["segments"])
+        name = self._next_segment_name()
+        writer.write(os.path.join(self.path, name))
+        self.manifest["segments"] = [name]
+        self._write_manifest()
+        self.open()
+        for old_segment in old_segments:
+            shutil.rmtree(os.path.join(self.path, old_segment), ignore_errors=True)
@@ -0,0 +1,60 @@
+"""
+CPU-only reranking of retrieved PubMed articles.
+
+The retriever over-fetches candidates (PubMed's own relevance ordering, or the local index's corpus-wide BM25) and
+this module re-scores them against the doctor's query with BM25 computed over the candidate set itself, so that
+terms rare among the candidates weigh most. Title terms count `TITLE_WEIGHT` times (a simplified BM25F). Scores are
+computed as one vectorized (candidates x query terms) matrix; ties keep the retrieval order.
+"""
+from collections import Counter
+from typing import List, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from business.index.bm25_index import tokenize
+
+TITLE_WEIGHT = 2.0
+K1 = 1.2
+B = 0.75
+
+
+def query_terms(query: str) -> List[str]:
+    """The distinct terms of `query`, in order."""
+    return list(dict.fromkeys(tokenize(query)))
+
+
+def bm25_scores(frequencies: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    BM25 scores from a (documents x query terms) matrix of term frequencies and the document lengths, with the
+    documents themselves as the corpus.
+    """
+    document_frequencies = (frequencies > 0).sum(axis=0)
+    idf = np.log(1 + (len(frequencies) - document_frequencies + 0.5) / (document_frequencies + 0.5))
+    norm = K1 * (1 - B + B * lengths / max(float(lengths.mean()), 1.0))
+    return (idf * frequencies * (K1 + 1) / (frequencies + norm[:, None])).sum(axis=1)
+
+
+def score_documents(query: str, documents: Sequence[Document]) -> np.ndarray:
+    """Return the BM25 score of every document for `query`, with the documents themselves as the corpus."""
+    terms = query_terms(query)
+    if not terms or not documents:
+        return np.zeros(len(documents), dtype=np.float64)
+
+    frequencies = np.zeros((len(documents), len(terms)), dtype=np.float64)
+    lengths = np.zeros(len(documents), dtype=np.float64)
+    for row, document in enumerate(documents):
+        title_counts = Counter(tokenize(document.metadata.get("Title") or ""))
+        content_counts = Counter(tokenize(document.page_content))
+        frequencies[row] = [TITLE_WEIGHT * title_counts[term] + content_counts[term] for term in terms]
+        lengths[row] = TITLE_WEIGHT * sum(title_counts.values()) + sum(content_counts.values())
+    return bm25_scores(frequencies, lengths)
+
+
+def rerank(query: str, documents: Sequence[Document], top_k: int) -> List[Document]:
+    """Return the `top_k` documents that best match `query`, best first."""
+    scores = score_documents(query, documents)
+    # Equal scores keep the retrieval order.
+    order = np.lexsort((np.arange(len(documents)), -scores))[:top_k]
+    return [documents[index] for index in order]
+
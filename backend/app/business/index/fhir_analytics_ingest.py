@@ -0,0 +1,172 @@
+"""
+Ingestion of FHIR data into the local analytics store (`business.index.fhir_analytics_store`).
+
+Loads Synthea (or any) JSON Bundles, FHIR Bulk Data NDJSON files, or runs a Bulk Data `$export` against the
+configured FHIR server and loads its output. Each run rebuilds the store from the given sources and swaps it in
+atomically; running workers pick it up within `FHIR_ANALYTICS_REFRESH_SECONDS`. Run from the `app` directory:
+
+    python -m business.index.fhir_analytics_ingest bundles ../../infrastructure/hapi-fhir-server/mock-data/*.json
+    python -m business.index.fhir_analytics_ingest ndjson /data/export/*.ndjson.gz
+    python -m business.index.fhir_analytics_ingest export --download-dir /data/export --types Patient,Observation
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import time
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from business.index.fhir_analytics_store import AnalyticsStore, AnalyticsStoreWriter, Fact
+
+# Resource type -> (coded elements, date elements in order of preference). Each coding of a coded element is a fact.
+FACT_ELEMENTS: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "Observation": (("code",), ("effectiveDateTime", "effectivePeriod", "effectiveInstant", "issued")),
+    "Condition": (("code",), ("onsetDateTime", "onsetPeriod", "recordedDate")),
+    "MedicationRequest": (("medicationCodeableConcept",), ("authoredOn",)),
+    "Procedure": (("code",), ("performedDateTime", "performedPeriod")),
+    "Immunization": (("vaccineCode",), ("occurrenceDateTime",)),
+    "AllergyIntolerance": (("code",), ("onsetDateTime", "recordedDate")),
+    "Encounter": (("type", "reasonCode"), ("period",)),
+    "DiagnosticReport": (("code",), ("effectiveDateTime", "effectivePeriod", "issued")),
+    "CarePlan": (("category",), ("period",)),
+}
+
+# Default `_type` of exports: the patients and every resource type facts are extracted from.
+EXPORT_RESOURCE_TYPES = ["Patient", *FACT_ELEMENTS]
+
+PATIENT_REFERENCE_ELEMENTS = ("subject", "patient")
+
+
+def _reference_id(reference: Any) -> Optional[str]:
+    """Return the ID of a `Patient/123` or `urn:uuid:123` reference."""
+    value = (reference or {}).get("reference", "") if isinstance(reference, dict) else ""
+    return value.removeprefix("urn:uuid:").rpartition("/")[2] or None
+
+
+def _date(resource: dict, elements: Tuple[str, ...]) -> Optional[str]:
+    for element in elements:
+        value = resource.get(element)
+        if isinstance(value, dict):
+            value = value.get("start")
+        if value:
+            return value
+    return None
+
+
+def _codings(value: Any) -> Iterator[dict]:
+    for concept in value if isinstance(value, list) else [value]:
+        if isinstance(concept, dict):
+            yield from (coding for coding in concept.get("coding", []) if coding.get("code"))
+
+
+def _quantity(element: dict) -> Tuple[Optional[float], Optional[str]]:
+    quantity = element.get("valueQuantity") or {}
+    value = quantity.get("value")
+    return (float(value) if isinstance(value, (int, float)) else None), quantity.get("unit") or quantity.get("code")
+
+
+def extract_facts(resource: dict) -> List[Fact]:
+    """Return the facts of a resource: one per coding, with Observation quantities and components as values."""
+    coded_elements, date_elements = FACT_ELEMENTS[resource["resourceType"]]
+    day = _date(resource, date_elements)
+    value, unit = _quantity(resource)
+    facts = [Fact(coding.get("system"), coding["code"], coding.get("display", ""), day, value, unit)
+             for element in coded_elements for coding in _codings(resource.get(element))]
+    for component in resource.get("component", []):
+        value, unit = _quantity(component)
+        facts.extend(Fact(coding.get("system"), coding["code"], coding.get("display", ""), day, value, unit)
+                     for coding in _codings(component.get("code")))
+    return facts
+
+
+def add_resources(writer: AnalyticsStoreWriter, resources: Iterable[dict]) -> int:
+    """Add patients and the facts of supported resource types to `writer`. Returns the number of resources used."""
+    count = 0
+    for resource in resources:
+        resource_type = resource.get("resourceType")
+        if resource_type == "Patient":
+            writer.add_patient(resource["id"], resource.get("gender"), resource.get("birthDate"),
+                               resource.get("deceasedDateTime"))
+        elif resource_type in FACT_ELEMENTS:
+            patient_id = next(filter(None, (_reference_id(resource.get(element))
+                                            for element in PATIENT_REFERENCE_ELEMENTS)), None)
+            if patient_id is None or "id" not in resource:
+                continue
+            writer.add_resource(resource_type, resource["id"], patient_id, extract_facts(resource))
+        else:
+            continue
+        count += 1
+    return count
+
+
+def _open(path: str) -> IO[str]:
+    return gzip.open(path, "rt", encoding="utf-8") if path.endswith(".gz") else open(path, encoding="utf-8")
+
+
+def iter_bundle_resources(paths: List[str]) -> Iterator[dict]:
+    """Yield the resources of JSON Bundle files, such as the Synthea patient bundles."""
+    for path in paths:
+        with _open(path) as bundle_file:
+            bundle = json.load(bundle_file)
+        yield from (entry["resource"] for entry in bundle.get("entry", []) if "resource" in entry)
+
+
+def iter_ndjson_resources(paths: List[str]) -> Iterator[dict]:
+    """Yield the resources of Bulk Data NDJSON files (`.ndjson` or `.ndjson.gz`), one per line."""
+    for path in paths:
+        with _open(path) as ndjson_file:
+            yield from (json.loads(line) for line in ndjson_file if line.strip())
+
+
+def build_store(store: AnalyticsStore, resources: Iterable[dict], sources: List[str]) -> AnalyticsStoreWriter:
+    """Rebuild `store` from `resources`, read from `sources`."""
+    start = time.perf_counter()
+    writer = AnalyticsStoreWriter()
+    count = add_resources(writer, resources)
+    store.replace(writer, [os.path.basename(source) for source in sources])
+    logger.info("Built FHIR analytics store from {} sources: {} resources, {} patients, {} facts in {:.1f}s",
+                len(sources), count, len(writer.patients), len(writer), time.perf_counter() - start)
+    return writer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store-path", help="Store directory (default: FHIR_ANALYTICS_STORE_PATH).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bundles_parser = commands.add_parser("bundles", help="Load JSON Bundle files (e.g. Synthea output).")
+    bundles_parser.add_argument("paths", nargs="+")
+    ndjson_parser = commands.add_parser("ndjson", help="Load Bulk Data NDJSON files.")
+    ndjson_parser.add_argument("paths", nargs="+")
+    export_parser = commands.add_parser("export", help="Run a Bulk Data $export on the FHIR server and load it.")
+    export_parser.add_argument("--download-dir", required=True, help="Directory the NDJSON output is saved to.")
+    export_parser.add_argument("--types", default=",".join(EXPORT_RESOURCE_TYPES),
+                               help="Comma-separated resource types to export.")
+    export_parser.add_argument("--since", help="Only resources updated since this instant (`_since`).")
+    export_parser.add_argument("--group", help="Export the members of this Group instead of the whole server.")
+    export_parser.add_argument("--poll-seconds", type=float, default=5.0)
+    export_parser.add_argument("--timeout-seconds", type=float, default=3600.0)
+    args = parser.parse_args()
+
+    from config.settings import get_settings
+    store = AnalyticsStore(args.store_path or get_settings().FHIR_ANALYTICS_STORE_PATH)
+    store.open()
+    if args.command == "bundles":
+        build_store(store, iter_bundle_resources(args.paths), args.paths)
+    elif args.command == "ndjson":
+        build_store(store, iter_ndjson_resources(args.paths), args.paths)
+    elif args.command == "export":
+        from business.clients.fhir_bulk_export_client import FHIRBulkExportClient
+        from business.clients.fhir_client import fhir_client
+        fhir_client.initialize()
+        paths = asyncio.run(FHIRBulkExportClient(fhir_client.get_fhir_server()).export(
+            args.download_dir, args.types.split(","), args.since, args.group, poll_seconds=args.poll_seconds,
+            timeout_seconds=args.timeout_seconds))
+        build_store(store, iter_ndjson_resources(paths), paths)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
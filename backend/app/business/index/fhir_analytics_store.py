@@ -0,0 +1,410 @@
+"""
+Columnar store of clinical facts for population-level queries.
+
+Every coded element of an ingested resource (an Observation code or component, a Condition code, a medication, ...)
+becomes one fact row: patient, code, date, numeric value and unit, and resource type. Columns are numpy
+arrays written once per ingest and memory-mapped by every worker, like the PubMed BM25 index. Rows are sorted by code
+then date, so a code's facts are one contiguous slice (`code_offsets`) and a date range within it is two binary
+searches; `patient_rows`/`patient_offsets` index the rows of each patient.
+"""
+import json
+import os
+import shutil
+import time
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from business.schemas.fhir_analytics import CodeSummary, CohortPatient, CohortQuery, CohortResult
+
+ID_DTYPE = "S64"
+CODE_DTYPE = "S160"
+DATE_DTYPE = "datetime64[D]"
+GENDERS = ("unknown", "male", "female", "other")
+
+MANIFEST_FILENAME = "manifest.json"
+DICTIONARIES_FILENAME = "dictionaries.json"
+
+
+class Fact(NamedTuple):
+    system: Optional[str]
+    code: str
+    display: str = ""
+    date: Optional[str] = None
+    value: Optional[float] = None
+    unit: Optional[str] = None
+
+
+def _to_day(value: Optional[str]) -> np.datetime64:
+    """Parse the day of a FHIR date or dateTime (`YYYY`, `YYYY-MM`, `YYYY-MM-DD...`), NaT if absent or invalid."""
+    try:
+        return np.datetime64(value[:10], "D") if value else np.datetime64("NaT", "D")
+    except ValueError:
+        return np.datetime64("NaT", "D")
+
+
+class AnalyticsStoreWriter:
+    """
+    Collects patients and facts in memory and writes them as one store snapshot.
+    A resource added again (same type and ID) replaces the facts of the earlier copy.
+    """
+
+    def __init__(self):
+        """Initialize AnalyticsStoreWriter configuration."""
+        self.patients: Dict[str, int] = {}
+        self.patient_gender: List[int] = []
+        self.patient_birth: List[Optional[str]] = []
+        self.patient_deceased: List[Optional[str]] = []
+        self.codes: Dict[str, int] = {}
+        self.code_displays: List[str] = []
+        self.resource_types: Dict[str, int] = {}
+        self.units: Dict[str, int] = {"": 0}
+        self.resources: Dict[str, int] = {}
+        self.resource_live: List[bool] = []
+        self.fact_patient: List[int] = []
+        self.fact_code: List[int] = []
+        self.fact_type: List[int] = []
+        self.fact_date: List[Optional[str]] = []
+        self.fact_value: List[float] = []
+        self.fact_unit: List[int] = []
+        self.fact_resource: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.fact_code)
+
+    def _patient(self, patient_id: str) -> int:
+        index = self.patients.get(patient_id)
+        if index is None:
+            index = self.patients[patient_id] = len(self.patients)
+            self.patient_gender.append(0)
+            self.patient_birth.append(None)
+            self.patient_deceased.append(None)
+        return index
+
+    def add_patient(self, patient_id: str, gender: Optional[str] = None, birth_date: Optional[str] = None,
+                    deceased_date: Optional[str] = None):
+        """Record a patient's demographics. Patients only referenced by facts keep unknown demographics."""
+        index = self._patient(patient_id)
+        self.patient_gender[index] = GENDERS.index(gender) if gender in GENDERS else 0
+        self.patient_birth[index] = birth_date
+        self.patient_deceased[index] = deceased_date
+
+    def add_resource(self, resource_type: str, resource_id: str, patient_id: str, facts: Iterable[Fact]):
+        """Record the facts of one resource about `patient_id`."""
+        key = f"{resource_type}/{resource_id}"
+        if key in self.resources:
+            self.resource_live[self.resources[key]] = False
+        resource = self.resources[key] = len(self.resource_live)
+        self.resource_live.append(True)
+
+        patient = self._patient(patient_id)
+        resource_type_index = self.resource_types.setdefault(resource_type, len(self.resource_types))
+        for fact in facts:
+            code_key = f"{fact.system or ''}|{fact.code}"
+            code = self.codes.get(code_key)
+            if code is None:
+                code = self.codes[code_key] = len(self.codes)
+                self.code_displays.append(fact.display or "")
+            elif fact.display and not self.code_displays[code]:
+                self.code_displays[code] = fact.display
+            self.fact_patient.append(patient)
+            self.fact_code.append(code)
+            self.fact_type.append(resource_type_index)
+            self.fact_date.append(fact.date)
+            self.fact_value.append(np.nan if fact.value is None else fact.value)
+            self.fact_unit.append(self.units.setdefault(fact.unit or "", len(self.units)))
+            self.fact_resource.append(resource)
+
+    def write(self, path: str):
+        """Write the snapshot atomically to `path`."""
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        # Number patients and codes in sorted order so that IDs and codes can be looked up by binary search.
+        patient_ids = sorted(self.patients)
+        patient_rank = np.empty(len(patient_ids), dtype=np.uint32)
+        patient_rank[[self.patients[patient_id] for patient_id in patient_ids]] = np.arange(len(patient_ids))
+        patient_order = patient_rank.argsort()
+        code_keys = sorted(self.codes)
+        code_rank = np.empty(len(code_keys), dtype=np.uint32)
+        code_rank[[self.codes[code_key] for code_key in code_keys]] = np.arange(len(code_keys))
+
+        # Drop the facts of superseded resources, then sort by code and date.
+        live = np.array(self.resource_live, dtype=bool)[np.array(self.fact_resource, dtype=np.int64)]
+        fact_code = code_rank[np.array(self.fact_code, dtype=np.int64)][live]
+        fact_date = np.array([_to_day(day) for day in self.fact_date], dtype=DATE_DTYPE)[live]
+        order = np.lexsort((fact_date, fact_code))
+
+        def column(values: list, dtype) -> np.ndarray:
+            return np.array(values, dtype=dtype)[live][order]
+
+        fact_code = fact_code[order]
+        fact_patient = patient_rank[column(self.fact_patient, np.int64)]
+        patient_rows = np.argsort(fact_patient, kind="stable").astype(np.uint32)
+
+        arrays = {
+            "code_keys": np.array([code_key.encode("utf-8")[:160] for code_key in code_keys], dtype=CODE_DTYPE),
+            "code_values": np.array([code_key.partition("|")[2].encode("utf-8")[:64] for code_key in code_keys],
+                                    dtype=ID_DTYPE),
+            "code_offsets": np.searchsorted(fact_code, np.arange(len(code_keys) + 1)).astype(np.int64),
+            "patient_ids": np.array([patient_id.encode("utf-8") for patient_id in patient_ids], dtype=ID_DTYPE),
+            "patient_gender": np.array(self.patient_gender, dtype=np.uint8)[patient_order],
+            "patient_birth": np.array([_to_day(day) for day in self.patient_birth], dtype=DATE_DTYPE)[patient_order],
+            "patient_deceased": np.array([_to_day(day) for day in self.patient_deceased],
+                                         dtype=DATE_DTYPE)[patient_order],
+            "patient_rows": patient_rows,
+            "patient_offsets": np.searchsorted(fact_patient[patient_rows],
+                                               np.arange(len(patient_ids) + 1)).astype(np.int64),
+            "fact_patient": fact_patient,
+            "fact_date": fact_date[order],
+            "fact_value": column(self.fact_value, np.float64),
+            "fact_unit": column(self.fact_unit, np.uint32),
+            "fact_type": column(self.fact_type, np.uint8),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+        with open(os.path.join(tmp_path, DICTIONARIES_FILENAME), "w", encoding="utf-8") as dictionaries_file:
+            json.dump({
+                "code_displays": [self.code_displays[self.codes[code_key]] for code_key in code_keys],
+                "resource_types": list(self.resource_types),
+                "units": list(self.units),
+            }, dictionaries_file)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+
+class AnalyticsSnapshot:
+    """Read-only, memory-mapped view of a snapshot written by `AnalyticsStoreWriter`."""
+
+    def __init__(self, path: str):
+        """Memory-map the snapshot at `path`."""
+        self.path = path
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.code_keys = load("code_keys")
+        self.code_values = load("code_values")
+        self.code_offsets = load("code_offsets")
+        self.patient_ids = load("patient_ids")
+        self.patient_gender = load("patient_gender")
+        self.patient_birth = load("patient_birth")
+        self.patient_deceased = load("patient_deceased")
+        self.patient_rows = load("patient_rows")
+        self.patient_offsets = load("patient_offsets")
+        self.fact_patient = load("fact_patient")
+        self.fact_date = load("fact_date")
+        self.fact_value = load("fact_value")
+        self.fact_unit = load("fact_unit")
+        self.fact_type = load("fact_type")
+        with open(os.path.join(path, DICTIONARIES_FILENAME), encoding="utf-8") as dictionaries_file:
+            dictionaries = json.load(dictionaries_file)
+        self.code_displays: List[str] = dictionaries["code_displays"]
+        self.resource_types: List[str] = dictionaries["resource_types"]
+        self.units: List[str] = dictionaries["units"]
+
+    def __len__(self) -> int:
+        return len(self.fact_patient)
+
+    def code_ids(self, codes: Sequence[str]) -> np.ndarray:
+        """Return the IDs of `system|code` tokens, or of every system's code for a bare `code`."""
+        ids = []
+        for token in codes:
+            if "|" in token:
+                key = token.encode("utf-8")
+                index = int(np.searchsorted(self.code_keys, key))
+                if index < len(self.code_keys) and self.code_keys[index] == key:
+                    ids.append(index)
+            else:
+                ids.extend(np.flatnonzero(self.code_values == token.encode("utf-8")).tolist())
+        return np.unique(np.array(ids, dtype=np.int64))
+
+    def patient_indexes(self, patient_ids: Sequence[str]) -> np.ndarray:
+        keys = np.array([patient_id.encode("utf-8") for patient_id in patient_ids], dtype=ID_DTYPE)
+        indexes = np.searchsorted(self.patient_ids, keys)
+        found = indexes < len(self.patient_ids)
+        found[found] = self.patient_ids[indexes[found]] == keys[found]
+        return np.unique(indexes[found])
+
+    def code_summary(self, code_id: int, fact_count: Optional[int] = None) -> CodeSummary:
+        if fact_count is None:
+            fact_count = int(self.code_offsets[code_id + 1] - self.code_offsets[code_id])
+        return CodeSummary(code=self.code_keys[code_id].decode("utf-8"), display=self.code_displays[code_id],
+                           fact_count=fact_count)
+
+
+def _day(value: np.datetime64) -> Optional[date]:
+    return None if np.isnat(value) else value.astype(object)
+
+
+def _float(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+class AnalyticsStore:
+    """
+    Local analytics store: a manifest pointing at the current memory-mapped snapshot.
+    Each ingest writes a new snapshot and swaps the manifest; readers re-open when `is_stale`.
+    """
+
+    def __init__(self, path: str):
+        """Initialize AnalyticsStore configuration."""
+        self.path = path
+        self.snapshot: Optional[AnalyticsSnapshot] = None
+        self.manifest: dict = {}
+        self.manifest_mtime: Optional[float] = None
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.path, MANIFEST_FILENAME)
+
+    @property
+    def fact_count(self) -> int:
+        return len(self.snapshot) if self.snapshot is not None else 0
+
+    @property
+    def patient_count(self) -> int:
+        return len(self.snapshot.patient_ids) if self.snapshot is not None else 0
+
+    def open(self):
+        """Memory-map the current snapshot, if the store has one."""
+        self.close()
+        if os.path.exists(self.manifest_path):
+            self.manifest_mtime = os.path.getmtime(self.manifest_path)
+            with open(self.manifest_path, encoding="utf-8") as manifest_file:
+                self.manifest = json.load(manifest_file)
+            self.snapshot = AnalyticsSnapshot(os.path.join(self.path, self.manifest["snapshot"]))
+
+    def is_stale(self) -> bool:
+        """Return True when another process has replaced the snapshot since the store was opened."""
+        mtime = os.path.getmtime(self.manifest_path) if os.path.exists(self.manifest_path) else None
+        return mtime != self.manifest_mtime
+
+    def close(self):
+        self.snapshot = None
+
+    def replace(self, writer: AnalyticsStoreWriter, sources: Sequence[str]):
+        """Write `writer` as the new snapshot, built from `sources`, and delete the previous one."""
+        os.makedirs(self.path, exist_ok=True)
+        previous = self.manifest.get("snapshot") if os.path.exists(self.manifest_path) else None
+        name = f"snapshot-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+        writer.write(os.path.join(self.path, name))
+        manifest = {"snapshot": name, "sources": list(sources), "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "patients": len(writer.patients), "facts": len(writer)}
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        self.open()
+        if previous and previous != name:
+            # Workers still mapping the previous snapshot keep reading it until they re-open.
+            shutil.rmtree(os.path.join(self.path, previous), ignore_errors=True)
+
+    def find_codes(self, text: str, limit: int = 20) -> List[CodeSummary]:
+        """Return the codes whose display or code contains `text` (case-insensitive), most frequent first."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return []
+        text = text.lower()
+        matches = [code_id for code_id, display in enumerate(snapshot.code_displays)
+                   if text in display.lower() or text in snapshot.code_keys[code_id].decode("utf-8").lower()]
+        summaries = [snapshot.code_summary(code_id) for code_id in matches]
+        summaries.sort(key=lambda summary: summary.fact_count, reverse=True)
+        return summaries[:limit]
+
+    def query(self, cohort_query: CohortQuery) -> CohortResult:
+        """Return the patients with facts matching `cohort_query`, with per-patient aggregates."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return CohortResult()
+
+        start = np.datetime64(cohort_query.start, "D") if cohort_query.start else None
+        end = np.datetime64(cohort_query.end, "D") if cohort_query.end else None
+        patients = snapshot.patient_indexes(cohort_query.patient_ids) if cohort_query.patient_ids is not None \
+            else None
+
+        # Candidate rows from the code index (with the date range by binary search), the patient index or a scan.
+        dated_by_index = False
+        if cohort_query.codes:
+            slices = []
+            for code_id in snapshot.code_ids(cohort_query.codes):
+                low, high = int(snapshot.code_offsets[code_id]), int(snapshot.code_offsets[code_id + 1])
+                dates = snapshot.fact_date[low:high]
+                first = low + int(np.searchsorted(dates, start, side="left")) if start is not None else low
+                last = low + int(np.searchsorted(dates, end, side="right")) if end is not None else high
+                slices.append(np.arange(first, last, dtype=np.int64))
+            rows = np.concatenate(slices) if slices else np.zeros(0, dtype=np.int64)
+            dated_by_index = True
+        elif patients is not None:
+            rows = np.concatenate([snapshot.patient_rows[snapshot.patient_offsets[patient]:
+                                                         snapshot.patient_offsets[patient + 1]]
+                                   for patient in patients] or [np.zeros(0, dtype=np.uint32)]).astype(np.int64)
+        else:
+            rows = np.arange(len(snapshot), dtype=np.int64)
+
+        mask = np.ones(len(rows), dtype=bool)
+        if not dated_by_index and (start is not None or end is not None):
+            dates = snapshot.fact_date[rows]
+            if start is not None:
+                mask &= dates >= start
+            if end is not None:
+                mask &= dates <= end
+        if patients is not None and cohort_query.codes:
+            mask &= np.isin(snapshot.fact_patient[rows], patients)
+        if cohort_query.resource_type:
+            if cohort_query.resource_type not in snapshot.resource_types:
+                return CohortResult()
+            mask &= snapshot.fact_type[rows] == snapshot.resource_types.index(cohort_query.resource_type)
+        values = snapshot.fact_value[rows]
+        for bound, compare in ((cohort_query.value_gt, np.greater), (cohort_query.value_ge, np.greater_equal),
+                               (cohort_query.value_lt, np.less), (cohort_query.value_le, np.less_equal)):
+            if bound is not None:
+                mask &= compare(values, bound)
+        if cohort_query.gender:
+            if cohort_query.gender not in GENDERS:
+                return CohortResult()
+            mask &= snapshot.patient_gender[snapshot.fact_patient[rows]] == GENDERS.index(cohort_query.gender)
+        rows = rows[mask]
+        if not len(rows):
+            return CohortResult()
+
+        # Aggregate per patient over rows sorted by patient, then date; undated rows (NaT) sort after dated ones.
+        fact_patient = snapshot.fact_patient[rows]
+        fact_date = snapshot.fact_date[rows]
+        order = np.lexsort((fact_date, fact_patient))
+        rows, fact_patient, fact_date = rows[order], fact_patient[order], fact_date[order]
+        values = snapshot.fact_value[rows]
+        patient_indexes, starts, counts = np.unique(fact_patient, return_index=True, return_counts=True)
+        # The latest fact is the last dated one; an undated fact only when the patient has no dated facts.
+        dated_counts = np.add.reduceat((~np.isnat(fact_date)).astype(np.int64), starts)
+        lasts = starts + np.where(dated_counts > 0, dated_counts, counts) - 1
+        min_values = np.fmin.reduceat(values, starts)
+        max_values = np.fmax.reduceat(values, starts)
+
+        # Most recent fact first; patients whose latest fact has no date sort last.
+        last_dates = fact_date[lasts]
+        undated = np.isnat(last_dates)
+        ranking = np.lexsort((patient_indexes, np.where(undated, 0, -last_dates.astype(np.int64)), undated))
+        cohort_patients = [
+            CohortPatient(
+                patient_id=snapshot.patient_ids[patient_indexes[index]].decode("utf-8"),
+                fact_count=int(counts[index]),
+                first_date=_day(fact_date[starts[index]]),
+                last_date=_day(last_dates[index]),
+                last_value=_float(values[lasts[index]]),
+                min_value=_float(min_values[index]),
+                max_value=_float(max_values[index]),
+                unit=snapshot.units[snapshot.fact_unit[rows[lasts[index]]]] or None,
+            )
+            for index in ranking[:cohort_query.limit]
+        ]
+
+        code_ids, code_counts = np.unique(np.searchsorted(snapshot.code_offsets, rows, side="right") - 1,
+                                          return_counts=True)
+        codes = [snapshot.code_summary(int(code_id), int(count)) for code_id, count in zip(code_ids, code_counts)]
+        codes.sort(key=lambda summary: summary.fact_count, reverse=True)
+        return CohortResult(patient_count=len(patient_indexes), fact_count=len(rows), patients=cohort_patients,
+                            codes=codes)
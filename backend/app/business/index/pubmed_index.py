@@ -0,0 +1,156 @@
+"""
+Local PubMed abstract index.
+
+Builds and incrementally updates a BM25 index over PubMed baseline and daily update files
+(`pubmedYYnNNNN.xml.gz` from https://ftp.ncbi.nlm.nih.gov/pubmed/). Run from the `app` directory:
+
+    python -m business.index.pubmed_index ingest /data/pubmed/baseline/*.xml.gz
+    python -m business.index.pubmed_index ingest /data/pubmed/updatefiles/*.xml.gz
+    python -m business.index.pubmed_index compact
+
+Files already listed in the index manifest are skipped, so the ingest command can be re-run daily over the whole
+update directory.
+"""
+import argparse
+import gzip
+import os
+import time
+import xml.etree.ElementTree as ElementTree
+from typing import IO, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from business.index.bm25_index import BM25Index, SegmentWriter
+
+
+def _element_text(element: Optional[ElementTree.Element]) -> str:
+    """Return the text of an element including inline markup such as <i> or <sup>."""
+    if element is None:
+        return ""
+    return "".join(element.itertext()).strip()
+
+
+def _parse_summary(abstract: Optional[ElementTree.Element]) -> str:
+    if abstract is None:
+        return "No abstract available"
+    summaries = []
+    for abstract_text in abstract.findall("AbstractText"):
+        text = _element_text(abstract_text)
+        if not text:
+            continue
+        label = abstract_text.get("Label")
+        summaries.append(f"{label}: {text}" if label else text)
+    return "\n".join(summaries) if summaries else "No abstract available"
+
+
+def parse_article(uid: str, article: ElementTree.Element) -> dict:
+    """
+    Convert an `Article` or `BookDocument` element into a stored document.
+
+    The stored shape is `{"page_content", "metadata"}` with the same metadata keys as `PubMedRetriever` output.
+    """
+    abstract = article.find("Abstract")
+    article_date = article.find("ArticleDate")
+    published = "-".join(
+        _element_text(article_date.find(part)) if article_date is not None else ""
+        for part in ("Year", "Month", "Day")
+    )
+    return {
+        "page_content": _parse_summary(abstract),
+        "metadata": {
+            "uid": uid,
+            "Title": _element_text(article.find("ArticleTitle")) or _element_text(article.find("BookTitle")),
+            "Published": published,
+            "Copyright Information": _element_text(abstract.find("CopyrightInformation")) if abstract is not None
+            else "",
+        },
+    }
+
+
+def indexed_text(stored: dict) -> str:
+    """Text that is indexed for a stored document: its title followed by its abstract."""
+    return f"{stored['metadata'].get('Title', '')}\n{stored['page_content']}"
+
+
+def to_document(stored: dict) -> Document:
+    return Document(page_content=stored["page_content"], metadata=stored["metadata"])
+
+
+def _open(path: str) -> IO[bytes]:
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def iter_pubmed_file(path: str) -> Iterator[Tuple[str, int, Optional[dict]]]:
+    """
+    Stream a PubMed XML file, yielding `("add", pmid, stored)` for every article and `("delete", pmid, None)` for
+    every PMID in a `DeleteCitation` block. Elements are cleared once parsed to keep memory flat.
+    """
+    with _open(path) as xml_file:
+        for _, element in ElementTree.iterparse(xml_file, events=("end",)):
+            if element.tag == "PubmedArticle":
+                citation = element.find("MedlineCitation")
+                uid = _element_text(citation.find("PMID"))
+                yield "add", int(uid), parse_article(uid, citation.find("Article"))
+                element.clear()
+            elif element.tag == "PubmedBookArticle":
+                book_document = element.find("BookDocument")
+                uid = _element_text(book_document.find("PMID"))
+                yield "add", int(uid), parse_article(uid, book_document)
+                element.clear()
+            elif element.tag == "DeleteCitation":
+                for pmid in element.findall("PMID"):
+                    yield "delete", int(_element_text(pmid)), None
+                element.clear()
+
+
+def ingest_files(index: BM25Index, paths: List[str]) -> int:
+    """Add one segment per file not yet ingested, in the given order. Returns the number of files ingested."""
+    index.open()
+    ingested = set(index.manifest["ingested_files"])
+    count = 0
+    for path in paths:
+        source = os.path.basename(path)
+        if source in ingested:
+            print(f"Skipping {source}: already ingested")
+            continue
+
+        start = time.perf_counter()
+        writer = SegmentWriter()
+        for action, pmid, stored in iter_pubmed_file(path):
+            if action == "add":
+                writer.add(pmid, indexed_text(stored), stored)
+            else:
+                writer.delete(pmid)
+        index.add_segment(writer, source)
+        ingested.add(source)
+        count += 1
+        print(f"Ingested {source}: {len(writer)} articles, {len(writer.deletions)} deletions "
+              f"in {time.perf_counter() - start:.1f}s ({index.document_count} live documents)")
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-path", help="Index directory (default: RETRIEVER_LOCAL_INDEX_PATH).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = commands.add_parser("ingest", help="Ingest baseline or update files not yet in the index.")
+    ingest_parser.add_argument("paths", nargs="+", help="PubMed XML files (.xml or .xml.gz), applied in order.")
+    commands.add_parser("compact", help="Merge all segments into one, dropping superseded and deleted articles.")
+    args = parser.parse_args()
+
+    index_path = args.index_path
+    if index_path is None:
+        from config.settings import get_settings
+        index_path = get_settings().RETRIEVER_LOCAL_INDEX_PATH
+
+    index = BM25Index(index_path)
+    if args.command == "ingest":
+        ingest_files(index, sorted(args.paths, key=os.path.basename))
+    elif args.command == "compact":
+        index.compact(indexed_text)
+        print(f"Compacted index: {index.document_count} live documents")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
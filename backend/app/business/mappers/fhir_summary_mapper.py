@@ -0,0 +1,266 @@
+"""
+Deterministic, token-efficient text summaries of FHIR resources.
+
+Each supported resource type is reduced to one line with the fields a clinician asks about (codes, statuses,
+dates, values, clinicians); narrative text, meta, identifiers and extensions are dropped. Unsupported resource types
+fall back to a generic line with their code, status and date.
+"""
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+CODE_SYSTEMS = {
+    "http://snomed.info/sct": "SNOMED",
+    "http://loinc.org": "LOINC",
+    "http://www.nlm.nih.gov/research/umls/rxnorm": "RxNorm",
+    "http://hl7.org/fhir/sid/cvx": "CVX",
+    "http://hl7.org/fhir/sid/icd-10": "ICD-10",
+    "http://hl7.org/fhir/sid/icd-10-cm": "ICD-10-CM",
+}
+
+
+def _date(value: Optional[str]) -> str:
+    """Keep only the calendar date of a FHIR date/dateTime."""
+    return value[:10] if value else ""
+
+
+def _period(period: Optional[dict]) -> str:
+    if not period:
+        return ""
+    start, end = _date(period.get("start")), _date(period.get("end"))
+    return f"{start} to {end}" if end and end != start else start
+
+
+def _codeable_concept(concept: Optional[dict], with_code: bool = True) -> str:
+    """Render a CodeableConcept as its display text, followed by the first coding's system and code."""
+    if not concept:
+        return ""
+    codings = concept.get("coding") or []
+    coding = codings[0] if codings else {}
+    text = concept.get("text") or coding.get("display") or coding.get("code") or ""
+    if with_code and coding.get("code") and coding.get("code") != text:
+        system = CODE_SYSTEMS.get(coding.get("system"), "")
+        return f"{text} ({f'{system} ' if system else ''}{coding['code']})"
+    return text
+
+
+def _status(concept: Optional[dict]) -> str:
+    """Render a status CodeableConcept (e.g. clinicalStatus) as its code."""
+    return _codeable_concept(concept, with_code=False)
+
+
+def _concepts(concepts: Optional[Iterable[dict]], with_code: bool = False) -> str:
+    return ", ".join(filter(None, (_codeable_concept(concept, with_code) for concept in concepts or [])))
+
+
+def _references(references: Optional[Iterable[dict]]) -> str:
+    return ", ".join(filter(None, ((reference or {}).get("display", "") for reference in references or [])))
+
+
+def _quantity(quantity: Optional[dict]) -> str:
+    """Render a Quantity with its comparator and unit; the value is kept exactly as recorded, never rounded."""
+    if not quantity or quantity.get("value") is None:
+        return ""
+    unit = quantity.get("unit") or quantity.get("code") or ""
+    return f"{quantity.get('comparator', '')}{quantity['value']} {unit}".strip()
+
+
+def _value(resource: dict) -> str:
+    """Render the value[x] of an Observation or Observation.component."""
+    if "valueQuantity" in resource:
+        return _quantity(resource["valueQuantity"])
+    if "valueCodeableConcept" in resource:
+        return _codeable_concept(resource["valueCodeableConcept"], with_code=False)
+    for key in ("valueString", "valueBoolean", "valueInteger", "valueDateTime"):
+        if key in resource:
+            return str(resource[key])
+    return ""
+
+
+def _join(*fields: str) -> str:
+    return " | ".join(field for field in fields if field)
+
+
+def _labelled(label: str, value: Any) -> str:
+    return f"{label} {value}" if value not in (None, "", []) else ""
+
+
+def _human_name(names: Optional[List[dict]], with_prefix: bool = True) -> str:
+    name = (names or [{}])[0]
+    prefix = name.get("prefix", []) if with_prefix else []
+    return " ".join(prefix + name.get("given", []) + [name.get("family", "")]).strip()
+
+
+def summarize_patient(resource: dict) -> str:
+    name = _human_name(resource.get("name"), with_prefix=False)
+    addresses = resource.get("address") or [{}]
+    location = ", ".join(filter(None, (addresses[0].get("city"), addresses[0].get("state"))))
+    deceased = resource.get("deceasedDateTime") or resource.get("deceasedBoolean")
+    return _join(
+        name,
+        resource.get("gender", ""),
+        _labelled("born", _date(resource.get("birthDate"))),
+        _labelled("deceased", _date(deceased) if isinstance(deceased, str) else deceased or ""),
+        _status(resource.get("maritalStatus")),
+        location,
+    )
+
+
+def summarize_encounter(resource: dict) -> str:
+    encounter_class = (resource.get("class") or {}).get("code", "")
+    return _join(
+        _concepts(resource.get("type")) or encounter_class,
+        encounter_class if resource.get("type") else "",
+        resource.get("status", ""),
+        _period(resource.get("period")),
+        _labelled("reason", _concepts(resource.get("reasonCode"), with_code=True)),
+        _labelled("with", _references(participant.get("individual") for participant in resource.get("participant", []))),
+        _labelled("at", _references(location.get("location") for location in resource.get("location", []))
+                  or (resource.get("serviceProvider") or {}).get("display", "")),
+    )
+
+
+def summarize_condition(resource: dict) -> str:
+    return _join(
+        _codeable_concept(resource.get("code")),
+        _status(resource.get("clinicalStatus")),
+        _status(resource.get("verificationStatus")),
+        _labelled("onset", _date(resource.get("onsetDateTime")) or _period(resource.get("onsetPeriod"))),
+        _labelled("abated", _date(resource.get("abatementDateTime"))),
+        _labelled("recorded", _date(resource.get("recordedDate"))),
+    )
+
+
+def summarize_observation(resource: dict) -> str:
+    value = _value(resource)
+    components = [
+        f"{_codeable_concept(component.get('code'), with_code=False)} {_value(component)}"
+        for component in resource.get("component", [])
+    ]
+    return _join(
+        _codeable_concept(resource.get("code")),
+        value or "; ".join(components),
+        _labelled("interpretation", _concepts(resource.get("interpretation"))),
+        _date(resource.get("effectiveDateTime")) or _period(resource.get("effectivePeriod")),
+        resource.get("status", "") if resource.get("status") != "final" else "",
+    )
+
+
+def summarize_medication_request(resource: dict) -> str:
+    medication = _codeable_concept(resource.get("medicationCodeableConcept")) or \
+        (resource.get("medicationReference") or {}).get("display", "")
+    dosage = "; ".join(filter(None, (instruction.get("text") for instruction in resource.get("dosageInstruction", []))))
+    return _join(
+        medication,
+        resource.get("status", ""),
+        resource.get("intent", "") if resource.get("intent") != "order" else "",
+        _labelled("authored", _date(resource.get("authoredOn"))),
+        _labelled("by", (resource.get("requester") or {}).get("display", "")),
+        _labelled("dosage", dosage),
+        _labelled("reason", _concepts(resource.get("reasonCode"), with_code=True)
+                  or _references(resource.get("reasonReference"))),
+    )
+
+
+def summarize_procedure(resource: dict) -> str:
+    return _join(
+        _codeable_concept(resource.get("code")),
+        resource.get("status", "") if resource.get("status") != "completed" else "",
+        _date(resource.get("performedDateTime")) or _period(resource.get("performedPeriod")),
+        _labelled("reason", _concepts(resource.get("reasonCode"), with_code=True)
+                  or _references(resource.get("reasonReference"))),
+        _labelled("at", (resource.get("location") or {}).get("display", "")),
+    )
+
+
+def summarize_allergy_intolerance(resource: dict) -> str:
+    reactions = "; ".join(filter(None, (
+        _join(_concepts(reaction.get("manifestation")), reaction.get("severity", ""))
+        for reaction in resource.get("reaction", [])
+    )))
+    return _join(
+        _codeable_concept(resource.get("code")),
+        _status(resource.get("clinicalStatus")),
+        _status(resource.get("verificationStatus")),
+        resource.get("type", ""),
+        ", ".join(resource.get("category", [])),
+        _labelled("criticality", resource.get("criticality", "")),
+        _labelled("reaction", reactions),
+        _labelled("recorded", _date(resource.get("recordedDate"))),
+    )
+
+
+def summarize_immunization(resource: dict) -> str:
+    return _join(
+        _codeable_concept(resource.get("vaccineCode")),
+        resource.get("status", "") if resource.get("status") != "completed" else "",
+        _date(resource.get("occurrenceDateTime")) or resource.get("occurrenceString", ""),
+    )
+
+
+def summarize_generic(resource: dict) -> str:
+    """Fallback for resource types without a dedicated summarizer."""
+    concept = resource.get("code") or next(iter(resource.get("type") or []), None)
+    date = next((resource[key] for key in ("effectiveDateTime", "date", "created", "authoredOn", "issued",
+                                             "occurrenceDateTime", "recordedDate") if resource.get(key)), "")
+    period = resource.get("period") or resource.get("billablePeriod") or resource.get("effectivePeriod")
+    name = resource.get("name")
+    return _join(
+        name if isinstance(name, str) else _human_name(name) if isinstance(name, list) else "",
+        _codeable_concept(concept) if isinstance(concept, dict) else "",
+        (resource.get("description") or {}).get("text", "") if isinstance(resource.get("description"), dict)
+        else "",
+        resource.get("status", "") if isinstance(resource.get("status"), str) else "",
+        _date(date) or _period(period),
+    )
+
+
+SUMMARIZERS: Dict[str, Callable[[dict], str]] = {
+    "Patient": summarize_patient,
+    "Encounter": summarize_encounter,
+    "Condition": summarize_condition,
+    "Observation": summarize_observation,
+    "MedicationRequest": summarize_medication_request,
+    "Procedure": summarize_procedure,
+    "AllergyIntolerance": summarize_allergy_intolerance,
+    "Immunization": summarize_immunization,
+}
+
+
+def summarize_fhir_resource(resource: dict) -> str:
+    return SUMMARIZERS.get(resource.get("resourceType"), summarize_generic)(resource)
+
+
+def summarize_fhir_resources(resources: List[dict]) -> str:
+    """
+    Summarize resources grouped by resource type, in their original order within each group.
+    """
+    if not resources:
+        return "No FHIR resources were found for this query."
+
+    groups: Dict[str, List[str]] = {}
+    for resource in resources:
+        groups.setdefault(resource.get("resourceType", "Unknown"), []).append(summarize_fhir_resource(resource))
+
+    return "\n".join(
+        f"{resource_type} ({len(lines)}):\n" + "\n".join(f"- {line}" for line in lines)
+        for resource_type, lines in groups.items()
+    )
+
+
+def as_fhir_resources(data: Any) -> Optional[List[dict]]:
+    """
+    Return retriever output as a list of FHIR resource dicts, unwrapping Bundles and decoding JSON text.
+    Returns None when the output is not FHIR data (e.g. a free-text answer from the retriever agent).
+    """
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return None
+    if isinstance(data, dict):
+        if data.get("resourceType") == "Bundle":
+            return [entry["resource"] for entry in data.get("entry", []) if "resource" in entry]
+        data = [data] if "resourceType" in data else None
+    if isinstance(data, list) and all(isinstance(item, dict) and "resourceType" in item for item in data):
+        return list(data)
+    return None
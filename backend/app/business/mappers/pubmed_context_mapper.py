@@ -0,0 +1,120 @@
+"""
+Packing of retrieved PubMed articles into the evidence context of the medical QA prompt.
+
+Abstracts are split into sentences, each sentence is scored with BM25 against the doctor's query (the sentences of
+all retrieved articles being the corpus), near-duplicate sentences are dropped and the best ones are packed into a
+token budget. Every article that contributes a sentence keeps its `PubMed ID | Title | Published` citation header;
+its selected sentences are rendered in their original order, with `...` marking skipped text.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, FrozenSet, List, NamedTuple, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from business.index.bm25_index import tokenize
+from business.index.bm25_reranker import bm25_scores, query_terms
+
+CHARS_PER_TOKEN = 4
+NO_ARTICLES_CONTEXT = "No relevant articles found."
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[])|\n+")
+GAP = "..."
+
+
+class Sentence(NamedTuple):
+    article: int
+    position: int
+    text: str
+    terms: FrozenSet[str]
+    score: float
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of `text` for budgeting, ~4 characters per token."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def citation_header(document: Document) -> str:
+    metadata = document.metadata
+    return (f"PubMed ID: {metadata.get('uid', 'Unknown')} | Title: {metadata.get('Title', 'Unknown')} | "
+            f"Published: {metadata.get('Published', 'Unknown')}")
+
+
+def format_context(documents: Sequence[Document]) -> str:
+    """Every article in full, as the prompt context was built before packing."""
+    if not documents:
+        return NO_ARTICLES_CONTEXT
+    return "\n\n".join(f"{citation_header(document)} | Content: {document.page_content}" for document in documents)
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence and sentence.strip()]
+
+
+def _score_sentences(query: str, documents: Sequence[Document]) -> List[Sentence]:
+    """Split every abstract into sentences and score them with the reranker's BM25 against `query`."""
+    split = [(article, position, text, tokenize(text))
+             for article, document in enumerate(documents)
+             for position, text in enumerate(split_sentences(document.page_content))]
+    if not split:
+        return []
+    terms = query_terms(query)
+    counts = [Counter(sentence_terms) for *_, sentence_terms in split]
+    frequencies = np.array([[count[term] for term in terms] for count in counts],
+                           dtype=np.float64).reshape(len(split), len(terms))
+    lengths = np.array([len(sentence_terms) for *_, sentence_terms in split], dtype=np.float64)
+    scores = bm25_scores(frequencies, lengths)
+    return [Sentence(article, position, text, frozenset(sentence_terms), float(score))
+            for (article, position, text, sentence_terms), score in zip(split, scores)]
+
+
+def _is_near_duplicate(terms: FrozenSet[str], selected: List[FrozenSet[str]], threshold: float) -> bool:
+    """Jaccard similarity of the sentence's terms to any selected sentence of at least `threshold`."""
+    return any(len(terms & other) / len(terms | other) >= threshold for other in selected if terms | other)
+
+
+def pack_context(query: str, documents: Sequence[Document], max_tokens: int,
+                 duplicate_threshold: float = 0.8) -> str:
+    """
+    Pack the sentences of `documents` most relevant to `query` into about `max_tokens` tokens.
+    Sentences are taken by descending score (ties by retrieval rank, then position); a sentence is skipped if it
+    does not fit the remaining budget, counting the citation header of an article not yet in the context, or if it
+    nearly duplicates a sentence already taken.
+    """
+    if not documents:
+        return NO_ARTICLES_CONTEXT
+
+    headers = [f"{citation_header(document)} | Content: " for document in documents]
+    # The blank line between articles is charged with the header.
+    header_tokens = [estimate_tokens(header) + 1 for header in headers]
+    remaining = max_tokens
+    selected: Dict[int, List[Sentence]] = {}
+    selected_terms: List[FrozenSet[str]] = []
+    for sentence in sorted(_score_sentences(query, documents),
+                           key=lambda sentence: (-sentence.score, sentence.article, sentence.position)):
+        cost = estimate_tokens(sentence.text) + 1
+        if sentence.article not in selected:
+            cost += header_tokens[sentence.article]
+        if cost > remaining or _is_near_duplicate(sentence.terms, selected_terms, duplicate_threshold):
+            continue
+        selected.setdefault(sentence.article, []).append(sentence)
+        selected_terms.append(sentence.terms)
+        remaining -= cost
+
+    if not selected:
+        return NO_ARTICLES_CONTEXT
+    return "\n\n".join(headers[article] + _join_sentences(selected[article]) for article in sorted(selected))
+
+
+def _join_sentences(sentences: List[Sentence]) -> str:
+    """Join an article's selected sentences in their original order, marking skipped sentences with `...`."""
+    parts = []
+    previous = -1
+    for sentence in sorted(sentences, key=lambda sentence: sentence.position):
+        if sentence.position != previous + 1:
+            parts.append(GAP)
+        parts.append(sentence.text)
+        previous = sentence.position
+    return " ".join(parts)
@@ -0,0 +1,45 @@
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class CohortQuery(BaseModel):
+    codes: List[str] = Field(default_factory=list,
+                             description="Codes as `system|code`, or a bare `code` in any system (e.g. LOINC "
+                                         "'4548-4'). Empty matches every code.")
+    resource_type: Optional[str] = Field(None, description="Only facts from this resource type (e.g. 'Observation').")
+    start: Optional[date] = Field(None, description="Only facts dated on or after this day.")
+    end: Optional[date] = Field(None, description="Only facts dated on or before this day.")
+    value_gt: Optional[float] = Field(None, description="Only facts with a numeric value above this.")
+    value_ge: Optional[float] = Field(None, description="Only facts with a numeric value of at least this.")
+    value_lt: Optional[float] = Field(None, description="Only facts with a numeric value below this.")
+    value_le: Optional[float] = Field(None, description="Only facts with a numeric value of at most this.")
+    gender: Optional[str] = Field(None, description="Only patients of this administrative gender.")
+    patient_ids: Optional[List[str]] = Field(None, description="Only these patients (e.g. a doctor's panel).")
+    limit: int = Field(100, ge=0, description="Maximum number of patients returned; counts cover every match.")
+
+
+class CodeSummary(BaseModel):
+    code: str = Field(..., description="The code as `system|code`.")
+    display: str = Field("", description="Display text of the code.")
+    fact_count: int = Field(0, description="Number of facts with this code.")
+
+
+class CohortPatient(BaseModel):
+    patient_id: str = Field(...)
+    fact_count: int = Field(..., description="Number of matching facts of the patient.")
+    first_date: Optional[date] = Field(None)
+    last_date: Optional[date] = Field(None)
+    last_value: Optional[float] = Field(None, description="Value of the latest matching fact, if numeric.")
+    min_value: Optional[float] = Field(None)
+    max_value: Optional[float] = Field(None)
+    unit: Optional[str] = Field(None, description="Unit of the latest matching fact.")
+
+
+class CohortResult(BaseModel):
+    patient_count: int = Field(0, description="Number of matching patients.")
+    fact_count: int = Field(0, description="Number of matching facts.")
+    patients: List[CohortPatient] = Field(default_factory=list,
+                                          description="Matching patients, most recent fact first, up to `limit`.")
+    codes: List[CodeSummary] = Field(default_factory=list, description="Codes of the matching facts.")
@@ -0,0 +1,8 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class FHIRSearchPage(BaseModel):
+    resources: List[dict] = Field(default_factory=list, description="The resources of one FHIR searchset page.")
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor of the next page, or None on the last page.")
@@ -0,0 +1,12 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class FHIRSearchQuery(BaseModel):
+    resource_type: str = Field(..., description="The FHIR resource type to search (e.g., 'Condition').")
+    params: Dict[str, List[str]] = Field(default_factory=dict,
+                                         description="Search parameters keyed by FHIR name, including modifiers.")
+    sort: Optional[str] = Field(None, description="FHIR `_sort` criteria (e.g., '-onset-date').")
+    count: Optional[int] = Field(None, description="Maximum number of resources to return, from the query's `_count`; "
+                                                   "pages are requested with `_count` up to `FHIR_SEARCH_PAGE_SIZE`.")
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 
 from pydantic import BaseModel, Field
 
@@ -10,3 +11,4 @@ class AssistantResponse(BaseModel):
     role: Role = Field(...)
     content: str = Field(...)
     created_at: datetime = Field(...)
+    request_id: Optional[str] = Field(default=None)
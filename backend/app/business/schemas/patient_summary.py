@@ -0,0 +1,16 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class PatientSummaryError(BaseModel):
+    status_code: int = Field(..., description="HTTP status code the section's own endpoint would have returned.")
+    detail: str = Field(..., description="Error detail of the failed section.")
+
+
+class PatientSummary(BaseModel):
+    patient: dict = Field(..., description="The Patient resource.")
+    latest_conditions: Optional[List[dict]] = Field(None, description="Latest conditions, or None if they failed.")
+    recent_encounters: Optional[List[dict]] = Field(None, description="Recent encounters, or None if they failed.")
+    errors: Dict[str, PatientSummaryError] = Field(default_factory=dict,
+                                                   description="Failed sections keyed by field name.")
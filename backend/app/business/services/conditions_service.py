@@ -1,9 +1,16 @@
+from typing import Dict, List
+
 from fastapi import HTTPException, status
 from fhirpy import AsyncFHIRClient
 from fhirpy.base.exceptions import BaseFHIRError, MultipleResourcesFound
-from fhirpy.lib import AsyncFHIRSearchSet
 from loguru import logger
 
+from business.schemas.fhir_search_query import FHIRSearchQuery
+from business.tools.fhir_batch import execute_batch
+from business.tools.fhir_search_iterator import FHIRSearchIterator
+
+LATEST_CONDITIONS_SORT = "-onset-date,-abatement-date,-recorded-date"
+
 
 class ConditionsService:
     """Service to manage FHIR Condition resources."""
@@ -13,17 +20,15 @@ class ConditionsService:
         Initialize ConditionsService with a FHIR client.
         """
         self.fhir_server: AsyncFHIRClient = fhir_server
-        self.conditions: AsyncFHIRSearchSet = self.fhir_server.resources('Condition')
 
     async def get_latest_conditions(self, patient_id: str, count: int = 1):
         """
         Retrieve the latest conditions for a patient.
         """
         try:
-            latest_conditions = (
-                await self.conditions.search(patient=patient_id).limit(count).sort(
-                    "-onset-date,-abatement-date,-recorded-date").fetch()
-            )
+            latest_conditions = await FHIRSearchIterator(self.fhir_server, 'Condition',
+                                                         {"patient": patient_id, "_sort": LATEST_CONDITIONS_SORT},
+                                                         limit=count).collect_shared()
             logger.debug(f"Number of conditions: {len(latest_conditions)}")
             return latest_conditions
         except MultipleResourcesFound as e:
@@ -44,3 +49,22 @@ class ConditionsService:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error fetching latest conditions for patient {patient_id}: {str(e)}"
             )
+
+    async def get_latest_conditions_for_patients(self, patient_ids: List[str], count: int = 1) -> Dict[str, List[dict]]:
+        """
+        Retrieve the latest conditions for several patients with a single FHIR batch request.
+        """
+        try:
+            results = await execute_batch(self.fhir_server, [
+                FHIRSearchQuery(resource_type="Condition", params={"patient": [patient_id]},
+                                sort=LATEST_CONDITIONS_SORT, count=count)
+                for patient_id in patient_ids
+            ])
+            logger.debug(f"Number of conditions: {[len(conditions) for conditions in results]}")
+            return dict(zip(patient_ids, results))
+        except BaseFHIRError as e:
+            logger.error(f"BaseFHIRError: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"BaseFHIRError: {str(e)}"
+            )
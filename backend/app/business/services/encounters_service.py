@@ -1,9 +1,14 @@
+from typing import Dict, List
+
 from fastapi import HTTPException, status
 from fhirpy import AsyncFHIRClient
 from fhirpy.base.exceptions import BaseFHIRError, MultipleResourcesFound
-from fhirpy.lib import AsyncFHIRSearchSet
 from loguru import logger
 
+from business.schemas.fhir_search_query import FHIRSearchQuery
+from business.tools.fhir_batch import execute_batch
+from business.tools.fhir_search_iterator import FHIRSearchIterator
+
 
 class EncountersService:
     """Service to manage FHIR Encounter resources."""
@@ -13,15 +18,15 @@ class EncountersService:
         Initialize EncountersService with a FHIR client.
         """
         self.fhir_server: AsyncFHIRClient = fhir_server
-        self.encounters: AsyncFHIRSearchSet = self.fhir_server.resources('Encounter')
 
     async def get_recent_encounters(self, patient_id: str, count: int = 3):
         """
         Retrieve recent encounters for a patient.
         """
         try:
-            recent_encounters = await self.encounters.search(patient=patient_id).limit(count).sort(
-                "-_lastUpdated").fetch()
+            recent_encounters = await FHIRSearchIterator(self.fhir_server, 'Encounter',
+                                                         {"patient": patient_id, "_sort": "-_lastUpdated"},
+                                                         limit=count).collect_shared()
             logger.debug(f"Number of encounters: {len(recent_encounters)}")
             return recent_encounters
         except MultipleResourcesFound as e:
@@ -32,3 +37,21 @@ class EncountersService:
             logger.error(f"BaseFHIRError:{str(e)}")
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail=f"Error retrieving patients: {str(e)}")
+
+    async def get_recent_encounters_for_patients(self, patient_ids: List[str],
+                                                 count: int = 3) -> Dict[str, List[dict]]:
+        """
+        Retrieve recent encounters for several patients with a single FHIR batch request.
+        """
+        try:
+            results = await execute_batch(self.fhir_server, [
+                FHIRSearchQuery(resource_type="Encounter", params={"patient": [patient_id]}, sort="-_lastUpdated",
+                                count=count)
+                for patient_id in patient_ids
+            ])
+            logger.debug(f"Number of encounters: {[len(encounters) for encounters in results]}")
+            return dict(zip(patient_ids, results))
+        except BaseFHIRError as e:
+            logger.error(f"BaseFHIRError:{str(e)}")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                detail=f"Error retrieving encounters: {str(e)}")
@@ -1,7 +1,7 @@
+import time
 from datetime import datetime
-from typing import AsyncIterable
+from typing import Any, AsyncIterable, AsyncIterator, Dict, NamedTuple, Tuple
 
-from langchain_community.tools import PubmedQueryRun
 from langchain_core.documents import Document
 from langchain_core.exceptions import LangChainException
 from langchain_core.output_parsers import StrOutputParser
@@ -12,12 +12,44 @@ from business.agents.fhir_retriever_agent import FHIRRetrieverAgent
 from business.agents.fhir_translator_agent import FHIRTranslatorAgent
 from business.clients.llm_client import LLMClient
 from business.clients.pubmed_retriever_client import PubmedRetrieverClient
+from business.mappers.pubmed_context_mapper import format_context, pack_context
 from business.schemas.fhir_translator_agent import FHIRTranslatorAgentOutput
 from business.schemas.medical_qa_assistant import AssistantResponse
+from business.telemetry.metrics import stage_duration
+from business.telemetry.tracing import span
 from business.templates.v2.medical_qa_template import get_medical_qa_template
+from config.logger import payload, stream_log_sampler
+from config.settings import get_settings
 from data.models.enums.role import Role
 from presentation.schemas.medical_qa_assistant import DoctorQuery
 
+settings = get_settings()
+
+TRANSLATOR_STAGE = "translator"
+RETRIEVER_STAGE = "retriever"
+FORMATTER_STAGE = "formatter"
+GENERATION_STAGE = "generation"
+
+GENERAL_PIPELINE = "general"
+PATIENT_PIPELINE = "patient"
+
+
+class StreamEvent(NamedTuple):
+    """A named event of a streamed answer (e.g. a completed stage), yielded between its text chunks."""
+    event: str
+    data: dict
+
+
+def stage_event(stage: str, started_at: float) -> StreamEvent:
+    """The event of a completed pipeline stage."""
+    elapsed_ms = round((time.perf_counter() - started_at) * 1000)
+    return StreamEvent("stage", {"stage": stage, "status": "completed", "elapsed_ms": elapsed_ms})
+
+
+def stage_span(pipeline: str, stage: str, current: bool = True):
+    """Time a pipeline stage into `stage_duration` and trace it as `<pipeline>_qa.<stage>`."""
+    return span(f"{pipeline}_qa.{stage}", stage_duration, {"pipeline": pipeline, "stage": stage}, current=current)
+
 
 class OrchestratorService:
     """
@@ -33,7 +65,6 @@ class OrchestratorService:
                  ):
         """Initialize with injected service dependencies."""
         self.llm_client = llm_client
-        llm_client.bind_tools_to_llm([PubmedQueryRun()])
         self.llm = llm_client.get_llm()
         self.template = get_medical_qa_template("medical_qa")
         self.retriever = retriever_client
@@ -41,6 +72,19 @@ class OrchestratorService:
         self.fhir_retriever_agent = fhir_retriever_agent
         self.fhir_formatter_agent = fhir_formatter_agent
 
+    @staticmethod
+    def _build_general_qa_context(doctor_query: DoctorQuery, relevant_articles: list[Document]) -> str:
+        """
+        Build the evidence context of the general QA prompt: the retrieved articles' sentences most relevant to the
+        query packed into `RETRIEVER_CONTEXT_MAX_TOKENS`, or every article in full when packing is disabled.
+        """
+        if not relevant_articles:
+            logger.warning("No relevant articles retrieved. Proceeding without evidence.")
+        if not settings.RETRIEVER_CONTEXT_PACKING_ENABLED:
+            return format_context(relevant_articles)
+        return pack_context(doctor_query.content, relevant_articles, settings.RETRIEVER_CONTEXT_MAX_TOKENS,
+                            settings.RETRIEVER_CONTEXT_DUPLICATE_THRESHOLD)
+
     async def general_medical_qa_chat(self, doctor_query: DoctorQuery) -> AssistantResponse:
         """
         Generate a complete, evidence-based response for a medical query.
@@ -60,37 +104,29 @@ class OrchestratorService:
         - RuntimeError: If the chain fails to generate a response due to an exception.
         """
 
-        logger.info(f"OrchestratorService, chat, doctor_query: {doctor_query}")
+        logger.info("OrchestratorService, chat, doctor_query {}: {}", doctor_query.id, payload(doctor_query.content))
 
         # Retrieval
-        relevant_articles: list[Document] = await self.retriever.get_relevant_documents(doctor_query.content)
+        with stage_span(GENERAL_PIPELINE, RETRIEVER_STAGE):
+            relevant_articles: list[Document] = await self.retriever.get_relevant_documents(doctor_query.content)
 
-        logger.debug(relevant_articles)
+        logger.debug("Relevant articles: {}", payload(relevant_articles))
 
         # Augmentation
         template = get_medical_qa_template("medical_qa")
 
         template_vars = {
-            "doctor_query": doctor_query.content
+            "doctor_query": doctor_query.content,
+            "context": self._build_general_qa_context(doctor_query, relevant_articles)
         }
 
-        if not relevant_articles or (len(relevant_articles) == 0):
-            logger.warning("No relevant articles retrieved. Proceeding without evidence.")
-            template_vars["context"] = "No relevant articles found."
-        else:
-            template_vars["context"] = "\n\n".join(
-                [
-                    f"PubMed ID: {doc.metadata.get('uid', 'Unknown')} | Title: {doc.metadata.get('Title', 'Unknown')} | Published: {doc.metadata.get('Published', 'Unknown')} | Content: {doc.page_content}"
-                    for doc in
-                    relevant_articles]
-            )
-
-        logger.debug(f"Medical QA Template Variables: {template_vars}")
+        logger.debug("Medical QA Template Variables: {}", payload(template_vars))
 
         # Generation
-        response = await self.llm_client.generate_response(template, template_vars)
+        with stage_span(GENERAL_PIPELINE, GENERATION_STAGE):
+            response = await self.llm_client.generate_response(template, template_vars)
 
-        logger.debug(f"Response: {response}")
+        logger.debug("Response: {}", payload(response))
 
         current_time = datetime.now()
 
@@ -101,71 +137,65 @@ class OrchestratorService:
             created_at=current_time
         )
 
-    async def general_medical_qa_chat_stream(self, doctor_query: DoctorQuery) -> AsyncIterable[str]:
+    async def general_medical_qa_chat_stream(self, doctor_query: DoctorQuery) -> AsyncIterable[str | StreamEvent]:
         """
         Stream a response for a medical query in real-time.
 
         This function:
         - Uses an async generator to provide incremental updates to the response.
         - Constructs a query-specific input template based on the doctor's question.
-        - Streams responses from the LLM, yielding formatted data chunks as they are generated.
+        - Streams responses from the LLM, yielding text chunks as they are generated.
+        - Emits a final stage event once generation completes.
 
         Parameters:
         - doctor_query (str): The medical question or prompt provided by the doctor.
 
         Yields:
-        - str: Formatted chunks of the response, each encapsulated as an event stream data message.
+        - str | StreamEvent: Text chunks of the response, then the `generation` stage event. The caller frames them
+          for the client.
 
         Raises:
         - RuntimeError: If the chain fails to stream a response due to an exception.
         """
 
-        logger.info(f"OrchestratorService, chat_stream, doctor_query: {doctor_query}")
+        logger.info("OrchestratorService, chat_stream, doctor_query {}: {}", doctor_query.id,
+                    payload(doctor_query.content))
 
-        relevant_articles = await self.retriever.get_relevant_documents(doctor_query.content)
+        started_at = time.perf_counter()
+        with stage_span(GENERAL_PIPELINE, RETRIEVER_STAGE):
+            relevant_articles = await self.retriever.get_relevant_documents(doctor_query.content)
 
-        logger.debug(relevant_articles)
+        logger.debug("Relevant articles: {}", payload(relevant_articles))
 
         template = get_medical_qa_template("medical_qa")
 
         template_vars = {
-            "doctor_query": doctor_query.content
+            "doctor_query": doctor_query.content,
+            "context": self._build_general_qa_context(doctor_query, relevant_articles)
         }
 
-        logger.debug(f"Medical QA Template Variables: {template_vars}")
+        logger.debug("Medical QA Template Variables: {}", payload(template_vars))
 
         # Assuming `self.llm` supports streaming via an async generator
         chain = template | self.llm | StrOutputParser()
 
         try:
-            async for chunk in chain.astream(template_vars):
-                content = chunk.replace("\n", "<br>")
-                logger.debug(f"Streamed content: {content}")
-                yield f"data: {content}\n\n"
+            with stage_span(GENERAL_PIPELINE, GENERATION_STAGE, current=False):
+                async for chunk in chain.astream(template_vars):
+                    if stream_log_sampler.sample():
+                        logger.debug("Streamed content: {}", payload(chunk))
+                    yield chunk
         except LangChainException as e:
             logger.error(f"LLM streaming failed: {str(e)}")
             raise RuntimeError("LLM streaming failed.") from e
 
-    async def patient_medical_qa_chat(self, patient_id: str, doctor_query: DoctorQuery) -> AssistantResponse:
-        """
-        Generate a complete, evidence-based response for a medical query.
-
-        This function:
-        - Constructs a query-specific input template based on the doctor's question.
-        - Runs a pre-configured chain combining the template, LLM, and output parser.
-        - Returns the generated response as an `LLMResponse` object.
+        yield stage_event(GENERATION_STAGE, started_at)
 
-        Parameters:
-        - doctor_query (str): The medical question or prompt provided by the doctor.
-
-        Returns:
-        - LLMResponse: Contains the generated response in structured format.
-
-        Raises:
-        - RuntimeError: If the chain fails to generate a response due to an exception.
+    async def _run_patient_qa_stages(self, patient_id: str,
+                                     doctor_query: DoctorQuery) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Run the translator, retriever and formatter agents in order, yielding `(stage, output)` as each finishes.
         """
-
-        logger.info(f"{self.__class__.__name__}, patient_medical_qa_chat, doctor_query: {doctor_query}")
 
         """
         Translator Agent
@@ -174,14 +204,16 @@ class OrchestratorService:
         """
 
         try:
-            fhir_translator_agent_output: FHIRTranslatorAgentOutput = await self.fhir_translator_agent.translate(
-                patient_id,
-                doctor_query)
+            with stage_span(PATIENT_PIPELINE, TRANSLATOR_STAGE):
+                fhir_translator_agent_output: FHIRTranslatorAgentOutput = await self.fhir_translator_agent.translate(
+                    patient_id,
+                    doctor_query)
         except Exception as e:
-            logger.error(f"Error during ResearchGate lookup: {e}")
+            logger.error(f"Error during {TRANSLATOR_STAGE} stage: {e}")
             raise
 
-        logger.info(f"FHIRTranslatorAgentOutput: {fhir_translator_agent_output}")
+        logger.info("FHIRTranslatorAgentOutput: {}", payload(fhir_translator_agent_output))
+        yield TRANSLATOR_STAGE, fhir_translator_agent_output
 
         """
         Retriever Agent
@@ -191,12 +223,15 @@ class OrchestratorService:
         """
 
         try:
-            fhir_retriever_agent_output = await self.fhir_retriever_agent.retrieve(fhir_translator_agent_output)
+            with stage_span(PATIENT_PIPELINE, RETRIEVER_STAGE):
+                fhir_retriever_agent_output = await self.fhir_retriever_agent.retrieve(patient_id,
+                                                                                   fhir_translator_agent_output)
         except Exception as e:
-            logger.error(f"Error during ResearchGate lookup: {e}")
+            logger.error(f"Error during {RETRIEVER_STAGE} stage: {e}")
             raise
 
-        logger.info(f"FHIRRetrieverAgentOutput: {fhir_retriever_agent_output}")
+        logger.info("FHIRRetrieverAgentOutput: {}", payload(fhir_retriever_agent_output))
+        yield RETRIEVER_STAGE, fhir_retriever_agent_output
 
         """
         Formatter Agent
@@ -206,13 +241,55 @@ class OrchestratorService:
         """
 
         try:
-            fhir_formatter_agent_output = await self.fhir_formatter_agent.format(fhir_translator_agent_output,
-                                                                                 fhir_retriever_agent_output)
+            with stage_span(PATIENT_PIPELINE, FORMATTER_STAGE):
+                fhir_formatter_agent_output = await self.fhir_formatter_agent.format(fhir_translator_agent_output,
+                                                                                     fhir_retriever_agent_output)
         except Exception as e:
-            logger.error(f"Error during ResearchGate lookup: {e}")
+            logger.error(f"Error during {FORMATTER_STAGE} stage: {e}")
             raise
 
-        logger.info(f"FHIRFormatterAgentOutput: {fhir_formatter_agent_output}")
+        logger.info("FHIRFormatterAgentOutput: {}", payload(fhir_formatter_agent_output))
+        yield FORMATTER_STAGE, fhir_formatter_agent_output
+
+    @staticmethod
+    def _build_patient_qa_template_vars(doctor_query: DoctorQuery, stage_outputs: Dict[str, Any]) -> dict:
+        """
+        Build the `patient_qa` template variables from the doctor's query and the agents' outputs.
+        """
+        fhir_translator_agent_output: FHIRTranslatorAgentOutput = stage_outputs[TRANSLATOR_STAGE]
+        return {
+            "doctor_query": doctor_query.content,
+            "fhir_query": fhir_translator_agent_output.fhir_query,
+            "intent": fhir_translator_agent_output.intent,
+            "entities": fhir_translator_agent_output.entities,
+            "ambiguities": fhir_translator_agent_output.ambiguities,
+            "formatted_fhir_data": stage_outputs[FORMATTER_STAGE]
+        }
+
+    async def patient_medical_qa_chat(self, patient_id: str, doctor_query: DoctorQuery) -> AssistantResponse:
+        """
+        Generate a complete, evidence-based response for a medical query.
+
+        This function:
+        - Constructs a query-specific input template based on the doctor's question.
+        - Runs a pre-configured chain combining the template, LLM, and output parser.
+        - Returns the generated response as an `LLMResponse` object.
+
+        Parameters:
+        - doctor_query (str): The medical question or prompt provided by the doctor.
+
+        Returns:
+        - LLMResponse: Contains the generated response in structured format.
+
+        Raises:
+        - RuntimeError: If the chain fails to generate a response due to an exception.
+        """
+
+        logger.info("{}, patient_medical_qa_chat, doctor_query {}: {}", self.__class__.__name__, doctor_query.id,
+                    payload(doctor_query.content))
+
+        stage_outputs = {stage: output async for stage, output in self._run_patient_qa_stages(patient_id,
+                                                                                               doctor_query)}
 
         """
         LLM Invocation
@@ -223,19 +300,13 @@ class OrchestratorService:
         # Augmentation
         template = get_medical_qa_template("patient_qa")
 
-        template_vars = {
-            "doctor_query": doctor_query.content,
-            "fhir_query": fhir_translator_agent_output.fhir_query,
-            "intent": fhir_translator_agent_output.intent,
-            "entities": fhir_translator_agent_output.entities,
-            "ambiguities": fhir_translator_agent_output.ambiguities,
-            "formatted_fhir_data": fhir_formatter_agent_output
-        }
+        template_vars = self._build_patient_qa_template_vars(doctor_query, stage_outputs)
 
         # Generation
-        response = await self.llm_client.generate_response(template, template_vars)
+        with stage_span(PATIENT_PIPELINE, GENERATION_STAGE):
+            response = await self.llm_client.generate_response(template, template_vars)
 
-        logger.debug(f"Response: {response}")
+        logger.debug("Response: {}", payload(response))
 
         current_time = datetime.now()
 
@@ -245,3 +316,51 @@ class OrchestratorService:
             content=response,
             created_at=current_time
         )
+
+    async def patient_medical_qa_chat_stream(self, patient_id: str,
+                                             doctor_query: DoctorQuery) -> AsyncIterable[str | StreamEvent]:
+        """
+        Stream a patient-specific response for a medical query in real-time.
+
+        This function:
+        - Emits a stage event as each of the translator, retriever and formatter agents finishes.
+        - Streams the final `patient_qa` answer from the LLM, yielding text chunks as they are generated.
+        - Emits a final stage event once generation completes.
+
+        Parameters:
+        - patient_id (str): The FHIR ID of the patient the query is about.
+        - doctor_query (str): The medical question or prompt provided by the doctor.
+
+        Yields:
+        - str | StreamEvent: Stage events and text chunks of the response. The caller frames them for the client.
+
+        Raises:
+        - RuntimeError: If the chain fails to stream a response due to an exception.
+        """
+
+        logger.info("{}, patient_medical_qa_chat_stream, doctor_query {}: {}", self.__class__.__name__, doctor_query.id,
+                    payload(doctor_query.content))
+
+        started_at = time.perf_counter()
+        stage_outputs = {}
+        async for stage, output in self._run_patient_qa_stages(patient_id, doctor_query):
+            stage_outputs[stage] = output
+            yield stage_event(stage, started_at)
+
+        template = get_medical_qa_template("patient_qa")
+
+        template_vars = self._build_patient_qa_template_vars(doctor_query, stage_outputs)
+
+        chain = template | self.llm | StrOutputParser()
+
+        try:
+            with stage_span(PATIENT_PIPELINE, GENERATION_STAGE, current=False):
+                async for chunk in chain.astream(template_vars):
+                    if stream_log_sampler.sample():
+                        logger.debug("Streamed content: {}", payload(chunk))
+                    yield chunk
+        except LangChainException as e:
+            logger.error(f"LLM streaming failed: {str(e)}")
+            raise RuntimeError("LLM streaming failed.") from e
+
+        yield stage_event(GENERATION_STAGE, started_at)
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any
+
+from fastapi import HTTPException, status
+from loguru import logger
+
+from business.schemas.patient_summary import PatientSummary, PatientSummaryError
+from business.services.conditions_service import ConditionsService
+from business.services.encounters_service import EncountersService
+from business.services.patients_service import PatientsService
+
+
+class PatientSummaryService:
+    """Service to compose a patient's dashboard data from the Patient, Condition and Encounter services."""
+
+    def __init__(self,
+                 patients_service: PatientsService,
+                 conditions_service: ConditionsService,
+                 encounters_service: EncountersService):
+        """
+        Initialize PatientSummaryService with the services it fans out to.
+        """
+        self.patients_service = patients_service
+        self.conditions_service = conditions_service
+        self.encounters_service = encounters_service
+
+    async def get_summary(self, patient_id: str, conditions_count: int = 1,
+                          encounters_count: int = 3) -> PatientSummary:
+        """
+        Retrieve a patient with their latest conditions and recent encounters, fetched concurrently.
+        Fails as a whole only if the patient cannot be retrieved; a failed conditions or encounters section is
+        returned as None and reported in `errors`.
+        """
+        patient, latest_conditions, recent_encounters = await asyncio.gather(
+            self.patients_service.get_one(patient_id),
+            self.conditions_service.get_latest_conditions(patient_id, conditions_count),
+            self.encounters_service.get_recent_encounters(patient_id, encounters_count),
+            return_exceptions=True
+        )
+        if isinstance(patient, BaseException):
+            raise patient
+
+        summary = PatientSummary(patient=patient)
+        for section, result in (("latest_conditions", latest_conditions), ("recent_encounters", recent_encounters)):
+            if isinstance(result, BaseException):
+                summary.errors[section] = self._section_error(patient_id, section, result)
+            else:
+                setattr(summary, section, result)
+        return summary
+
+    @staticmethod
+    def _section_error(patient_id: str, section: str, error: BaseException) -> PatientSummaryError:
+        if isinstance(error, asyncio.CancelledError):
+            raise error
+        if isinstance(error, HTTPException):
+            return PatientSummaryError(status_code=error.status_code, detail=str(error.detail))
+        logger.error(f"Error retrieving {section} of patient {patient_id}: {str(error)}")
+        return PatientSummaryError(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                                   detail=f"Error retrieving {section}: {str(error)}")
@@ -1,9 +1,18 @@
+import sys
+from typing import AsyncIterator, Optional
+
 from fastapi import HTTPException, status
 from fhirpy import AsyncFHIRClient
-from fhirpy.base.exceptions import BaseFHIRError, ResourceNotFound, MultipleResourcesFound
-from fhirpy.lib import AsyncFHIRSearchSet
+from fhirpy.base.exceptions import BaseFHIRError, ResourceNotFound
 from loguru import logger
 
+from business.cache.shared_cache import fhir_cache
+from business.cache.single_flight import fhir_single_flight, hash_key
+from business.clients.fhir_client import fhir_client
+from business.schemas.fhir_search_page import FHIRSearchPage
+from business.tools.fhir_projection import project_resource, projection_params
+from business.tools.fhir_search_iterator import FHIRSearchIterator, decode_search_cursor
+
 
 class PatientsService:
     """Service to manage FHIR Patient resources."""
@@ -13,15 +22,15 @@ class PatientsService:
         Initialize PatientsService with a FHIR client.
         """
         self.fhir_server: AsyncFHIRClient = fhir_server
-        self.patients: AsyncFHIRSearchSet = self.fhir_server.resources('Patient')
 
     async def get_one(self, patient_id: str):
         """
-        Retrieve a single Patient resource by ID.
+        Retrieve a single Patient resource by ID, projected to the Patient projection profile.
         """
+        key = hash_key(self.fhir_server.url, "Patient", patient_id)
         try:
-            patient = await self.patients.get(patient_id)
-            return patient
+            return await fhir_single_flight.run(key, lambda: fhir_cache.get_or_call(
+                key, lambda: self._read_patient(patient_id)))
         except ResourceNotFound as e:
             logger.error(f"ResourceNotFound: {str(e)}")
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Patient {patient_id} Not Found")
@@ -30,19 +39,61 @@ class PatientsService:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail=f"Error retrieving patient {patient_id}: {str(e)}")
 
-    async def get_many(self):
+    async def _read_patient(self, patient_id: str) -> dict:
+        patient, _ = await fhir_client.request("get", f"Patient/{patient_id}", projection_params("Patient"),
+                                               fhir_server=self.fhir_server)
+        return project_resource(patient)
+
+    async def get_page(self, page_size: int, cursor: Optional[str] = None) -> FHIRSearchPage:
         """
-        Retrieve all patients.
+        Retrieve one page of patients, starting from the page a cursor of a previous page points to.
+        Pages follow the FHIR server's `next` links, so a cursor keeps the page size it was issued with.
         """
         try:
-            patients = await self.patients.fetch()  # No filters applied
-            logger.debug(f"Length of patients: {len(patients)}")
-            return patients
-        except MultipleResourcesFound as e:
-            logger.error(f"MultipleResourcesFound: {str(e)}")
+            path = decode_search_cursor(self.fhir_server, cursor) if cursor else 'Patient'
+        except ValueError as e:
+            logger.error(f"Invalid patients cursor: {str(e)}")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        try:
+            search = FHIRSearchIterator(self.fhir_server, path, page_size=page_size, max_pages=1)
+            patients = await search.collect()
+            logger.debug(f"Length of patients page: {len(patients)}")
+            return FHIRSearchPage(resources=patients, next_cursor=search.cursor)
+        except ResourceNotFound as e:
+            logger.error(f"ResourceNotFound: {str(e)}")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patients page Not Found")
+        except BaseFHIRError as e:
+            logger.error(f"BaseFHIRError:{str(e)}")
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                                detail=f"MultipleResourcesFound: {str(e)}")
+                                detail=f"Error retrieving patients: {str(e)}")
+
+    async def stream_many(self) -> AsyncIterator[dict]:
+        """
+        Stream all patients as the pages of the FHIR search arrive, holding one page in memory at a time, so the
+        FHIR search resource and byte limits do not apply. The first page is fetched before returning, so that a
+        failing FHIR server is still reported as an HTTP error.
+        """
+        patients = aiter(FHIRSearchIterator(self.fhir_server, 'Patient', max_resources=sys.maxsize,
+                                            max_bytes=sys.maxsize))
+        try:
+            first_patient = await anext(patients, None)
         except BaseFHIRError as e:
             logger.error(f"BaseFHIRError:{str(e)}")
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                                 detail=f"Error retrieving patients: {str(e)}")
+        return self._stream(first_patient, patients)
+
+    @staticmethod
+    async def _stream(first_patient: Optional[dict], patients: AsyncIterator[dict]) -> AsyncIterator[dict]:
+        try:
+            if first_patient is None:
+                return
+            yield first_patient
+            async for patient in patients:
+                yield patient
+        except BaseFHIRError as e:
+            # The response has already started, so the error can only end the stream.
+            logger.error(f"BaseFHIRError while streaming patients: {str(e)}")
+            raise
+        finally:
+            await patients.aclose()
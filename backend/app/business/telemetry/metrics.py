@@ -0,0 +1,188 @@
+import bisect
+import math
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Upper bounds, in seconds, of the latency histograms' buckets: from a cached FHIR read to a long Bedrock answer.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+METRIC_PREFIX = "medqa"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(label_names: Sequence[str], label_values: Sequence[str]) -> str:
+    if not label_names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """A metric family with a fixed set of label names, rendered in the Prometheus text exposition format."""
+
+    type: str
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        """Initialize Metric configuration."""
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def expose(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}", *self.samples()]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonic total per label set, e.g. tokens sent to Bedrock."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        """Initialize Counter configuration."""
+        super().__init__(name, documentation, label_names)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+                for key, value in sorted(self.values.items())]
+
+
+class Histogram(Metric):
+    """Distribution of observed values per label set, with cumulative buckets, a sum and a count."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        """Initialize Histogram configuration."""
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: the count of each bucket (the last one is +Inf) and the sum of the observed values.
+        self.series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                labels = _format_labels((*self.label_names, "le"), (*key, _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class StatsGauges:
+    """
+    Gauges read at scrape time from an existing `stats()` method: `collect()` returns the counters of each instance
+    (a single-flight group, a cache namespace...) by name, and each counter becomes the gauge `<name>_<counter>`,
+    labelled with the instance name.
+    """
+
+    def __init__(self, name: str, documentation: str, label_name: str,
+                 collect: Callable[[], Dict[str, Dict[str, float]]]):
+        """Initialize StatsGauges configuration."""
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.documentation = documentation
+        self.label_name = label_name
+        self.collect = collect
+
+    def expose(self) -> List[str]:
+        by_counter: Dict[str, List[str]] = {}
+        for instance, stats in sorted(self.collect().items()):
+            labels = _format_labels((self.label_name,), (instance,))
+            for counter, value in stats.items():
+                by_counter.setdefault(counter, []).append(f"{self.name}_{counter}{labels} {_format_value(value)}")
+        lines = []
+        for counter, samples in by_counter.items():
+            lines += [f"# HELP {self.name}_{counter} {self.documentation} ({counter})",
+                      f"# TYPE {self.name}_{counter} gauge", *samples]
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of metrics served at `/api/v1/metrics`.
+
+    Metrics are recorded from the event loop and are not thread-safe. Every gunicorn worker keeps its own registry,
+    so a scrape reports the worker that answered it.
+    """
+
+    def __init__(self):
+        """Initialize MetricsRegistry configuration."""
+        self.metrics: Dict[str, Metric | StatsGauges] = {}
+
+    def register(self, metric: Metric | StatsGauges) -> Metric | StatsGauges:
+        """Add a metric, replacing any previous one with the same name."""
+        self.metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, label_names))
+
+    def stats_gauges(self, name: str, documentation: str, label_name: str,
+                     collect: Callable[[], Dict[str, Dict[str, float]]]) -> StatsGauges:
+        return self.register(StatsGauges(name, documentation, label_name, collect))
+
+    def expose(self) -> str:
+        """Render every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self.metrics.values():
+            lines += metric.expose()
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+query_duration = metrics_registry.histogram(
+    "query_duration_seconds", "Duration of WebSocket queries, from receipt to the last message sent.",
+    ("endpoint", "mode", "status"))
+stage_duration = metrics_registry.histogram(
+    "stage_duration_seconds", "Duration of the QA pipeline stages.", ("pipeline", "stage", "status"))
+fhir_request_duration = metrics_registry.histogram(
+    "fhir_request_duration_seconds", "Duration of FHIR server requests.", ("method", "resource_type", "status"))
+pubmed_request_duration = metrics_registry.histogram(
+    "pubmed_request_duration_seconds", "Duration of PubMed E-utilities requests, retries included.",
+    ("endpoint", "status"))
+llm_call_duration = metrics_registry.histogram(
+    "llm_call_duration_seconds", "Duration of Bedrock calls, admission wait included.", ("model", "mode", "status"))
+llm_time_to_first_token = metrics_registry.histogram(
+    "llm_time_to_first_token_seconds", "Time to the first streamed token of Bedrock streams.", ("model",))
+llm_tokens = metrics_registry.counter(
+    "llm_tokens_total", "Tokens reported by Bedrock usage metadata.", ("model", "direction"))
+ws_messages = metrics_registry.counter(
+    "ws_messages_total", "Messages sent on the medical QA WebSockets.", ("endpoint", "mode", "framing"))
+ws_message_bytes = metrics_registry.counter(
+    "ws_message_bytes_total", "Bytes of the messages sent on the medical QA WebSockets, before compression.",
+    ("endpoint", "mode", "framing"))
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, Optional
+
+from loguru import logger
+
+from business.telemetry.metrics import Histogram
+from config.settings import get_settings
+
+settings = get_settings()
+
+
+class Tracer:
+    """
+    Optional OpenTelemetry export of the spans, to an OTLP/HTTP collector.
+
+    Enabled with `TRACING_ENABLED`, which requires the `opentelemetry-sdk` and `opentelemetry-exporter-otlp-proto-http`
+    packages; they are only imported then. Spans nest through the current context, so the LLM and FHIR calls of a
+    stage are its children.
+    """
+
+    def __init__(self):
+        """Initialize Tracer configuration."""
+        self.provider = None
+        self.tracer = None
+
+    def initialize(self):
+        """Set up the span exporter when tracing is enabled."""
+        if not settings.TRACING_ENABLED:
+            return
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError as e:
+            logger.error(f"Tracing is enabled but OpenTelemetry is not installed: {str(e)}")
+            raise RuntimeError("TRACING_ENABLED requires the opentelemetry-sdk and "
+                               "opentelemetry-exporter-otlp-proto-http packages.") from e
+
+        self.provider = TracerProvider(resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}))
+        self.provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)))
+        self.tracer = self.provider.get_tracer(__name__)
+        logger.info(f"Tracing Initialized (exporting to {settings.TRACING_OTLP_ENDPOINT})")
+
+    def close(self):
+        """Flush the pending spans and stop the exporter."""
+        if self.provider is not None:
+            self.provider.shutdown()
+            self.provider = None
+            self.tracer = None
+            logger.info("Tracing Closed")
+
+    def start(self, name: str, attributes: Dict[str, Any], current: bool):
+        """Context manager of an OpenTelemetry span, or of None when tracing is disabled."""
+        if self.tracer is None:
+            return nullcontext()
+        if current:
+            return self.tracer.start_as_current_span(name, attributes=attributes)
+        # Spans kept open across the yields of an async generator must not become the current span: the context they
+        # would attach may be detached from another task.
+        return self.tracer.start_span(name, attributes=attributes)
+
+
+tracer = Tracer()
+
+
+class Span:
+    """The operation being timed, to which attributes known only at its end (e.g. token counts) can be added."""
+
+    def __init__(self, otel_span: Any):
+        """Initialize Span configuration."""
+        self.otel_span = otel_span
+
+    def set_attributes(self, **attributes: Any):
+        if self.otel_span is not None:
+            self.otel_span.set_attributes(attributes)
+
+
+@contextmanager
+def span(name: str, histogram: Histogram, labels: Dict[str, str], attributes: Optional[Dict[str, Any]] = None,
+         current: bool = True) -> Iterator[Span]:
+    """
+    Time the enclosed operation into `histogram` with `labels` plus a `status` label (`ok`, `error` or `cancelled`),
+    and export it as the span `name` when tracing is enabled. Pass `current=False` around the yields of a generator.
+    """
+    started_at = time.perf_counter()
+    status = "ok"
+    try:
+        with tracer.start(name, {**labels, **(attributes or {})}, current) as otel_span:
+            yield Span(otel_span)
+    except (asyncio.CancelledError, GeneratorExit):
+        status = "cancelled"
+        raise
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - started_at, **labels, status=status)
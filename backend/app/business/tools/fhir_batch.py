@@ -0,0 +1,62 @@
+import asyncio
+from typing import List
+
+from fhirpy import AsyncFHIRClient
+from fhirpy.base.exceptions import OperationOutcome
+from fhirpy.base.utils import encode_params
+from loguru import logger
+
+from business.clients.fhir_client import fhir_client
+from business.schemas.fhir_search_query import FHIRSearchQuery
+from business.tools.fhir_projection import PROJECTION_PARAMETERS, projection_params
+from business.tools.fhir_search_iterator import FHIRSearchIterator
+from config.settings import get_settings
+
+settings = get_settings()
+
+
+def search_request_url(search_query: FHIRSearchQuery) -> str:
+    """Return the relative, projected search URL of a batch entry, e.g. `Condition?patient=123&_count=5&...`."""
+    params = dict(search_query.params)
+    if not any(name in params for name in PROJECTION_PARAMETERS):
+        params.update(projection_params(search_query.resource_type))
+    if search_query.sort:
+        params["_sort"] = search_query.sort
+    params["_count"] = min(search_query.count or settings.FHIR_SEARCH_PAGE_SIZE, settings.FHIR_SEARCH_PAGE_SIZE)
+    return f"{search_query.resource_type}?{encode_params(params)}"
+
+
+async def execute_batch(fhir_server: AsyncFHIRClient, search_queries: List[FHIRSearchQuery]) -> List[List[dict]]:
+    """
+    Run several searches with a single FHIR `batch` Bundle and return each search's resources, in order.
+
+    The first page of every search comes back in one round trip; searches with more pages than fit are continued
+    with `FHIRSearchIterator`, concurrently. `count` is treated as the maximum number of resources, as in
+    `FHIRTools.execute_search`. Raises `OperationOutcome` if any entry of the batch failed.
+    """
+    if not search_queries:
+        return []
+
+    urls = [search_request_url(search_query) for search_query in search_queries]
+    bundle = {
+        "resourceType": "Bundle",
+        "type": "batch",
+        "entry": [{"request": {"method": "GET", "url": url}} for url in urls],
+    }
+    response, size = await fhir_client.request("post", "", data=bundle, fhir_server=fhir_server)
+    entries = (response or {}).get("entry", [])
+    logger.info(f"FHIR batch of {len(urls)} searches returned {size} bytes")
+    if len(entries) != len(urls):
+        raise OperationOutcome(reason=f"FHIR batch returned {len(entries)} entries for {len(urls)} requests")
+
+    searches = []
+    for search_query, url, entry in zip(search_queries, urls, entries):
+        entry_response = entry.get("response") or {}
+        if not str(entry_response.get("status", "")).startswith("2"):
+            outcome = entry_response.get("outcome") or entry.get("resource")
+            if isinstance(outcome, dict) and outcome.get("resourceType") == "OperationOutcome":
+                raise OperationOutcome(resource=outcome)
+            raise OperationOutcome(reason=f"FHIR batch entry '{url}' failed with status {entry_response.get('status')}")
+        searches.append(FHIRSearchIterator(fhir_server, search_query.resource_type, search_query.params,
+                                           limit=search_query.count, first_page=entry.get("resource") or {}).collect())
+    return list(await asyncio.gather(*searches))
@@ -0,0 +1,238 @@
+"""
+In-memory evaluation of FHIR searches over a patient's resources.
+
+Supports the subset of R4 search semantics the translator produces for patient questions: the patient reference,
+`_id`, `_lastUpdated`, token parameters (`system|code`, `code`, `|code`), date parameters with the `eq`, `ge`,
+`gt`, `le` and `lt` prefixes at year, month or day precision, `_sort` on those parameters and `_count`.
+Comma-separated values are OR-ed and repeated parameters are AND-ed, as on the server. Any other parameter,
+modifier, chain or prefix makes the search unanswerable locally, and `search_resources` returns None so the caller
+can query the server instead.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from business.schemas.fhir_search_query import FHIRSearchQuery
+
+TOKEN = "token"
+DATE = "date"
+
+# Search parameter name -> (type, candidate element paths). Choice elements list every supported variant.
+SearchParameters = Dict[str, Tuple[str, Tuple[str, ...]]]
+
+COMMON_SEARCH_PARAMETERS: SearchParameters = {
+    "_id": (TOKEN, ("id",)),
+    "_lastUpdated": (DATE, ("meta.lastUpdated",)),
+}
+
+SEARCH_PARAMETERS: Dict[str, SearchParameters] = {
+    "Patient": {
+        "gender": (TOKEN, ("gender",)),
+        "birthdate": (DATE, ("birthDate",)),
+    },
+    "Encounter": {
+        "status": (TOKEN, ("status",)),
+        "class": (TOKEN, ("class",)),
+        "type": (TOKEN, ("type",)),
+        "reason-code": (TOKEN, ("reasonCode",)),
+        "date": (DATE, ("period",)),
+    },
+    "Condition": {
+        "code": (TOKEN, ("code",)),
+        "category": (TOKEN, ("category",)),
+        "clinical-status": (TOKEN, ("clinicalStatus",)),
+        "verification-status": (TOKEN, ("verificationStatus",)),
+        "onset-date": (DATE, ("onsetDateTime", "onsetPeriod")),
+        "abatement-date": (DATE, ("abatementDateTime", "abatementPeriod")),
+        "recorded-date": (DATE, ("recordedDate",)),
+    },
+    "Observation": {
+        "code": (TOKEN, ("code",)),
+        "category": (TOKEN, ("category",)),
+        "status": (TOKEN, ("status",)),
+        "date": (DATE, ("effectiveDateTime", "effectivePeriod", "effectiveInstant")),
+    },
+    "MedicationRequest": {
+        "code": (TOKEN, ("medicationCodeableConcept",)),
+        "status": (TOKEN, ("status",)),
+        "intent": (TOKEN, ("intent",)),
+        "authoredon": (DATE, ("authoredOn",)),
+    },
+    "Procedure": {
+        "code": (TOKEN, ("code",)),
+        "status": (TOKEN, ("status",)),
+        "date": (DATE, ("performedDateTime", "performedPeriod")),
+    },
+    "AllergyIntolerance": {
+        "code": (TOKEN, ("code",)),
+        "category": (TOKEN, ("category",)),
+        "type": (TOKEN, ("type",)),
+        "criticality": (TOKEN, ("criticality",)),
+        "clinical-status": (TOKEN, ("clinicalStatus",)),
+        "verification-status": (TOKEN, ("verificationStatus",)),
+        "date": (DATE, ("recordedDate",)),
+    },
+    "Immunization": {
+        "vaccine-code": (TOKEN, ("vaccineCode",)),
+        "status": (TOKEN, ("status",)),
+        "date": (DATE, ("occurrenceDateTime",)),
+    },
+    "DiagnosticReport": {
+        "code": (TOKEN, ("code",)),
+        "category": (TOKEN, ("category",)),
+        "status": (TOKEN, ("status",)),
+        "date": (DATE, ("effectiveDateTime", "effectivePeriod")),
+    },
+    "CarePlan": {
+        "category": (TOKEN, ("category",)),
+        "status": (TOKEN, ("status",)),
+        "date": (DATE, ("period",)),
+    },
+}
+
+PATIENT_REFERENCE_PARAMETERS = ("patient", "subject")
+
+DATE_PATTERN = re.compile(r"^(eq|ge|gt|le|lt)?(\d{4}(?:-\d{2}(?:-\d{2})?)?)$")
+
+# Sorts after every date, standing in for the end of a Period that is still ongoing.
+OPEN_END = "\uffff"
+
+
+def query_patient_id(search_query: FHIRSearchQuery) -> Optional[str]:
+    """Return the ID of the single patient a search is scoped to, if any."""
+    if search_query.resource_type == "Patient":
+        values = search_query.params.get("_id", [])
+    else:
+        values = next((search_query.params[name] for name in PATIENT_REFERENCE_PARAMETERS
+                       if name in search_query.params), [])
+    if len(values) != 1 or "," in values[0]:
+        return None
+    return values[0].removeprefix("Patient/") or None
+
+
+def _element(resource: dict, path: str) -> Any:
+    value: Any = resource
+    for name in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(name)
+    return value
+
+
+def _codings(value: Any) -> Iterable[Tuple[Optional[str], Optional[str]]]:
+    """Yield `(system, code)` for a code, Coding, CodeableConcept or a list of them."""
+    if isinstance(value, str):
+        yield None, value
+    elif isinstance(value, list):
+        for item in value:
+            yield from _codings(item)
+    elif isinstance(value, dict):
+        if "coding" in value:
+            yield from _codings(value["coding"])
+        elif "code" in value:
+            yield value.get("system"), value["code"]
+
+
+def _token_matches(values: List[Any], token: str) -> bool:
+    system, separator, code = token.rpartition("|")
+    for value in values:
+        for value_system, value_code in _codings(value):
+            if value_code != code:
+                continue
+            if not separator or (system == "" and value_system is None) or system == value_system:
+                return True
+    return False
+
+
+def _date_range(values: List[Any]) -> Optional[Tuple[str, str]]:
+    """Return the `(start, end)` of the first date, dateTime or Period; open ends are empty or high."""
+    for value in values:
+        if isinstance(value, str):
+            return value, value
+        if isinstance(value, dict) and (value.get("start") or value.get("end")):
+            return value.get("start", ""), value.get("end") or OPEN_END
+    return None
+
+
+def _date_matches(values: List[Any], prefix: str, date: str) -> bool:
+    date_range = _date_range(values)
+    if date_range is None:
+        return False
+    # Truncating to the precision of the searched date makes the lexical comparison match FHIR date ranges.
+    start, end = date_range[0][:len(date)], date_range[1][:len(date)]
+    if prefix == "ge":
+        return end >= date
+    if prefix == "gt":
+        return end > date
+    if prefix == "le":
+        return start <= date
+    if prefix == "lt":
+        return start < date
+    return start <= date <= end
+
+
+def _parameter_matches(resource: dict, parameter: Tuple[str, Tuple[str, ...]], value: str) -> bool:
+    """Return whether the resource matches any comma-separated alternative of `value`."""
+    parameter_type, paths = parameter
+    values = [element for element in (_element(resource, path) for path in paths) if element is not None]
+    for alternative in value.split(","):
+        if parameter_type == TOKEN:
+            if _token_matches(values, alternative):
+                return True
+        else:
+            prefix, date = DATE_PATTERN.match(alternative).groups()
+            if _date_matches(values, prefix or "eq", date):
+                return True
+    return False
+
+
+def _sort_key(resource: dict, parameter: Tuple[str, Tuple[str, ...]]) -> str:
+    date_range = _date_range([element for element in (_element(resource, path) for path in parameter[1])
+                              if element is not None])
+    return date_range[0] if date_range else ""
+
+
+def search_resources(resources: List[dict], search_query: FHIRSearchQuery) -> Optional[List[dict]]:
+    """
+    Evaluate `search_query` over a single patient's `resources` of every type.
+
+    Returns the matching resources in server order (or `_sort` order), or None when the search uses parameters
+    that cannot be evaluated locally.
+    """
+    search_parameters = {**COMMON_SEARCH_PARAMETERS, **SEARCH_PARAMETERS.get(search_query.resource_type, {})}
+
+    filters = []
+    for name, values in search_query.params.items():
+        if name in PATIENT_REFERENCE_PARAMETERS and search_query.resource_type != "Patient":
+            continue  # every resource in the snapshot belongs to the patient
+        if name not in search_parameters:
+            return None
+        if search_parameters[name][0] == DATE and not all(
+                DATE_PATTERN.match(alternative) for value in values for alternative in value.split(",")):
+            return None
+        filters.extend((search_parameters[name], value) for value in values)
+
+    sort_keys = []
+    for criterion in (search_query.sort or "").split(","):
+        criterion = criterion.strip()
+        if not criterion:
+            continue
+        name = criterion.lstrip("-")
+        if name not in search_parameters or search_parameters[name][0] != DATE:
+            return None
+        sort_keys.append((search_parameters[name], criterion.startswith("-")))
+
+    matches = [
+        resource for resource in resources
+        if resource.get("resourceType") == search_query.resource_type
+        and all(_parameter_matches(resource, parameter, value) for parameter, value in filters)
+    ]
+
+    # Stable sorts applied from the last criterion to the first, with missing values last.
+    for parameter, descending in reversed(sort_keys):
+        present = [resource for resource in matches if _sort_key(resource, parameter)]
+        missing = [resource for resource in matches if not _sort_key(resource, parameter)]
+        matches = sorted(present, key=lambda resource: _sort_key(resource, parameter), reverse=descending) + missing
+
+    if search_query.count:
+        matches = matches[:search_query.count]
+    return matches
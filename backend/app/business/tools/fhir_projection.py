@@ -0,0 +1,123 @@
+"""
+Projection of FHIR resources down to the elements the application uses.
+
+Searches and reads ask the server for the elements of the resource type's profile with `_elements`, or with
+`_summary=data` (everything but the narrative) for types without a profile. Servers are free to ignore both, so
+`project_resource` applies the same profile client-side: it drops the narrative, every element outside the profile
+and the parts of `meta` other than `versionId` and `lastUpdated`, which the patient snapshot cache and the UI rely
+on. Choice elements are listed as `onset[x]` and keep every typed variant (`onsetDateTime`, `onsetPeriod`, ...).
+
+Resources of a profiled type also lose their extensions, `extension` and primitive extensions (`_birthDate`, ...),
+at every depth, since nothing downstream reads them. `modifierExtension`s are kept whole wherever they appear: they
+change the meaning of the element carrying them and must not be silently dropped. Resources of a type without a
+profile keep their extensions, as `_summary=data` does.
+
+Profiles cover what the rule-based summaries, the in-memory search parameters and the UI read; they can be
+overridden per resource type with `FHIR_PROJECTION_PROFILES`.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from config.settings import get_settings
+
+settings = get_settings()
+
+DEFAULT_PROJECTION_PROFILES: Dict[str, Sequence[str]] = {
+    "Patient": ("identifier", "active", "name", "telecom", "gender", "birthDate", "deceased[x]", "address",
+                "maritalStatus", "communication", "generalPractitioner", "managingOrganization"),
+    "Encounter": ("status", "class", "type", "serviceType", "priority", "subject", "participant", "period",
+                  "reasonCode", "reasonReference", "diagnosis", "hospitalization", "location", "serviceProvider"),
+    "Condition": ("clinicalStatus", "verificationStatus", "category", "severity", "code", "bodySite", "subject",
+                  "encounter", "onset[x]", "abatement[x]", "recordedDate"),
+    "Observation": ("status", "category", "code", "subject", "encounter", "effective[x]", "issued", "value[x]",
+                    "dataAbsentReason", "interpretation", "component"),
+    "MedicationRequest": ("status", "intent", "category", "medication[x]", "subject", "encounter", "authoredOn",
+                          "requester", "reasonCode", "reasonReference", "dosageInstruction"),
+    "Procedure": ("status", "category", "code", "subject", "encounter", "performed[x]", "reasonCode",
+                  "reasonReference", "location", "bodySite", "outcome"),
+    "AllergyIntolerance": ("clinicalStatus", "verificationStatus", "type", "category", "criticality", "code",
+                           "patient", "onset[x]", "recordedDate", "reaction"),
+    "Immunization": ("status", "vaccineCode", "patient", "encounter", "occurrence[x]", "primarySource", "location"),
+    "DiagnosticReport": ("status", "category", "code", "subject", "encounter", "effective[x]", "issued", "result",
+                         "conclusion", "conclusionCode"),
+    "CarePlan": ("status", "intent", "category", "title", "description", "subject", "encounter", "period",
+                 "addresses", "activity", "goal"),
+    # Line items and contained resources make up most of a billing resource; totals and coded context are kept.
+    "Claim": ("status", "type", "use", "patient", "billablePeriod", "created", "provider", "priority", "diagnosis",
+              "procedure", "total"),
+    "ExplanationOfBenefit": ("status", "type", "use", "patient", "billablePeriod", "created", "insurer", "provider",
+                             "claim", "outcome", "diagnosis", "procedure", "total", "payment"),
+}
+
+PROJECTION_PROFILES: Dict[str, Sequence[str]] = {**DEFAULT_PROJECTION_PROFILES, **settings.FHIR_PROJECTION_PROFILES}
+
+# Elements kept regardless of the profile, as a server applying `_elements` does.
+MANDATORY_ELEMENTS = frozenset(("resourceType", "id", "meta", "modifierExtension", "implicitRules"))
+META_ELEMENTS = ("versionId", "lastUpdated")
+
+PROJECTION_PARAMETERS = ("_elements", "_summary")
+
+
+def projection_params(resource_type: str) -> Dict[str, str]:
+    """Return the `_elements` or `_summary` search parameter projecting `resource_type`, if projection is enabled."""
+    if not settings.FHIR_PROJECTION_ENABLED:
+        return {}
+    profile = PROJECTION_PROFILES.get(resource_type)
+    if profile:
+        return {"_elements": ",".join(element.removesuffix("[x]") for element in profile)}
+    return {"_summary": "data"}
+
+
+@lru_cache
+def _element_filter(resource_type: str) -> Optional[Callable[[str], bool]]:
+    """Return a predicate telling whether a top-level element is in the profile, or None without a profile."""
+    profile = PROJECTION_PROFILES.get(resource_type)
+    if not profile:
+        return None
+    elements = frozenset(element for element in profile if not element.endswith("[x]"))
+    choices = tuple(element.removesuffix("[x]") for element in profile if element.endswith("[x]"))
+
+    def keep(name: str) -> bool:
+        if name in elements or name in MANDATORY_ELEMENTS:
+            return True
+        return any(name.startswith(choice) and name[len(choice):len(choice) + 1].isupper() for choice in choices)
+
+    return keep
+
+
+def _strip_extensions(value: Any):
+    """
+    Remove `extension` elements and primitive extensions (`_birthDate`, ...) at every level, in place, leaving
+    `modifierExtension`s and their content untouched.
+    """
+    if isinstance(value, dict):
+        for name in [name for name in value if name == "extension" or name.startswith("_")]:
+            del value[name]
+        for name, item in value.items():
+            if name != "modifierExtension":
+                _strip_extensions(item)
+    elif isinstance(value, list):
+        for item in value:
+            _strip_extensions(item)
+
+
+def project_resource(resource: dict) -> dict:
+    """Strip a resource to its projection profile, in place, and return it."""
+    if not settings.FHIR_PROJECTION_ENABLED or not isinstance(resource, dict):
+        return resource
+
+    keep = _element_filter(resource.get("resourceType", ""))
+    for name in [name for name in resource if name == "text" or (keep is not None and not keep(name))]:
+        del resource[name]
+
+    meta = resource.get("meta")
+    if isinstance(meta, dict):
+        meta = {name: meta[name] for name in META_ELEMENTS if name in meta}
+        if meta:
+            resource["meta"] = meta
+        else:
+            del resource["meta"]
+
+    if keep is not None:
+        _strip_extensions(resource)
+    return resource
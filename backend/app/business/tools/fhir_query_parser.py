@@ -0,0 +1,154 @@
+import re
+from contextvars import ContextVar
+from typing import List, Optional
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from business.schemas.fhir_search_query import FHIRSearchQuery
+
+# FHIR R4 resource types that can be searched on a patient compartment server.
+FHIR_RESOURCE_TYPES = frozenset({
+    "Account", "AllergyIntolerance", "Appointment", "AppointmentResponse", "AuditEvent", "Basic", "BodyStructure",
+    "CarePlan", "CareTeam", "ChargeItem", "Claim", "ClaimResponse", "ClinicalImpression", "Communication",
+    "CommunicationRequest", "Composition", "Condition", "Consent", "Coverage", "CoverageEligibilityRequest",
+    "CoverageEligibilityResponse", "DetectedIssue", "Device", "DeviceRequest", "DeviceUseStatement",
+    "DiagnosticReport", "DocumentManifest", "DocumentReference", "Encounter", "EnrollmentRequest",
+    "EpisodeOfCare", "ExplanationOfBenefit", "FamilyMemberHistory", "Flag", "Goal", "Group", "ImagingStudy",
+    "Immunization", "ImmunizationEvaluation", "ImmunizationRecommendation", "Invoice", "List", "Location",
+    "Media", "Medication", "MedicationAdministration", "MedicationDispense", "MedicationRequest",
+    "MedicationStatement", "MolecularSequence", "NutritionOrder", "Observation", "Organization", "Patient",
+    "Person", "Practitioner", "PractitionerRole", "Procedure", "Provenance", "QuestionnaireResponse",
+    "RelatedPerson", "RequestGroup", "ResearchSubject", "RiskAssessment", "Schedule", "ServiceRequest",
+    "Specimen", "SupplyDelivery", "SupplyRequest", "VisionPrescription",
+})
+
+# A search parameter name with optional chaining (`subject.name`, `subject:Patient.name`), reverse chaining
+# (`_has:Observation:patient:code`) and modifiers (`code:not`, `name:contains`).
+PARAM_NAME_PATTERN = re.compile(r"^_?[A-Za-z][A-Za-z0-9\-]*([.:][A-Za-z_][A-Za-z0-9\-_]*)*$")
+RESOURCE_ID_PATTERN = re.compile(r"^[A-Za-z0-9\-.]{1,64}$")
+
+# Resource types without a `patient` search parameter, whose searches cannot be restricted to one patient.
+UNSCOPED_RESOURCE_TYPES = frozenset({
+    "Group", "Location", "Medication", "Organization", "Practitioner", "PractitionerRole", "Schedule", "SupplyRequest",
+})
+PATIENT_REFERENCE_PARAMETERS = ("patient", "subject")
+
+# The patient of the QA session whose FHIR searches run in this context; set by the retriever agent so that the
+# searches of its LLM fallback are scoped too.
+patient_scope: ContextVar[Optional[str]] = ContextVar("patient_scope", default=None)
+
+
+class FHIRQueryParseError(ValueError):
+    """Raised when a translated FHIR query cannot be converted into a validated search."""
+
+
+class FHIRQueryScopeError(ValueError):
+    """Raised when a FHIR search could read the resources of another patient than the session's."""
+
+
+def _resource_type_from_entities(entities: Optional[dict]) -> Optional[str]:
+    """Find a resource type mentioned in the translator's extracted entities."""
+    for key, value in (entities or {}).items():
+        if re.sub(r"[^a-z]", "", str(key).lower()) not in ("resourcetype", "resource", "resourcetypes"):
+            continue
+        if isinstance(value, list) and len(value) == 1:
+            value = value[0]
+        if isinstance(value, str) and value.strip() in FHIR_RESOURCE_TYPES:
+            return value.strip()
+    return None
+
+
+def scope_to_patient(search_query: FHIRSearchQuery, patient_id: str) -> FHIRSearchQuery:
+    """
+    Restrict a search to the resources of `patient_id`: a `Patient` search to its `_id`, any other search to its
+    `patient` or `subject` reference, added when the search has neither. Raises `FHIRQueryScopeError` for another
+    patient's ID or reference, chained or modified patient references, and resource types that cannot be scoped.
+    """
+    if search_query.resource_type == "Patient":
+        scope_parameters, allowed = ("_id",), {patient_id}
+    elif search_query.resource_type in UNSCOPED_RESOURCE_TYPES:
+        raise FHIRQueryScopeError(f"{search_query.resource_type} searches cannot be scoped to a patient")
+    else:
+        scope_parameters, allowed = PATIENT_REFERENCE_PARAMETERS, {patient_id, f"Patient/{patient_id}"}
+        for name in search_query.params:
+            if name not in PATIENT_REFERENCE_PARAMETERS and re.split(r"[.:]", name)[0] in PATIENT_REFERENCE_PARAMETERS:
+                raise FHIRQueryScopeError(f"Chained or modified patient reference '{name}'")
+
+    present = [name for name in scope_parameters if name in search_query.params]
+    for name in present:
+        # Every value, repeated (ANDed) or comma-separated (ORed), must be the patient.
+        if not all(set(value.split(",")) <= allowed for value in search_query.params[name]):
+            raise FHIRQueryScopeError(f"Search parameter '{name}' is not the session's patient")
+    if not present:
+        search_query.params[scope_parameters[0]] = [patient_id]
+    return search_query
+
+
+def parse_fhir_query(fhir_query: str, patient_id: str, entities: Optional[dict] = None) -> FHIRSearchQuery:
+    """
+    Parse a translated FHIR query such as `Condition?patient=123&_sort=-onset-date&_count=5` into a validated
+    `FHIRSearchQuery` scoped to `patient_id` (see `scope_to_patient`).
+
+    Accepts absolute server URLs, a leading `/`, read-by-ID paths (`Patient/123`) and bare parameter strings
+    (`?patient=123`), in which case the resource type is taken from `entities`. `_count` is read as the maximum
+    number of resources to return, as translated queries use it for "the latest N". Raises `FHIRQueryParseError`
+    for operations, unknown resource types, malformed parameter names and invalid `_count` values, and
+    `FHIRQueryScopeError` for searches that could read another patient's resources.
+    """
+    query = (fhir_query or "").strip().strip("`'\"").strip()
+    if not query:
+        raise FHIRQueryParseError("Empty FHIR query")
+
+    split = urlsplit(query)
+    segments = [unquote(segment) for segment in split.path.split("/") if segment]
+
+    resource_id = None
+    if segments and any(segment.startswith("$") for segment in segments):
+        raise FHIRQueryParseError(f"FHIR operations are not supported: '{query}'")
+    if len(segments) >= 2 and segments[-2] in FHIR_RESOURCE_TYPES:
+        resource_type, resource_id = segments[-2], segments[-1]
+        if not RESOURCE_ID_PATTERN.match(resource_id):
+            raise FHIRQueryParseError(f"Invalid resource ID '{resource_id}'")
+    elif segments and segments[-1] in FHIR_RESOURCE_TYPES:
+        resource_type = segments[-1]
+    elif segments and not split.scheme:
+        raise FHIRQueryParseError(f"Unknown FHIR resource type '{segments[-1]}'")
+    else:
+        resource_type = _resource_type_from_entities(entities)
+    if resource_type is None:
+        raise FHIRQueryParseError(f"No resource type in FHIR query '{query}'")
+
+    search_query = FHIRSearchQuery(resource_type=resource_type)
+    if resource_id:
+        search_query.params["_id"] = [resource_id]
+
+    for name, value in parse_qsl(split.query, keep_blank_values=True):
+        name, value = name.strip(), value.strip()
+        if not PARAM_NAME_PATTERN.match(name):
+            raise FHIRQueryParseError(f"Invalid search parameter name '{name}'")
+        if not value:
+            raise FHIRQueryParseError(f"Empty value for search parameter '{name}'")
+
+        if name == "_sort":
+            search_query.sort = value
+        elif name == "_count":
+            if not value.isdigit() or int(value) <= 0:
+                raise FHIRQueryParseError(f"Invalid _count '{value}'")
+            search_query.count = int(value)
+        elif name == "_format":
+            continue
+        else:
+            search_query.params.setdefault(name, []).append(value)
+
+    return scope_to_patient(search_query, patient_id)
+
+
+def parse_fhir_queries(fhir_query: str, patient_id: str, entities: Optional[dict] = None) -> List[FHIRSearchQuery]:
+    """
+    Parse a translated FHIR query holding one search per line (for questions spanning several resource types) into
+    validated `FHIRSearchQuery`s scoped to `patient_id`. Raises `FHIRQueryParseError` or `FHIRQueryScopeError` if any
+    line is invalid.
+    """
+    lines = [line for line in (fhir_query or "").strip().strip("`").splitlines() if line.strip()]
+    if not lines:
+        raise FHIRQueryParseError("Empty FHIR query")
+    return [parse_fhir_query(line, patient_id, entities) for line in lines]
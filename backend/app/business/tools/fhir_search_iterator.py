@@ -0,0 +1,176 @@
+import asyncio
+import base64
+import binascii
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from fhirpy import AsyncFHIRClient
+from loguru import logger
+from yarl import URL
+
+from business.cache.shared_cache import fhir_cache
+from business.cache.single_flight import fhir_single_flight, hash_key
+from business.clients.fhir_client import fhir_client
+from business.tools.fhir_projection import PROJECTION_PARAMETERS, project_resource, projection_params
+from config.settings import get_settings
+
+settings = get_settings()
+
+SearchParams = Dict[str, Union[str, int, List[str]]]
+
+
+def encode_search_cursor(fhir_server: AsyncFHIRClient, next_url: str) -> str:
+    """Return an opaque cursor for a searchset `next` link, holding only its part relative to the server's base URL."""
+    relative = str(URL(next_url).relative()).removeprefix(URL(fhir_server.url).path.rstrip("/")).lstrip("/")
+    return base64.urlsafe_b64encode(relative.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(fhir_server: AsyncFHIRClient, cursor: str) -> str:
+    """
+    Return the absolute `next` link of a cursor made by `encode_search_cursor`, always under the server's base URL.
+    Raises `ValueError` if the cursor is malformed.
+    """
+    try:
+        relative = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError("Malformed search cursor") from e
+    path = relative.partition("?")[0]
+    if not relative or "://" in path or path.startswith("/") or ".." in path.split("/"):
+        raise ValueError("Malformed search cursor")
+    return f"{fhir_server.url.rstrip('/')}{'' if relative.startswith('?') else '/'}{relative}"
+
+
+class FHIRSearchIterator:
+    """
+    Async iterator over every resource of a FHIR search, following the searchset Bundle's `next` links.
+
+    Pages are fetched over the FHIR client's pooled HTTP session. While the resources of one page are consumed, the
+    next page is already being fetched (`prefetch`). Iteration stops after `limit` resources, or, with a warning and
+    `truncated` set, once `max_resources` resources have been yielded or `max_bytes` response bytes have been read.
+    The first page is always yielded, up to `limit` and `max_resources`. After `max_pages` pages iteration also stops
+    quietly, keeping the `next` link to resume from in `next_url` (and as an opaque `cursor`). With `projection`,
+    type searches request only the elements of the type's projection profile and every resource is stripped to its
+    profile client-side.
+
+        async for resource in FHIRSearchIterator(fhir_server, "Observation", {"patient": patient_id}):
+            ...
+    """
+
+    def __init__(self,
+                 fhir_server: AsyncFHIRClient,
+                 path: str,
+                 params: Optional[SearchParams] = None,
+                 limit: Optional[int] = None,
+                 page_size: Optional[int] = None,
+                 max_resources: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 prefetch: Optional[bool] = None,
+                 max_pages: Optional[int] = None,
+                 first_page: Optional[dict] = None,
+                 projection: bool = True):
+        """
+        Initialize FHIRSearchIterator configuration.
+        `path` is a resource type, a path such as `Patient/123/$everything` or a `next` link to resume from (which
+        keeps its own parameters). `limit` stops the iteration quietly after that many resources; unset caps default
+        to the `FHIR_SEARCH_*` settings. `first_page` is a searchset Bundle that was already fetched (e.g. from a
+        batch response) to continue from instead of requesting `path`.
+        Searches that set `_elements` or `_summary` themselves are not projected.
+        """
+        page_size = page_size or settings.FHIR_SEARCH_PAGE_SIZE
+        params = params or {}
+        self.projection = projection and not any(name in params for name in PROJECTION_PARAMETERS)
+        if self.projection and "/" not in path:
+            params = {**params, **projection_params(path)}
+        self.fhir_server = fhir_server
+        self.path = path
+        self.limit = limit
+        self.params = {**params, "_count": min(page_size, limit) if limit else page_size}
+        self.max_resources = max_resources or settings.FHIR_SEARCH_MAX_RESOURCES
+        self.max_bytes = max_bytes or settings.FHIR_SEARCH_MAX_BYTES
+        self.prefetch = settings.FHIR_SEARCH_PREFETCH if prefetch is None else prefetch
+        self.max_pages = max_pages
+        self.first_page = first_page
+        self.next_url: Optional[str] = None
+        self.pages = 0
+        self.resources_read = 0
+        self.bytes_read = 0
+        self.truncated = False
+
+    def __aiter__(self) -> AsyncIterator[dict]:
+        return self._iterate()
+
+    @property
+    def cursor(self) -> Optional[str]:
+        """Opaque cursor of `next_url`, for resuming the search in a later request."""
+        return encode_search_cursor(self.fhir_server, self.next_url) if self.next_url else None
+
+    async def collect(self) -> List[dict]:
+        """Return every resource of the search as a list."""
+        return [resource async for resource in self]
+
+    async def collect_shared(self) -> List[dict]:
+        """
+        Like `collect`, but concurrent identical searches (same server, path, parameters and caps) share one fetch
+        and its result list, which must not be mutated, and with `FHIR_CACHE_TTL_SECONDS` set the result is cached.
+        Only the iterator that ran the fetch updates its counters.
+        """
+        if self.first_page is not None:
+            return await self.collect()
+        key = hash_key(self.fhir_server.url, self.path, self.params, self.limit, self.max_resources, self.max_bytes,
+                       self.max_pages, self.projection)
+        return await fhir_single_flight.run(key, lambda: fhir_cache.get_or_call(key, self.collect))
+
+    async def _fetch_page(self, path: str, params: Optional[SearchParams] = None) -> Tuple[dict, int]:
+        """Fetch one searchset Bundle, returning it with its size in bytes."""
+        return await fhir_client.request("get", path, params, fhir_server=self.fhir_server)
+
+    @staticmethod
+    def _next_url(bundle: dict) -> Optional[str]:
+        return next((link.get("url") for link in bundle.get("link", []) if link.get("relation") == "next"), None)
+
+    async def _iterate(self) -> AsyncIterator[dict]:
+        next_page: Optional[asyncio.Future]
+        if self.first_page is not None:
+            next_page = asyncio.get_running_loop().create_future()
+            next_page.set_result((self.first_page, 0))
+        else:
+            next_page = asyncio.ensure_future(self._fetch_page(self.path, self.params))
+        try:
+            while next_page is not None:
+                bundle, size = await next_page
+                next_page = None
+                self.pages += 1
+                self.bytes_read += size
+                resources = [entry["resource"] for entry in bundle.get("entry", []) if "resource" in entry]
+
+                next_url = self._next_url(bundle)
+                total = self.resources_read + len(resources)
+                if self.limit and total >= self.limit:
+                    next_url = None
+                elif self.max_pages and self.pages >= self.max_pages:
+                    self.next_url, next_url = next_url, None
+                elif total > self.max_resources or (next_url and total >= self.max_resources):
+                    self._truncate(f"{total} resources read")
+                    next_url = None
+                elif next_url and self.bytes_read >= self.max_bytes:
+                    self._truncate(f"{self.bytes_read} bytes read")
+                    next_url = None
+                if next_url and self.prefetch:
+                    next_page = asyncio.ensure_future(self._fetch_page(next_url))
+
+                for resource in resources[:min(self.limit or self.max_resources, self.max_resources)
+                                          - self.resources_read]:
+                    self.resources_read += 1
+                    yield project_resource(resource) if self.projection else resource
+
+                if next_url and not self.prefetch:
+                    next_page = asyncio.ensure_future(self._fetch_page(next_url))
+        finally:
+            # Reached with a page outstanding when the consumer stops early; its result or error is discarded.
+            if next_page is not None:
+                next_page.cancel()
+                next_page.add_done_callback(lambda page: page.cancelled() or page.exception())
+
+    def _truncate(self, reason: str):
+        self.truncated = True
+        logger.warning(f"FHIR search {self.path} truncated after {self.pages} pages ({reason}); "
+                       f"limits are {self.max_resources} resources and {self.max_bytes} bytes")
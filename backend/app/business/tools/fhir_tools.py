@@ -1,10 +1,17 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 from fhirpy import AsyncFHIRClient
+from fhirpy.base.searchset import SQ
 from fhirpy.lib import AsyncFHIRSearchSet
 from langchain_core.tools import StructuredTool
 from loguru import logger
 
+from business.cache.patient_snapshot_cache import PatientSnapshotCache, patient_snapshot_cache
+from business.schemas.fhir_search_query import FHIRSearchQuery
+from business.tools.fhir_batch import execute_batch
+from business.tools.fhir_query_parser import patient_scope, scope_to_patient
+from business.tools.fhir_search_iterator import FHIRSearchIterator
+from config.logger import payload
 from config.settings import get_settings
 
 settings = get_settings()
@@ -13,11 +20,15 @@ settings = get_settings()
 class FHIRTools:
     """Service to manage FHIR Tools."""
 
-    def __init__(self, fhir_server: AsyncFHIRClient):
+    def __init__(self,
+                 fhir_server: AsyncFHIRClient,
+                 snapshot_cache: Optional[PatientSnapshotCache] = patient_snapshot_cache
+                 if settings.PATIENT_SNAPSHOT_ENABLED else None):
         """
-        Initialize FHIRTools with a FHIR client.
+        Initialize FHIRTools with a FHIR client and the patient snapshot cache searches are answered from first.
         """
         self.fhir_server: AsyncFHIRClient = fhir_server
+        self.snapshot_cache = snapshot_cache
         self.get_fhir_resources_tool = StructuredTool.from_function(
             coroutine=self.get_fhir_resources,
             name="get_fhir_resources",
@@ -37,7 +48,7 @@ class FHIRTools:
             resource_type (str): The type of FHIR resource to retrieve (e.g., 'Patient', 'Observation').
             search_params (Optional[Dict[str, Any]]): A dictionary of search parameters to filter the resources.
                                                       Keys and values should follow FHIR's search parameter syntax.
-            limit (Optional[int]): Maximum number of results to retrieve.
+            limit (Optional[int]): Maximum number of results to retrieve. Without a limit, every page is retrieved.
             sort (Optional[str]): Sort criteria for the results. Use FHIR-compliant syntax (e.g., '_lastUpdated, -onset-date,-abatement-date,-recorded-date').
             require_count (Optional[bool]): If True, returns the count of matching resources instead of the resources themselves.
 
@@ -45,19 +56,33 @@ class FHIRTools:
             Any: Either the count of resources or a list of resources matching the search criteria.
         """
 
-        logger.info(f"get_fhir_resources called with resource_type={resource_type}, "
-                    f"search_params={search_params}, limit={limit}, sort={sort}, require_count={require_count}")
+        logger.info("get_fhir_resources called with resource_type={}, search_params={}, limit={}, sort={}, "
+                    "require_count={}", resource_type, payload(search_params), limit, sort, require_count)
 
-        # Initialize resource search set
-        resource: AsyncFHIRSearchSet = self.fhir_server.resources(resource_type).search(**search_params)
+        search_query = FHIRSearchQuery(resource_type=resource_type,
+                                       params={name: [str(value) for value in values]
+                                               for name, values in SQ(**(search_params or {})).items()},
+                                       sort=sort)
+        patient_id = patient_scope.get()
+        if patient_id is not None:
+            search_query = scope_to_patient(search_query, patient_id)
+
+        if self.snapshot_cache is not None:
+            snapshot_resources = await self.snapshot_cache.search(search_query)
+            if snapshot_resources is not None:
+                if require_count:
+                    logger.info(f"Returning count of snapshot resources: {len(snapshot_resources)}")
+                    return len(snapshot_resources)
+                snapshot_resources = snapshot_resources[:limit] if limit else snapshot_resources
+                logger.info(f"Returning snapshot resources: {len(snapshot_resources)} resources")
+                return snapshot_resources
 
-        # Apply limit if specified
-        if limit:
-            resource.limit(limit)
+        # Initialize resource search set
+        resource: AsyncFHIRSearchSet = AsyncFHIRSearchSet(self.fhir_server, resource_type, search_query.params)
 
         # Apply sort criteria if specified
         if sort:
-            resource.sort(sort)
+            resource = resource.sort(sort)
 
         # Return the count if requested
         if require_count:
@@ -65,7 +90,57 @@ class FHIRTools:
             logger.info(f"Returning count of resources: {count}")
             return count
 
-        # Fetch and return the resources as a list of dictionaries
-        fetched_resources = await resource.fetch()
+        # Fetch every page, up to the limit, and return the resources as a list of dictionaries
+        search = FHIRSearchIterator(self.fhir_server, resource_type, resource.params, limit=limit)
+        fetched_resources = await search.collect_shared()
+        logger.info(f"Returning fetched resources: {len(fetched_resources)} resources")
+        return fetched_resources
+
+    async def execute_search(self, search_query: FHIRSearchQuery) -> List[dict]:
+        """
+        Execute a search parsed by `parse_fhir_query`, passing parameter names (with modifiers and chains) through
+        to the FHIR server unchanged. Searches scoped to a patient with a cached snapshot are answered from memory.
+        """
+        logger.info("execute_search called for {} with {}", search_query.resource_type, payload(search_query.params))
+
+        if self.snapshot_cache is not None:
+            snapshot_resources = await self.snapshot_cache.search(search_query)
+            if snapshot_resources is not None:
+                logger.info(f"Returning snapshot resources: {len(snapshot_resources)} resources")
+                return snapshot_resources
+
+        return await self._search_server(search_query)
+
+    async def _search_server(self, search_query: FHIRSearchQuery) -> List[dict]:
+        params = dict(search_query.params)
+        if search_query.sort:
+            params["_sort"] = search_query.sort
+
+        search = FHIRSearchIterator(self.fhir_server, search_query.resource_type, params, limit=search_query.count)
+        fetched_resources = await search.collect_shared()
         logger.info(f"Returning fetched resources: {len(fetched_resources)} resources")
         return fetched_resources
+
+    async def execute_batch(self, search_queries: List[FHIRSearchQuery]) -> List[List[dict]]:
+        """
+        Execute several parsed searches in one round trip, returning each search's resources in order.
+        Searches answered from a patient snapshot are left out of the FHIR `batch` Bundle sent to the server.
+        """
+        logger.info(f"execute_batch called with {len(search_queries)} searches")
+
+        results: List[Optional[List[dict]]] = [None] * len(search_queries)
+        if self.snapshot_cache is not None:
+            for index, search_query in enumerate(search_queries):
+                results[index] = await self.snapshot_cache.search(search_query)
+
+        pending = [index for index, resources in enumerate(results) if resources is None]
+        if len(pending) == 1:
+            results[pending[0]] = await self._search_server(search_queries[pending[0]])
+        elif pending:
+            batch_results = await execute_batch(self.fhir_server, [search_queries[index] for index in pending])
+            for index, resources in zip(pending, batch_results):
+                results[index] = resources
+
+        logger.info(f"Returning batch resources: {[len(resources) for resources in results]} resources, "
+                    f"{len(search_queries) - len(pending)} searches answered from snapshots")
+        return results
@@ -1,8 +1,131 @@
+import re
 import sys
+from collections import Counter
+from typing import Any, List, Pattern, TextIO, Tuple
 
 from loguru import logger
+from pydantic import BaseModel
 
+from config.settings import get_settings
 
-def setup_logging() -> None:
+settings = get_settings()
+
+LOG_FORMAT = "<green>{time:HH:mm:ss}</green> | {level} | <level>{message}</level>"
+
+# Identifiers replaced in every emitted message, whatever logged them.
+REDACTIONS: List[Tuple[Pattern[str], str]] = [
+    (re.compile(r"\b\d{3}-\d{2}-\d{4}\b"), "[SSN]"),
+    (re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b"), "[EMAIL]"),
+    (re.compile(r"(?<!\d)(?:\+1[-. ]?)?\(?\d{3}\)?[-. ]\d{3}[-. ]\d{4}(?!\d)"), "[PHONE]"),
+]
+
+SUMMARY_MAX_KEYS = 8
+SUMMARY_MAX_TYPES = 5
+
+
+def setup_logging(sink: TextIO = sys.stdout) -> None:
+    """
+    Log to `sink` (stdout) at `LOG_LEVEL`. With `LOG_ENQUEUE`, records are written by a background thread so that a slow
+    stdout never blocks the event loop; with `LOG_REDACT`, identifiers are masked in every message.
+    """
     logger.remove()
-    logger.add(sys.stdout, colorize=True, format="<green>{time:HH:mm:ss}</green> | {level} | <level>{message}</level>")
+    redactions = REDACTIONS + [(re.compile(pattern), "[REDACTED]") for pattern in settings.LOG_REDACT_PATTERNS]
+    # `patcher=None` would keep the previous patcher, so redaction is switched off with a no-op one.
+    logger.configure(patcher=(lambda record: redact(record, redactions)) if settings.LOG_REDACT
+                     else lambda record: None)
+    logger.add(sink, level=settings.LOG_LEVEL, enqueue=settings.LOG_ENQUEUE, colorize=True, format=LOG_FORMAT)
+
+
+def redact(record: dict, redactions: List[Tuple[Pattern[str], str]]):
+    message = record["message"]
+    for pattern, replacement in redactions:
+        message = pattern.sub(replacement, message)
+    record["message"] = message
+
+
+def truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... (+{len(text) - max_chars} chars)"
+
+
+def summarize(value: Any, depth: int = 0) -> str:
+    """
+    Describe a value by its shape instead of its content: lengths of strings, counts and resource types of lists,
+    keys of dicts, fields of models. FHIR resources, documents and prompts are reduced to what can be logged
+    without PHI.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return str(value)
+    if isinstance(value, str):
+        return f"<{len(value)} chars>"
+    if isinstance(value, bytes):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, dict) and isinstance(value.get("resourceType"), str):
+        return f"<{value['resourceType']}>"
+    if isinstance(getattr(value, "page_content", None), str):
+        return f"<{type(value).__name__} {len(value.page_content)} chars>"
+    if isinstance(value, BaseModel):
+        value_type = type(value).__name__
+        if depth:
+            return f"<{value_type}>"
+        fields = ", ".join(f"{name}={summarize(getattr(value, name), depth + 1)}"
+                           for name in list(type(value).model_fields)[:SUMMARY_MAX_KEYS])
+        return f"<{value_type} {fields}>"
+    if isinstance(value, dict):
+        if depth:
+            return f"<dict of {len(value)}>"
+        items = ", ".join(f"{key}: {summarize(item, depth + 1)}" for key, item in list(value.items())[:SUMMARY_MAX_KEYS])
+        more = f", +{len(value) - SUMMARY_MAX_KEYS} more" if len(value) > SUMMARY_MAX_KEYS else ""
+        return f"{{{items}{more}}}"
+    if isinstance(value, (list, tuple, set)):
+        types = Counter(item["resourceType"] if isinstance(item, dict) and "resourceType" in item
+                        else type(item).__name__ for item in value)
+        counts = ", ".join(f"{count} {item_type}" for item_type, count in types.most_common(SUMMARY_MAX_TYPES))
+        return f"<{type(value).__name__} of {len(value)}{': ' + counts if counts else ''}>"
+    return f"<{type(value).__name__}>"
+
+
+class LogPayload:
+    """
+    A log argument rendered only when a sink emits the record: the value's summary, or its text truncated to
+    `LOG_MAX_PAYLOAD_CHARS` when `LOG_PAYLOADS` is enabled for debugging. Pass it as a `{}` argument, not in an
+    f-string, so that nothing is formatted when the level is off.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        """Initialize LogPayload configuration."""
+        self.value = value
+
+    def __str__(self) -> str:
+        if settings.LOG_PAYLOADS:
+            return truncate(str(self.value), settings.LOG_MAX_PAYLOAD_CHARS)
+        return summarize(self.value)
+
+    def __format__(self, format_spec: str) -> str:
+        return str(self)
+
+
+def payload(value: Any) -> LogPayload:
+    """Wrap a large or sensitive value for logging; see `LogPayload`."""
+    return LogPayload(value)
+
+
+class LogSampler:
+    """Lets one in `every` events through, for logs of per-token events; `every` <= 0 lets none through."""
+
+    def __init__(self, every: int):
+        """Initialize LogSampler configuration."""
+        self.every = every
+        self.count = 0
+
+    def sample(self) -> bool:
+        if self.every <= 0:
+            return False
+        self.count += 1
+        return (self.count - 1) % self.every == 0
+
+
+stream_log_sampler = LogSampler(settings.LOG_STREAM_SAMPLE_EVERY)
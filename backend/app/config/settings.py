@@ -1,6 +1,6 @@
 import os
 from functools import lru_cache
-from typing import Sequence
+from typing import Dict, Literal, Optional, Sequence
 
 from pydantic import field_validator
 from pydantic_settings import BaseSettings
@@ -24,12 +24,94 @@ class Settings(BaseSettings):
     MODEL_ID: str
     MODEL_TEMPERATURE: float
     MODEL_MAX_TOKENS: int
+    FHIR_AGENT_MODEL_ID: Optional[str] = None
+
+    LLM_MAX_POOL_CONNECTIONS: int = 50
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_READ_TIMEOUT: float = 120.0
+    LLM_TCP_KEEPALIVE: bool = True
+    LLM_MAX_RETRY_ATTEMPTS: int = 3
+    LLM_REQUESTS_PER_MINUTE: Optional[int] = None
+    LLM_TOKENS_PER_MINUTE: Optional[int] = None
+    LLM_ADMISSION_MAX_QUEUE: int = 100
+    LLM_ADMISSION_QUEUE_TIMEOUT: float = 60.0
+    LLM_THROTTLE_MAX_RETRIES: int = 4
+    LLM_THROTTLE_BACKOFF: float = 1.0
+    LLM_THROTTLE_MAX_BACKOFF: float = 20.0
 
     RETRIEVER_API_KEY: str
     RETRIEVER_TOP_K_RESULTS: int
+    RETRIEVER_BACKEND: Literal["eutils", "local_index"] = "eutils"
+    RETRIEVER_LOCAL_INDEX_PATH: str = "data/pubmed_index"
+    RETRIEVER_LOCAL_INDEX_REFRESH_SECONDS: float = 60.0
+    RETRIEVER_BASE_URL: str = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+    RETRIEVER_REQUESTS_PER_SECOND: Optional[float] = None
+    RETRIEVER_MAX_CONNECTIONS: int = 10
+    RETRIEVER_KEEPALIVE_TIMEOUT: float = 60.0
+    RETRIEVER_TIMEOUT: float = 30.0
+    RETRIEVER_MAX_RETRY: int = 3
+    RETRIEVER_RETRY_BACKOFF: float = 0.5
+    RETRIEVER_CACHE_ENABLED: bool = True
+    RETRIEVER_CACHE_MAX_ENTRIES: int = 1024
+    RETRIEVER_CACHE_TTL_SECONDS: float = 86400.0
+    RETRIEVER_RERANK_ENABLED: bool = True
+    RETRIEVER_RERANK_CANDIDATES: int = 50
+    RETRIEVER_CONTEXT_PACKING_ENABLED: bool = True
+    RETRIEVER_CONTEXT_MAX_TOKENS: int = 1500
+    RETRIEVER_CONTEXT_DUPLICATE_THRESHOLD: float = 0.8
 
     FHIR_CLIENT_APP_ID: str
     FHIR_CLIENT_API_BASE: str
+    FHIR_CLIENT_MAX_CONNECTIONS: int = 20
+    FHIR_CLIENT_TIMEOUT: float = 30.0
+    FHIR_SEARCH_PAGE_SIZE: int = 100
+    FHIR_SEARCH_MAX_RESOURCES: int = 5000
+    FHIR_SEARCH_MAX_BYTES: int = 50_000_000
+    FHIR_SEARCH_PREFETCH: bool = True
+    FHIR_PROJECTION_ENABLED: bool = True
+    FHIR_PROJECTION_PROFILES: Dict[str, Sequence[str]] = {}
+    FHIR_RETRIEVER_MODE: Literal["deterministic", "agent"] = "deterministic"
+    FHIR_FORMATTER_MODE: Literal["rules", "llm"] = "rules"
+    FHIR_ANALYTICS_STORE_PATH: str = "data/fhir_analytics"
+    FHIR_ANALYTICS_REFRESH_SECONDS: float = 60.0
+
+    PATIENT_SNAPSHOT_ENABLED: bool = True
+    PATIENT_SNAPSHOT_RESOURCE_TYPES: Sequence[str] = []
+    PATIENT_SNAPSHOT_MAX_PATIENTS: int = 64
+    PATIENT_SNAPSHOT_MAX_RESOURCES: int = 5000
+    PATIENT_SNAPSHOT_TTL_SECONDS: float = 3600.0
+    PATIENT_SNAPSHOT_REVALIDATE_SECONDS: float = 30.0
+
+    SINGLE_FLIGHT_ENABLED: bool = True
+
+    CACHE_BACKEND: Literal["memory", "sqlite", "redis"] = "memory"
+    CACHE_SQLITE_PATH: str = "data/cache.sqlite3"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_REDIS_MAX_CONNECTIONS: int = 10
+    CACHE_REDIS_TIMEOUT: float = 1.0
+    CACHE_KEY_PREFIX: str = "medqa"
+    FHIR_CACHE_TTL_SECONDS: float = 0.0
+    FHIR_CACHE_MAX_ENTRIES: int = 256
+    LLM_CACHE_TTL_SECONDS: float = 0.0
+    LLM_CACHE_MAX_ENTRIES: int = 256
+
+    WS_MAX_IN_FLIGHT_QUERIES: int = 4
+    WS_STREAM_FRAMING: Literal["sse", "json"] = "sse"
+    WS_STREAM_COALESCE_MS: float = 30.0
+    WS_STREAM_COALESCE_BYTES: int = 2048
+    WS_PER_MESSAGE_DEFLATE: bool = True
+
+    LOG_LEVEL: str = "INFO"
+    LOG_ENQUEUE: bool = True
+    LOG_PAYLOADS: bool = False
+    LOG_MAX_PAYLOAD_CHARS: int = 500
+    LOG_STREAM_SAMPLE_EVERY: int = 50
+    LOG_REDACT: bool = True
+    LOG_REDACT_PATTERNS: Sequence[str] = []
+
+    TRACING_ENABLED: bool = False
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_SERVICE_NAME: str = "medical-qa-assistant"
 
     CORS_ORIGINS: Sequence[str]
 
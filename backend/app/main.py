@@ -3,12 +3,22 @@ from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
 
+from business.cache.patient_snapshot_cache import patient_snapshot_cache
+from business.cache.shared_cache import shared_cache
+from business.cache.single_flight import single_flight_stats
+from business.dependencies import clear_agent_caches
+from business.clients.fhir_analytics_client import fhir_analytics_client
 from business.clients.fhir_client import fhir_client
+from business.clients.llm_admission_controller import llm_admission_controller
+from business.clients.llm_client import llm_client_registry
+from business.clients.pubmed_retriever_client import get_retriever_backend
+from business.telemetry.tracing import tracer
 from config.logger import setup_logging
 from config.settings import get_settings
-from presentation.routers import health
-from presentation.routers.v1 import medical_qa_assistant, patients, conditions, encounters
+from presentation.routers import health, metrics
+from presentation.routers.v1 import medical_qa_assistant, patients, conditions, encounters, analytics
 
 settings = get_settings()
 
@@ -16,8 +26,27 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     setup_logging()
+    tracer.initialize()
     fhir_client.initialize()
+    llm_admission_controller.initialize()
+    llm_client_registry.initialize()
+    retriever_backend = get_retriever_backend()
+    retriever_backend.initialize()
+    shared_cache.initialize()
+    patient_snapshot_cache.initialize()
+    fhir_analytics_client.initialize()
     yield
+    logger.info(f"Single-flight stats: {single_flight_stats()}")
+    await fhir_analytics_client.close()
+    await patient_snapshot_cache.close()
+    await shared_cache.close()
+    await retriever_backend.close()
+    clear_agent_caches()
+    llm_client_registry.close()
+    llm_admission_controller.close()
+    await fhir_client.close()
+    tracer.close()
+    await logger.complete()
 
 
 app = FastAPI(
@@ -35,10 +64,12 @@ app.add_middleware(
 )
 
 app.include_router(health.router, prefix="/api/v1", tags=["Health"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["Metrics"])
 app.include_router(medical_qa_assistant.router, prefix="/api/v1", tags=["Medical QA Assistant"])
 app.include_router(patients.router, prefix="/api/v1", tags=["Patients"])
 app.include_router(encounters.router, prefix="/api/v1", tags=["Encounters"])
 app.include_router(conditions.router, prefix="/api/v1", tags=["Conditions"])
+app.include_router(analytics.router, prefix="/api/v1", tags=["Analytics"])
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    uvicorn.run(app, host="127.0.0.1", port=8000, ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE)
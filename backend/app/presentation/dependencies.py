@@ -3,10 +3,12 @@ from typing import Annotated
 from fastapi import Depends
 
 from business.dependencies import LLMClientDependency, RetrieverClientDependency, FHIRServerDependency, \
-    TranslatorAgentDependency, FHIRRetrieverAgentDependency, FHIRFormatterAgentDependency
+    TranslatorAgentDependency, FHIRRetrieverAgentDependency, FHIRFormatterAgentDependency, \
+    PatientSnapshotCacheDependency, FHIRAnalyticsClientDependency
 from business.services.conditions_service import ConditionsService
 from business.services.encounters_service import EncountersService
 from business.services.orchestrator_service import OrchestratorService
+from business.services.patient_summary_service import PatientSummaryService
 from business.services.patients_service import PatientsService
 
 
@@ -42,3 +44,14 @@ OrchestratorServiceDependency = Annotated[OrchestratorService, Depends(get_orche
 PatientsServiceDependency = Annotated[PatientsService, Depends(get_patients_service)]
 EncountersServiceDependency = Annotated[EncountersService, Depends(get_encounters_service)]
 ConditionsServiceDependency = Annotated[ConditionsService, Depends(get_conditions_service)]
+
+
+def get_patient_summary_service(
+        patients_service: PatientsServiceDependency,
+        conditions_service: ConditionsServiceDependency,
+        encounters_service: EncountersServiceDependency
+) -> PatientSummaryService:
+    return PatientSummaryService(patients_service, conditions_service, encounters_service)
+
+
+PatientSummaryServiceDependency = Annotated[PatientSummaryService, Depends(get_patient_summary_service)]
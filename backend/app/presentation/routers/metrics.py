@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from business.cache.patient_snapshot_cache import patient_snapshot_cache
+from business.cache.shared_cache import shared_cache
+from business.cache.single_flight import single_flight_stats
+from business.clients.llm_admission_controller import llm_admission_controller
+from business.telemetry.metrics import metrics_registry
+
+router = APIRouter(prefix="")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics_registry.stats_gauges("single_flight", "Single-flight call counters", "group", single_flight_stats)
+metrics_registry.stats_gauges("llm_admission", "Bedrock admission control counters", "controller",
+                              lambda: {"bedrock": llm_admission_controller.stats()})
+metrics_registry.stats_gauges("cache", "Shared cache counters", "namespace", shared_cache.stats)
+metrics_registry.stats_gauges("patient_snapshot_cache", "Patient snapshot cache counters", "cache",
+                              lambda: {"patient_snapshot": patient_snapshot_cache.stats()})
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Stage, FHIR, PubMed and LLM latency histograms, token counters and cache stats in the Prometheus format.
+    Served on the event loop, where the metrics are recorded, so that they are not read mid-update.
+    """
+    return PlainTextResponse(metrics_registry.expose(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,21 @@
+from typing import Annotated, List
+
+from fastapi import APIRouter, Query
+
+from business.schemas.fhir_analytics import CodeSummary, CohortQuery, CohortResult
+from presentation.dependencies import FHIRAnalyticsClientDependency
+
+router = APIRouter(prefix="/analytics")
+
+
+@router.post("/cohort", response_model=CohortResult)
+async def query_cohort(cohort_query: CohortQuery, client: FHIRAnalyticsClientDependency):
+    result = await client.query(cohort_query)
+    return result
+
+
+@router.get("/codes", response_model=List[CodeSummary])
+async def find_codes(text: Annotated[str, Query(min_length=2)], client: FHIRAnalyticsClientDependency,
+                     limit: Annotated[int, Query(ge=1, le=200)] = 20):
+    codes = await client.find_codes(text, limit)
+    return codes
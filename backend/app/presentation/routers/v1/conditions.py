@@ -1,10 +1,25 @@
-from fastapi import APIRouter
+from typing import Annotated, List
 
+from fastapi import APIRouter, Query
+
+from config.settings import get_settings
 from presentation.dependencies import ConditionsServiceDependency
 
+settings = get_settings()
+
+# Searches read "no limit" from a count of 0, so counts are bounded to one page of the FHIR server.
+Count = Annotated[int, Query(ge=1, le=settings.FHIR_SEARCH_PAGE_SIZE)]
+
 router = APIRouter(prefix="/conditions")
 
 
+@router.get("/latest/patients")
+async def get_latest_conditions_for_patients(patient_ids: Annotated[List[str], Query(min_length=1)],
+                                             service: ConditionsServiceDependency, count: Count = 1):
+    conditions = await service.get_latest_conditions_for_patients(patient_ids, count)
+    return conditions
+
+
 @router.get("/latest/patients/{patient_id}")
 async def get_latest_condition(patient_id: str, service: ConditionsServiceDependency):
     condition = await service.get_latest_conditions(patient_id)
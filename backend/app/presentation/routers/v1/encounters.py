@@ -1,11 +1,26 @@
-from fastapi import APIRouter
+from typing import Annotated, List
 
+from fastapi import APIRouter, Query
+
+from config.settings import get_settings
 from presentation.dependencies import EncountersServiceDependency
 
+settings = get_settings()
+
+# Searches read "no limit" from a count of 0, so counts are bounded to one page of the FHIR server.
+Count = Annotated[int, Query(ge=1, le=settings.FHIR_SEARCH_PAGE_SIZE)]
+
 router = APIRouter(prefix="/encounters")
 
 
+@router.get("/recent/patients")
+async def get_recent_encounters_for_patients(patient_ids: Annotated[List[str], Query(min_length=1)],
+                                             service: EncountersServiceDependency, count: Count = 3):
+    encounters = await service.get_recent_encounters_for_patients(patient_ids, count)
+    return encounters
+
+
 @router.get("/recent/patients/{patient_id}")
-async def get_recent_encounters(patient_id: str, service: EncountersServiceDependency, count: int = 3):
+async def get_recent_encounters(patient_id: str, service: EncountersServiceDependency, count: Count = 3):
     encounters = await service.get_recent_encounters(patient_id, count)
     return encounters
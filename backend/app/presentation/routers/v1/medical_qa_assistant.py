@@ -1,30 +1,262 @@
-from typing import AsyncIterable
+import asyncio
+import json
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, List, Optional
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from loguru import logger
+from pydantic import ValidationError
 
-from presentation.dependencies import OrchestratorServiceDependency
-from presentation.schemas.medical_qa_assistant import DoctorQuery, AssistantResponse
+from business.clients.llm_admission_controller import AdmissionListener, LLMOverloadedError, admission_listener
+from business.services.orchestrator_service import StreamEvent
+from business.telemetry.metrics import query_duration, ws_message_bytes, ws_messages
+from business.telemetry.tracing import span
+from config.logger import payload
+from config.settings import get_settings
+from presentation.dependencies import OrchestratorServiceDependency, PatientSnapshotCacheDependency
+from presentation.schemas.medical_qa_assistant import CancelQuery, DoctorQuery, AssistantResponse
+
+settings = get_settings()
 
 router = APIRouter(prefix="/medical-qa-assistant")
 
+STREAM_FRAMINGS = ("sse", "json")
+
 
 class ConnectionManager:
     @staticmethod
     async def connect(websocket: WebSocket):
         await websocket.accept()
 
-    @staticmethod
-    async def send_message(assistant_response: AssistantResponse, websocket: WebSocket):
-        await websocket.send_text(assistant_response.model_dump_json())
 
-    @staticmethod
-    async def send_stream(message_stream: AsyncIterable[str], websocket: WebSocket):
-        async for chunk in message_stream:
-            await websocket.send_text(chunk)
+manager = ConnectionManager()
 
 
-manager = ConnectionManager()
+class TooManyQueriesError(Exception):
+    """Raised when a query cannot start because of the in-flight limit or a duplicate id."""
+
+    def __init__(self, request_id: str, detail: str):
+        super().__init__(detail)
+        self.request_id = request_id
+
+
+def format_event(event: str, data: dict) -> str:
+    """Format a named event as an event stream message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def format_data(content: str) -> str:
+    """Format answer text as an event stream data message; newlines, which would end it, become `<br>`."""
+    content = content.replace("\n", "<br>")
+    return f"data: {content}\n\n"
+
+
+class ChunkCoalescer:
+    """
+    Joins the text chunks of one streamed answer into fewer WebSocket messages.
+
+    The first chunk is sent at once, so the time to first token is unchanged. Later chunks are held for up to `window`
+    seconds and sent together, or as soon as `max_bytes` are held; `flush` sends what is held before an event and at
+    the end of the answer, so that messages keep their order. A `window` of 0 sends every chunk on its own.
+    """
+
+    def __init__(self, send: Callable[[str], Awaitable[None]], window: float, max_bytes: int):
+        """Initialize ChunkCoalescer configuration."""
+        self.send = send
+        self.window = window
+        self.max_bytes = max_bytes
+        self.chunks: List[str] = []
+        self.size = 0
+        self.started = False
+        self.timer: Optional[asyncio.Task] = None
+
+    async def write(self, text: str):
+        if not text:
+            return
+        if not self.started or self.window <= 0:
+            self.started = True
+            await self.send(text)
+            return
+        self.chunks.append(text)
+        self.size += len(text.encode())
+        if self.size >= self.max_bytes:
+            await self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.create_task(self._flush_after_window())
+
+    async def flush(self):
+        self.cancel()
+        await self._send_held()
+
+    def cancel(self):
+        """Stop the pending timer; chunks still held are dropped."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.window)
+        # From here on `flush` must not cancel this task: the chunks it takes have to be sent.
+        self.timer = None
+        try:
+            await self._send_held()
+        except Exception as e:
+            # The client may be gone; the answer's next send fails the same way and ends the query.
+            logger.debug(f"Coalesced chunks not sent: {e!r}")
+
+    async def _send_held(self):
+        if self.chunks:
+            text = "".join(self.chunks)
+            self.chunks.clear()
+            self.size = 0
+            await self.send(text)
+
+
+class QuerySession:
+    """
+    The queries in flight on one WebSocket.
+
+    Each `DoctorQuery` is answered in its own task, keyed by its `id`, so that up to `WS_MAX_IN_FLIGHT_QUERIES`
+    queries are answered at once. Every message about a query carries that id: an `id:` line in `STREAM` mode, a
+    `request_id` field in `NORMAL` mode and with the `json` stream framing. A `{"type": "cancel", "id": ...}` message
+    cancels the task of that query, along with its Bedrock stream and FHIR calls, and a disconnect cancels all of them.
+    Sends are serialized so the messages of concurrent queries interleave whole.
+    """
+
+    def __init__(self, websocket: WebSocket, endpoint: str, response_mode: str, framing: str = "sse"):
+        """Initialize QuerySession configuration."""
+        self.websocket = websocket
+        self.endpoint = endpoint
+        self.response_mode = response_mode
+        self.framing = framing if response_mode == "STREAM" else "json"
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.send_lock = asyncio.Lock()
+
+    async def send_text(self, text: str):
+        async with self.send_lock:
+            await self.websocket.send_text(text)
+        labels = {"endpoint": self.endpoint, "mode": "STREAM" if self.response_mode == "STREAM" else "NORMAL",
+                  "framing": self.framing}
+        ws_messages.inc(**labels)
+        ws_message_bytes.inc(len(text.encode()), **labels)
+
+    async def send_json(self, message: Dict[str, Any]):
+        await self.send_text(json.dumps(message, ensure_ascii=False, separators=(",", ":")))
+
+    async def send_event(self, event: str, request_id: Optional[str], details: Dict[str, Any]):
+        """Send a named event about a query: an event stream message with `sse` framing, a JSON message otherwise."""
+        if self.framing == "sse":
+            await self.send_text(f"id: {request_id}\n{format_event(event, details)}")
+        else:
+            await self.send_json({"event": event, "request_id": request_id, **details})
+
+    async def send_chunk(self, request_id: str, text: str):
+        """Send answer text: an event stream data message with the `sse` framing, `{"request_id", "data"}` otherwise."""
+        if self.framing == "sse":
+            await self.send_text(f"id: {request_id}\n{format_data(text)}")
+        else:
+            await self.send_json({"request_id": request_id, "data": text})
+
+    async def send_stream(self, request_id: str, message_stream: AsyncIterable[str | StreamEvent]):
+        """Send a streamed answer, its text chunks coalesced by `ChunkCoalescer` and its events as they come."""
+        coalescer = ChunkCoalescer(lambda text: self.send_chunk(request_id, text),
+                                   settings.WS_STREAM_COALESCE_MS / 1000, settings.WS_STREAM_COALESCE_BYTES)
+        try:
+            async for item in message_stream:
+                if isinstance(item, StreamEvent):
+                    await coalescer.flush()
+                    await self.send_event(item.event, request_id, item.data)
+                else:
+                    await coalescer.write(item)
+            await coalescer.flush()
+        finally:
+            coalescer.cancel()
+
+    async def send_message(self, request_id: str, assistant_response: AssistantResponse):
+        assistant_response.request_id = request_id
+        await self.send_text(assistant_response.model_dump_json())
+
+    def admission_notifier(self, request_id: str) -> AdmissionListener:
+        """Tell the client when one of the LLM calls of a query is queued by admission control."""
+        async def notify(details: Dict[str, Any]):
+            await self.send_event("queued", request_id, details)
+
+        return notify
+
+    async def receive(self, answer: Callable[[DoctorQuery], Awaitable[None]]):
+        """Dispatch the client's queries and cancellations until it disconnects, then cancel what is in flight."""
+        try:
+            while True:
+                message = await self.websocket.receive_json()
+                try:
+                    if isinstance(message, dict) and message.get("type") == "cancel":
+                        await self.cancel(CancelQuery.model_validate(message).id)
+                    else:
+                        self.start(DoctorQuery.model_validate(message), answer)
+                except ValidationError as e:
+                    # The error text repeats the client's input (the doctor's question), so only its locations
+                    # and types are logged.
+                    logger.opt(lazy=True).warning("Invalid message: {}", lambda: [
+                        (".".join(map(str, error["loc"])), error["type"])
+                        for error in e.errors(include_url=False, include_input=False)])
+                    await self.send_event("error", message.get("id") if isinstance(message, dict) else None,
+                                          {"detail": "Invalid message."})
+                except TooManyQueriesError as e:
+                    await self.send_event("error", e.request_id, {"detail": str(e)})
+        except WebSocketDisconnect:
+            logger.info("Client disconnected.")
+        finally:
+            self.cancel_all()
+
+    def start(self, doctor_query: DoctorQuery, answer: Callable[[DoctorQuery], Awaitable[None]]):
+        if doctor_query.id in self.tasks:
+            raise TooManyQueriesError(doctor_query.id, "A query with this id is already in flight.")
+        if len(self.tasks) >= settings.WS_MAX_IN_FLIGHT_QUERIES:
+            raise TooManyQueriesError(doctor_query.id,
+                                      f"At most {settings.WS_MAX_IN_FLIGHT_QUERIES} queries may be in flight.")
+        logger.info("doctor_query {}: {}", doctor_query.id, payload(doctor_query.content))
+        self.tasks[doctor_query.id] = asyncio.create_task(self._run(doctor_query, answer))
+
+    async def _run(self, doctor_query: DoctorQuery, answer: Callable[[DoctorQuery], Awaitable[None]]):
+        request_id = doctor_query.id
+        # The task runs in a copy of the receiving context, so this listener is this query's alone.
+        admission_listener.set(self.admission_notifier(request_id))
+        labels = {"endpoint": self.endpoint, "mode": "STREAM" if self.response_mode == "STREAM" else "NORMAL"}
+        try:
+            with span("medical_qa.query", query_duration, labels, {"request_id": request_id}):
+                await answer(doctor_query)
+        except asyncio.CancelledError:
+            logger.info(f"Query {request_id} cancelled.")
+            raise
+        except LLMOverloadedError as e:
+            logger.warning(f"Query {request_id} not admitted: {e}")
+            await self._report_failure(request_id, str(e))
+        except Exception as e:
+            logger.exception(f"Query {request_id} failed: {e!r}")
+            await self._report_failure(request_id, "The query failed.")
+        finally:
+            if self.tasks.get(request_id) is asyncio.current_task():
+                del self.tasks[request_id]
+
+    async def _report_failure(self, request_id: str, detail: str):
+        try:
+            await self.send_event("error", request_id, {"detail": detail})
+        except Exception as e:
+            # The client may be gone already; its disconnect is handled by `receive`.
+            logger.debug(f"Failure of query {request_id} not reported: {e!r}")
+
+    async def cancel(self, request_id: str):
+        """Cancel a query in flight and confirm it; a query that already completed is left alone."""
+        task = self.tasks.pop(request_id, None)
+        if task is None:
+            return
+        task.cancel()
+        await self.send_event("cancelled", request_id, {})
+
+    def cancel_all(self):
+        for request_id, task in self.tasks.items():
+            logger.info(f"Cancelling query {request_id} of a closed session.")
+            task.cancel()
+        self.tasks.clear()
 
 
 @router.websocket("/general/ws")
@@ -35,44 +267,47 @@ async def general_medical_qa_websocket(websocket: WebSocket, orchestrator: Orche
     # Parse query parameters manually from websocket
     query_params = websocket.query_params
     response_mode = query_params.get("response_mode", "NORMAL")  # Default to "NORMAL" if not provided
+    framing = query_params.get("framing", settings.WS_STREAM_FRAMING)
     logger.info(f"Query params: {query_params}")
 
     await manager.connect(websocket)
-    try:
+    session = QuerySession(websocket, "general", response_mode,
+                           framing if framing in STREAM_FRAMINGS else settings.WS_STREAM_FRAMING)
+
+    async def answer(doctor_query: DoctorQuery):
         if response_mode == "STREAM":
-            while True:
-                json_doctor_query = await websocket.receive_json()
-                doctor_query: DoctorQuery = DoctorQuery.model_validate(json_doctor_query)
-                logger.info(f"doctor_query: {doctor_query}")
-                await manager.send_stream(orchestrator.general_medical_qa_chat_stream(doctor_query), websocket)
-        elif response_mode == "NORMAL":
-            while True:
-                json_doctor_query = await websocket.receive_json()
-                doctor_query: DoctorQuery = DoctorQuery.model_validate(json_doctor_query)
-                logger.info(f"doctor_query: {doctor_query}")
-                assistant_response: AssistantResponse = await orchestrator.general_medical_qa_chat(doctor_query)
-                await manager.send_message(assistant_response, websocket)
+            await session.send_stream(doctor_query.id, orchestrator.general_medical_qa_chat_stream(doctor_query))
+        else:
+            await session.send_message(doctor_query.id, await orchestrator.general_medical_qa_chat(doctor_query))
 
-    except WebSocketDisconnect:
-        logger.info("Client disconnected.")
+    await session.receive(answer)
 
 
 @router.websocket("/patient/{patient_id}/ws")
 async def patient_medical_qa_websocket(patient_id: str, websocket: WebSocket,
-                                       orchestrator: OrchestratorServiceDependency):
+                                       orchestrator: OrchestratorServiceDependency,
+                                       snapshot_cache: PatientSnapshotCacheDependency):
     """
     WebSocket endpoint for the patient medical qa assistant.
     """
-
-    logger.info(f"Patient ID: {patient_id}")
+    # Parse query parameters manually from websocket
+    query_params = websocket.query_params
+    response_mode = query_params.get("response_mode", "NORMAL")  # Default to "NORMAL" if not provided
+    framing = query_params.get("framing", settings.WS_STREAM_FRAMING)
+    logger.info(f"Patient ID: {patient_id}, Query params: {query_params}")
 
     await manager.connect(websocket)
-    try:
-        while True:
-            json_doctor_query = await websocket.receive_json()
-            doctor_query: DoctorQuery = DoctorQuery.model_validate(json_doctor_query)
-            logger.info(f"doctor_query: {doctor_query}")
-            assistant_response: AssistantResponse = await orchestrator.patient_medical_qa_chat(patient_id, doctor_query)
-            await manager.send_message(assistant_response, websocket)
-    except WebSocketDisconnect:
-        logger.info("Client disconnected.")
+    session = QuerySession(websocket, "patient", response_mode,
+                           framing if framing in STREAM_FRAMINGS else settings.WS_STREAM_FRAMING)
+    # Load the patient's resources while the doctor types the first question.
+    snapshot_cache.prefetch(patient_id)
+
+    async def answer(doctor_query: DoctorQuery):
+        if response_mode == "STREAM":
+            await session.send_stream(doctor_query.id,
+                                      orchestrator.patient_medical_qa_chat_stream(patient_id, doctor_query))
+        else:
+            await session.send_message(doctor_query.id,
+                                       await orchestrator.patient_medical_qa_chat(patient_id, doctor_query))
+
+    await session.receive(answer)
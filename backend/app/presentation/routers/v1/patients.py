@@ -1,17 +1,69 @@
-from fastapi import APIRouter
+import json
+from typing import Annotated, AsyncIterator, Optional
 
-from presentation.dependencies import PatientsServiceDependency
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+
+from business.schemas.fhir_search_page import FHIRSearchPage
+from business.schemas.patient_summary import PatientSummary
+from config.settings import get_settings
+from presentation.dependencies import PatientsServiceDependency, PatientSummaryServiceDependency
+
+settings = get_settings()
+
+MAX_PAGE_SIZE = 1000
+
+# Searches read "no limit" from a count of 0, so counts are bounded to one page of the FHIR server.
+Count = Annotated[int, Query(ge=1, le=settings.FHIR_SEARCH_PAGE_SIZE)]
 
 router = APIRouter(prefix="/patients")
 
 
+def _dumps(resource: dict) -> str:
+    return json.dumps(resource, separators=(",", ":"))
+
+
+async def _json_array(resources: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """Write resources as one JSON array, element by element."""
+    separator = "["
+    async for resource in resources:
+        yield separator + _dumps(resource)
+        separator = ","
+    yield "[]" if separator == "[" else "]"
+
+
 @router.get("")
 async def get_many(service: PatientsServiceDependency):
-    patients = await service.get_many()
-    return patients
+    """
+    Every patient as a JSON array, streamed while the FHIR pages arrive so that one page is held in memory at a time.
+    """
+    patients = await service.stream_many()
+    return StreamingResponse(_json_array(patients), media_type="application/json")
+
+
+@router.get("/page", response_model=FHIRSearchPage)
+async def get_page(service: PatientsServiceDependency,
+                   page_size: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = settings.FHIR_SEARCH_PAGE_SIZE,
+                   cursor: Optional[str] = None):
+    page = await service.get_page(page_size, cursor)
+    return page
+
+
+@router.get("/stream")
+async def stream_many(service: PatientsServiceDependency):
+    patients = await service.stream_many()
+    return StreamingResponse((_dumps(patient) + "\n" async for patient in patients),
+                             media_type="application/x-ndjson")
 
 
 @router.get("/{patient_id}")
 async def get_one(patient_id: str, service: PatientsServiceDependency):
     patient = await service.get_one(patient_id)
     return patient
+
+
+@router.get("/{patient_id}/summary", response_model=PatientSummary)
+async def get_summary(patient_id: str, service: PatientSummaryServiceDependency, conditions_count: Count = 1,
+                      encounters_count: Count = 3):
+    summary = await service.get_summary(patient_id, conditions_count, encounters_count)
+    return summary
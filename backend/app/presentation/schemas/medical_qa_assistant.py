@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -12,8 +13,14 @@ class DoctorQuery(BaseModel):
     created_at: datetime = Field(...)
 
 
+class CancelQuery(BaseModel):
+    type: Literal["cancel"] = Field(...)
+    id: str = Field(...)
+
+
 class AssistantResponse(BaseModel):
     id: str = Field(...)
     role: Role = Field(...)
     content: str = Field(...)
     created_at: datetime = Field(...)
+    request_id: Optional[str] = Field(default=None)
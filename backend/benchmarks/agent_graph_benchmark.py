@@ -0,0 +1,66 @@
+"""
+Micro-benchmark of the per-call LangGraph construction overhead on the patient QA hot path.
+
+Compares building the translator, retriever and formatter ReAct graphs on every call (the previous behaviour)
+with reusing the graph compiled on first use. No Bedrock or FHIR calls are made.
+
+Run from the `backend/app` directory (so that `.env` is picked up):
+    python ../benchmarks/agent_graph_benchmark.py --iterations 50
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from business.agents.fhir_formatter_agent import FHIRFormatterAgent  # noqa: E402
+from business.agents.fhir_retriever_agent import FHIRRetrieverAgent  # noqa: E402
+from business.agents.fhir_translator_agent import FHIRTranslatorAgent  # noqa: E402
+from business.clients.fhir_client import fhir_client  # noqa: E402
+from business.clients.llm_client import llm_client_registry  # noqa: E402
+from business.tools.fhir_tools import FHIRTools  # noqa: E402
+
+
+def time_per_call(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    fhir_client.initialize()
+    llm_client_registry.initialize()
+    llm_client = llm_client_registry.get_llm_client()
+    fhir_tools = FHIRTools(fhir_client.get_fhir_server())
+
+    agents = [
+        FHIRTranslatorAgent(llm_client),
+        FHIRRetrieverAgent(llm_client, fhir_tools),
+        FHIRFormatterAgent(llm_client),
+    ]
+
+    def rebuild(agent):
+        agent.agent = None
+        return agent.get_agent()
+
+    print(f"{'agent':<22}{'rebuild per call (ms)':>24}{'reused (ms)':>14}")
+    total_rebuild, total_reused = 0.0, 0.0
+    for agent in agents:
+        rebuild_ms = time_per_call(lambda: rebuild(agent), args.iterations)
+        reused_ms = time_per_call(agent.get_agent, args.iterations)
+        total_rebuild += rebuild_ms
+        total_reused += reused_ms
+        print(f"{agent.agent_name:<22}{rebuild_ms:>24.3f}{reused_ms:>14.4f}")
+    print(f"{'patient QA total':<22}{total_rebuild:>24.3f}{total_reused:>14.4f}")
+
+    llm_client_registry.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark of PubMed evidence context packing (`business.mappers.pubmed_context_mapper`).
+
+Builds synthetic abstracts shaped like PubMed's structured abstracts (about ten sentences, boilerplate shared across
+articles, a few sentences about the queried topic and the rest about other topics) for increasing
+`RETRIEVER_TOP_K_RESULTS`. It then compares the full context the prompt used to get with the packed context at
+several token budgets. Reports estimated prompt tokens (~4 characters per token), how many distinct on-topic
+statements are kept, how many citation headers are kept and the packing time. No Bedrock or PubMed calls are made.
+
+Run from the `backend/app` directory (so that `.env` is picked up):
+    python ../benchmarks/context_packing_benchmark.py --top-k 5,10,20,50 --budgets 500,1500,3000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from langchain_core.documents import Document  # noqa: E402
+
+from business.mappers.pubmed_context_mapper import estimate_tokens, format_context, pack_context  # noqa: E402
+
+QUERY = "Do SGLT2 inhibitors reduce hospitalization for heart failure in patients with type 2 diabetes?"
+TOPIC_SENTENCES = [
+    "SGLT2 inhibitors reduced hospitalization for heart failure by {n}% compared with placebo.",
+    "In patients with type 2 diabetes, SGLT2 inhibitor therapy lowered the risk of heart failure events.",
+    "The benefit on heart failure hospitalization was consistent across baseline HbA1c subgroups.",
+]
+OTHER_SENTENCES = [
+    "Metformin remains the first-line therapy for most adults with newly diagnosed disease.",
+    "Statin adherence was associated with fewer major adverse cardiovascular events.",
+    "Renal function declined more slowly in the intervention arm over {n} weeks.",
+    "Genital mycotic infections were the most common adverse event reported.",
+    "Blood pressure decreased modestly, by {n} mmHg on average, during follow-up.",
+    "Quality of life scores improved in both groups without significant differences.",
+    "Weight loss of {n} kg was observed at 52 weeks.",
+]
+BOILERPLATE_SENTENCES = [
+    "BACKGROUND: Cardiovascular disease is a leading cause of death worldwide.",
+    "METHODS: We conducted a randomized, double-blind, placebo-controlled trial.",
+    "CONCLUSIONS: Further studies are needed to confirm these findings.",
+]
+
+
+def synthetic_documents(count: int, rng: random.Random):
+    documents = []
+    for rank in range(count):
+        on_topic = rng.sample(TOPIC_SENTENCES, rng.randint(0, 2))
+        sentences = [BOILERPLATE_SENTENCES[0], BOILERPLATE_SENTENCES[1],
+                     *rng.sample(OTHER_SENTENCES + on_topic, len(on_topic) + 5), BOILERPLATE_SENTENCES[2]]
+        content = " ".join(sentence.format(n=rng.randint(2, 40)) for sentence in sentences)
+        documents.append(Document(page_content=content, metadata={
+            "uid": str(30000000 + rank), "Title": f"Cardiometabolic outcomes study {rank}", "Published": "2023-05-01",
+        }))
+    return documents
+
+
+def on_topic_statements(text: str) -> int:
+    """Distinct on-topic statements in `text`; repeats of a statement with other numbers are near-duplicates."""
+    return sum(sentence.split("{n}")[0] in text for sentence in TOPIC_SENTENCES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", default="5,10,20,50", help="Comma-separated numbers of retrieved articles.")
+    parser.add_argument("--budgets", default="500,1500,3000", help="Comma-separated token budgets.")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'top k':>6}{'context':>16}{'tokens':>10}{'on-topic':>10}{'sources':>10}{'time (ms)':>12}")
+    for top_k in [int(top_k) for top_k in args.top_k.split(",")]:
+        documents = synthetic_documents(top_k, random.Random(top_k))
+        full = format_context(documents)
+        print(f"{top_k:>6}{'full':>16}{estimate_tokens(full):>10}{on_topic_statements(full):>10}{top_k:>10}"
+              f"{'-':>12}")
+        for budget in [int(budget) for budget in args.budgets.split(",")]:
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                packed = pack_context(QUERY, documents, budget)
+            elapsed_ms = (time.perf_counter() - start) / args.iterations * 1000
+            print(f"{top_k:>6}{f'packed {budget}':>16}{estimate_tokens(packed):>10}{on_topic_statements(packed):>10}"
+                  f"{packed.count('PubMed ID:'):>10}{elapsed_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
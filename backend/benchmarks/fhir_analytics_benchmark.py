@@ -0,0 +1,143 @@
+"""
+Benchmark of the local FHIR analytics store: ingest time, size and cohort query latency.
+
+Replicates the Synthea mock patients `--copies` times (new patient and resource IDs), builds the store with
+`business.index.fhir_analytics_ingest` and times a few cohort queries at each size. Then answers the same cohort
+question for the original patients both from the store and the way the app would without it, with one FHIR
+Observation search per patient against `stubs/fhir_stub.py` (started in-process) and filtering client-side. Exits
+non-zero if the two disagree on the matching patients.
+
+Run from the `backend/app` directory (so that `.env` is picked up):
+    python ../benchmarks/fhir_analytics_benchmark.py --copies 1,100,1000
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs"))
+
+from fhirpy import AsyncFHIRClient  # noqa: E402
+
+from business.clients.fhir_client import fhir_client  # noqa: E402
+from business.index.fhir_analytics_ingest import PATIENT_REFERENCE_ELEMENTS, build_store  # noqa: E402
+from business.index.fhir_analytics_store import AnalyticsStore  # noqa: E402
+from business.schemas.fhir_analytics import CohortQuery  # noqa: E402
+from business.tools.fhir_search_iterator import FHIRSearchIterator  # noqa: E402
+from fhir_stub import create_app  # noqa: E402
+
+GLUCOSE = "http://loinc.org|2339-0"
+GLUCOSE_THRESHOLD = 90.0
+
+QUERIES = {
+    "glucose > 90": CohortQuery(codes=[GLUCOSE], value_gt=GLUCOSE_THRESHOLD),
+    "systolic BP 2015-2016, male": CohortQuery(codes=["8480-6"], start="2015-01-01", end="2016-12-31",
+                                               gender="male"),
+    "all conditions": CohortQuery(resource_type="Condition"),
+}
+
+
+def replicate(resources, copy: int):
+    """Yield a copy of the mock resources with new patient and resource IDs."""
+    if copy == 0:
+        yield from resources
+        return
+    for resource in resources:
+        replica = {**resource, "id": f"{resource['id']}-{copy}"}
+        for element in PATIENT_REFERENCE_ELEMENTS:
+            if isinstance(resource.get(element), dict) and "reference" in resource[element]:
+                replica[element] = {"reference": f"{resource[element]['reference']}-{copy}"}
+        yield replica
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def time_query(store: AnalyticsStore, cohort_query: CohortQuery, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        store.query(cohort_query)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+async def fhir_search_cohort(fhir_server: AsyncFHIRClient, patient_ids) -> set:
+    """The cohort of GLUCOSE facts above the threshold from one Observation search per patient."""
+    async def matches(patient_id: str) -> bool:
+        observations = await FHIRSearchIterator(fhir_server, "Observation", {"patient": patient_id}).collect()
+        return any(f"{coding.get('system')}|{coding.get('code')}" == GLUCOSE
+                   and observation.get("valueQuantity", {}).get("value", 0) > GLUCOSE_THRESHOLD
+                   for observation in observations for coding in observation.get("code", {}).get("coding", []))
+
+    found = await asyncio.gather(*(matches(patient_id) for patient_id in patient_ids))
+    return {patient_id for patient_id, match in zip(patient_ids, found) if match}
+
+
+async def run(args) -> bool:
+    app = create_app(latency=args.latency)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+    resources = app["stub"].resources
+    patient_ids = [resource["id"] for resource in resources if resource["resourceType"] == "Patient"]
+
+    work_dir = tempfile.mkdtemp(prefix="fhir_analytics_benchmark_")
+    try:
+        print(f"{'copies':>8}{'patients':>10}{'facts':>10}{'ingest (s)':>12}{'size (MB)':>11}"
+              + "".join(f"{label + ' (ms)':>32}" for label in QUERIES))
+        for copies in [int(copies) for copies in args.copies.split(",")]:
+            store = AnalyticsStore(os.path.join(work_dir, f"store-{copies}"))
+            start = time.perf_counter()
+            writer = build_store(store, (resource for copy in range(copies) for resource in replicate(resources, copy)),
+                                 [f"mock-data x{copies}"])
+            ingest_seconds = time.perf_counter() - start
+            timings = "".join(f"{time_query(store, cohort_query, args.repeat):>32.2f}"
+                              for cohort_query in QUERIES.values())
+            print(f"{copies:>8}{len(writer.patients):>10}{len(writer):>10}{ingest_seconds:>12.2f}"
+                  f"{directory_size(store.path) / 1e6:>11.2f}{timings}")
+
+        # The original patients only: the store versus per-patient FHIR searches.
+        store = AnalyticsStore(os.path.join(work_dir, "store-original"))
+        build_store(store, resources, ["mock-data"])
+        cohort_query = QUERIES["glucose > 90"]
+        start = time.perf_counter()
+        store_cohort = {patient.patient_id for patient in store.query(cohort_query).patients}
+        store_ms = (time.perf_counter() - start) * 1000
+        fhir_server = AsyncFHIRClient(f"http://127.0.0.1:{args.port}/fhir")
+        start = time.perf_counter()
+        search_cohort = await fhir_search_cohort(fhir_server, patient_ids)
+        search_ms = (time.perf_counter() - start) * 1000
+        print(f"\n{len(patient_ids)} patients, latency {args.latency * 1000:.0f}ms, cohort 'glucose > 90': "
+              f"store {store_ms:.2f}ms ({len(store_cohort)} patients), per-patient FHIR searches {search_ms:.1f}ms "
+              f"({len(search_cohort)} patients)")
+        identical = store_cohort == search_cohort
+        if not identical:
+            print(f"COHORT MISMATCH store={sorted(store_cohort)} searches={sorted(search_cohort)}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        await fhir_client.close()
+        await runner.cleanup()
+    return identical
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", default="1,10,100", help="Comma-separated replication factors of the mock data.")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query; the median is reported.")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark of multi-resource patient searches as separate requests versus one FHIR `batch` Bundle.
+
+Starts `stubs/fhir_stub.py` in-process with a per-response latency and, for every mock patient, runs one search per
+resource type sequentially, concurrently (`asyncio.gather`) and as a single batch via `FHIRTools.execute_batch`,
+reporting wall time and the number of HTTP requests the stub received.
+
+Run from the `backend/app` directory (so that `.env` is picked up):
+    python ../benchmarks/fhir_batch_benchmark.py --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs"))
+
+from fhirpy import AsyncFHIRClient  # noqa: E402
+
+from business.clients.fhir_client import fhir_client  # noqa: E402
+from business.schemas.fhir_search_query import FHIRSearchQuery  # noqa: E402
+from business.tools.fhir_tools import FHIRTools  # noqa: E402
+from fhir_stub import create_app  # noqa: E402
+
+RESOURCE_TYPES = ["Condition", "Encounter", "MedicationRequest", "AllergyIntolerance", "Immunization"]
+
+
+async def run(args):
+    app = create_app(latency=args.latency)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    stub = app["stub"]
+    fhir_tools = FHIRTools(AsyncFHIRClient(f"http://127.0.0.1:{args.port}/fhir"), snapshot_cache=None)
+    patient_ids = [resource["id"] for resource in stub.resources if resource["resourceType"] == "Patient"]
+
+    async def sequential(search_queries):
+        return [await fhir_tools.execute_search(search_query) for search_query in search_queries]
+
+    async def concurrent(search_queries):
+        return await asyncio.gather(*(fhir_tools.execute_search(search_query) for search_query in search_queries))
+
+    strategies = {"sequential": sequential, "concurrent": concurrent, "batch": fhir_tools.execute_batch}
+    print(f"{len(patient_ids)} patients x {len(RESOURCE_TYPES)} resource types, latency {args.latency * 1000:.0f}ms")
+    print(f"{'strategy':<14}{'ms / patient':>14}{'requests / patient':>20}{'resources':>11}")
+    for label, strategy in strategies.items():
+        stub.requests.clear()
+        resources = 0
+        start = time.perf_counter()
+        for patient_id in patient_ids:
+            search_queries = [FHIRSearchQuery(resource_type=resource_type, params={"patient": [patient_id]})
+                              for resource_type in RESOURCE_TYPES]
+            resources += sum(len(result) for result in await strategy(search_queries))
+        elapsed_ms = (time.perf_counter() - start) * 1000 / len(patient_ids)
+        requests = sum(stub.requests.values()) / len(patient_ids)
+        print(f"{label:<14}{elapsed_ms:>14.1f}{requests:>20.1f}{resources:>11}")
+
+    await fhir_client.close()
+    await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency", type=float, default=0.05)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
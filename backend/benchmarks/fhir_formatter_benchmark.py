@@ -0,0 +1,66 @@
+"""
+Benchmark of the rule-based FHIR formatter on the Synthea mock bundles.
+
+For every bundle in `infrastructure/hapi-fhir-server/mock-data`, and for each supported resource type on its own,
+compares the compact JSON the LLM formatter agent would receive with the rule-based summary: size in characters,
+estimated tokens (~4 characters per token) and summarization latency. No Bedrock or FHIR calls are made.
+
+Run from the `backend/app` directory (so that `.env` is picked up):
+    python ../benchmarks/fhir_formatter_benchmark.py --iterations 20
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from business.mappers.fhir_summary_mapper import SUMMARIZERS, as_fhir_resources, summarize_fhir_resources  # noqa: E402
+
+MOCK_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "infrastructure",
+                             "hapi-fhir-server", "mock-data")
+
+CHARS_PER_TOKEN = 4
+
+
+def measure(resources: list, iterations: int):
+    raw = json.dumps(resources, separators=(",", ":"))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        summary = summarize_fhir_resources(resources)
+    elapsed_ms = (time.perf_counter() - start) / iterations * 1000
+    return len(raw), len(summary), elapsed_ms
+
+
+def print_row(label: str, count: int, raw_chars: int, summary_chars: int, elapsed_ms: float):
+    print(f"{label:<44}{count:>10}{raw_chars // CHARS_PER_TOKEN:>12}{summary_chars // CHARS_PER_TOKEN:>16}"
+          f"{raw_chars / max(summary_chars, 1):>8.1f}x{elapsed_ms:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=MOCK_DATA_DIR)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    bundles = {}
+    for path in sorted(glob.glob(os.path.join(args.data_dir, "*.json"))):
+        with open(path) as bundle_file:
+            bundles[os.path.basename(path).split("_")[0]] = as_fhir_resources(json.load(bundle_file))
+
+    print(f"{'input':<44}{'resources':>10}{'raw tokens':>12}{'summary tokens':>16}{'ratio':>9}{'time (ms)':>12}")
+    for name, resources in bundles.items():
+        print_row(name, len(resources), *measure(resources, args.iterations))
+
+    print()
+    all_resources = [resource for resources in bundles.values() for resource in resources]
+    for resource_type in SUMMARIZERS:
+        resources = [resource for resource in all_resources if resource["resourceType"] == resource_type]
+        if resources:
+            print_row(f"all bundles: {resource_type}", len(resources), *measure(resources, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
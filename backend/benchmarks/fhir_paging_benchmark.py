@@ -0,0 +1,103 @@
+"""
+Benchmark and completeness check of paged FHIR searches against the local paging FHIR stub.
+
+Starts `stubs/fhir_stub.py` in-process with a per-response latency. For every mock patient it searches each resource
+type with a small page size and compares fhirpy's `fetch()` (first page only) with `FHIRSearchIterator` with and
+without next-page prefetching, while the consumer spends `--process-ms` on every resource. Exits non-zero if the
+iterator does not return every matching resource.
+
+Run from the `backend/app` directory (so that `.env` is picked up):
+    python ../benchmarks/fhir_paging_benchmark.py --latency 0.02 --page-size 20 --process-ms 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs"))
+
+from fhirpy import AsyncFHIRClient  # noqa: E402
+
+from business.clients.fhir_client import fhir_client  # noqa: E402
+from business.tools.fhir_search_iterator import FHIRSearchIterator  # noqa: E402
+from fhir_stub import create_app, patient_id_of  # noqa: E402
+
+RESOURCE_TYPES = ["Observation", "Encounter", "Immunization", "Procedure", "Condition"]
+
+
+async def consume(search: FHIRSearchIterator, process_seconds: float) -> int:
+    count = 0
+    async for _ in search:
+        count += 1
+        if process_seconds:
+            await asyncio.sleep(process_seconds)
+    return count
+
+
+async def run(args):
+    app = create_app(latency=args.latency)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    stub = app["stub"]
+    fhir_server = AsyncFHIRClient(f"http://127.0.0.1:{args.port}/fhir")
+    patient_ids = [resource["id"] for resource in stub.resources if resource["resourceType"] == "Patient"]
+    process_seconds = args.process_ms / 1000
+
+    totals = {"first page": 0, "iterator": 0, "iterator + prefetch": 0}
+    times = dict.fromkeys(totals, 0.0)
+    expected_total = 0
+    complete = True
+    for patient_id in patient_ids:
+        for resource_type in RESOURCE_TYPES:
+            expected = sum(1 for resource in stub.resources
+                           if resource["resourceType"] == resource_type and patient_id_of(resource) == patient_id)
+            expected_total += expected
+
+            start = time.perf_counter()
+            first_page = await fhir_server.resources(resource_type).search(patient=patient_id).limit(
+                args.page_size).fetch()
+            for _ in first_page:
+                await asyncio.sleep(process_seconds)
+            times["first page"] += time.perf_counter() - start
+            totals["first page"] += len(first_page)
+
+            for label, prefetch in (("iterator", False), ("iterator + prefetch", True)):
+                search = FHIRSearchIterator(fhir_server, resource_type, {"patient": patient_id},
+                                            page_size=args.page_size, prefetch=prefetch)
+                start = time.perf_counter()
+                count = await consume(search, process_seconds)
+                times[label] += time.perf_counter() - start
+                totals[label] += count
+                if count != expected:
+                    complete = False
+                    print(f"MISMATCH {label} {resource_type} {patient_id}: {count} != {expected}")
+
+    print(f"{len(patient_ids)} patients x {len(RESOURCE_TYPES)} types, {expected_total} matching resources, "
+          f"page size {args.page_size}, latency {args.latency * 1000:.0f}ms, processing {args.process_ms}ms/resource")
+    print(f"{'strategy':<22}{'resources':>10}{'complete':>10}{'time (s)':>10}")
+    for label in totals:
+        print(f"{label:<22}{totals[label]:>10}{str(totals[label] == expected_total):>10}{times[label]:>10.2f}")
+
+    await fhir_client.close()
+    await runner.cleanup()
+    return complete
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--process-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
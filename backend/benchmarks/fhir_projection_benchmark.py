@@ -0,0 +1,101 @@
+"""
+Benchmark of FHIR projection: response bytes and prompt tokens of full versus projected searches.
+
+Starts `stubs/fhir_stub.py` in-process and, for every mock patient and resource type, searches with
+`FHIRSearchIterator` three ways: without projection, with server-side `_elements`/`_summary` and with a stub that
+ignores them so only the client-side stripping applies. Reports response bytes, the compact JSON the LLM agents would
+receive (estimated tokens, ~4 characters per token) and wall time. Exits non-zero if projection changes the
+rule-based summary of any search.
+
+Run from the `backend/app` directory (so that `.env` is picked up):
+    python ../benchmarks/fhir_projection_benchmark.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs"))
+
+from fhirpy import AsyncFHIRClient  # noqa: E402
+
+from business.clients.fhir_client import fhir_client  # noqa: E402
+from business.mappers.fhir_summary_mapper import summarize_fhir_resources  # noqa: E402
+from business.tools.fhir_projection import PROJECTION_PROFILES  # noqa: E402
+from business.tools.fhir_search_iterator import FHIRSearchIterator  # noqa: E402
+from fhir_stub import create_app  # noqa: E402
+
+CHARS_PER_TOKEN = 4
+# Projected with `_summary=data` rather than a profile.
+UNPROFILED_RESOURCE_TYPES = ["CareTeam", "Goal"]
+
+# label -> (stub honours `_elements`/`_summary`, iterator applies projection)
+STRATEGIES = {
+    "full": (True, False),
+    "server-side": (True, True),
+    "client stripping": (False, True),
+}
+
+
+async def run(args):
+    app = create_app(latency=args.latency)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+
+    stub = app["stub"]
+    fhir_server = AsyncFHIRClient(f"http://127.0.0.1:{args.port}/fhir")
+    patient_ids = [resource["id"] for resource in stub.resources if resource["resourceType"] == "Patient"]
+    resource_types = list(PROJECTION_PROFILES) + UNPROFILED_RESOURCE_TYPES
+
+    print(f"{len(patient_ids)} patients, latency {args.latency * 1000:.0f}ms")
+    print(f"{'resource type':<22}{'strategy':<20}{'resources':>10}{'response KB':>13}{'prompt tokens':>15}"
+          f"{'ratio':>8}{'time (ms)':>11}")
+    identical = True
+    for resource_type in resource_types:
+        full_summaries = {}
+        full_tokens = 0
+        for label, (honor_projection, projection) in STRATEGIES.items():
+            stub.honor_projection = honor_projection
+            resources = bytes_read = chars = 0
+            start = time.perf_counter()
+            for patient_id in patient_ids:
+                search = FHIRSearchIterator(fhir_server, resource_type, {"patient": patient_id},
+                                            projection=projection)
+                fetched = await search.collect()
+                resources += len(fetched)
+                bytes_read += search.bytes_read
+                chars += len(json.dumps(fetched, separators=(",", ":")))
+
+                summary = summarize_fhir_resources(fetched)
+                if not projection:
+                    full_summaries[patient_id] = summary
+                elif summary != full_summaries[patient_id]:
+                    identical = False
+                    print(f"SUMMARY MISMATCH {label} {resource_type} {patient_id}")
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            tokens = chars // CHARS_PER_TOKEN
+            full_tokens = full_tokens or tokens
+            print(f"{resource_type:<22}{label:<20}{resources:>10}{bytes_read / 1024:>13.1f}{tokens:>15}"
+                  f"{full_tokens / max(tokens, 1):>7.1f}x{elapsed_ms:>11.1f}")
+
+    await fhir_client.close()
+    await runner.cleanup()
+    return identical
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
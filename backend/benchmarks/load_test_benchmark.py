@@ -0,0 +1,234 @@
+"""
+Offline load test of the medical QA WebSockets, end to end through the real application.
+
+Starts the FHIR stub (serving the Synthea mock bundles) and the PubMed E-utilities stub in-process, then the
+application itself with uvicorn in a subprocess where Bedrock is replaced by `stubs/fake_chat_model.py`, which answers
+with a configurable time to first token and token rate. `--clients` concurrent WebSocket clients each send
+`--queries` questions one after another, to the general and patient endpoints in `NORMAL` and `STREAM` modes; patient
+clients are spread over the mock patients. Reports per endpoint and mode the completed and failed queries, the
+throughput, and the p50/p95/p99 of the answer latency and, in `STREAM` mode, of the time to the first answer chunk.
+
+Run from the `backend/app` directory (so that `.env` is picked up):
+    python ../benchmarks/load_test_benchmark.py --clients 16 --queries 5 --ttft 0.5 --tokens-per-second 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs"))
+
+import aiohttp  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+import eutils_stub  # noqa: E402
+import fhir_stub  # noqa: E402
+
+ENDPOINTS = ("general", "patient")
+MODES = ("NORMAL", "STREAM")
+TOPICS = ["hypertension", "type 2 diabetes", "heart failure", "asthma", "chronic kidney disease", "sepsis"]
+
+
+class QueryResult:
+    def __init__(self, latency: float, ttft: Optional[float], error: Optional[str]):
+        self.latency = latency
+        self.ttft = ttft
+        self.error = error
+
+
+def doctor_query(content: str) -> dict:
+    return {"id": uuid.uuid4().hex, "role": "USER", "content": content,
+            "created_at": datetime.now(timezone.utc).isoformat()}
+
+
+def query_content(endpoint: str, mode: str, client: int, index: int) -> str:
+    """A question no other client or scenario asks, so that no cache or coalescing answers it."""
+    topic = TOPICS[(client + index) % len(TOPICS)]
+    if endpoint == "general":
+        return f"What is the first-line management of {topic} in adults? ({mode} client {client}, question {index})"
+    return f"Which of this patient's active conditions and medications relate to {topic}? ({mode} {client}-{index})"
+
+
+async def ask(websocket: aiohttp.ClientWebSocketResponse, mode: str, content: str) -> QueryResult:
+    """Send one question and wait for its answer: the JSON response, or the final `generation` stage event."""
+    query = doctor_query(content)
+    started_at = time.perf_counter()
+    ttft = None
+    await websocket.send_json(query)
+    async for message in websocket:
+        if message.type != aiohttp.WSMsgType.TEXT:
+            break
+        elapsed = time.perf_counter() - started_at
+        if mode == "NORMAL":
+            data = json.loads(message.data)
+            if data.get("event") == "error":
+                return QueryResult(elapsed, None, data.get("detail"))
+            if "event" not in data:
+                return QueryResult(elapsed, None, None)
+            continue
+        body = message.data.split("\n", 1)[1] if message.data.startswith("id: ") else message.data
+        if body.startswith("data: "):
+            ttft = elapsed if ttft is None else ttft
+        elif body.startswith("event: error"):
+            return QueryResult(elapsed, ttft, body)
+        elif body.startswith("event: stage") and '"stage": "generation"' in body:
+            return QueryResult(elapsed, ttft, None)
+    return QueryResult(time.perf_counter() - started_at, ttft, "connection closed")
+
+
+async def run_client(session: aiohttp.ClientSession, url: str, endpoint: str, mode: str, client: int,
+                     queries: int) -> List[QueryResult]:
+    results = []
+    try:
+        async with session.ws_connect(url, max_msg_size=0) as websocket:
+            for index in range(queries):
+                results.append(await ask(websocket, mode, query_content(endpoint, mode, client, index)))
+    except aiohttp.ClientError as e:
+        results.append(QueryResult(0.0, None, repr(e)))
+    return results
+
+
+def endpoint_url(args, endpoint: str, mode: str, patient_id: str) -> str:
+    base = f"ws://127.0.0.1:{args.port}/api/v1/medical-qa-assistant"
+    if endpoint == "general":
+        return f"{base}/general/ws?response_mode={mode}"
+    return f"{base}/patient/{patient_id}/ws?response_mode={mode}"
+
+
+def percentiles(values: List[float]) -> List[str]:
+    if not values:
+        return ["-"] * 3
+    if len(values) == 1:
+        return [f"{values[0] * 1000:.0f}"] * 3
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return [f"{cuts[index] * 1000:.0f}" for index in (49, 94, 98)]
+
+
+async def run_scenario(args, session: aiohttp.ClientSession, endpoint: str, mode: str, patient_ids: List[str]):
+    # One unmeasured query first, so that connection pools and agent graphs are warm.
+    await run_client(session, endpoint_url(args, endpoint, mode, patient_ids[0]), endpoint, mode, -1, 1)
+
+    started_at = time.perf_counter()
+    client_results = await asyncio.gather(*(
+        run_client(session, endpoint_url(args, endpoint, mode, patient_ids[client % len(patient_ids)]), endpoint,
+                   mode, client, args.queries)
+        for client in range(args.clients)))
+    wall_time = time.perf_counter() - started_at
+
+    results = [result for results in client_results for result in results]
+    completed = [result for result in results if result.error is None]
+    errors = [result.error for result in results if result.error is not None]
+    latency = percentiles([result.latency for result in completed])
+    ttft = percentiles([result.ttft for result in completed if result.ttft is not None])
+    print(f"{endpoint:<9}{mode:<8}{len(completed):>6}{len(errors):>7}{len(completed) / wall_time:>8.2f}"
+          f"{latency[0]:>9}{latency[1]:>9}{latency[2]:>9}{ttft[0]:>9}{ttft[1]:>9}{ttft[2]:>9}")
+    for error in sorted(set(errors))[:3]:
+        print(f"    error: {error}")
+
+
+async def wait_until_healthy(args, server: subprocess.Popen):
+    url = f"http://127.0.0.1:{args.port}/api/v1/healthy"
+    async with aiohttp.ClientSession() as session:
+        for _ in range(int(args.startup_timeout / 0.2)):
+            if server.poll() is not None:
+                raise RuntimeError(f"Application exited with code {server.returncode}; see --server-log")
+            try:
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Application did not become healthy within {args.startup_timeout}s")
+
+
+async def start_stub(app: web.Application, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+async def load_test(args):
+    fhir_app = fhir_stub.create_app(latency=args.fhir_latency)
+    patient_ids = [resource["id"] for resource in fhir_app["stub"].resources if resource["resourceType"] == "Patient"]
+    runners = [await start_stub(fhir_app, args.fhir_port),
+               await start_stub(eutils_stub.create_app(args.pubmed_latency), args.pubmed_port)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ,
+                   FHIR_CLIENT_API_BASE=f"http://127.0.0.1:{args.fhir_port}/fhir",
+                   RETRIEVER_BACKEND="eutils",
+                   RETRIEVER_BASE_URL=f"http://127.0.0.1:{args.pubmed_port}/entrez/eutils",
+                   FHIR_ANALYTICS_STORE_PATH=os.path.join(directory, "fhir_analytics"),
+                   CACHE_SQLITE_PATH=os.path.join(directory, "cache.sqlite3"))
+        server_log = open(args.server_log, "w") if args.server_log else subprocess.DEVNULL
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", *sys.argv[1:]], env=env,
+                                  stdout=server_log, stderr=subprocess.STDOUT)
+        try:
+            await wait_until_healthy(args, server)
+            print(f"{args.clients} clients x {args.queries} queries, fake model TTFT {args.ttft}s at "
+                  f"{args.tokens_per_second} tokens/s ({args.answer_tokens} answer, {args.agent_tokens} agent tokens), "
+                  f"{len(patient_ids)} mock patients")
+            print(f"{'endpoint':<9}{'mode':<8}{'done':>6}{'errors':>7}{'QPS':>8}{'p50 ms':>9}{'p95 ms':>9}"
+                  f"{'p99 ms':>9}{'TTFT p50':>9}{'p95':>9}{'p99':>9}")
+            async with aiohttp.ClientSession() as session:
+                for endpoint in args.endpoints:
+                    for mode in args.modes:
+                        await run_scenario(args, session, endpoint, mode, patient_ids)
+        finally:
+            server.terminate()
+            server.wait()
+            if args.server_log:
+                server_log.close()
+            for runner in runners:
+                await runner.cleanup()
+
+
+def serve(args):
+    """Run the application with the fake chat model; this is the subprocess started by `load_test`."""
+    import uvicorn
+
+    import fake_chat_model
+
+    fake_chat_model.install(args.ttft, args.tokens_per_second, args.answer_tokens, args.agent_tokens)
+    uvicorn.run("main:app", host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent WebSocket clients per scenario.")
+    parser.add_argument("--queries", type=int, default=5, help="Questions each client asks, one after another.")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--ttft", type=float, default=0.5, help="Fake model time to first token, in seconds.")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0, help="Fake model output token rate.")
+    parser.add_argument("--answer-tokens", type=int, default=200, help="Tokens of every final answer.")
+    parser.add_argument("--agent-tokens", type=int, default=40, help="Tokens of every FHIR agent answer.")
+    parser.add_argument("--fhir-latency", type=float, default=0.02, help="FHIR stub latency per request.")
+    parser.add_argument("--pubmed-latency", type=float, default=0.05, help="E-utilities stub latency per request.")
+    parser.add_argument("--port", type=int, default=8090, help="Port of the application under test.")
+    parser.add_argument("--fhir-port", type=int, default=8092)
+    parser.add_argument("--pubmed-port", type=int, default=8091)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--server-log", help="File receiving the application's output (discarded by default).")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+    else:
+        asyncio.run(load_test(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark of the logging overhead of one streamed patient QA request.
+
+Replays the log calls of a request (doctor query, translator output, the retrieved FHIR resources of the largest
+Synthea mock patient, formatter summary, template variables, `--chunks` streamed chunks and the response) in two
+styles: `eager`, the f-string calls the orchestrator used to make (every payload formatted in full and every chunk
+logged), and `lazy`, the current calls with `config.logger.payload` summaries and stream sampling, set up by
+`setup_logging` with redaction. Each style runs at `DEBUG` and `INFO`, with the sink written inline or enqueued to a
+background thread, into a file that takes `--sink-latency` seconds per record, like a stdout pipe the container
+runtime is slow to drain. Requests are `--request-interval` seconds apart, untimed, as they would be in production;
+loguru's queue is a pipe, so back-to-back requests that log faster than the sink drains block the caller anyway.
+Reports the time the caller (the event loop) spends logging per request and the bytes written per request.
+
+Run from the `backend/app` directory (so that `.env` is picked up):
+    python ../benchmarks/logging_benchmark.py --requests 50 --chunks 200 --sink-latency 0.001
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs"))
+
+from loguru import logger  # noqa: E402
+
+from business.mappers.fhir_summary_mapper import summarize_fhir_resources  # noqa: E402
+from business.schemas.fhir_translator_agent import FHIRTranslatorAgentOutput  # noqa: E402
+from config import logger as logging_config  # noqa: E402
+from config.logger import payload, setup_logging  # noqa: E402
+from config.settings import get_settings  # noqa: E402
+from fhir_stub import MOCK_DATA_DIR, load_resources, patient_id_of  # noqa: E402
+
+settings = get_settings()
+
+
+class SlowSink:
+    """File sink that blocks for `latency` seconds per record."""
+
+    def __init__(self, file, latency: float):
+        """Initialize SlowSink configuration."""
+        self.file = file
+        self.latency = latency
+
+    def write(self, message: str):
+        if self.latency:
+            time.sleep(self.latency)
+        self.file.write(message)
+
+    def flush(self):
+        self.file.flush()
+
+
+def request_values(chunks: int) -> dict:
+    by_patient = {}
+    for resource in load_resources(MOCK_DATA_DIR):
+        by_patient.setdefault(patient_id_of(resource), []).append(resource)
+    resources = max((resources for patient_id, resources in by_patient.items() if patient_id), key=len)
+    summary = summarize_fhir_resources(resources)
+    query = "Which of this patient's active conditions and medications relate to their hypertension?"
+    translator_output = FHIRTranslatorAgentOutput(
+        intent="Review the patient's active conditions and medications.", entities={"patient": "1234"},
+        ambiguities=[], fhir_query="Condition?patient=1234&clinical-status=active")
+    chunk_texts = [f"token{index} " for index in range(chunks)]
+    return {"query": query, "translator_output": translator_output, "resources": resources, "summary": summary,
+            "template_vars": {"doctor_query": query, "formatted_fhir_data": summary, "intent": translator_output.intent},
+            "chunks": chunk_texts, "response": "".join(chunk_texts)}
+
+
+def log_eager(values: dict):
+    logger.info(f"OrchestratorService, patient_medical_qa_chat_stream, doctor_query: {values['query']}")
+    logger.info(f"FHIRTranslatorAgentOutput: {values['translator_output']}")
+    logger.info(f"FHIRRetrieverAgentOutput: {values['resources']}")
+    logger.info(f"FHIRFormatterAgentOutput: {values['summary']}")
+    logger.debug(f"Medical QA Template Variables: {values['template_vars']}")
+    for chunk in values["chunks"]:
+        content = chunk.replace("\n", "<br>")
+        logger.debug(f"Streamed content: {content}")
+    logger.debug(f"Response: {values['response']}")
+
+
+def log_lazy(values: dict):
+    logger.info("OrchestratorService, patient_medical_qa_chat_stream, doctor_query {}: {}", "q1",
+                payload(values["query"]))
+    logger.info("FHIRTranslatorAgentOutput: {}", payload(values["translator_output"]))
+    logger.info("FHIRRetrieverAgentOutput: {}", payload(values["resources"]))
+    logger.info("FHIRFormatterAgentOutput: {}", payload(values["summary"]))
+    logger.debug("Medical QA Template Variables: {}", payload(values["template_vars"]))
+    for chunk in values["chunks"]:
+        content = chunk.replace("\n", "<br>")
+        if logging_config.stream_log_sampler.sample():
+            logger.debug("Streamed content: {}", payload(content))
+    logger.debug("Response: {}", payload(values["response"]))
+
+
+def run(values: dict, style: str, level: str, enqueue: bool, args, directory: str):
+    path = os.path.join(directory, f"{style}-{level}-{enqueue}.log")
+    settings.LOG_LEVEL, settings.LOG_ENQUEUE = level, enqueue
+    # The eager style is the logging as it was: no redaction.
+    settings.LOG_REDACT = style == "lazy"
+    log = log_lazy if style == "lazy" else log_eager
+    with open(path, "w") as file:
+        setup_logging(SlowSink(file, args.sink_latency))
+        caller_time = 0.0
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            log(values)
+            caller_time += time.perf_counter() - start
+            # Spin rather than sleep between requests, so that the CPU stays as busy as a loaded server's.
+            idle_until = time.perf_counter() + args.request_interval
+            while time.perf_counter() < idle_until:
+                pass
+        caller_ms = caller_time / args.requests * 1000
+        # Waits for the enqueued records to be written.
+        logger.remove()
+    size = os.path.getsize(path) / args.requests
+    print(f"{style:<7}{level:<7}{'enqueued' if enqueue else 'inline':<10}{caller_ms:>12.3f}{size / 1024:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="Requests replayed per configuration.")
+    parser.add_argument("--chunks", type=int, default=200, help="Streamed chunks per request.")
+    parser.add_argument("--sink-latency", type=float, default=0.001, help="Seconds the sink blocks per record.")
+    parser.add_argument("--request-interval", type=float, default=0.05, help="Untimed seconds between requests.")
+    args = parser.parse_args()
+
+    values = request_values(args.chunks)
+    print(f"{len(values['resources'])} FHIR resources, {args.chunks} chunks per request, stream sampling 1 in "
+          f"{settings.LOG_STREAM_SAMPLE_EVERY}, sink latency {args.sink_latency * 1e6:.0f} us per record")
+    print(f"{'style':<7}{'level':<7}{'sink':<10}{'caller (ms)':>12}{'KB written':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for style in ("eager", "lazy"):
+            for level in ("DEBUG", "INFO"):
+                for enqueue in (False, True):
+                    run(values, style, level, enqueue, args, directory)
+
+
+if __name__ == "__main__":
+    main()
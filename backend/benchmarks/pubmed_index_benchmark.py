@@ -0,0 +1,96 @@
+"""
+Benchmark of local PubMed BM25 index query latency against index size.
+
+Builds synthetic abstract corpora of increasing size (Zipf-distributed vocabulary, split over several segments as
+daily ingests would produce) in a temporary directory and reports build time, on-disk size and query latency.
+
+    python ../benchmarks/pubmed_index_benchmark.py --sizes 10000 100000 500000 --queries 200
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from business.index.bm25_index import BM25Index, SegmentWriter  # noqa: E402
+from business.index.pubmed_index import indexed_text  # noqa: E402
+
+VOCABULARY_SIZE = 50000
+ABSTRACT_WORDS = 180
+TITLE_WORDS = 12
+
+
+def build_vocabulary(rng: np.random.Generator):
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    return ["".join(rng.choice(letters, size=rng.integers(4, 12))) for _ in range(VOCABULARY_SIZE)]
+
+
+def zipf_words(rng: np.random.Generator, vocabulary, count: int):
+    ranks = np.minimum(rng.zipf(1.2, size=count), len(vocabulary)) - 1
+    return [vocabulary[rank] for rank in ranks]
+
+
+def build_index(path: str, size: int, segments: int, vocabulary, rng: np.random.Generator) -> float:
+    start = time.perf_counter()
+    index = BM25Index(path)
+    per_segment = size // segments
+    pmid = 1
+    for _ in range(segments):
+        writer = SegmentWriter()
+        for _ in range(per_segment):
+            stored = {
+                "page_content": " ".join(zipf_words(rng, vocabulary, ABSTRACT_WORDS)),
+                "metadata": {"uid": str(pmid), "Title": " ".join(zipf_words(rng, vocabulary, TITLE_WORDS)),
+                             "Published": "2024-01-01", "Copyright Information": ""},
+            }
+            writer.add(pmid, indexed_text(stored), stored)
+            pmid += 1
+        index.add_segment(writer)
+    index.close()
+    return time.perf_counter() - start
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--segments", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    vocabulary = build_vocabulary(rng)
+    queries = [" ".join(zipf_words(rng, vocabulary[:5000], int(rng.integers(3, 9)))) for _ in range(args.queries)]
+
+    print(f"{'documents':>10}{'build (s)':>11}{'disk (MB)':>11}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}")
+    for size in args.sizes:
+        path = tempfile.mkdtemp(prefix="pubmed-index-")
+        try:
+            build_seconds = build_index(path, size, args.segments, vocabulary, rng)
+            index = BM25Index(path)
+            index.open()
+            index.search(queries[0], args.top_k)
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                index.search(query, args.top_k)
+                latencies.append((time.perf_counter() - start) * 1000)
+            index.close()
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            print(f"{size:>10}{build_seconds:>11.1f}{directory_size(path) / 2 ** 20:>11.1f}"
+                  f"{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}")
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark of the local CPU reranker of PubMed results (`business.index.bm25_reranker`).
+
+Measures rerank latency per candidate batch size on synthetic abstracts of PubMed length (~250 words), where each
+batch hides a few articles about the queried topic at random positions. Reports the median latency per batch and
+per candidate, and how many of the topical articles the reranked top K holds versus the retrieval order.
+Then times a full retrieval against `stubs/eutils_stub.py` (started in-process) without over-fetching and with
+over-fetching plus reranking, to show the cost of the larger `efetch`.
+
+Run from the `backend/app` directory (so that `.env` is picked up):
+    python ../benchmarks/rerank_benchmark.py --batches 10,50,100,200 --top-k 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs"))
+
+from langchain_core.documents import Document  # noqa: E402
+
+from business.index.bm25_reranker import rerank  # noqa: E402
+
+QUERY = "anticoagulation for stroke prevention in atrial fibrillation"
+TOPIC_WORDS = "anticoagulation stroke prevention atrial fibrillation apixaban warfarin".split()
+FILLER_WORDS = ("patients outcomes cohort randomized trial therapy risk clinical adults mortality hospital treatment "
+                "analysis follow-up baseline dose adverse events diabetes hypertension renal cardiac pulmonary "
+                "infection quality life cost imaging biomarker surgery").split()
+
+
+def synthetic_documents(count: int, rng: random.Random, topical: int):
+    topical_ranks = set(rng.sample(range(count), min(topical, count)))
+    documents = []
+    for rank in range(count):
+        words = rng.choices(FILLER_WORDS, k=250)
+        if rank in topical_ranks:
+            for position in rng.sample(range(250), 12):
+                words[position] = rng.choice(TOPIC_WORDS)
+        documents.append(Document(page_content=" ".join(words).capitalize() + ".", metadata={
+            "uid": str(30000000 + rank), "Title": f"Study {rank}", "Topical": rank in topical_ranks}))
+    return documents
+
+
+def topical_in(documents) -> int:
+    return sum(1 for document in documents if document.metadata["Topical"])
+
+
+async def retrieval_latency(args):
+    """Median retrieval latency from the E-utilities stub, fetching `top_k` versus `candidates` and reranking."""
+    from eutils_stub import create_app
+    from business.clients.pubmed_eutils_client import pubmed_eutils_client
+
+    runner = web.AppRunner(create_app(args.latency))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+    pubmed_eutils_client.base_url = f"http://127.0.0.1:{args.port}/entrez/eutils"
+    pubmed_eutils_client.initialize()
+    pubmed_eutils_client.rate_limiter.rate = pubmed_eutils_client.rate_limiter.capacity = 1000.0
+    try:
+        for label, fetched, reranked in (("top k only", args.top_k, False),
+                                         (f"over-fetch {args.candidates} + rerank", args.candidates, True)):
+            timings = []
+            for iteration in range(args.iterations):
+                start = time.perf_counter()
+                documents = await pubmed_eutils_client.search(f"{QUERY} {iteration}", fetched)
+                if reranked:
+                    rerank(QUERY, documents, args.top_k)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{label:<32}{statistics.median(timings):>12.1f}")
+    finally:
+        await pubmed_eutils_client.close()
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", default="10,50,100,200", help="Comma-separated candidate batch sizes.")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=50, help="Over-fetched candidates in the stub run.")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05, help="E-utilities stub latency per request.")
+    args = parser.parse_args()
+
+    print(f"{'candidates':>10}{'median (ms)':>13}{'per doc (us)':>14}{'topical in top k (retrieval)':>30}"
+          f"{'topical in top k (reranked)':>29}")
+    for batch in [int(batch) for batch in args.batches.split(",")]:
+        documents = synthetic_documents(batch, random.Random(batch), args.top_k)
+        timings = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            reranked = rerank(QUERY, documents, args.top_k)
+            timings.append(time.perf_counter() - start)
+        median = statistics.median(timings)
+        print(f"{batch:>10}{median * 1000:>13.2f}{median / batch * 1e6:>14.1f}"
+              f"{topical_in(documents[:args.top_k]):>30}{topical_in(reranked):>29}")
+
+    print(f"\n{'retrieval from the E-utilities stub':<32}{'median (ms)':>12}")
+    asyncio.run(retrieval_latency(args))
+
+
+if __name__ == "__main__":
+    main()
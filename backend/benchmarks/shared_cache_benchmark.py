@@ -0,0 +1,155 @@
+"""
+Benchmark of the shared cache (`business.cache.shared_cache`) and its backends.
+
+First reports the serialized size and encode/decode time of typical values: PubMed `Document` lists, the Synthea
+mock patients' Observation searches (via `stubs/fhir_stub.py`'s loader, as fhirpy resources) and an LLM answer.
+Then simulates gunicorn workers: each worker has its own in-process tiers (its own `SharedCache`) and serves the same
+skewed stream of repeated PubMed queries, with `memory`, `sqlite` and `redis` (`stubs/redis_stub.py`, started
+in-process) backends. Reports how many lookups had to go to PubMed (misses) across all workers and the median lookup
+latency of in-process hits and shared-tier hits.
+
+Run from the `backend/app` directory (so that `.env` is picked up):
+    python ../benchmarks/shared_cache_benchmark.py --workers 4 --queries 200 --requests 1000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs"))
+
+from fhirpy import AsyncFHIRClient  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+
+from business.cache.cache_backends import RedisCacheBackend, SQLiteCacheBackend  # noqa: E402
+from business.cache.shared_cache import DocumentsCodec, JSONCodec, SharedCache  # noqa: E402
+from fhir_stub import MOCK_DATA_DIR, load_resources  # noqa: E402
+from redis_stub import start_server  # noqa: E402
+
+ABSTRACT = ("BACKGROUND: Outcomes of heart failure remain variable across care settings. METHODS: We analysed a cohort "
+            "of 512 adults with heart failure treated with SGLT2 inhibitors. RESULTS: Guideline-directed therapy "
+            "reduced hospitalization by 23% (95% CI 15-30%). CONCLUSIONS: Early treatment improves outcomes.")
+VOCABULARY = ABSTRACT.split() + [str(number) for number in range(100)]
+
+
+def pubmed_documents(count: int, seed: int):
+    """Abstracts of PubMed length (~250 words) drawn from a small vocabulary, different for every article."""
+    rng = random.Random(seed)
+    return [Document(page_content=" ".join(rng.choices(VOCABULARY, k=250)), metadata={
+        "uid": str(30000000 + seed * 100 + rank), "Title": f"Heart failure outcomes study {seed}-{rank}",
+        "Published": "2023-05-01", "Copyright Information": "Copyright 2023 Stub Publisher."})
+        for rank in range(count)]
+
+
+def time_codec(codec, value, iterations: int):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        data = codec.encode(value)
+    encode_us = (time.perf_counter() - start) / iterations * 1e6
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.decode(data)
+    decode_us = (time.perf_counter() - start) / iterations * 1e6
+    return len(data), encode_us, decode_us
+
+
+def codec_report(args):
+    fhir_server = AsyncFHIRClient("http://127.0.0.1/fhir")
+    observations = {}
+    for resource in load_resources(MOCK_DATA_DIR):
+        if resource["resourceType"] == "Observation":
+            patient_id = resource["subject"]["reference"].split("/")[-1]
+            observations.setdefault(patient_id, []).append(fhir_server.resource("Observation", **resource))
+    largest = max(observations.values(), key=len)
+
+    values = [
+        ("PubMed top 5", DocumentsCodec(), pubmed_documents(5, 0)),
+        ("PubMed top 50", DocumentsCodec(), pubmed_documents(50, 0)),
+        (f"FHIR {len(largest)} Observations", JSONCodec(), largest),
+        ("LLM answer", JSONCodec(), ABSTRACT),
+    ]
+    print(f"{'value':<28}{'JSON KB':>10}{'stored KB':>11}{'encode (us)':>13}{'decode (us)':>13}")
+    for label, codec, value in values:
+        plain = len(json.dumps(codec.to_json(value)))
+        size, encode_us, decode_us = time_codec(codec, value, args.iterations)
+        print(f"{label:<28}{plain / 1024:>10.1f}{size / 1024:>11.1f}{encode_us:>13.0f}{decode_us:>13.0f}")
+
+
+async def simulate(args, backend_name: str, sqlite_path: str, redis_url: str):
+    """Serve the same skewed query stream from `workers` caches sharing one backend; return misses and latencies."""
+    workers = []
+    for _ in range(args.workers):
+        cache = SharedCache()
+        namespace = cache.namespace("retrieval", DocumentsCodec(), 3600, args.max_entries)
+        if backend_name == "sqlite":
+            cache.backend = SQLiteCacheBackend(sqlite_path)
+        elif backend_name == "redis":
+            cache.backend = RedisCacheBackend(redis_url, 10, 1.0)
+        workers.append((cache, namespace))
+
+    rng = random.Random(0)
+    # Zipf-like popularity: a few questions are asked much more often than the rest.
+    weights = [1 / (rank + 1) for rank in range(args.queries)]
+    misses = 0
+    memory_hits, shared_hits = [], []
+    for request in range(args.requests):
+        query = rng.choices(range(args.queries), weights)[0]
+        _, namespace = workers[request % args.workers]
+        before = namespace.shared_hits
+        start = time.perf_counter()
+        documents = await namespace.get(f"query {query}")
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        if documents is None:
+            misses += 1
+            await namespace.set(f"query {query}", pubmed_documents(5, query))
+        elif namespace.shared_hits > before:
+            shared_hits.append(elapsed_us)
+        else:
+            memory_hits.append(elapsed_us)
+    for cache, _ in workers:
+        if cache.backend is not None:
+            await cache.backend.close()
+    return misses, memory_hits, shared_hits
+
+
+async def backend_report(args):
+    server, _ = await start_server("127.0.0.1", args.redis_port, args.redis_latency)
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"\n{args.workers} workers, {args.requests} requests over {args.queries} distinct queries, "
+              f"{args.max_entries} in-process entries per worker")
+        print(f"{'backend':<10}{'PubMed calls':>14}{'hit rate':>10}{'in-process hit (us)':>21}"
+              f"{'shared hit (us)':>17}")
+        for backend_name in ("memory", "sqlite", "redis"):
+            misses, memory_hits, shared_hits = await simulate(
+                args, backend_name, os.path.join(directory, f"{backend_name}.sqlite3"),
+                f"redis://127.0.0.1:{args.redis_port}/0")
+            median = (lambda timings: f"{statistics.median(timings):.0f}" if timings else "-")
+            print(f"{backend_name:<10}{misses:>14}{1 - misses / args.requests:>10.1%}{median(memory_hits):>21}"
+                  f"{median(shared_hits):>17}")
+    server.close()
+    await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Simulated gunicorn workers.")
+    parser.add_argument("--queries", type=int, default=200, help="Distinct PubMed queries.")
+    parser.add_argument("--requests", type=int, default=1000, help="Lookups across all workers.")
+    parser.add_argument("--max-entries", type=int, default=64, help="In-process entries per worker.")
+    parser.add_argument("--iterations", type=int, default=200, help="Codec timing iterations.")
+    parser.add_argument("--redis-port", type=int, default=6390)
+    parser.add_argument("--redis-latency", type=float, default=0.0, help="Redis stub latency per command.")
+    args = parser.parse_args()
+
+    codec_report(args)
+    asyncio.run(backend_report(args))
+
+
+if __name__ == "__main__":
+    main()
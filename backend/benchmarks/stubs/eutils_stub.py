@@ -0,0 +1,106 @@
+"""
+Local stub of the PubMed E-utilities `esearch.fcgi` and `efetch.fcgi` endpoints.
+
+Serves deterministic synthetic articles so the PubMed client can be exercised without network access.
+Point the backend at it with `RETRIEVER_BASE_URL=http://127.0.0.1:8081/entrez/eutils`.
+
+    python ../benchmarks/stubs/eutils_stub.py --port 8081 --latency 0.05
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+TOPICS = [
+    "hypertension", "type 2 diabetes", "heart failure", "asthma", "chronic kidney disease", "atrial fibrillation",
+    "sepsis", "pneumonia", "migraine", "osteoarthritis", "depression", "COPD",
+]
+
+
+def article_uid(query: str, rank: int) -> str:
+    digest = hashlib.sha1(f"{query}:{rank}".encode()).hexdigest()
+    return str(30000000 + int(digest[:8], 16) % 9000000)
+
+
+def article_xml(uid: str) -> str:
+    seed = int(uid)
+    topic = TOPICS[seed % len(TOPICS)]
+    year, month, day = 2015 + seed % 10, 1 + seed % 12, 1 + seed % 28
+    return f"""
+    <PubmedArticle>
+      <MedlineCitation Status="MEDLINE" Owner="NLM">
+        <PMID Version="1">{uid}</PMID>
+        <Article PubModel="Print-Electronic">
+          <ArticleTitle>Management of {escape(topic)} in adults: study {uid}.</ArticleTitle>
+          <Abstract>
+            <AbstractText Label="BACKGROUND">Outcomes of {escape(topic)} remain variable across care settings.</AbstractText>
+            <AbstractText Label="METHODS">We analysed a cohort of {100 + seed % 900} adults with {escape(topic)}.</AbstractText>
+            <AbstractText Label="RESULTS">Guideline-directed therapy reduced adverse events by {5 + seed % 30}%.</AbstractText>
+            <AbstractText Label="CONCLUSIONS">Early treatment of {escape(topic)} improves outcomes.</AbstractText>
+            <CopyrightInformation>Copyright {year} Stub Publisher.</CopyrightInformation>
+          </Abstract>
+          <ArticleDate DateType="Electronic">
+            <Year>{year}</Year><Month>{month:02d}</Month><Day>{day:02d}</Day>
+          </ArticleDate>
+        </Article>
+      </MedlineCitation>
+    </PubmedArticle>"""
+
+
+async def read_params(request: web.Request) -> dict:
+    params = dict(request.query)
+    if request.method == "POST":
+        params.update(await request.post())
+    return params
+
+
+async def esearch(request: web.Request) -> web.Response:
+    params = await read_params(request)
+    await asyncio.sleep(request.app["latency"])
+    term, retmax = params.get("term", ""), int(params.get("retmax", 20))
+    request.app["requests"]["esearch"] += 1
+    idlist = [article_uid(term, rank) for rank in range(retmax)]
+    body = {"header": {"type": "esearch"},
+            "esearchresult": {"count": str(retmax), "retmax": str(retmax), "retstart": "0", "idlist": idlist}}
+    return web.Response(text=json.dumps(body), content_type="application/json")
+
+
+async def efetch(request: web.Request) -> web.Response:
+    params = await read_params(request)
+    await asyncio.sleep(request.app["latency"])
+    uids = [uid for uid in params.get("id", "").split(",") if uid]
+    request.app["requests"]["efetch"] += 1
+    body = '<?xml version="1.0" ?>\n<PubmedArticleSet>' + "".join(article_xml(uid) for uid in uids) + \
+           "</PubmedArticleSet>"
+    return web.Response(text=body, content_type="text/xml")
+
+
+async def stats(request: web.Request) -> web.Response:
+    return web.json_response(request.app["requests"])
+
+
+def create_app(latency: float = 0.0) -> web.Application:
+    app = web.Application()
+    app["latency"] = latency
+    app["requests"] = {"esearch": 0, "efetch": 0}
+    for path, handler in (("/entrez/eutils/esearch.fcgi", esearch), ("/entrez/eutils/efetch.fcgi", efetch)):
+        app.router.add_get(path, handler)
+        app.router.add_post(path, handler)
+    app.router.add_get("/stats", stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial latency per request in seconds.")
+    args = parser.parse_args()
+    web.run_app(create_app(args.latency), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Fake Bedrock chat model for load tests: answers without AWS with a configurable time to first token and token rate.
+
+`install()` makes `LLMClient` build `FakeChatBedrockConverse` (behind the same admission control as the real model)
+instead of calling Bedrock, so it must run before the application starts. Calls with a system prompt (the FHIR
+agents) answer with `agent_tokens` tokens and the others (the final answers) with `answer_tokens`. When the
+`FHIRTranslatorAgentOutput` structured output tool is bound, the model calls it with a two-line FHIR query for the
+patient named in the prompt, which the stub FHIR server can answer.
+"""
+import asyncio
+import re
+import uuid
+from typing import Any, AsyncIterator, ClassVar, List, Optional
+
+from langchain_aws import ChatBedrockConverse
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+PATIENT_ID_PATTERN = re.compile(r"Patient ID: ([\w\-.]+)")
+TRANSLATOR_TOOL = "FHIRTranslatorAgentOutput"
+WORDS = ("Based on the available evidence the recommended management includes guideline directed therapy with close "
+         "monitoring of renal function blood pressure and symptoms at every follow up visit").split()
+
+
+class FakeChatBedrockConverse(ChatBedrockConverse):
+    ttft: ClassVar[float] = 0.5
+    tokens_per_second: ClassVar[float] = 50.0
+    answer_tokens: ClassVar[int] = 200
+    agent_tokens: ClassVar[int] = 40
+
+    def _token_count(self, messages: List[BaseMessage]) -> int:
+        return self.agent_tokens if any(isinstance(message, SystemMessage) for message in messages) \
+            else self.answer_tokens
+
+    @staticmethod
+    def _usage(messages: List[BaseMessage], output_tokens: int) -> dict:
+        input_tokens = sum(len(str(message.content)) for message in messages) // 4
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    @staticmethod
+    def _translator_call(messages: List[BaseMessage]) -> dict:
+        match = PATIENT_ID_PATTERN.search(" ".join(str(message.content) for message in messages))
+        patient_id = match.group(1) if match else "unknown"
+        return {
+            "name": TRANSLATOR_TOOL,
+            "id": f"tooluse_{uuid.uuid4().hex[:16]}",
+            "args": {
+                "intent": "Review the patient's active conditions and medications.",
+                "entities": {"patient": patient_id},
+                "ambiguities": [],
+                "fhir_query": f"Condition?patient={patient_id}&clinical-status=active\n"
+                              f"MedicationRequest?patient={patient_id}&status=active",
+            },
+        }
+
+    @staticmethod
+    def _bound_tools(kwargs: Any) -> List[str]:
+        """Names of the tools bound to the call, in the OpenAI or the Converse tool format."""
+        return [(tool.get("function") or tool.get("toolSpec") or {}).get("name") for tool in kwargs.get("tools") or []]
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if TRANSLATOR_TOOL in self._bound_tools(kwargs):
+            await asyncio.sleep(self.ttft + self.agent_tokens / self.tokens_per_second)
+            message = AIMessage(content="", tool_calls=[self._translator_call(messages)],
+                                usage_metadata=self._usage(messages, self.agent_tokens))
+        else:
+            tokens = self._token_count(messages)
+            await asyncio.sleep(self.ttft + tokens / self.tokens_per_second)
+            message = AIMessage(content=" ".join(WORDS[index % len(WORDS)] for index in range(tokens)),
+                                usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._token_count(messages)
+        await asyncio.sleep(self.ttft)
+        for index in range(tokens):
+            if index:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=f"{WORDS[index % len(WORDS)]} "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, tokens)))
+
+
+def install(ttft: float, tokens_per_second: float, answer_tokens: int, agent_tokens: int):
+    """Make every `LLMClient` created from now on use the fake model, keeping admission control in front of it."""
+    from business.clients import llm_client
+
+    FakeChatBedrockConverse.ttft = ttft
+    FakeChatBedrockConverse.tokens_per_second = tokens_per_second
+    FakeChatBedrockConverse.answer_tokens = answer_tokens
+    FakeChatBedrockConverse.agent_tokens = agent_tokens
+    llm_client.AdmissionControlledChatBedrockConverse = type(
+        "AdmissionControlledFakeChatBedrockConverse",
+        (llm_client.AdmissionControlledChatBedrockConverse, FakeChatBedrockConverse), {})
@@ -0,0 +1,190 @@
+"""
+Local stub of a paging FHIR R4 server backed by the Synthea bundles in `infrastructure/hapi-fhir-server/mock-data`.
+
+Supports type searches filtered by `_id`, `patient`/`subject` and `_lastUpdated=gt...`, `_count` paging with
+`next` links, `_sort` on `_lastUpdated`, `_elements` and `_summary=data` (unless `--ignore-projection`), `batch`
+Bundles of searches, `Patient/{id}/$everything` (with `_since`) and read by ID. Every response waits `--latency`
+seconds.
+Point the backend at it with `FHIR_CLIENT_API_BASE=http://127.0.0.1:8082/fhir`.
+
+    python ../benchmarks/stubs/fhir_stub.py --port 8082 --latency 0.02
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+from collections import Counter
+from typing import Dict, List, Optional
+
+from aiohttp import web
+from yarl import URL
+
+MOCK_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "infrastructure",
+                             "hapi-fhir-server", "mock-data")
+DEFAULT_PAGE_SIZE = 20
+MANDATORY_ELEMENTS = ("resourceType", "id", "meta")
+
+
+def load_resources(data_dir: str) -> List[dict]:
+    """Load every resource of the mock bundles, rewriting `urn:uuid:` references to `Type/id`."""
+    resources = []
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.json"))):
+        with open(path) as bundle_file:
+            text = bundle_file.read()
+        bundle = json.loads(text)
+        types_by_uuid = {entry["fullUrl"].removeprefix("urn:uuid:"): entry["resource"]["resourceType"]
+                         for entry in bundle.get("entry", []) if "fullUrl" in entry}
+        for uuid, resource_type in types_by_uuid.items():
+            text = text.replace(f'"urn:uuid:{uuid}"', f'"{resource_type}/{uuid}"')
+        for index, entry in enumerate(json.loads(text).get("entry", [])):
+            resource = entry["resource"]
+            resource["meta"] = {"versionId": "1", "lastUpdated": f"2024-01-01T00:{index // 60 % 60:02d}:"
+                                                                 f"{index % 60:02d}Z"}
+            resources.append(resource)
+    return resources
+
+
+def patient_id_of(resource: dict) -> Optional[str]:
+    if resource["resourceType"] == "Patient":
+        return resource["id"]
+    for element in ("patient", "subject", "beneficiary"):
+        reference = (resource.get(element) or {}).get("reference", "")
+        if reference.startswith("Patient/"):
+            return reference.removeprefix("Patient/")
+    return None
+
+
+def project(resource: dict, query) -> dict:
+    """Apply `_elements` (choice elements by their base name) or `_summary=data` to a copy of a resource."""
+    if "_elements" in query:
+        elements = query["_elements"].split(",")
+        projected = {name: value for name, value in resource.items() if name in MANDATORY_ELEMENTS or any(
+            name == element or (name.startswith(element) and name[len(element):len(element) + 1].isupper())
+            for element in elements)}
+        projected["meta"] = {**resource["meta"], "tag": [
+            {"system": "http://terminology.hl7.org/CodeSystem/v3-ObservationValue", "code": "SUBSETTED"}]}
+        return projected
+    if query.get("_summary") == "data":
+        return {name: value for name, value in resource.items() if name != "text"}
+    return resource
+
+
+class FHIRStub:
+    def __init__(self, resources: List[dict], latency: float, honor_projection: bool = True):
+        self.resources = resources
+        self.by_id: Dict[str, dict] = {f"{r['resourceType']}/{r['id']}": r for r in resources}
+        self.latency = latency
+        self.honor_projection = honor_projection
+        self.requests = Counter()
+
+    def bundle(self, url: URL, matches: List[dict]) -> dict:
+        count = int(url.query.get("_count", DEFAULT_PAGE_SIZE))
+        offset = int(url.query.get("_offset", 0))
+        page = matches[offset:offset + count]
+        if self.honor_projection:
+            page = [project(resource, url.query) for resource in page]
+        bundle = {
+            "resourceType": "Bundle",
+            "type": "searchset",
+            "total": len(matches),
+            "link": [{"relation": "self", "url": str(url)}],
+            "entry": [{"resource": resource} for resource in page],
+        }
+        if offset + count < len(matches):
+            bundle["link"].append({"relation": "next", "url": str(url.update_query(_offset=offset + count))})
+        return bundle
+
+    def search_bundle(self, resource_type: str, url: URL) -> dict:
+        query = url.query
+        matches = [resource for resource in self.resources if resource["resourceType"] == resource_type]
+        if "_id" in query:
+            ids = set(query["_id"].split(","))
+            matches = [resource for resource in matches if resource["id"] in ids]
+        patient = query.get("patient") or query.get("subject")
+        if patient:
+            matches = [resource for resource in matches if patient_id_of(resource) == patient.removeprefix("Patient/")]
+        last_updated = query.get("_lastUpdated", "")
+        if last_updated.startswith("gt"):
+            matches = [resource for resource in matches if resource["meta"]["lastUpdated"] > last_updated[2:]]
+        if query.get("_sort", "").lstrip("-") == "_lastUpdated":
+            matches.sort(key=lambda resource: resource["meta"]["lastUpdated"],
+                         reverse=query["_sort"].startswith("-"))
+        if query.get("_summary") == "count":
+            return {"resourceType": "Bundle", "type": "searchset", "total": len(matches)}
+        return self.bundle(url, matches)
+
+    async def search(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        self.requests[request.match_info["resource_type"]] += 1
+        bundle = self.search_bundle(request.match_info["resource_type"], request.url)
+        return web.json_response(bundle, content_type="application/fhir+json")
+
+    async def batch(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        self.requests["batch"] += 1
+        request_bundle = await request.json()
+        entries = []
+        for entry in request_bundle.get("entry", []):
+            relative_url = URL(entry["request"]["url"])
+            url = request.url.with_path(f"/fhir/{relative_url.path}").with_query(relative_url.query)
+            entries.append({
+                "resource": self.search_bundle(relative_url.path, url),
+                "response": {"status": "200 OK"},
+            })
+        return web.json_response({"resourceType": "Bundle", "type": "batch-response", "entry": entries},
+                                 content_type="application/fhir+json")
+
+    async def read(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        self.requests["read"] += 1
+        resource = self.by_id.get(f"{request.match_info['resource_type']}/{request.match_info['id']}")
+        if resource is None:
+            return web.json_response({"resourceType": "OperationOutcome", "issue": [
+                {"severity": "error", "code": "not-found"}]}, status=404)
+        if self.honor_projection:
+            resource = project(resource, request.query)
+        return web.json_response(resource, content_type="application/fhir+json")
+
+    async def everything(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        self.requests["$everything"] += 1
+        patient_id = request.match_info["id"]
+        since = request.query.get("_since", "")
+        matches = [resource for resource in self.resources
+                   if patient_id_of(resource) == patient_id and resource["meta"]["lastUpdated"] >= since]
+        return web.json_response(self.bundle(request.url, matches), content_type="application/fhir+json")
+
+    async def stats(self, request: web.Request) -> web.Response:
+        """HTTP requests received, by resource type or interaction."""
+        return web.json_response(dict(self.requests))
+
+
+def create_app(data_dir: str = MOCK_DATA_DIR, latency: float = 0.0,
+               honor_projection: bool = True) -> web.Application:
+    stub = FHIRStub(load_resources(data_dir), latency, honor_projection)
+    app = web.Application()
+    app["stub"] = stub
+    app.router.add_get("/stats", stub.stats)
+    app.router.add_post("/fhir", stub.batch)
+    app.router.add_post("/fhir/", stub.batch)
+    app.router.add_get("/fhir/Patient/{id}/$everything", stub.everything)
+    app.router.add_get("/fhir/{resource_type}", stub.search)
+    app.router.add_get("/fhir/{resource_type}/{id}", stub.read)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--data-dir", default=MOCK_DATA_DIR)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before every response.")
+    parser.add_argument("--ignore-projection", action="store_true",
+                        help="Return complete resources regardless of `_elements` and `_summary`.")
+    args = parser.parse_args()
+    web.run_app(create_app(args.data_dir, args.latency, not args.ignore_projection), host="127.0.0.1",
+                port=args.port)
+
+
+if __name__ == "__main__":
+    main()
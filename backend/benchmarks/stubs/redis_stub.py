@@ -0,0 +1,89 @@
+"""
+Local stub of a Redis server speaking enough of the Redis protocol (RESP2) for the shared cache: `GET`, `SET` with
+`EX`/`PX`, `DEL`, `PING`, `AUTH` and `SELECT`, with entries held in memory and expired on read.
+
+Point the backend at it with `CACHE_BACKEND=redis` and `CACHE_REDIS_URL=redis://127.0.0.1:6390/0`.
+
+    python ../benchmarks/stubs/redis_stub.py --port 6390 --latency 0.0005
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class RedisStub:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.entries: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.commands = 0
+
+    @staticmethod
+    async def read_command(reader: asyncio.StreamReader) -> List[bytes]:
+        header = await reader.readuntil(b"\r\n")
+        if not header.startswith(b"*"):
+            raise ValueError("Inline commands are not supported")
+        args = []
+        for _ in range(int(header[1:-2])):
+            length = int((await reader.readuntil(b"\r\n"))[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def execute(self, args: List[bytes]) -> bytes:
+        command = args[0].upper()
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if command == b"GET":
+            value, expires_at = self.entries.get(args[1], (None, None))
+            if value is None or (expires_at is not None and expires_at <= time.monotonic()):
+                self.entries.pop(args[1], None)
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if command == b"SET":
+            expires_at = None
+            options = [arg.upper() for arg in args[3:]]
+            if b"PX" in options:
+                expires_at = time.monotonic() + int(args[3 + options.index(b"PX") + 1]) / 1000
+            elif b"EX" in options:
+                expires_at = time.monotonic() + int(args[3 + options.index(b"EX") + 1])
+            self.entries[args[1]] = (args[2], expires_at)
+            return b"+OK\r\n"
+        if command == b"DEL":
+            return b":%d\r\n" % sum(self.entries.pop(key, None) is not None for key in args[1:])
+        return b"-ERR unknown command '%s'\r\n" % command
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                args = await self.read_command(reader)
+                self.commands += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(self.execute(args))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def start_server(host: str, port: int, latency: float = 0.0) -> Tuple[asyncio.Server, RedisStub]:
+    stub = RedisStub(latency)
+    server = await asyncio.start_server(stub.handle, host, port)
+    return server, stub
+
+
+async def serve(args):
+    server, _ = await start_server(args.host, args.port, args.latency)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Redis protocol stub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every command.")
+    asyncio.run(serve(parser.parse_args()))
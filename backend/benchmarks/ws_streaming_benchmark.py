@@ -0,0 +1,262 @@
+"""
+Benchmark of the WebSocket messages of streamed answers: framing, chunk coalescing and permessage-deflate.
+
+Serves `QuerySession.send_stream` with uvicorn in a subprocess, answering every query with a fake stream: three stage
+events, `--answer-tokens` tokens of a medical answer at `--tokens-per-second` in chunks of `--tokens-per-chunk`, and
+the `generation` stage event. `--clients` concurrent clients each ask `--queries` questions through a TCP proxy that
+counts the bytes on the wire. Each combination of `--framings` (`sse`, `json`), `--coalesce-ms` windows (0 sends every
+chunk on its own) and `--deflate` (whether permessage-deflate is negotiated) runs against a fresh server. Reports per
+answer the messages and kilobytes received and the server's CPU time, the p50/p95 time to the first answer chunk and
+the p50 answer latency, and checks that every answer arrives intact.
+
+Run from the `backend/app` directory (so that `.env` is picked up):
+    python ../benchmarks/ws_streaming_benchmark.py --clients 20 --queries 3 --tokens-per-second 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import aiohttp  # noqa: E402
+
+FRAMINGS = ("sse", "json")
+ANSWER = ("Hypertension in adults is managed first with lifestyle changes: a low-sodium diet rich in fruit and "
+          "vegetables, regular aerobic exercise, weight loss and limited alcohol.\nWhen drug treatment is needed, "
+          "first-line options are thiazide diuretics, ACE inhibitors, angiotensin receptor blockers and calcium "
+          "channel blockers, chosen by age, ethnicity and comorbidities such as diabetes or chronic kidney disease.\n")
+
+
+def answer_tokens(count: int) -> List[str]:
+    """`count` tokens of about four characters, cycling through `ANSWER`."""
+    text = ANSWER * (count * 4 // len(ANSWER) + 1)
+    return [text[index * 4:index * 4 + 4] for index in range(count)]
+
+
+class QueryResult:
+    def __init__(self, latency: float, ttft: Optional[float], messages: int, error: Optional[str]):
+        self.latency = latency
+        self.ttft = ttft
+        self.messages = messages
+        self.error = error
+
+
+class ByteCountingProxy:
+    """TCP proxy to the server counting the bytes it sends to the clients, WebSocket framing and compression included."""
+
+    def __init__(self, port: int):
+        """Initialize ByteCountingProxy configuration."""
+        self.port = port
+        self.downstream_bytes = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", self.port)
+        await asyncio.gather(self.pipe(reader, upstream_writer, False), self.pipe(upstream_reader, writer, True))
+
+    async def pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, downstream: bool):
+        try:
+            while data := await reader.read(65536):
+                if downstream:
+                    self.downstream_bytes += len(data)
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def parse_message(framing: str, text: str):
+    """The answer text of a message, or `None` for an event; `True` for the final `generation` stage event."""
+    if framing == "json":
+        message = json.loads(text)
+        if "data" in message:
+            return message["data"]
+        return message.get("stage") == "generation" or None
+    body = text.split("\n", 1)[1]
+    if body.startswith("data: "):
+        return body[len("data: "):-2]
+    return body.startswith("event: stage") and '"stage": "generation"' in body or None
+
+
+async def ask(websocket: aiohttp.ClientWebSocketResponse, framing: str, expected: str) -> QueryResult:
+    started_at = time.perf_counter()
+    ttft = None
+    messages = 0
+    received = []
+    await websocket.send_json({"id": uuid.uuid4().hex, "role": "USER", "content": "How is hypertension managed?",
+                               "created_at": datetime.now(timezone.utc).isoformat()})
+    async for message in websocket:
+        if message.type != aiohttp.WSMsgType.TEXT:
+            break
+        messages += 1
+        content = parse_message(framing, message.data)
+        if isinstance(content, str):
+            ttft = time.perf_counter() - started_at if ttft is None else ttft
+            received.append(content)
+        elif content:
+            text = "".join(received)
+            error = None if text == expected else f"answer differs: {len(text)} chars instead of {len(expected)}"
+            return QueryResult(time.perf_counter() - started_at, ttft, messages, error)
+    return QueryResult(time.perf_counter() - started_at, ttft, messages, "connection closed")
+
+
+async def run_client(session: aiohttp.ClientSession, url: str, framing: str, deflate: bool, queries: int,
+                     expected: str) -> List[QueryResult]:
+    async with session.ws_connect(url, compress=15 if deflate else 0, max_msg_size=0) as websocket:
+        return [await ask(websocket, framing, expected) for _ in range(queries)]
+
+
+def percentile(values: List[float], cut: int) -> str:
+    if len(values) < 2:
+        return f"{values[0] * 1000:.0f}" if values else "-"
+    return f"{statistics.quantiles(values, n=100, method='inclusive')[cut - 1] * 1000:.0f}"
+
+
+async def wait_until_up(args, server: subprocess.Popen):
+    async with aiohttp.ClientSession() as session:
+        for _ in range(int(args.startup_timeout / 0.2)):
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode}")
+            try:
+                async with session.get(f"http://127.0.0.1:{args.port}/cpu") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server did not start within {args.startup_timeout}s")
+
+
+async def server_cpu_time(session: aiohttp.ClientSession, args) -> float:
+    async with session.get(f"http://127.0.0.1:{args.port}/cpu") as response:
+        return (await response.json())["seconds"]
+
+
+async def run_configuration(args, framing: str, coalesce_ms: float, deflate: bool):
+    env = dict(os.environ, WS_STREAM_COALESCE_MS=str(coalesce_ms), WS_PER_MESSAGE_DEFLATE=str(deflate).lower(),
+               LOG_LEVEL="WARNING")
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", *sys.argv[1:]], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    proxy = ByteCountingProxy(args.port)
+    proxy_server = await asyncio.start_server(proxy.handle, "127.0.0.1", args.proxy_port)
+    try:
+        await wait_until_up(args, server)
+        url = f"ws://127.0.0.1:{args.proxy_port}/ws?framing={framing}"
+        expected = "".join(answer_tokens(args.answer_tokens))
+        if framing == "sse":
+            expected = expected.replace("\n", "<br>")
+        async with aiohttp.ClientSession() as session:
+            # One unmeasured query first, so that the server is warm.
+            await run_client(session, url, framing, deflate, 1, expected)
+            proxy.downstream_bytes = 0
+            cpu_before = await server_cpu_time(session, args)
+            client_results = await asyncio.gather(*(run_client(session, url, framing, deflate, args.queries, expected)
+                                                    for _ in range(args.clients)))
+            cpu_time = await server_cpu_time(session, args) - cpu_before
+    finally:
+        proxy_server.close()
+        server.terminate()
+        server.wait()
+
+    results = [result for results in client_results for result in results]
+    completed = [result for result in results if result.error is None]
+    errors = [result.error for result in results if result.error is not None]
+    print(f"{framing:<8}{coalesce_ms:>9g}{'on' if deflate else 'off':>9}{len(errors):>8}"
+          f"{statistics.mean(result.messages for result in results):>10.1f}"
+          f"{proxy.downstream_bytes / len(results) / 1024:>10.2f}{cpu_time / len(results) * 1000:>10.2f}"
+          f"{percentile([result.ttft for result in completed if result.ttft is not None], 50):>10}"
+          f"{percentile([result.ttft for result in completed if result.ttft is not None], 95):>9}"
+          f"{percentile([result.latency for result in completed], 50):>11}")
+    for error in sorted(set(errors))[:3]:
+        print(f"    error: {error}")
+
+
+async def benchmark(args):
+    print(f"{args.clients} clients x {args.queries} queries, {args.answer_tokens} tokens per answer at "
+          f"{args.tokens_per_second} tokens/s, {args.tokens_per_chunk} per chunk, TTFT {args.ttft}s")
+    print(f"{'framing':<8}{'window ms':>9}{'deflate':>9}{'errors':>8}{'messages':>10}{'wire KB':>10}{'CPU ms':>10}"
+          f"{'TTFT p50':>10}{'p95':>9}{'total p50':>11}")
+    for framing in args.framings:
+        for coalesce_ms in args.coalesce_ms:
+            for deflate in args.deflate:
+                await run_configuration(args, framing, coalesce_ms, deflate == "on")
+
+
+def serve(args):
+    """Serve the fake streamed answers; this is the subprocess started by `run_configuration`."""
+    import uvicorn
+    from fastapi import FastAPI, WebSocket
+
+    from business.services.orchestrator_service import StreamEvent
+    from config.settings import get_settings
+    from presentation.routers.v1.medical_qa_assistant import QuerySession
+
+    settings = get_settings()
+    tokens = answer_tokens(args.answer_tokens)
+    chunks = ["".join(tokens[index:index + args.tokens_per_chunk])
+              for index in range(0, len(tokens), args.tokens_per_chunk)]
+    app = FastAPI()
+
+    async def fake_answer():
+        for stage in ("translator", "retriever", "formatter"):
+            yield StreamEvent("stage", {"stage": stage, "status": "completed", "elapsed_ms": 0})
+        await asyncio.sleep(args.ttft)
+        for chunk in chunks:
+            yield chunk
+            await asyncio.sleep(args.tokens_per_chunk / args.tokens_per_second)
+        yield StreamEvent("stage", {"stage": "generation", "status": "completed", "elapsed_ms": 0})
+
+    @app.websocket("/ws")
+    async def stream(websocket: WebSocket):
+        framing = websocket.query_params.get("framing", settings.WS_STREAM_FRAMING)
+        await websocket.accept()
+        session = QuerySession(websocket, "benchmark", "STREAM", framing)
+
+        async def answer(doctor_query):
+            await session.send_stream(doctor_query.id, fake_answer())
+
+        await session.receive(answer)
+
+    @app.get("/cpu")
+    async def cpu():
+        return {"seconds": time.process_time()}
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning",
+                ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent WebSocket clients per configuration.")
+    parser.add_argument("--queries", type=int, default=3, help="Questions each client asks, one after another.")
+    parser.add_argument("--framings", nargs="+", choices=FRAMINGS, default=list(FRAMINGS))
+    parser.add_argument("--coalesce-ms", nargs="+", type=float, default=[0.0, 30.0],
+                        help="Coalescing windows to compare, in milliseconds.")
+    parser.add_argument("--deflate", nargs="+", choices=("off", "on"), default=["off", "on"])
+    parser.add_argument("--ttft", type=float, default=0.2, help="Fake stream time to first token, in seconds.")
+    parser.add_argument("--tokens-per-second", type=float, default=100.0, help="Fake stream token rate.")
+    parser.add_argument("--tokens-per-chunk", type=int, default=1, help="Tokens per streamed chunk.")
+    parser.add_argument("--answer-tokens", type=int, default=300, help="Tokens of every answer.")
+    parser.add_argument("--port", type=int, default=8093, help="Port of the benchmark server.")
+    parser.add_argument("--proxy-port", type=int, default=8094, help="Port of the byte-counting proxy.")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+    else:
+        asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,22 @@
 import os
 
+from uvicorn.workers import UvicornWorker
+
 # Bind the application to a specific IP and port
 bind = f"0.0.0.0:{os.getenv('APP_PORT', 8000)}"
 
 workers = 1
 
+
+class MedicalQAUvicornWorker(UvicornWorker):
+    """UvicornWorker negotiating WebSocket permessage-deflate as `WS_PER_MESSAGE_DEFLATE` says (default: on)."""
+
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS,
+                     "ws_per_message_deflate": os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"}
+
+
 # Worker class (recommended for FastAPI/ASGI apps)
-worker_class = "uvicorn.workers.UvicornWorker"
+worker_class = MedicalQAUvicornWorker
 
 # Maximum number of requests a worker can handle before being restarted (to prevent memory leaks)
 max_requests = 1000
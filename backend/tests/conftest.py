@@ -0,0 +1,21 @@
+import os
+
+# The settings without defaults, so that the application modules import without a `.env`. No test reaches AWS,
+# PubMed or a FHIR server.
+for name, value in {
+    "ENVIRONMENT": "test",
+    "APP_NAME": "medical-qa-assistant",
+    "APP_VERSION": "0.0.0",
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_REGION": "us-east-1",
+    "MODEL_ID": "test-model",
+    "MODEL_TEMPERATURE": "0",
+    "MODEL_MAX_TOKENS": "1024",
+    "RETRIEVER_API_KEY": "",
+    "RETRIEVER_TOP_K_RESULTS": "5",
+    "FHIR_CLIENT_APP_ID": "test",
+    "FHIR_CLIENT_API_BASE": "http://fhir.test/fhir",
+    "CORS_ORIGINS": '["http://localhost"]',
+}.items():
+    os.environ.setdefault(name, value)
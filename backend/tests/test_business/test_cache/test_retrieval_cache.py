@@ -0,0 +1,40 @@
+import pytest
+
+from business.cache.retrieval_cache import RetrievalCache, normalize_query
+from config.settings import get_settings
+
+settings = get_settings()
+
+
+@pytest.mark.parametrize("query, normalized", [
+    ("  Heart   Failure\tstatin  ", "heart failure statin"),
+    ("What is the first-line management of HYPERTENSION?", "what is the first-line management of hypertension?"),
+    ('"Heart  Failure" AND Statin', '"Heart  Failure" AND statin'),
+    ("(Asthma OR COPD) NOT Pediatric[tiab]", "(asthma OR copd) NOT pediatric[tiab]"),
+])
+def test_normalize_query(query, normalized):
+    assert normalize_query(query) == normalized
+
+
+@pytest.mark.parametrize("query, other", [
+    ('"heart failure" AND statin', "heart failure and statin"),
+    ('"heart failure" statin', "heart failure statin"),
+    ("heart failure AND statin", "heart failure and statin"),
+    ("asthma NOT children", "asthma not children"),
+    ("(asthma OR copd) AND steroids", "asthma OR copd AND steroids"),
+    ("asthma[tiab]", "asthma tiab"),
+    ("cardio*", "cardio"),
+])
+def test_different_searches_do_not_share_a_key(query, other):
+    assert normalize_query(query) != normalize_query(other)
+
+
+def test_phrasings_of_the_same_search_share_a_key():
+    assert normalize_query("Heart failure   AND  Statin") == normalize_query("heart FAILURE AND statin ")
+
+
+def test_build_key_includes_backend_and_counts():
+    key = RetrievalCache.build_key("Heart failure", 5, 50)
+
+    assert key == f"{settings.RETRIEVER_BACKEND}/5/50:heart failure"
+    assert RetrievalCache.build_key("Heart failure", 5) == f"{settings.RETRIEVER_BACKEND}/5:heart failure"
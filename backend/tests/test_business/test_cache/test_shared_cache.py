@@ -0,0 +1,66 @@
+import asyncio
+import zlib
+from typing import Dict, Optional
+
+import pytest
+
+from business.cache.cache_backends import CacheBackend
+from business.cache.shared_cache import COMPRESSED_MARKER, RAW_MARKER, DocumentsCodec, JSONCodec, SharedCache
+
+
+class DictBackend(CacheBackend):
+    name = "dict"
+
+    def __init__(self):
+        self.entries: Dict[str, bytes] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        self.entries[key] = value
+
+    async def delete(self, key: str):
+        self.entries.pop(key, None)
+
+    async def close(self):
+        pass
+
+
+def namespace(codec: JSONCodec):
+    cache = SharedCache()
+    cache.backend = DictBackend()
+    return cache.namespace("test", codec, ttl_seconds=60, max_entries=10)
+
+
+@pytest.mark.parametrize("value", [{"resourceType": "Patient", "id": "p1"}, ["x" * 2000]])
+def test_values_round_trip_through_the_backend(value):
+    async def test():
+        cache = namespace(JSONCodec())
+        await cache.set("key", value)
+        cache.memory_cache.delete("key")
+        return await cache.get("key")
+
+    assert asyncio.run(test()) == value
+
+
+@pytest.mark.parametrize("codec, data", [
+    (JSONCodec(), COMPRESSED_MARKER + b"not zlib"),
+    (JSONCodec(), COMPRESSED_MARKER + zlib.compress(b'{"truncated":')),
+    (JSONCodec(), RAW_MARKER + b"\xff\xfe"),
+    (JSONCodec(), RAW_MARKER + b"{"),
+    (DocumentsCodec(), RAW_MARKER + b"[1]"),
+    (DocumentsCodec(), RAW_MARKER + b'[["content"]]'),
+])
+def test_corrupt_entry_is_a_miss(codec, data):
+    async def test():
+        cache = namespace(codec)
+        cache.cache.backend.entries[cache._backend_key("key")] = data
+        value = await cache.get("key")
+        refreshed = await cache.get_or_call("key", lambda: asyncio.sleep(0, []))
+        return value, refreshed, cache.stats()
+
+    value, refreshed, stats = asyncio.run(test())
+    assert value is None
+    assert refreshed == []
+    assert stats["errors"] == 2 and stats["misses"] == 2
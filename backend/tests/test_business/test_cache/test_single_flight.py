@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from business.cache import single_flight as single_flight_module
+from business.cache.single_flight import SingleFlight, hash_key
+
+
+class SlowCall:
+    """Counts its executions and returns `result` once `release` is set."""
+
+    def __init__(self, result=None, error: Exception = None):
+        self.result = result
+        self.error = error
+        self.executions = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.executions += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_hash_key_is_stable_and_order_insensitive():
+    assert hash_key("model", {"a": 1, "b": 2}) == hash_key("model", {"b": 2, "a": 1})
+    assert hash_key("model", {"a": 1}) != hash_key("other", {"a": 1})
+
+
+def test_concurrent_identical_calls_run_once():
+    async def test():
+        flight = SingleFlight("test")
+        call = SlowCall(result={"answer": 42})
+        callers = [asyncio.ensure_future(flight.run("key", call)) for _ in range(5)]
+        await asyncio.sleep(0)
+        waiters = flight.waiters["key"]
+        call.release.set()
+        results = await asyncio.gather(*callers)
+        return flight, call, waiters, results
+
+    flight, call, waiters, results = asyncio.run(test())
+    assert call.executions == 1
+    assert waiters == 5
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"calls": 5, "executions": 1, "coalesced": 4, "in_flight": 0}
+    assert flight.waiters == {}
+
+
+def test_different_keys_and_later_calls_run_separately():
+    async def test():
+        flight = SingleFlight("test")
+        call = SlowCall(result="done")
+        call.release.set()
+        await asyncio.gather(flight.run("a", call), flight.run("b", call))
+        await flight.run("a", call)
+        return flight, call
+
+    flight, call = asyncio.run(test())
+    assert call.executions == 3
+    assert flight.stats() == {"calls": 3, "executions": 3, "coalesced": 0, "in_flight": 0}
+
+
+def test_disabled_single_flight_runs_every_call(monkeypatch):
+    monkeypatch.setattr(single_flight_module.settings, "SINGLE_FLIGHT_ENABLED", False)
+
+    async def test():
+        flight = SingleFlight("test")
+        call = SlowCall(result="done")
+        call.release.set()
+        await asyncio.gather(*(flight.run("key", call) for _ in range(3)))
+        return flight, call
+
+    flight, call = asyncio.run(test())
+    assert call.executions == 3
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_exception_reaches_every_waiter_and_the_key_is_forgotten():
+    async def test():
+        flight = SingleFlight("test")
+        failing = SlowCall(error=ValueError("upstream failed"))
+        callers = [asyncio.ensure_future(flight.run("key", failing)) for _ in range(3)]
+        await asyncio.sleep(0)
+        failing.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        in_flight = dict(flight.in_flight)
+
+        retry = SlowCall(result="recovered")
+        retry.release.set()
+        return results, in_flight, await flight.run("key", retry), retry
+
+    results, in_flight, recovered, retry = asyncio.run(test())
+    assert [type(result) for result in results] == [ValueError] * 3
+    assert all(str(result) == "upstream failed" for result in results)
+    assert in_flight == {}
+    assert recovered == "recovered"
+    assert retry.executions == 1
+
+
+def test_cancelling_one_waiter_leaves_the_call_to_the_others():
+    async def test():
+        flight = SingleFlight("test")
+        call = SlowCall(result="done")
+        cancelled = asyncio.ensure_future(flight.run("key", call))
+        others = [asyncio.ensure_future(flight.run("key", call)) for _ in range(2)]
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        waiters = flight.waiters["key"]
+        call.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return flight, call, waiters, await asyncio.gather(*others)
+
+    flight, call, waiters, results = asyncio.run(test())
+    assert waiters == 2
+    assert results == ["done", "done"]
+    assert call.executions == 1
+    assert flight.in_flight == {}
+
+
+def test_cancelling_every_waiter_cancels_the_call():
+    async def test():
+        flight = SingleFlight("test")
+        call = SlowCall(result="done")
+        callers = [asyncio.ensure_future(flight.run("key", call)) for _ in range(2)]
+        await asyncio.sleep(0)
+        task = flight.in_flight["key"]
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flight, task
+
+    flight, task = asyncio.run(test())
+    assert task.cancelled()
+    assert flight.in_flight == {}
+    assert flight.waiters == {}
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from typing import Callable, List
+
+import pytest
+from aiohttp import web
+from fhirpy import AsyncFHIRClient
+
+from business.clients.fhir_bulk_export_client import FHIRBulkExportClient
+
+PATIENTS = [{"resourceType": "Patient", "id": "p1"}, {"resourceType": "Patient", "id": "p2"}]
+OBSERVATIONS = [{"resourceType": "Observation", "id": "o1", "subject": {"reference": "Patient/p1"}}]
+
+
+def ndjson(resources: List[dict]) -> str:
+    return "".join(json.dumps(resource) + "\n" for resource in resources)
+
+
+class BulkDataServer:
+    """Bulk Data server answering the status URL with 202 `in_progress` times before the manifest."""
+
+    def __init__(self, in_progress: int = 2, kick_off_status: int = 202, status_code: int = 200):
+        self.in_progress = in_progress
+        self.kick_off_status = kick_off_status
+        self.status_code = status_code
+        self.requests: List[web.Request] = []
+        self.deleted = False
+        self.app = web.Application()
+        self.app.router.add_get("/fhir/$export", self.kick_off)
+        self.app.router.add_get("/fhir/Group/{group}/$export", self.kick_off)
+        self.app.router.add_get("/status/1", self.status)
+        self.app.router.add_delete("/status/1", self.delete)
+        self.app.router.add_get("/files/{name}", self.download)
+        self.base_url = ""
+
+    async def kick_off(self, request: web.Request) -> web.Response:
+        self.requests.append(request)
+        if self.kick_off_status != 202:
+            return web.Response(status=self.kick_off_status, text="export not supported")
+        return web.Response(status=202, headers={"Content-Location": f"{self.base_url}/status/1"})
+
+    async def status(self, request: web.Request) -> web.Response:
+        self.requests.append(request)
+        if self.in_progress:
+            self.in_progress -= 1
+            return web.Response(status=202, headers={"X-Progress": "50%", "Retry-After": "0"})
+        if self.status_code != 200:
+            return web.Response(status=self.status_code, text="export failed")
+        return web.json_response({"transactionTime": "2024-01-01T00:00:00Z", "requiresAccessToken": True,
+                                  "output": [{"type": "Patient", "url": f"{self.base_url}/files/patients"},
+                                             {"type": "Observation", "url": f"{self.base_url}/files/observations"}],
+                                  "error": []})
+
+    async def delete(self, request: web.Request) -> web.Response:
+        self.deleted = True
+        return web.Response(status=202)
+
+    async def download(self, request: web.Request) -> web.Response:
+        self.requests.append(request)
+        resources = PATIENTS if request.match_info["name"] == "patients" else OBSERVATIONS
+        return web.Response(text=ndjson(resources), content_type="application/fhir+ndjson")
+
+
+async def with_server(server: BulkDataServer, test: Callable):
+    runner = web.AppRunner(server.app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    server.base_url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    try:
+        client = FHIRBulkExportClient(AsyncFHIRClient(f"{server.base_url}/fhir", authorization="Bearer token"))
+        return await test(client)
+    finally:
+        await runner.cleanup()
+
+
+def test_export_kicks_off_polls_and_downloads(tmp_path):
+    server = BulkDataServer(in_progress=2)
+
+    paths = asyncio.run(with_server(server, lambda client: client.export(
+        str(tmp_path), ["Patient", "Observation"], since="2023-01-01T00:00:00Z", poll_seconds=0)))
+
+    assert [path.rsplit("/", 1)[1] for path in paths] == ["0000_Patient.ndjson", "0001_Observation.ndjson"]
+    assert [json.loads(line) for line in open(paths[0])] == PATIENTS
+    assert [json.loads(line) for line in open(paths[1])] == OBSERVATIONS
+
+    kick_off = server.requests[0]
+    assert kick_off.query["_type"] == "Patient,Observation"
+    assert kick_off.query["_since"] == "2023-01-01T00:00:00Z"
+    assert kick_off.query["_outputFormat"] == "application/fhir+ndjson"
+    assert kick_off.headers["Prefer"] == "respond-async"
+    assert [request.path for request in server.requests[1:4]] == ["/status/1"] * 3
+    # The manifest requires the access token on downloads.
+    assert all(request.headers.get("Authorization") == "Bearer token" for request in server.requests[4:])
+    assert server.deleted
+
+
+def test_group_export(tmp_path):
+    server = BulkDataServer(in_progress=0)
+
+    asyncio.run(with_server(server, lambda client: client.export(str(tmp_path), group_id="panel-1")))
+
+    assert server.requests[0].path == "/fhir/Group/panel-1/$export"
+
+
+def test_rejected_kick_off_raises(tmp_path):
+    server = BulkDataServer(kick_off_status=400)
+
+    with pytest.raises(RuntimeError, match="kick-off failed with 400"):
+        asyncio.run(with_server(server, lambda client: client.export(str(tmp_path))))
+
+
+def test_failed_export_raises_and_cleans_up(tmp_path):
+    server = BulkDataServer(in_progress=1, status_code=500)
+
+    with pytest.raises(RuntimeError, match="failed with 500"):
+        asyncio.run(with_server(server, lambda client: client.export(str(tmp_path), poll_seconds=0)))
+    assert server.deleted
+
+
+def test_export_times_out(tmp_path):
+    server = BulkDataServer(in_progress=1000)
+
+    with pytest.raises(RuntimeError, match="did not complete"):
+        asyncio.run(with_server(server, lambda client: client.export(str(tmp_path), poll_seconds=0,
+                                                                     timeout_seconds=0)))
+    assert server.deleted
@@ -0,0 +1,285 @@
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+from botocore.exceptions import ClientError
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+from business.clients import llm_admission_controller as admission
+from business.clients.llm_admission_controller import (LLMAdmissionController, LLMOverloadedError,
+                                                        admission_listener, llm_admission_broadcasts)
+from business.clients.llm_client import LLMClient
+from business.clients.rate_limiter import TokenBucketRateLimiter
+
+
+def throttling_error() -> ClientError:
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "Too many requests"}}, "Converse")
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(admission.settings, "LLM_THROTTLE_BACKOFF", 0.001)
+    monkeypatch.setattr(admission.settings, "LLM_THROTTLE_MAX_BACKOFF", 0.002)
+    monkeypatch.setattr(admission.settings, "LLM_THROTTLE_MAX_RETRIES", 3)
+
+
+def listen(notifications: List[Dict[str, Any]]):
+    async def listener(details: Dict[str, Any]):
+        notifications.append(details)
+
+    admission_listener.set(listener)
+
+
+def controller(requests_per_second: float = None, tokens_per_second: float = None,
+               token_capacity: float = None) -> LLMAdmissionController:
+    controller = LLMAdmissionController()
+    if requests_per_second:
+        controller.request_limiter = TokenBucketRateLimiter(requests_per_second, 1)
+    if tokens_per_second:
+        controller.token_limiter = TokenBucketRateLimiter(tokens_per_second, token_capacity)
+    return controller
+
+
+class FlakyCall:
+    """Raises `errors` throttling errors, then returns `result`."""
+
+    def __init__(self, errors: int, result: Any = "response"):
+        self.errors = errors
+        self.result = result
+        self.attempts = 0
+
+    async def __call__(self):
+        self.attempts += 1
+        if self.attempts <= self.errors:
+            raise throttling_error()
+        return self.result
+
+
+def test_unlimited_calls_are_admitted_at_once():
+    async def test():
+        notifications = []
+        listen(notifications)
+        llm = controller()
+        for _ in range(3):
+            assert await llm.admit(1000) == 0.0
+        return llm, notifications
+
+    llm, notifications = asyncio.run(test())
+    assert notifications == []
+    assert llm.stats() == {"admitted": 3, "queued": 0, "rejected": 0, "throttled": 0, "waiting": 0}
+
+
+def test_request_budget_queues_and_notifies():
+    async def test():
+        notifications = []
+        listen(notifications)
+        llm = controller(requests_per_second=20)
+        loop = asyncio.get_running_loop()
+        await llm.admit(1)
+        started_at = loop.time()
+        await llm.admit(1)
+        return llm, notifications, loop.time() - started_at
+
+    llm, notifications, waited = asyncio.run(test())
+    assert waited >= 0.04
+    assert len(notifications) == 1
+    assert notifications[0]["status"] == "queued"
+    assert notifications[0]["reason"] == "rate_limit"
+    assert notifications[0]["position"] == 1
+    assert 0 < notifications[0]["wait_ms"] <= 50
+    assert llm.stats()["queued"] == 1
+
+
+def test_token_budget_reserves_capped_estimate_and_settles_unused_tokens():
+    async def test():
+        llm = controller(tokens_per_second=1, token_capacity=100)
+        reservation = await llm.admit(150)
+        after_admit = llm.token_limiter.tokens
+        llm.settle(reservation, 40)
+        return reservation, after_admit, llm.token_limiter.tokens
+
+    reservation, after_admit, after_settle = asyncio.run(test())
+    assert reservation == 100
+    assert after_admit == pytest.approx(0, abs=1)
+    assert after_settle == pytest.approx(60, abs=1)
+
+
+def test_call_over_the_token_budget_waits_for_it():
+    async def test():
+        notifications = []
+        listen(notifications)
+        llm = controller(tokens_per_second=2000, token_capacity=100)
+        await llm.admit(100)
+        await llm.admit(100)
+        return notifications
+
+    notifications = asyncio.run(test())
+    assert [details["reason"] for details in notifications] == ["rate_limit"]
+    assert 0 < notifications[0]["wait_ms"] <= 50
+
+
+def test_full_queue_rejects(monkeypatch):
+    monkeypatch.setattr(admission.settings, "LLM_ADMISSION_MAX_QUEUE", 1)
+
+    async def test():
+        llm = controller(requests_per_second=1)
+        await llm.admit(1)
+        waiting = asyncio.ensure_future(llm.admit(1))
+        await asyncio.sleep(0.01)
+        with pytest.raises(LLMOverloadedError, match="queue is full"):
+            await llm.admit(1)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        return llm
+
+    llm = asyncio.run(test())
+    assert llm.stats() == {"admitted": 1, "queued": 1, "rejected": 1, "throttled": 0, "waiting": 0}
+
+
+def test_queue_timeout_rejects(monkeypatch):
+    monkeypatch.setattr(admission.settings, "LLM_ADMISSION_QUEUE_TIMEOUT", 0.05)
+
+    async def test():
+        llm = controller(requests_per_second=1)
+        await llm.admit(1)
+        with pytest.raises(LLMOverloadedError, match="not admitted within"):
+            await llm.admit(1)
+        return llm
+
+    llm = asyncio.run(test())
+    assert llm.stats() == {"admitted": 1, "queued": 1, "rejected": 1, "throttled": 0, "waiting": 0}
+
+
+def test_throttled_call_is_retried_with_jittered_backoff(monkeypatch):
+    bounds = []
+
+    def uniform(low: float, high: float) -> float:
+        bounds.append((low, high))
+        return high
+
+    monkeypatch.setattr(admission.random, "uniform", uniform)
+
+    async def test():
+        notifications = []
+        listen(notifications)
+        llm = controller()
+        call = FlakyCall(errors=3)
+        result = await llm.call(10, call, lambda result: None)
+        return llm, call, result, notifications
+
+    llm, call, result, notifications = asyncio.run(test())
+    assert result == "response"
+    assert call.attempts == 4
+    assert bounds == [(0, 0.001), (0, 0.002), (0, 0.002)]
+    assert notifications == [{"status": "queued", "reason": "throttled", "retry": retry, "wait_ms": wait_ms}
+                             for retry, wait_ms in [(1, 1), (2, 2), (3, 2)]]
+    assert llm.stats()["throttled"] == 3
+    assert llm.stats()["admitted"] == 4
+
+
+def test_throttling_past_the_retries_is_raised():
+    async def test():
+        llm = controller()
+        call = FlakyCall(errors=10)
+        with pytest.raises(ClientError):
+            await llm.call(10, call, lambda result: None)
+        return call
+
+    assert asyncio.run(test()).attempts == 4
+
+
+def test_other_errors_are_not_retried():
+    async def test():
+        attempts = []
+
+        async def call():
+            attempts.append(1)
+            raise ClientError({"Error": {"Code": "ValidationException"}}, "Converse")
+
+        with pytest.raises(ClientError):
+            await controller().call(10, call, lambda result: None)
+        return len(attempts)
+
+    assert asyncio.run(test()) == 1
+
+
+def test_stream_is_retried_before_the_first_chunk():
+    async def test():
+        attempts = []
+
+        async def stream():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise throttling_error()
+            for chunk in ("a", "b"):
+                yield chunk
+
+        chunks = [chunk async for chunk in controller().stream(10, stream, lambda chunk: None)]
+        return chunks, len(attempts)
+
+    assert asyncio.run(test()) == (["a", "b"], 2)
+
+
+def test_stream_is_not_retried_after_the_first_chunk():
+    async def test():
+        attempts = []
+        chunks = []
+
+        async def stream():
+            attempts.append(1)
+            yield "a"
+            raise throttling_error()
+
+        with pytest.raises(ClientError):
+            async for chunk in controller().stream(10, stream, lambda chunk: None):
+                chunks.append(chunk)
+        return chunks, len(attempts)
+
+    assert asyncio.run(test()) == (["a"], 1)
+
+
+def test_failing_listener_does_not_fail_the_call():
+    async def test():
+        async def listener(details):
+            raise ConnectionError("client went away")
+
+        admission_listener.set(listener)
+        return await controller().call(10, FlakyCall(errors=1), lambda result: None)
+
+    assert asyncio.run(test()) == "response"
+
+
+def test_every_caller_sharing_a_generation_is_notified():
+    attempts = []
+
+    async def generate(prompt_value):
+        async def call():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise throttling_error()
+            return "answer"
+
+        return await admission.llm_admission_controller.call(10, call, lambda result: None)
+
+    llm_client = LLMClient.__new__(LLMClient)
+    llm_client.model_id = "test-model"
+    llm_client.llm = RunnableLambda(generate)
+    prompt_template = PromptTemplate.from_template("Question: {question}")
+
+    async def ask(notifications: List[Dict[str, Any]]) -> str:
+        listen(notifications)
+        return await llm_client.generate_response(prompt_template, {"question": "shared"})
+
+    async def test():
+        leader, follower = [], []
+        answers = await asyncio.gather(ask(leader), ask(follower))
+        return answers, leader, follower
+
+    answers, leader, follower = asyncio.run(test())
+    assert answers == ["answer", "answer"]
+    assert len(attempts) == 2
+    assert [details["reason"] for details in leader] == ["throttled"]
+    assert follower == leader
+    assert llm_admission_broadcasts.broadcasts == {}
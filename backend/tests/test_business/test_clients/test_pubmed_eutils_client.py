@@ -0,0 +1,99 @@
+import asyncio
+import time
+from typing import List, Tuple
+
+from aiohttp import web
+
+from benchmarks.stubs.eutils_stub import create_app
+from business.clients.pubmed_eutils_client import PubmedEUtilsClient, parse_pubmed_articles
+from business.clients.rate_limiter import TokenBucketRateLimiter
+
+
+async def serve(test, rate_limiter: TokenBucketRateLimiter = None):
+    """Run `test(client, app, requests)` against the E-utilities stub; `requests` records (path, time) pairs."""
+    app = create_app()
+    requests: List[Tuple[str, float]] = []
+
+    async def record(request: web.Request, response: web.StreamResponse):
+        requests.append((request.path.rsplit("/", 1)[-1], time.monotonic()))
+
+    app.on_response_prepare.append(record)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    client = PubmedEUtilsClient()
+    client.initialize()
+    client.base_url = f"http://127.0.0.1:{port}/entrez/eutils"
+    if rate_limiter is not None:
+        client.rate_limiter = rate_limiter
+    try:
+        return await test(client, app, requests)
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+def test_search_fetches_every_uid_in_one_request():
+    async def test(client, app, requests):
+        uids = await client.esearch("hypertension", 5)
+        documents = await client.search("hypertension", 5)
+        return uids, documents, dict(app["requests"])
+
+    uids, documents, counts = asyncio.run(serve(test))
+    assert len(uids) == 5
+    assert [document.metadata["uid"] for document in documents] == uids
+    assert counts == {"esearch": 2, "efetch": 1}
+
+
+def test_documents_carry_pubmed_retriever_metadata():
+    async def test(client, app, requests):
+        return await client.efetch(["30000012", "30000001"])
+
+    documents = asyncio.run(serve(test))
+    assert [document.metadata["uid"] for document in documents] == ["30000012", "30000001"]
+    document = documents[1]
+    assert set(document.metadata) == {"uid", "Title", "Published", "Copyright Information"}
+    assert document.metadata["Title"] == "Management of type 2 diabetes in adults: study 30000001."
+    assert document.metadata["Published"] == "2016-02-18"
+    assert document.metadata["Copyright Information"] == "Copyright 2016 Stub Publisher."
+    assert document.page_content.splitlines() == [
+        "BACKGROUND: Outcomes of type 2 diabetes remain variable across care settings.",
+        "METHODS: We analysed a cohort of 401 adults with type 2 diabetes.",
+        "RESULTS: Guideline-directed therapy reduced adverse events by 6%.",
+        "CONCLUSIONS: Early treatment of type 2 diabetes improves outcomes.",
+    ]
+
+
+def test_empty_uid_list_makes_no_request():
+    async def test(client, app, requests):
+        return await client.efetch([]), dict(app["requests"])
+
+    assert asyncio.run(serve(test)) == ([], {"esearch": 0, "efetch": 0})
+
+
+def test_requests_are_paced_by_the_rate_limiter():
+    async def test(client, app, requests):
+        await asyncio.gather(*(client.esearch(f"query {i}", 1) for i in range(4)))
+        return requests
+
+    requests = asyncio.run(serve(test, TokenBucketRateLimiter(20, 1)))
+    times = sorted(at for _, at in requests)
+    assert len(times) == 4
+    # One request every 50ms; allow for timer granularity.
+    assert all(later - earlier >= 0.04 for earlier, later in zip(times, times[1:]))
+
+
+def test_book_articles_and_missing_abstracts_are_parsed():
+    documents = parse_pubmed_articles("""<PubmedArticleSet>
+      <PubmedBookArticle><BookDocument>
+        <PMID Version="1">20301</PMID>
+        <BookTitle>GeneReviews</BookTitle>
+      </BookDocument></PubmedBookArticle>
+    </PubmedArticleSet>""")
+    document = documents["20301"]
+    assert document.page_content == "No abstract available"
+    assert document.metadata == {"uid": "20301", "Title": "GeneReviews", "Published": "--",
+                                 "Copyright Information": ""}
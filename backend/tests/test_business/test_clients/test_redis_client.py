@@ -0,0 +1,98 @@
+import asyncio
+from typing import Callable, List
+
+import pytest
+
+from business.clients.redis_client import RedisClient, RedisError, RedisProtocolError
+
+
+async def read_command(reader: asyncio.StreamReader) -> List[str]:
+    count = int((await reader.readuntil(b"\r\n"))[1:-2])
+    args = []
+    for _ in range(count):
+        length = int((await reader.readuntil(b"\r\n"))[1:-2])
+        args.append((await reader.readexactly(length + 2))[:-2].decode())
+    return args
+
+
+async def with_server(reply: Callable[[List[str]], bytes], test):
+    """Run `test(url, connections)` against a RESP server answering every command with `reply(args)`."""
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        try:
+            while True:
+                writer.write(reply(await read_command(reader)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        return await test(port, connections)
+
+
+def replies(args: List[str]) -> bytes:
+    if args[0] == "AUTH":
+        return b"+OK\r\n" if args[-1] == "secret" else b"-WRONGPASS invalid password\r\n"
+    if args[0] == "PING":
+        return b"+PONG\r\n"
+    if args[0] == "GET":
+        return {"hit": b"$5\r\nvalue\r\n", "wrongtype": b"-WRONGTYPE not a string\r\n",
+                "malformed": b"?what\r\n", "nested": b"*2\r\n-ERR first\r\n+second\r\n"}.get(args[1], b"$-1\r\n")
+    return b"-ERR unknown command\r\n"
+
+
+def test_failed_auth_leaves_no_connection_in_the_pool():
+    async def test(port, connections):
+        client = RedisClient(f"redis://:wrong@127.0.0.1:{port}")
+        with pytest.raises(RedisError, match="WRONGPASS"):
+            await client.get("hit")
+        assert client.idle == []
+        await client.close()
+
+        client = RedisClient(f"redis://:secret@127.0.0.1:{port}")
+        assert await client.get("hit") == b"value"
+        await client.close()
+
+    asyncio.run(with_server(replies, test))
+
+
+def test_error_reply_keeps_the_connection():
+    async def test(port, connections):
+        client = RedisClient(f"redis://127.0.0.1:{port}")
+        with pytest.raises(RedisError, match="WRONGTYPE"):
+            await client.get("wrongtype")
+        assert len(client.idle) == 1
+        assert await client.get("hit") == b"value"
+        assert len(connections) == 1
+        await client.close()
+
+    asyncio.run(with_server(replies, test))
+
+
+def test_error_inside_an_array_is_read_in_full():
+    async def test(port, connections):
+        client = RedisClient(f"redis://127.0.0.1:{port}")
+        first, second = await client.get("nested")
+        assert isinstance(first, RedisError) and second == "second"
+        assert await client.ping()
+        assert len(connections) == 1
+        await client.close()
+
+    asyncio.run(with_server(replies, test))
+
+
+def test_malformed_reply_closes_the_connection():
+    async def test(port, connections):
+        client = RedisClient(f"redis://127.0.0.1:{port}")
+        with pytest.raises(RedisProtocolError):
+            await client.get("malformed")
+        assert client.idle == []
+        assert await client.get("missing") is None
+        assert len(connections) == 2
+        await client.close()
+
+    asyncio.run(with_server(replies, test))
@@ -0,0 +1,23 @@
+from fhirpy import AsyncFHIRClient
+
+from business.dependencies import clear_agent_caches, get_fhir_formatter_agent, get_fhir_retriever_agent
+
+
+class FakeLLMClient:
+    def get_llm(self):
+        return None
+
+
+def test_agents_are_cached_until_the_caches_are_cleared():
+    llm_client = FakeLLMClient()
+    fhir_server = AsyncFHIRClient("http://fhir.test/fhir")
+    formatter = get_fhir_formatter_agent(llm_client)
+    retriever = get_fhir_retriever_agent(llm_client, fhir_server)
+    assert get_fhir_formatter_agent(llm_client) is formatter
+    assert get_fhir_retriever_agent(llm_client, fhir_server) is retriever
+
+    clear_agent_caches()
+    assert get_fhir_formatter_agent.cache_info().currsize == 0
+    assert get_fhir_retriever_agent.cache_info().currsize == 0
+    assert get_fhir_formatter_agent(llm_client) is not formatter
+    clear_agent_caches()
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from business.index.bm25_index import MAX_TERM_BYTES, BM25Index, SegmentWriter, tokenize
+
+
+def stored(pmid: int, text: str) -> dict:
+    return {"pmid": pmid, "text": text}
+
+
+def add_segment(index: BM25Index, documents: dict, deletions=(), source=None):
+    writer = SegmentWriter()
+    for pmid, text in documents.items():
+        writer.add(pmid, text, stored(pmid, text))
+    for pmid in deletions:
+        writer.delete(pmid)
+    index.add_segment(writer, source)
+
+
+def pmids(results) -> list:
+    return [document["pmid"] for _, document in results]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = BM25Index(str(tmp_path / "index"))
+    add_segment(index, {
+        1: "Statins reduce mortality in heart failure",
+        2: "Heart failure with preserved ejection fraction",
+        3: "Asthma management in children",
+        4: "Beta blockers in heart failure and heart failure readmission",
+    }, source="baseline-0001.xml.gz")
+    yield index
+    index.close()
+
+
+def test_tokenize_drops_stop_words_and_truncates_terms():
+    assert tokenize("What is the role of SGLT2-inhibitors in HFrEF?") == ["role", "sglt2", "inhibitors", "hfref"]
+    assert tokenize("x" * 40) == ["x" * MAX_TERM_BYTES]
+
+
+def test_search_ranks_by_bm25(index):
+    results = index.search("heart failure", top_k=10)
+
+    assert pmids(results)[0] == 4
+    assert sorted(pmids(results)) == [1, 2, 4]
+    assert [score for score, _ in results] == sorted((score for score, _ in results), reverse=True)
+
+
+def test_search_returns_stored_documents_and_respects_top_k(index):
+    results = index.search("heart failure statins", top_k=1)
+
+    assert results[0][1] == stored(1, "Statins reduce mortality in heart failure")
+
+
+@pytest.mark.parametrize("query", ["", "the of and", "pneumothorax"])
+def test_search_without_matching_terms_is_empty(index, query):
+    assert index.search(query, top_k=5) == []
+
+
+def test_newer_segment_supersedes_and_deletes(index):
+    add_segment(index, {3: "Asthma biologics in adults"}, deletions=[2])
+
+    assert pmids(index.search("children", top_k=5)) == []
+    assert pmids(index.search("asthma", top_k=5)) == [3]
+    assert pmids(index.search("preserved ejection fraction", top_k=5)) == []
+    assert index.document_count == 3
+    assert index.manifest["ingested_files"] == ["baseline-0001.xml.gz"]
+
+
+def test_last_occurrence_in_a_segment_wins(tmp_path):
+    index = BM25Index(str(tmp_path / "index"))
+    add_segment(index, {1: "first version about gout"})
+    writer = SegmentWriter()
+    writer.add(5, "draft about gout", stored(5, "draft"))
+    writer.add(5, "final about lupus", stored(5, "final"))
+    index.add_segment(writer)
+
+    assert pmids(index.search("gout", top_k=5)) == [1]
+    assert index.search("lupus", top_k=5)[0][1] == stored(5, "final")
+    index.close()
+
+
+def test_compact_keeps_only_live_documents(index):
+    add_segment(index, {3: "Asthma biologics in adults"}, deletions=[2])
+    before = index.search("heart failure asthma", top_k=10)
+
+    index.compact(lambda document: document["text"])
+
+    assert len(index.manifest["segments"]) == 1
+    assert sorted(os.listdir(index.path)) == sorted(index.manifest["segments"] + ["manifest.json"])
+    assert index.document_count == 3
+    assert sorted(pmids(index.search("heart failure asthma", top_k=10))) == sorted(pmids(before))
+
+
+def test_reopened_index_reads_the_manifest(index):
+    reopened = BM25Index(index.path)
+    assert reopened.is_stale()
+    reopened.open()
+
+    assert not reopened.is_stale()
+    assert pmids(reopened.search("asthma", top_k=5)) == [3]
+
+    add_segment(index, {6: "Gout flares"})
+    assert reopened.is_stale()
+    reopened.close()
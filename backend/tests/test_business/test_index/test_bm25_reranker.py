@@ -0,0 +1,50 @@
+from langchain_core.documents import Document
+
+from business.index.bm25_reranker import rerank, score_documents
+
+
+def article(uid: str, title: str, abstract: str = "") -> Document:
+    return Document(page_content=abstract, metadata={"uid": uid, "Title": title})
+
+
+def uids(documents) -> list:
+    return [document.metadata["uid"] for document in documents]
+
+
+def test_rerank_orders_by_relevance_and_truncates():
+    documents = [
+        article("1", "Asthma in children"),
+        article("2", "Dapagliflozin outcomes", "Dapagliflozin reduced heart failure hospitalization."),
+        article("3", "Heart failure outcomes", "Dapagliflozin in heart failure with reduced ejection fraction."),
+    ]
+
+    assert uids(rerank("dapagliflozin heart failure", documents, top_k=2)) == ["3", "2"]
+
+
+def test_title_terms_weigh_more_than_abstract_terms():
+    documents = [article("abstract", "Outcomes", "gout"), article("title", "Gout", "outcomes")]
+
+    assert uids(rerank("gout", documents, top_k=2)) == ["title", "abstract"]
+
+
+def test_terms_rare_among_candidates_weigh_most():
+    documents = [
+        article("common", "Diabetes cohort", "diabetes diabetes"),
+        article("rare", "Diabetes and retinopathy", "diabetes retinopathy"),
+        article("other", "Diabetes registry", "diabetes"),
+    ]
+
+    assert uids(rerank("diabetes retinopathy", documents, top_k=1)) == ["rare"]
+
+
+def test_ties_keep_the_retrieval_order():
+    documents = [article(str(index), "Unrelated") for index in range(4)]
+
+    assert uids(rerank("sepsis", documents, top_k=4)) == ["0", "1", "2", "3"]
+    assert score_documents("sepsis", documents).tolist() == [0.0] * 4
+
+
+def test_empty_query_or_candidates():
+    assert score_documents("", [article("1", "Sepsis")]).tolist() == [0.0]
+    assert score_documents("sepsis", []).tolist() == []
+    assert rerank("sepsis", [], top_k=5) == []
@@ -0,0 +1,213 @@
+import json
+from datetime import date
+
+import pytest
+
+from business.index.fhir_analytics_ingest import (add_resources, build_store, extract_facts, iter_bundle_resources,
+                                                  iter_ndjson_resources)
+from business.index.fhir_analytics_store import AnalyticsStore, AnalyticsStoreWriter, Fact
+from business.schemas.fhir_analytics import CohortQuery
+
+LOINC = "http://loinc.org"
+SNOMED = "http://snomed.info/sct"
+
+
+def patient(patient_id: str, gender: str, birth_date: str) -> dict:
+    return {"resourceType": "Patient", "id": patient_id, "gender": gender, "birthDate": birth_date}
+
+
+def hba1c(resource_id: str, patient_id: str, value: float, effective: str = None) -> dict:
+    resource = {"resourceType": "Observation", "id": resource_id, "status": "final",
+                "code": {"coding": [{"system": LOINC, "code": "4548-4", "display": "Hemoglobin A1c"}]},
+                "subject": {"reference": f"urn:uuid:{patient_id}"},
+                "valueQuantity": {"value": value, "unit": "%"}}
+    if effective:
+        resource["effectiveDateTime"] = effective
+    return resource
+
+
+def blood_pressure(resource_id: str, patient_id: str, systolic: float, diastolic: float, effective: str) -> dict:
+    return {"resourceType": "Observation", "id": resource_id,
+            "code": {"coding": [{"system": LOINC, "code": "85354-9", "display": "Blood pressure panel"}]},
+            "subject": {"reference": f"Patient/{patient_id}"}, "effectiveDateTime": effective,
+            "component": [
+                {"code": {"coding": [{"system": LOINC, "code": "8480-6", "display": "Systolic blood pressure"}]},
+                 "valueQuantity": {"value": systolic, "unit": "mm[Hg]"}},
+                {"code": {"coding": [{"system": LOINC, "code": "8462-4", "display": "Diastolic blood pressure"}]},
+                 "valueQuantity": {"value": diastolic, "unit": "mm[Hg]"}},
+            ]}
+
+
+def diabetes(resource_id: str, patient_id: str, onset: str) -> dict:
+    return {"resourceType": "Condition", "id": resource_id,
+            "code": {"coding": [{"system": SNOMED, "code": "44054006", "display": "Diabetes mellitus type 2"}]},
+            "subject": {"reference": f"urn:uuid:{patient_id}"}, "onsetDateTime": onset}
+
+
+RESOURCES = [
+    patient("p1", "female", "1960-01-01"),
+    patient("p2", "male", "1955-06-15"),
+    patient("p3", "female", "1980-03-03"),
+    hba1c("o1", "p1", 6.1, "2023-01-10T08:00:00Z"),
+    hba1c("o2", "p1", 7.4, "2024-02-01"),
+    hba1c("o3", "p2", 8.2, "2024-03-15"),
+    hba1c("o4", "p3", 5.4, "2022-07-01"),
+    blood_pressure("bp1", "p2", 150, 95, "2024-01-05"),
+    diabetes("c1", "p1", "2015-05-01"),
+    diabetes("c2", "p2", "2018-09-09"),
+    {"resourceType": "Observation", "id": "orphan", "code": {"coding": [{"code": "x"}]}},
+    {"resourceType": "Claim", "id": "claim", "patient": {"reference": "urn:uuid:p1"}},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "analytics"))
+    writer = AnalyticsStoreWriter()
+    add_resources(writer, RESOURCES)
+    store.replace(writer, ["bundle.json"])
+    yield store
+    store.close()
+
+
+def ids(result) -> list:
+    return [cohort_patient.patient_id for cohort_patient in result.patients]
+
+
+def test_extract_facts_reads_codes_values_and_components():
+    assert extract_facts(blood_pressure("bp1", "p2", 150, 95, "2024-01-05T10:00:00Z")) == [
+        Fact(LOINC, "85354-9", "Blood pressure panel", "2024-01-05T10:00:00Z", None, None),
+        Fact(LOINC, "8480-6", "Systolic blood pressure", "2024-01-05T10:00:00Z", 150.0, "mm[Hg]"),
+        Fact(LOINC, "8462-4", "Diastolic blood pressure", "2024-01-05T10:00:00Z", 95.0, "mm[Hg]"),
+    ]
+    assert extract_facts(diabetes("c1", "p1", "2015-05-01")) == [
+        Fact(SNOMED, "44054006", "Diabetes mellitus type 2", "2015-05-01", None, None)]
+
+
+def test_add_resources_skips_unreferenced_and_unsupported_resources():
+    writer = AnalyticsStoreWriter()
+
+    assert add_resources(writer, RESOURCES) == len(RESOURCES) - 2
+    assert sorted(writer.patients) == ["p1", "p2", "p3"]
+    assert len(writer) == 9
+
+
+def test_urn_uuid_and_relative_references_resolve_to_the_same_patient(store):
+    result = store.query(CohortQuery(patient_ids=["p2"]))
+
+    assert result.patient_count == 1
+    assert {code.code for code in result.codes} == {f"{LOINC}|4548-4", f"{LOINC}|85354-9", f"{LOINC}|8480-6",
+                                                    f"{LOINC}|8462-4", f"{SNOMED}|44054006"}
+
+
+def test_query_by_code_ranks_the_most_recent_first(store):
+    result = store.query(CohortQuery(codes=["4548-4"]))
+
+    assert ids(result) == ["p2", "p1", "p3"]
+    assert result.patient_count == 3 and result.fact_count == 4
+    p1 = result.patients[1]
+    assert (p1.fact_count, p1.first_date, p1.last_date) == (2, date(2023, 1, 10), date(2024, 2, 1))
+    assert (p1.last_value, p1.min_value, p1.max_value, p1.unit) == (7.4, 6.1, 7.4, "%")
+
+
+def test_query_by_system_and_code(store):
+    assert ids(store.query(CohortQuery(codes=[f"{LOINC}|8480-6"]))) == ["p2"]
+    assert ids(store.query(CohortQuery(codes=[f"{SNOMED}|8480-6"]))) == []
+
+
+@pytest.mark.parametrize("bounds, expected", [
+    ({"value_gt": 7.4}, ["p2"]),
+    ({"value_ge": 7.4}, ["p2", "p1"]),
+    ({"value_lt": 6.1}, ["p3"]),
+    ({"value_le": 6.1, "value_gt": 5.4}, ["p1"]),
+])
+def test_query_by_value_bounds(store, bounds, expected):
+    assert ids(store.query(CohortQuery(codes=["4548-4"], **bounds))) == expected
+
+
+def test_query_by_date_range(store):
+    result = store.query(CohortQuery(codes=["4548-4"], start=date(2023, 1, 1), end=date(2024, 2, 1)))
+
+    assert ids(result) == ["p1"]
+    assert result.fact_count == 2
+    assert ids(store.query(CohortQuery(start=date(2024, 1, 1), resource_type="Observation"))) == ["p2", "p1"]
+
+
+def test_query_by_gender_patients_and_resource_type(store):
+    assert ids(store.query(CohortQuery(codes=["4548-4"], gender="female"))) == ["p1", "p3"]
+    assert ids(store.query(CohortQuery(codes=["4548-4"], patient_ids=["p3", "unknown"]))) == ["p3"]
+    assert ids(store.query(CohortQuery(resource_type="Condition"))) == ["p2", "p1"]
+    assert store.query(CohortQuery(resource_type="Claim")).patient_count == 0
+    assert store.query(CohortQuery(gender="robot")).patient_count == 0
+
+
+def test_limit_truncates_patients_but_not_counts(store):
+    result = store.query(CohortQuery(codes=["4548-4"], limit=1))
+
+    assert ids(result) == ["p2"]
+    assert result.patient_count == 3
+
+
+def test_latest_fact_is_the_latest_dated_one(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "analytics"))
+    writer = AnalyticsStoreWriter()
+    add_resources(writer, [hba1c("a", "dated", 6.0, "2020-01-01"), hba1c("b", "dated", 9.9),
+                           hba1c("c", "dated", 7.0, "2024-06-01"), hba1c("d", "older", 6.5, "2023-01-01"),
+                           hba1c("e", "undated", 5.0)])
+    store.replace(writer, [])
+
+    result = store.query(CohortQuery(codes=["4548-4"]))
+
+    assert ids(result) == ["dated", "older", "undated"]
+    dated = result.patients[0]
+    assert (dated.fact_count, dated.last_date, dated.last_value) == (3, date(2024, 6, 1), 7.0)
+    assert (dated.min_value, dated.max_value) == (6.0, 9.9)
+    undated = result.patients[2]
+    assert (undated.first_date, undated.last_date, undated.last_value) == (None, None, 5.0)
+    store.close()
+
+
+def test_readded_resource_replaces_its_facts(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "analytics"))
+    writer = AnalyticsStoreWriter()
+    add_resources(writer, [hba1c("o1", "p1", 6.1, "2023-01-10"), hba1c("o1", "p1", 6.3, "2023-01-10")])
+    store.replace(writer, [])
+
+    assert [p.last_value for p in store.query(CohortQuery(codes=["4548-4"])).patients] == [6.3]
+    store.close()
+
+
+def test_find_codes(store):
+    assert [summary.code for summary in store.find_codes("blood pressure")] == [
+        f"{LOINC}|8462-4", f"{LOINC}|8480-6", f"{LOINC}|85354-9"]
+    summaries = store.find_codes("A1C")
+    assert [(summary.display, summary.fact_count) for summary in summaries] == [("Hemoglobin A1c", 4)]
+    assert store.find_codes("44054006")[0].display == "Diabetes mellitus type 2"
+    assert store.find_codes("pneumothorax") == []
+
+
+def test_empty_store_answers_nothing(tmp_path):
+    store = AnalyticsStore(str(tmp_path / "missing"))
+    store.open()
+
+    assert store.query(CohortQuery(codes=["4548-4"])).patient_count == 0
+    assert store.find_codes("a1c") == []
+
+
+def test_build_store_from_bundles_and_ndjson(tmp_path):
+    bundle_path = tmp_path / "bundle.json"
+    bundle_path.write_text(json.dumps({"resourceType": "Bundle", "type": "transaction",
+                                       "entry": [{"fullUrl": f"urn:uuid:{resource['id']}", "resource": resource}
+                                                 for resource in RESOURCES]}))
+    ndjson_path = tmp_path / "Observation.ndjson"
+    ndjson_path.write_text(json.dumps(hba1c("o9", "p3", 6.6, "2025-01-01")) + "\n\n")
+    store = AnalyticsStore(str(tmp_path / "analytics"))
+    sources = [str(bundle_path), str(ndjson_path)]
+
+    writer = build_store(store, [*iter_bundle_resources(sources[:1]), *iter_ndjson_resources(sources[1:])], sources)
+
+    assert len(writer) == 10
+    assert store.manifest["sources"] == ["bundle.json", "Observation.ndjson"]
+    assert ids(store.query(CohortQuery(codes=["4548-4"]))) == ["p3", "p2", "p1"]
+    assert not store.is_stale()
+    store.close()
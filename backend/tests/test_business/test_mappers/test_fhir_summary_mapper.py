@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from business.mappers.fhir_summary_mapper import as_fhir_resources, summarize_fhir_resource, summarize_fhir_resources
+
+
+def observation(value_quantity: dict) -> dict:
+    return {"resourceType": "Observation", "status": "final",
+            "code": {"coding": [{"system": "http://loinc.org", "code": "6598-7", "display": "Troponin T"}]},
+            "valueQuantity": value_quantity, "effectiveDateTime": "2024-03-01T08:30:00Z"}
+
+
+@pytest.mark.parametrize("value_quantity, rendered", [
+    ({"value": 0.004, "unit": "ng/mL"}, "0.004 ng/mL"),
+    ({"value": 0.045, "unit": "ng/mL"}, "0.045 ng/mL"),
+    ({"value": 12.3456, "unit": "mmol/L"}, "12.3456 mmol/L"),
+    ({"value": 120, "unit": "mm[Hg]"}, "120 mm[Hg]"),
+    ({"value": 0.01, "comparator": "<", "unit": "ng/mL"}, "<0.01 ng/mL"),
+    ({"value": 90, "comparator": ">=", "code": "mL/min"}, ">=90 mL/min"),
+    ({"value": 7.2}, "7.2"),
+])
+def test_quantity_is_never_rounded_and_keeps_its_comparator(value_quantity, rendered):
+    assert summarize_fhir_resource(observation(value_quantity)) == \
+        f"Troponin T (LOINC 6598-7) | {rendered} | 2024-03-01"
+
+
+def test_observation_components():
+    resource = {"resourceType": "Observation", "status": "final", "code": {"text": "Blood pressure"},
+                "component": [{"code": {"text": "Systolic"}, "valueQuantity": {"value": 128, "unit": "mm[Hg]"}},
+                              {"code": {"text": "Diastolic"}, "valueQuantity": {"value": 84, "unit": "mm[Hg]"}}]}
+
+    assert summarize_fhir_resource(resource) == "Blood pressure | Systolic 128 mm[Hg]; Diastolic 84 mm[Hg]"
+
+
+def test_condition():
+    resource = {"resourceType": "Condition",
+                "code": {"coding": [{"system": "http://snomed.info/sct", "code": "44054006",
+                                     "display": "Diabetes mellitus type 2"}]},
+                "clinicalStatus": {"coding": [{"code": "active"}]},
+                "onsetDateTime": "2019-05-04T00:00:00Z", "recordedDate": "2019-05-05"}
+
+    assert summarize_fhir_resource(resource) == \
+        "Diabetes mellitus type 2 (SNOMED 44054006) | active | onset 2019-05-04 | recorded 2019-05-05"
+
+
+def test_medication_request():
+    resource = {"resourceType": "MedicationRequest", "status": "active", "intent": "order",
+                "medicationCodeableConcept": {"text": "Metformin 500 mg"}, "authoredOn": "2023-01-10",
+                "requester": {"display": "Dr. Lee"}, "dosageInstruction": [{"text": "twice daily"}]}
+
+    assert summarize_fhir_resource(resource) == \
+        "Metformin 500 mg | active | authored 2023-01-10 | by Dr. Lee | dosage twice daily"
+
+
+def test_unsupported_resource_type_uses_the_generic_summary():
+    resource = {"resourceType": "DiagnosticReport", "status": "final", "code": {"text": "Lipid panel"},
+                "effectiveDateTime": "2024-02-02T10:00:00Z"}
+
+    assert summarize_fhir_resource(resource) == "Lipid panel | final | 2024-02-02"
+
+
+def test_resources_are_grouped_by_type_in_order():
+    resources = [{"resourceType": "Condition", "code": {"text": "Asthma"}},
+                 {"resourceType": "Observation", "code": {"text": "Heart rate"}, "valueQuantity": {"value": 72}},
+                 {"resourceType": "Condition", "code": {"text": "Hypertension"}}]
+
+    assert summarize_fhir_resources(resources) == \
+        "Condition (2):\n- Asthma\n- Hypertension\nObservation (1):\n- Heart rate | 72"
+    assert summarize_fhir_resources([]) == "No FHIR resources were found for this query."
+
+
+def test_as_fhir_resources():
+    resource = {"resourceType": "Condition", "id": "c1"}
+    bundle = {"resourceType": "Bundle", "entry": [{"resource": resource}, {"search": {"mode": "outcome"}}]}
+
+    assert as_fhir_resources(bundle) == [resource]
+    assert as_fhir_resources(json.dumps(bundle)) == [resource]
+    assert as_fhir_resources(resource) == [resource]
+    assert as_fhir_resources([resource]) == [resource]
+    assert as_fhir_resources("The patient has no recorded allergies.") is None
+    assert as_fhir_resources([resource, "text"]) is None
@@ -0,0 +1,100 @@
+import pytest
+from langchain_core.documents import Document
+
+from business.index.bm25_index import tokenize
+from business.mappers.pubmed_context_mapper import (NO_ARTICLES_CONTEXT, _is_near_duplicate, _score_sentences,
+                                                    citation_header, estimate_tokens, format_context, pack_context,
+                                                    split_sentences)
+
+
+def article(uid: str, title: str, abstract: str) -> Document:
+    return Document(page_content=abstract, metadata={"uid": uid, "Title": title, "Published": "2021-03-04"})
+
+
+METFORMIN = article("1", "Metformin in type 2 diabetes",
+                    "BACKGROUND: Diabetes is common. Metformin lowers HbA1c in type 2 diabetes. "
+                    "Weight was unchanged. Metformin rarely causes lactic acidosis.")
+ASTHMA = article("2", "Inhaled corticosteroids in asthma",
+                 "Inhaled corticosteroids reduce asthma exacerbations. Adherence was poor.")
+
+
+def terms(text: str) -> frozenset:
+    return frozenset(tokenize(text))
+
+
+@pytest.mark.parametrize("text, sentences", [
+    ("First sentence. Second one! Third? 4th item.", ["First sentence.", "Second one!", "Third?", "4th item."]),
+    ("BACKGROUND: Outcomes vary.\nMETHODS: A cohort.", ["BACKGROUND: Outcomes vary.", "METHODS: A cohort."]),
+    ("Dose was 2.5 mg vs. placebo in e.g. adults.", ["Dose was 2.5 mg vs. placebo in e.g. adults."]),
+    ("Risk fell (p < .05). (Secondary) outcomes held.", ["Risk fell (p < .05).", "(Secondary) outcomes held."]),
+    ("  \n\n ", []),
+])
+def test_split_sentences(text, sentences):
+    assert split_sentences(text) == sentences
+
+
+def test_citation_header_and_missing_metadata():
+    assert citation_header(METFORMIN) == \
+        "PubMed ID: 1 | Title: Metformin in type 2 diabetes | Published: 2021-03-04"
+    assert citation_header(Document(page_content="")) == "PubMed ID: Unknown | Title: Unknown | Published: Unknown"
+
+
+def test_format_context_keeps_every_article_in_full():
+    assert format_context([METFORMIN, ASTHMA]) == (
+        f"{citation_header(METFORMIN)} | Content: {METFORMIN.page_content}\n\n"
+        f"{citation_header(ASTHMA)} | Content: {ASTHMA.page_content}")
+    assert format_context([]) == NO_ARTICLES_CONTEXT
+
+
+@pytest.mark.parametrize("sentence, selected, duplicate", [
+    ("Metformin lowers HbA1c in type 2 diabetes.", ["Metformin lowers HbA1c in type 2 diabetes!"], True),
+    ("Metformin lowers HbA1c in adults with type 2 diabetes.", ["Metformin lowers HbA1c in type 2 diabetes."], True),
+    ("Metformin lowers HbA1c.", ["Metformin rarely causes lactic acidosis."], False),
+    ("Metformin lowers HbA1c.", [], False),
+    ("...", ["..."], False),
+])
+def test_is_near_duplicate(sentence, selected, duplicate):
+    assert _is_near_duplicate(terms(sentence), [terms(other) for other in selected], 0.8) is duplicate
+
+
+def test_sentences_matching_the_query_score_highest():
+    sentences = _score_sentences("metformin HbA1c", [METFORMIN, ASTHMA])
+    best = max(sentences, key=lambda sentence: sentence.score)
+    assert best.text == "Metformin lowers HbA1c in type 2 diabetes."
+    assert (best.article, best.position) == (0, 1)
+    assert all(sentence.score == 0 for sentence in sentences if sentence.article == 1)
+
+
+def test_pack_context_keeps_best_sentences_in_order_with_gaps():
+    context = pack_context("metformin lactic acidosis HbA1c", [METFORMIN, ASTHMA], max_tokens=50)
+    assert context == (f"{citation_header(METFORMIN)} | Content: ... Metformin lowers HbA1c in type 2 diabetes. ... "
+                       "Metformin rarely causes lactic acidosis.")
+
+
+@pytest.mark.parametrize("max_tokens", [30, 45, 60, 100, 200])
+def test_pack_context_stays_within_the_token_budget(max_tokens):
+    context = pack_context("metformin diabetes asthma corticosteroids", [METFORMIN, ASTHMA], max_tokens)
+    assert context == NO_ARTICLES_CONTEXT or estimate_tokens(context) <= max_tokens
+
+
+def test_pack_context_with_room_for_everything_keeps_every_sentence():
+    context = pack_context("diabetes asthma", [METFORMIN, ASTHMA], max_tokens=1000)
+    assert context == format_context([METFORMIN, ASTHMA])
+
+
+def test_pack_context_drops_near_duplicate_sentences():
+    copy = article("3", "Metformin review", "Metformin lowers HbA1c in type 2 diabetes!")
+    context = pack_context("metformin HbA1c", [METFORMIN, copy], max_tokens=1000)
+    assert context.count("Metformin lowers HbA1c in type 2 diabetes") == 1
+    assert "PubMed ID: 3" not in context
+    assert pack_context("metformin HbA1c", [METFORMIN, copy], max_tokens=1000, duplicate_threshold=1.1) \
+        .count("Metformin lowers HbA1c in type 2 diabetes") == 2
+
+
+@pytest.mark.parametrize("documents, max_tokens", [
+    ([], 1000),
+    ([METFORMIN], 5),
+    ([article("4", "Empty", "")], 1000),
+])
+def test_pack_context_without_anything_to_pack(documents, max_tokens):
+    assert pack_context("metformin", documents, max_tokens) == NO_ARTICLES_CONTEXT
@@ -0,0 +1,114 @@
+import pytest
+
+from business.schemas.fhir_search_query import FHIRSearchQuery
+from business.tools.fhir_local_search import query_patient_id, search_resources
+
+PATIENT_ID = "p1"
+
+RESOURCES = [
+    {"resourceType": "Patient", "id": PATIENT_ID, "gender": "female", "birthDate": "1960-04-02"},
+    {"resourceType": "Condition", "id": "diabetes",
+     "code": {"coding": [{"system": "http://snomed.info/sct", "code": "44054006"}]},
+     "clinicalStatus": {"coding": [{"code": "active"}]}, "onsetDateTime": "2019-05-04T10:00:00Z"},
+    {"resourceType": "Condition", "id": "asthma",
+     "code": {"coding": [{"system": "http://snomed.info/sct", "code": "195967001"}]},
+     "clinicalStatus": {"coding": [{"code": "resolved"}]}, "onsetDateTime": "2005-01-20"},
+    {"resourceType": "Condition", "id": "no-onset",
+     "code": {"coding": [{"code": "38341003"}]},
+     "clinicalStatus": {"coding": [{"code": "active"}]}},
+    {"resourceType": "Encounter", "id": "stay", "status": "finished",
+     "period": {"start": "2024-01-30T22:00:00Z", "end": "2024-02-02T09:00:00Z"}},
+    {"resourceType": "Encounter", "id": "ongoing", "status": "in-progress", "period": {"start": "2024-06-01"}},
+]
+
+
+def search(resource_type: str, sort=None, count=None, **params) -> list:
+    """Search RESOURCES; keyword `onset_date` stands for the `onset-date` parameter, `_id` is kept as is."""
+    search_query = FHIRSearchQuery(resource_type=resource_type,
+                                   params={name[0] + name[1:].replace("_", "-"): values
+                                           for name, values in params.items()},
+                                   sort=sort, count=count)
+    matches = search_resources(RESOURCES, search_query)
+    return None if matches is None else [resource["id"] for resource in matches]
+
+
+@pytest.mark.parametrize("params, patient_id", [
+    ({"patient": ["p1"]}, "p1"),
+    ({"subject": ["Patient/p1"]}, "p1"),
+    ({"patient": ["p1,p2"]}, None),
+    ({"patient": ["p1"], "subject": ["p1"]}, "p1"),
+    ({"code": ["x"]}, None),
+])
+def test_query_patient_id(params, patient_id):
+    assert query_patient_id(FHIRSearchQuery(resource_type="Condition", params=params)) == patient_id
+
+
+def test_query_patient_id_of_patient_search():
+    assert query_patient_id(FHIRSearchQuery(resource_type="Patient", params={"_id": ["p1"]})) == "p1"
+
+
+def test_resource_type_and_patient_reference():
+    assert search("Condition", patient=[f"Patient/{PATIENT_ID}"]) == ["diabetes", "asthma", "no-onset"]
+
+
+@pytest.mark.parametrize("token, ids", [
+    ("44054006", ["diabetes"]),
+    ("http://snomed.info/sct|44054006", ["diabetes"]),
+    ("http://loinc.org|44054006", []),
+    ("|38341003", ["no-onset"]),
+    ("|44054006", []),
+    ("44054006,195967001", ["diabetes", "asthma"]),
+])
+def test_token_search(token, ids):
+    assert search("Condition", code=[token]) == ids
+
+
+def test_repeated_parameters_are_anded():
+    assert search("Condition", clinical_status=["active"], code=["44054006,195967001"]) == ["diabetes"]
+
+
+@pytest.mark.parametrize("date, ids", [
+    ("2019", ["diabetes"]),
+    ("2019-05", ["diabetes"]),
+    ("eq2019-05-04", ["diabetes"]),
+    ("ge2010", ["diabetes"]),
+    ("lt2010-01-01", ["asthma"]),
+    ("le2005-01-20", ["asthma"]),
+    ("gt2019-05-04", []),
+])
+def test_date_search(date, ids):
+    assert search("Condition", onset_date=[date]) == ids
+
+
+@pytest.mark.parametrize("date, ids", [
+    ("2024-02-01", ["stay"]),
+    ("ge2024-02-02", ["stay", "ongoing"]),
+    ("ge2030", ["ongoing"]),
+    ("lt2024-01-30", []),
+])
+def test_date_search_over_periods(date, ids):
+    assert search("Encounter", date=[date]) == ids
+
+
+def test_sort_puts_missing_values_last_and_count_limits():
+    assert search("Condition", sort="-onset-date") == ["diabetes", "asthma", "no-onset"]
+    assert search("Condition", sort="onset-date") == ["asthma", "diabetes", "no-onset"]
+    assert search("Condition", sort="-onset-date", count=1) == ["diabetes"]
+
+
+def test_patient_search_by_id():
+    assert search("Patient", _id=[PATIENT_ID], gender=["female"]) == [PATIENT_ID]
+    assert search("Patient", _id=["p2"]) == []
+
+
+@pytest.mark.parametrize("resource_type, params, sort", [
+    ("Condition", {"code:text": ["diabetes"]}, None),
+    ("Condition", {"subject.name": ["Rivera"]}, None),
+    ("Condition", {"onset-date": ["ap2019"]}, None),
+    ("Condition", {"onset-date": ["2019-05-04T10:00"]}, None),
+    ("Condition", {"body-site": ["368209003"]}, None),
+    ("Condition", {}, "code"),
+    ("Observation", {"value-quantity": ["gt5"]}, None),
+])
+def test_unsupported_search_returns_none(resource_type, params, sort):
+    assert search_resources(RESOURCES, FHIRSearchQuery(resource_type=resource_type, params=params, sort=sort)) is None
@@ -0,0 +1,98 @@
+import copy
+
+import pytest
+
+from business.tools import fhir_projection
+from business.tools.fhir_projection import DEFAULT_PROJECTION_PROFILES, project_resource, projection_params
+
+MODIFIER_EXTENSION = [{"url": "http://example.org/fhir/StructureDefinition/refuted",
+                       "valueBoolean": True,
+                       "extension": [{"url": "reason", "valueString": "retracted"}]}]
+
+
+def profiled_resource(resource_type: str) -> dict:
+    """A resource with every element of the profile, one typed variant per choice element, and elements to drop."""
+    resource = {"resourceType": resource_type, "id": "r1", "implicitRules": "http://example.org/rules",
+                "meta": {"versionId": "3", "lastUpdated": "2024-05-01T10:00:00Z", "source": "#abc",
+                         "profile": ["http://hl7.org/fhir/us/core/StructureDefinition/us-core"]},
+                "text": {"status": "generated", "div": "<div>narrative</div>"},
+                "extension": [{"url": "http://example.org/race", "valueString": "x"}],
+                "modifierExtension": MODIFIER_EXTENSION,
+                "language": "en", "contained": [{"resourceType": "Organization", "id": "o1"}]}
+    for element in DEFAULT_PROJECTION_PROFILES[resource_type]:
+        if element.endswith("[x]"):
+            resource[element.removesuffix("[x]") + "DateTime"] = "2024-01-01"
+        else:
+            resource[element] = {"text": element, "extension": [{"url": "http://example.org/note"}]}
+    return resource
+
+
+@pytest.mark.parametrize("resource_type", sorted(DEFAULT_PROJECTION_PROFILES))
+def test_projection_params_list_the_profile(resource_type):
+    elements = projection_params(resource_type)["_elements"].split(",")
+    assert elements == [element.removesuffix("[x]") for element in DEFAULT_PROJECTION_PROFILES[resource_type]]
+
+
+def test_types_without_profile_are_summarized():
+    assert projection_params("Location") == {"_summary": "data"}
+
+
+def test_projection_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(fhir_projection.settings, "FHIR_PROJECTION_ENABLED", False)
+    resource = profiled_resource("Condition")
+    assert projection_params("Condition") == {}
+    assert project_resource(copy.deepcopy(resource)) == resource
+
+
+@pytest.mark.parametrize("resource_type", sorted(DEFAULT_PROJECTION_PROFILES))
+def test_project_resource_keeps_the_profile(resource_type):
+    projected = project_resource(profiled_resource(resource_type))
+
+    expected = {"resourceType", "id", "implicitRules", "meta", "modifierExtension"}
+    for element in DEFAULT_PROJECTION_PROFILES[resource_type]:
+        expected.add(element.removesuffix("[x]") + "DateTime" if element.endswith("[x]") else element)
+    assert set(projected) == expected
+    assert projected["meta"] == {"versionId": "3", "lastUpdated": "2024-05-01T10:00:00Z"}
+    assert projected["modifierExtension"] == MODIFIER_EXTENSION
+    for element in DEFAULT_PROJECTION_PROFILES[resource_type]:
+        if not element.endswith("[x]"):
+            assert projected[element] == {"text": element}
+
+
+def test_choice_elements_keep_every_typed_variant_only():
+    projected = project_resource({"resourceType": "Observation", "valueQuantity": {"value": 7.1},
+                                  "valueString": "high", "values": [1], "valuer": "x", "effectivePeriod": {}})
+    assert set(projected) == {"resourceType", "valueQuantity", "valueString", "effectivePeriod"}
+
+
+def test_extensions_are_stripped_at_every_depth_but_modifier_extensions_are_kept():
+    dosage = {"text": "1 tablet daily", "_text": {"extension": [{"url": "http://example.org/translation"}]},
+              "modifierExtension": copy.deepcopy(MODIFIER_EXTENSION),
+              "doseAndRate": [{"doseQuantity": {"value": 1, "extension": [{"url": "http://example.org/x"}]}}]}
+    projected = project_resource({"resourceType": "MedicationRequest", "status": "active",
+                                  "_status": {"extension": [{"url": "http://example.org/y"}]},
+                                  "dosageInstruction": [dosage]})
+    assert projected == {"resourceType": "MedicationRequest", "status": "active",
+                         "dosageInstruction": [{"text": "1 tablet daily", "modifierExtension": MODIFIER_EXTENSION,
+                                                "doseAndRate": [{"doseQuantity": {"value": 1}}]}]}
+
+
+def test_types_without_profile_keep_extensions_and_drop_the_narrative():
+    resource = {"resourceType": "Location", "id": "l1", "text": {"div": "<div/>"}, "name": "Ward 3",
+                "_name": {"extension": [{"url": "http://example.org/translation"}]},
+                "extension": [{"url": "http://example.org/z", "valueString": "z"}],
+                "meta": {"versionId": "1", "tag": [{"code": "x"}]}}
+    assert project_resource(resource) == {
+        "resourceType": "Location", "id": "l1", "name": "Ward 3",
+        "_name": {"extension": [{"url": "http://example.org/translation"}]},
+        "extension": [{"url": "http://example.org/z", "valueString": "z"}],
+        "meta": {"versionId": "1"}}
+
+
+def test_meta_without_kept_elements_is_dropped():
+    assert project_resource({"resourceType": "Condition", "meta": {"source": "#abc"}}) == {"resourceType": "Condition"}
+
+
+@pytest.mark.parametrize("resource", [None, [], "Patient"])
+def test_non_resources_are_returned_as_is(resource):
+    assert project_resource(resource) == resource
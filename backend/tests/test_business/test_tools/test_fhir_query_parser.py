@@ -0,0 +1,135 @@
+import pytest
+
+from business.schemas.fhir_search_query import FHIRSearchQuery
+from business.tools.fhir_query_parser import (FHIRQueryParseError, FHIRQueryScopeError, parse_fhir_queries,
+                                              parse_fhir_query, scope_to_patient)
+
+PATIENT_ID = "564b051c-6fcf-4123-909e-5ee74d5f6a9a"
+OTHER_PATIENT_ID = "0c3d2f1e-9a8b-4c7d-8e6f-5a4b3c2d1e0f"
+
+
+def test_parses_type_params_sort_and_count():
+    search_query = parse_fhir_query(
+        f"Condition?patient={PATIENT_ID}&clinical-status=active&_sort=-onset-date&_count=5", PATIENT_ID)
+
+    assert search_query == FHIRSearchQuery(resource_type="Condition",
+                                           params={"patient": [PATIENT_ID], "clinical-status": ["active"]},
+                                           sort="-onset-date", count=5)
+
+
+@pytest.mark.parametrize("fhir_query", [
+    f"http://fhir.test/fhir/Observation?patient={PATIENT_ID}&code=8480-6",
+    f"/Observation?patient={PATIENT_ID}&code=8480-6",
+    f"`Observation?patient={PATIENT_ID}&code=8480-6`",
+])
+def test_accepts_urls_leading_slashes_and_quoting(fhir_query):
+    search_query = parse_fhir_query(fhir_query, PATIENT_ID)
+
+    assert search_query.resource_type == "Observation"
+    assert search_query.params == {"patient": [PATIENT_ID], "code": ["8480-6"]}
+
+
+def test_keeps_repeated_parameters_and_modifiers():
+    search_query = parse_fhir_query(f"Observation?patient={PATIENT_ID}&date=ge2024-01-01&date=lt2025-01-01"
+                                    f"&code:not=8480-6", PATIENT_ID)
+
+    assert search_query.params["date"] == ["ge2024-01-01", "lt2025-01-01"]
+    assert search_query.params["code:not"] == ["8480-6"]
+
+
+def test_bare_parameters_take_the_resource_type_from_entities():
+    search_query = parse_fhir_query(f"?patient={PATIENT_ID}&status=active,completed", PATIENT_ID,
+                                    {"resource_type": ["MedicationRequest"]})
+
+    assert search_query.resource_type == "MedicationRequest"
+    assert search_query.params == {"patient": [PATIENT_ID], "status": ["active,completed"]}
+
+
+def test_unscoped_search_is_scoped_to_the_session_patient():
+    search_query = parse_fhir_query("?clinical-status=active", PATIENT_ID, {"resourceType": "Condition"})
+
+    assert search_query.params == {"clinical-status": ["active"], "patient": [PATIENT_ID]}
+
+
+@pytest.mark.parametrize("reference", [PATIENT_ID, f"Patient/{PATIENT_ID}"])
+def test_subject_reference_to_the_session_patient_is_kept(reference):
+    search_query = parse_fhir_query(f"Observation?subject={reference}", PATIENT_ID)
+
+    assert search_query.params == {"subject": [reference]}
+
+
+def test_patient_read_is_scoped_by_id():
+    assert parse_fhir_query(f"Patient/{PATIENT_ID}", PATIENT_ID).params == {"_id": [PATIENT_ID]}
+    assert parse_fhir_query("Patient?name=Rivera", PATIENT_ID).params == {"name": ["Rivera"], "_id": [PATIENT_ID]}
+
+
+@pytest.mark.parametrize("fhir_query", [
+    f"Condition?patient={OTHER_PATIENT_ID}",
+    f"Condition?patient={PATIENT_ID},{OTHER_PATIENT_ID}",
+    f"Condition?patient={PATIENT_ID}&patient={OTHER_PATIENT_ID}",
+    f"Observation?patient={PATIENT_ID}&subject=Patient/{OTHER_PATIENT_ID}",
+    "Observation?subject=Group/cohort-1",
+    "Observation?subject.name=Rivera",
+    "Observation?patient:Patient.family=Rivera",
+    "Encounter?patient:missing=false",
+    f"Patient/{OTHER_PATIENT_ID}",
+    f"Patient?_id={PATIENT_ID},{OTHER_PATIENT_ID}",
+    "Medication?code=197361",
+    "Practitioner?name=Smith",
+])
+def test_search_of_other_patients_is_rejected(fhir_query):
+    with pytest.raises(FHIRQueryScopeError):
+        parse_fhir_query(fhir_query, PATIENT_ID)
+
+
+def test_scope_error_is_not_a_parse_error():
+    # Parse errors fall back to the LLM retriever agent; scope errors must not.
+    assert not issubclass(FHIRQueryScopeError, FHIRQueryParseError)
+
+
+def test_scope_to_patient_adds_the_patient_reference():
+    search_query = scope_to_patient(FHIRSearchQuery(resource_type="Encounter"), PATIENT_ID)
+
+    assert search_query.params == {"patient": [PATIENT_ID]}
+
+
+@pytest.mark.parametrize("fhir_query", [
+    "",
+    "   ",
+    f"Patient/{PATIENT_ID}/$everything",
+    f"Observation/$lastn?patient={PATIENT_ID}",
+    f"Vitals?patient={PATIENT_ID}",
+    f"Patient/{'x' * 65}",
+    f"Condition?patient={PATIENT_ID}&_count=0",
+    f"Condition?patient={PATIENT_ID}&_count=-1",
+    f"Condition?patient={PATIENT_ID}&_count=five",
+    f"Condition?patient={PATIENT_ID}&code%20x=1",
+    f"Condition?patient={PATIENT_ID}&code=",
+    "?status=active",
+])
+def test_invalid_query_is_rejected(fhir_query):
+    with pytest.raises(FHIRQueryParseError):
+        parse_fhir_query(fhir_query, PATIENT_ID)
+
+
+def test_format_is_dropped():
+    assert parse_fhir_query(f"Condition?patient={PATIENT_ID}&_format=json", PATIENT_ID).params == {
+        "patient": [PATIENT_ID]}
+
+
+def test_parse_fhir_queries_reads_one_search_per_line():
+    search_queries = parse_fhir_queries(f"""```
+Condition?patient={PATIENT_ID}&clinical-status=active
+
+MedicationRequest?status=active
+```""", PATIENT_ID)
+
+    assert [search_query.resource_type for search_query in search_queries] == ["Condition", "MedicationRequest"]
+    assert all(search_query.params["patient"] == [PATIENT_ID] for search_query in search_queries)
+
+
+def test_parse_fhir_queries_rejects_any_invalid_line():
+    with pytest.raises(FHIRQueryScopeError):
+        parse_fhir_queries(f"Condition?patient={PATIENT_ID}\nCondition?patient={OTHER_PATIENT_ID}", PATIENT_ID)
+    with pytest.raises(FHIRQueryParseError):
+        parse_fhir_queries("  \n ", PATIENT_ID)
@@ -0,0 +1,176 @@
+import asyncio
+import base64
+from typing import Dict, List, Optional
+
+import pytest
+from fhirpy import AsyncFHIRClient
+
+from business.tools.fhir_search_iterator import FHIRSearchIterator, decode_search_cursor, encode_search_cursor
+
+BASE_URL = "http://fhir.test/fhir"
+
+
+def bundle(ids: List[str], next_url: Optional[str] = None) -> dict:
+    return {"resourceType": "Bundle", "type": "searchset",
+            "link": [{"relation": "next", "url": next_url}] if next_url else [],
+            "entry": [{"resource": {"resourceType": "Observation", "id": id_}} for id_ in ids]}
+
+
+def page_url(page: int) -> str:
+    return f"{BASE_URL}/Observation?_count=2&page={page}"
+
+
+class FakePagesIterator(FHIRSearchIterator):
+    """Serves the pages from a dict keyed by path or `next` link instead of the FHIR server."""
+
+    def __init__(self, pages: Dict[str, dict], sizes: Optional[Dict[str, int]] = None, **kwargs):
+        kwargs.setdefault("projection", False)
+        super().__init__(AsyncFHIRClient(BASE_URL), "Observation", {"patient": "p1"}, **kwargs)
+        self.served = pages
+        self.sizes = sizes or {}
+        self.fetched: List[str] = []
+
+    async def _fetch_page(self, path, params=None):
+        self.fetched.append(path)
+        return self.served[path], self.sizes.get(path, 100)
+
+
+def three_pages() -> Dict[str, dict]:
+    return {"Observation": bundle(["o1", "o2"], page_url(2)),
+            page_url(2): bundle(["o3", "o4"], page_url(3)),
+            page_url(3): bundle(["o5"])}
+
+
+def ids(resources: List[dict]) -> List[str]:
+    return [resource["id"] for resource in resources]
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+def test_follows_next_links(prefetch):
+    iterator = FakePagesIterator(three_pages(), prefetch=prefetch)
+
+    assert ids(asyncio.run(iterator.collect())) == ["o1", "o2", "o3", "o4", "o5"]
+    assert iterator.fetched == ["Observation", page_url(2), page_url(3)]
+    assert iterator.pages == 3
+    assert iterator.next_url is None
+    assert not iterator.truncated
+
+
+def test_page_size_is_sent_as_count():
+    iterator = FakePagesIterator(three_pages(), page_size=2)
+
+    assert iterator.params == {"patient": "p1", "_count": 2}
+
+
+def test_limit_stops_quietly_without_fetching_further_pages():
+    iterator = FakePagesIterator(three_pages(), limit=3)
+
+    assert ids(asyncio.run(iterator.collect())) == ["o1", "o2", "o3"]
+    assert iterator.fetched == ["Observation", page_url(2)]
+    assert not iterator.truncated
+
+
+def test_limit_below_page_size_lowers_count():
+    iterator = FakePagesIterator(three_pages(), limit=1, page_size=100)
+
+    assert iterator.params["_count"] == 1
+    assert ids(asyncio.run(iterator.collect())) == ["o1"]
+
+
+def test_max_resources_truncates():
+    iterator = FakePagesIterator(three_pages(), max_resources=3)
+
+    assert ids(asyncio.run(iterator.collect())) == ["o1", "o2", "o3"]
+    assert iterator.truncated
+
+
+def test_max_bytes_truncates_after_the_page_over_the_cap():
+    iterator = FakePagesIterator(three_pages(), sizes={"Observation": 600, page_url(2): 600}, max_bytes=1000)
+
+    assert ids(asyncio.run(iterator.collect())) == ["o1", "o2", "o3", "o4"]
+    assert iterator.truncated
+
+
+def test_max_pages_keeps_the_next_link_to_resume_from():
+    iterator = FakePagesIterator(three_pages(), max_pages=1)
+
+    assert ids(asyncio.run(iterator.collect())) == ["o1", "o2"]
+    assert iterator.fetched == ["Observation"]
+    assert iterator.next_url == page_url(2)
+    assert decode_search_cursor(iterator.fhir_server, iterator.cursor) == page_url(2)
+    assert not iterator.truncated
+
+
+def test_first_page_is_not_fetched():
+    pages = three_pages()
+    iterator = FakePagesIterator(pages, first_page=pages.pop("Observation"))
+
+    assert ids(asyncio.run(iterator.collect())) == ["o1", "o2", "o3", "o4", "o5"]
+    assert iterator.fetched == [page_url(2), page_url(3)]
+
+
+def test_stopping_early_cancels_the_prefetched_page():
+    fetch_started = asyncio.Event()
+    fetch_cancelled = asyncio.Event()
+
+    class PendingSecondPage(FakePagesIterator):
+        async def _fetch_page(self, path, params=None):
+            if path == "Observation":
+                return await super()._fetch_page(path, params)
+            fetch_started.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                fetch_cancelled.set()
+                raise
+
+    async def consume_one():
+        resources = aiter(PendingSecondPage(three_pages(), prefetch=True))
+        first = await anext(resources)
+        await fetch_started.wait()
+        await resources.aclose()
+        await asyncio.wait_for(fetch_cancelled.wait(), 1)
+        return first
+
+    assert asyncio.run(consume_one())["id"] == "o1"
+    assert fetch_cancelled.is_set()
+
+
+@pytest.mark.parametrize("next_url", [
+    f"{BASE_URL}/Observation?patient=p1&_count=2&page=2",
+    f"{BASE_URL}?_getpages=3f2a&_getpagesoffset=100&_count=100",
+    f"{BASE_URL}/Patient/p1/$everything?_page_token=abc%3D%3D",
+])
+def test_cursor_round_trip(next_url):
+    fhir_server = AsyncFHIRClient(BASE_URL)
+
+    cursor = encode_search_cursor(fhir_server, next_url)
+
+    assert "/" not in cursor and "=" not in cursor
+    assert decode_search_cursor(fhir_server, cursor) == next_url
+
+
+def raw_cursor(relative: bytes) -> str:
+    return base64.urlsafe_b64encode(relative).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "%%%",
+    raw_cursor(b""),
+    raw_cursor(b"\xff\xfe"),
+    raw_cursor(b"http://attacker.test/fhir/Patient"),
+    raw_cursor(b"//attacker.test/fhir/Patient"),
+    raw_cursor(b"/etc/passwd"),
+    raw_cursor(b"../admin/Patient"),
+    raw_cursor(b"Patient/../../admin"),
+])
+def test_tampered_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_search_cursor(AsyncFHIRClient(BASE_URL), cursor)
+
+
+def test_decoded_cursor_stays_under_the_base_url():
+    decoded = decode_search_cursor(AsyncFHIRClient(BASE_URL), raw_cursor(b"Observation?next=http://attacker.test/"))
+
+    assert decoded == f"{BASE_URL}/Observation?next=http://attacker.test/"
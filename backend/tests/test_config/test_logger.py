@@ -0,0 +1,120 @@
+import io
+import re
+import sys
+
+import pytest
+from langchain_core.documents import Document
+from loguru import logger
+
+from business.schemas.fhir_search_query import FHIRSearchQuery
+from config import logger as logger_module
+from config.logger import LogSampler, payload, setup_logging, summarize
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+@pytest.fixture
+def log(monkeypatch):
+    """Set up logging to a buffer without the background thread; returns a function reading the messages logged."""
+    monkeypatch.setattr(logger_module.settings, "LOG_ENQUEUE", False)
+    monkeypatch.setattr(logger_module.settings, "LOG_LEVEL", "DEBUG")
+    sink = io.StringIO()
+
+    def messages():
+        return [line.split(" | ", 2)[2] for line in ANSI_ESCAPE.sub("", sink.getvalue()).splitlines()]
+
+    def configure():
+        setup_logging(sink)
+        return messages
+
+    yield configure
+    logger.remove()
+    logger.configure(patcher=lambda record: None)
+    logger.add(sys.stderr)
+
+
+def test_identifiers_are_redacted(log):
+    messages = log()
+    logger.info("Patient 123-45-6789 <jane.doe@example.org> called (555) 123-4567 and +1 555.987.6543")
+    logger.info("Observation 12345678 on 2024-01-30, 5 results")
+    assert messages() == ["Patient [SSN] <[EMAIL]> called [PHONE] and [PHONE]",
+                          "Observation 12345678 on 2024-01-30, 5 results"]
+
+
+def test_configured_patterns_redact_names(log, monkeypatch):
+    monkeypatch.setattr(logger_module.settings, "LOG_REDACT_PATTERNS", [r"\bJane Doe\b"])
+    messages = log()
+    logger.info("Summary for Jane Doe, 555-123-4567")
+    assert messages() == ["Summary for [REDACTED], [PHONE]"]
+
+
+def test_redaction_can_be_disabled(log, monkeypatch):
+    monkeypatch.setattr(logger_module.settings, "LOG_REDACT", False)
+    messages = log()
+    logger.info("SSN 123-45-6789")
+    assert messages() == ["SSN 123-45-6789"]
+
+
+def test_query_text_is_logged_by_shape(log):
+    messages = log()
+    logger.info("Query: {}", payload("Does Jane Doe's HbA1c of 9.1 call for insulin?"))
+    assert messages() == ["Query: <46 chars>"]
+
+
+def test_payloads_are_truncated_when_enabled(log, monkeypatch):
+    monkeypatch.setattr(logger_module.settings, "LOG_PAYLOADS", True)
+    monkeypatch.setattr(logger_module.settings, "LOG_MAX_PAYLOAD_CHARS", 10)
+    messages = log()
+    logger.info("Query: {}", payload("Does Jane Doe's HbA1c of 9.1 call for insulin?"))
+    logger.info("Short: {}", payload("HbA1c"))
+    assert messages() == ["Query: Does Jane ... (+36 chars)", "Short: HbA1c"]
+
+
+def test_payloads_are_not_rendered_below_the_level(log):
+    class Unrenderable:
+        def __str__(self):
+            raise AssertionError("rendered")
+
+    messages = log()
+    logger.remove()
+    logger.add(io.StringIO(), level="INFO")
+    logger.debug("Value: {}", payload(Unrenderable()))
+    assert messages() == []
+
+
+@pytest.mark.parametrize("value, summary", [
+    (None, "None"),
+    (3.5, "3.5"),
+    ("John Smith", "<10 chars>"),
+    (b"\x00\x01", "<2 bytes>"),
+    ({"resourceType": "Patient", "name": [{"family": "Smith"}]}, "<Patient>"),
+    (Document(page_content="Metformin lowers HbA1c."), "<Document 23 chars>"),
+    ([{"resourceType": "Condition"}, {"resourceType": "Condition"}, {"resourceType": "Observation"}, "x"],
+     "<list of 4: 2 Condition, 1 Observation, 1 str>"),
+    ((), "<tuple of 0>"),
+    ({"patient": "John Smith", "nested": {"name": "John Smith"}, "ids": ["p1", "p2"]},
+     "{patient: <10 chars>, nested: <dict of 1>, ids: <list of 2: 2 str>}"),
+])
+def test_summarize_describes_shape_not_content(value, summary):
+    assert summarize(value) == summary
+
+
+def test_summarize_bounds_size_and_depth():
+    assert summarize({f"key{i}": {"name": "John Smith"} for i in range(10)}) == \
+        "{" + ", ".join(f"key{i}: <dict of 1>" for i in range(8)) + ", +2 more}"
+    assert summarize([str(i) if i % 2 else i for i in range(1000)] + [None] * 5 + [b""] * 3 + [1.0, object()]) == \
+        "<list of 1010: 500 int, 500 str, 5 NoneType, 3 bytes, 1 float>"
+
+
+def test_summarize_models_lists_their_fields_one_level_deep():
+    search_query = FHIRSearchQuery(resource_type="Condition", params={"patient": ["p1"]})
+    summary = summarize(search_query)
+    assert summary.startswith("<FHIRSearchQuery resource_type=<9 chars>, params=<dict of 1>")
+    assert "p1" not in summary
+    assert summarize({"query": search_query}) == "{query: <FHIRSearchQuery>}"
+
+
+@pytest.mark.parametrize("every, emitted", [(1, list(range(10))), (4, [0, 4, 8]), (0, []), (-1, [])])
+def test_log_sampler_lets_one_in_every_through(every, emitted):
+    sampler = LogSampler(every)
+    assert [event for event in range(10) if sampler.sample()] == emitted
@@ -0,0 +1,31 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from presentation.dependencies import get_conditions_service
+from presentation.routers.v1 import conditions
+
+
+class FakeConditionsService:
+    async def get_latest_conditions_for_patients(self, patient_ids, count):
+        return {patient_id: count for patient_id in patient_ids}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(conditions.router)
+    app.dependency_overrides[get_conditions_service] = FakeConditionsService
+    return TestClient(app)
+
+
+def test_count_is_passed_through(client):
+    response = client.get("/conditions/latest/patients?patient_ids=p1&patient_ids=p2&count=5")
+
+    assert response.status_code == 200
+    assert response.json() == {"p1": 5, "p2": 5}
+
+
+@pytest.mark.parametrize("count", ["0", "-1", str(conditions.settings.FHIR_SEARCH_PAGE_SIZE + 1)])
+def test_invalid_count_is_rejected(client, count):
+    assert client.get(f"/conditions/latest/patients?patient_ids=p1&count={count}").status_code == 422
@@ -0,0 +1,41 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from presentation.dependencies import get_encounters_service
+from presentation.routers.v1 import encounters
+
+
+class FakeEncountersService:
+    async def get_recent_encounters_for_patients(self, patient_ids, count):
+        return {patient_id: count for patient_id in patient_ids}
+
+    async def get_recent_encounters(self, patient_id, count):
+        return {patient_id: count}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(encounters.router)
+    app.dependency_overrides[get_encounters_service] = FakeEncountersService
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", ["/encounters/recent/patients?patient_ids=p1&patient_ids=p2",
+                                  "/encounters/recent/patients/p1"])
+def test_count_defaults_to_three(client, path):
+    response = client.get(path)
+
+    assert response.status_code == 200
+    assert set(response.json().values()) == {3}
+
+
+@pytest.mark.parametrize("path", ["/encounters/recent/patients?patient_ids=p1&", "/encounters/recent/patients/p1?"])
+@pytest.mark.parametrize("count", ["0", "-1", str(encounters.settings.FHIR_SEARCH_PAGE_SIZE + 1), "all"])
+def test_invalid_count_is_rejected(client, path, count):
+    assert client.get(f"{path}count={count}").status_code == 422
+
+
+def test_batch_requires_patient_ids(client):
+    assert client.get("/encounters/recent/patients").status_code == 422
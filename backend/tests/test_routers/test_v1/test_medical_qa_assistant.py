@@ -0,0 +1,43 @@
+import asyncio
+import json
+
+from fastapi import WebSocketDisconnect
+from loguru import logger
+
+from presentation.routers.v1.medical_qa_assistant import QuerySession, format_data, format_event
+
+
+class FakeWebSocket:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.sent = []
+
+    async def receive_json(self):
+        if not self.messages:
+            raise WebSocketDisconnect()
+        return self.messages.pop(0)
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+
+def test_invalid_message_is_logged_without_the_client_input():
+    question = "Does Jane Doe, born 1961-02-03, still take warfarin?"
+    websocket = FakeWebSocket([{"id": "q1", "role": "DOCTOR", "content": question, "created_at": "yesterday"}])
+    logs = []
+    sink = logger.add(logs.append, level="WARNING", format="{message}")
+    try:
+        asyncio.run(QuerySession(websocket, "/test", "NORMAL").receive(None))
+    finally:
+        logger.remove(sink)
+
+    assert websocket.sent == [{"event": "error", "request_id": "q1", "detail": "Invalid message."}]
+    assert len(logs) == 1
+    assert "Invalid message" in logs[0]
+    assert "role" in logs[0] and "created_at" in logs[0]
+    assert "warfarin" not in logs[0] and "yesterday" not in logs[0] and "DOCTOR" not in logs[0]
+
+
+def test_event_stream_framing():
+    assert format_event("stage", {"stage": "retriever"}) == 'event: stage\ndata: {"stage": "retriever"}\n\n'
+    assert format_data("line one\nline two") == "data: line one<br>line two\n\n"
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from business.services.patients_service import PatientsService
+from presentation.dependencies import get_patient_summary_service, get_patients_service
+from presentation.routers.v1 import patients
+
+
+class FakePatientsService:
+    def __init__(self, resources):
+        self.resources = resources
+
+    async def stream_many(self):
+        return PatientsService._stream(self.resources[0] if self.resources else None, self._rest())
+
+    async def _rest(self):
+        for resource in self.resources[1:]:
+            yield resource
+
+
+def client(resources) -> TestClient:
+    app = FastAPI()
+    app.include_router(patients.router)
+    app.dependency_overrides[get_patients_service] = lambda: FakePatientsService(resources)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("resources", [
+    [],
+    [{"resourceType": "Patient", "id": "p1"}],
+    [{"resourceType": "Patient", "id": f"p{index}", "name": [{"family": "Ñúñez"}]} for index in range(250)],
+])
+def test_get_many_streams_one_json_array(resources):
+    response = client(resources).get("/patients")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.content) == resources
+
+
+def test_stream_writes_ndjson():
+    resources = [{"resourceType": "Patient", "id": "p1"}, {"resourceType": "Patient", "id": "p2"}]
+
+    response = client(resources).get("/patients/stream")
+
+    assert [json.loads(line) for line in response.text.splitlines()] == resources
+
+
+class FakePatientSummaryService:
+    async def get_summary(self, patient_id, conditions_count, encounters_count):
+        return {"patient": {"id": patient_id, "counts": [conditions_count, encounters_count]}}
+
+
+@pytest.fixture
+def summary_client() -> TestClient:
+    app = FastAPI()
+    app.include_router(patients.router)
+    app.dependency_overrides[get_patient_summary_service] = FakePatientSummaryService
+    return TestClient(app)
+
+
+def test_summary_counts(summary_client):
+    assert summary_client.get("/patients/p1/summary").json()["patient"]["counts"] == [1, 3]
+    assert summary_client.get("/patients/p1/summary?conditions_count=2&encounters_count=5").json()["patient"][
+        "counts"] == [2, 5]
+
+
+@pytest.mark.parametrize("query", ["conditions_count=0", "conditions_count=-1", "encounters_count=0",
+                                   "encounters_count=-3",
+                                   f"encounters_count={patients.settings.FHIR_SEARCH_PAGE_SIZE + 1}"])
+def test_invalid_summary_counts_are_rejected(summary_client, query):
+    assert summary_client.get(f"/patients/p1/summary?{query}").status_code == 422
@@ -36,6 +36,7 @@ const useChat = (url: string, patient_id?: string): UseChatHook => {
   const [isTyping, setIsTyping] = useState<boolean>(false);
   const [error, setError] = useState<string | null>(null);
   const socketRef = useRef<WebSocket | null>(null);
+  const pendingIdRef = useRef<string | null>(null);
 
   useEffect(() => {
     const socket = new WebSocket(url);
@@ -55,6 +56,22 @@ const useChat = (url: string, patient_id?: string): UseChatHook => {
         const rawData = JSON.parse(event.data);
         console.log('Raw message received:', rawData);
 
+        // Events about a query: progress such as "queued" precedes the answer, "cancelled" and "error" end it.
+        if (rawData && typeof rawData === 'object' && rawData.event) {
+          console.log('Assistant event received:', rawData);
+          if (rawData.event === 'cancelled' || rawData.event === 'error') {
+            if (rawData.request_id === pendingIdRef.current) {
+              pendingIdRef.current = null;
+              setIsLoading(false);
+              setIsTyping(false);
+            }
+            if (rawData.event === 'error') {
+              setError(rawData.detail ?? 'The assistant could not answer.');
+            }
+          }
+          return;
+        }
+
         if (typeof rawData === 'string') {
           const nestedData = JSON.parse(rawData);
           console.log('Nested message decoded:', nestedData);
@@ -78,6 +95,7 @@ const useChat = (url: string, patient_id?: string): UseChatHook => {
           setMessages((prevMessages) => [...prevMessages, normalizedMessage]);
         }
 
+        pendingIdRef.current = null;
         setIsLoading(false);
         setIsTyping(false);
       } catch (error) {
@@ -129,6 +147,7 @@ const useChat = (url: string, patient_id?: string): UseChatHook => {
     try {
       setMessages((prevMessages) => [...prevMessages, payload]);
       socketRef.current.send(JSON.stringify(payload));
+      pendingIdRef.current = payload.id;
       setIsLoading(true);
       setIsTyping(true);
       setError(null);
@@ -139,6 +158,12 @@ const useChat = (url: string, patient_id?: string): UseChatHook => {
     }
   };
 
+  // Cancel the query awaiting its answer; the server confirms with a "cancelled" event.
+  const stop = () => {
+    if (!socketRef.current || !pendingIdRef.current) return;
+    socketRef.current.send(JSON.stringify({ type: 'cancel', id: pendingIdRef.current }));
+  };
+
   return {
     messages,
     input,